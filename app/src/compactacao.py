@@ -0,0 +1,287 @@
+###################################################################################################################
+# Job de compactação de arquivos pequenos das tabelas refinadas (ao lado do JobELTB3).                            #
+# Para cada partição do catálogo dentro da janela (--MONTH, --START_DATE/--END_DATE ou o mês anterior), junta     #
+# os arquivos Parquet em arquivos do tamanho alvo (--TARGET_FILE_MB), ordenados por codigo_bovespa conforme o     #
+# perfil de gravação (--WRITE_PROFILE), trocando os arquivos sem que o Athena veja um estado intermediário:       #
+#   1. grava os arquivos novos em <location>/_compactacao/<partição>/<execução>/ (prefixo que o Athena e o Spark  #
+#      ignoram ao listar a tabela);                                                                               #
+#   2. aponta o location das partições no Glue Catalog para esse prefixo (batch_update_partition);                #
+#   3. copia os arquivos novos para o diretório da partição e apaga os antigos;                                   #
+#   4. devolve o location das partições ao diretório padrão e apaga o prefixo da execução.                        #
+# O layout final continua o da tabela (ex.: ano=/mes=/dia=/data_pregao=): o JobELTB3 no Spark recria as           #
+# partições a partir desses diretórios, então nenhum location fica apontando para fora deles ao fim.              #
+#                                                                                                                 #
+# Tabelas com partition projection (layout_particoes.py) não são compactadas: sem partições no catálogo não há    #
+# location a trocar, e o Athena lê os diretórios do S3 diretamente, então a cópia e a remoção do passo 3 abririam #
+# uma janela em que a partição é lida em dobro (ou pela metade). Elas são puladas com um aviso.                   #
+#                                                                                                                 #
+# A reexecução é idempotente: partições já no tamanho alvo não são regravadas, partições deixadas no passo 2/3    #
+# por uma execução interrompida são finalizadas a partir da versão que o catálogo aponta e versões órfãs são      #
+# removidas. Não deve rodar ao mesmo tempo que o JobELTB3 na mesma janela. Roda só com pyarrow no driver: cada    #
+# partição (um pregão) cabe em memória.                                                                           #
+###################################################################################################################
+
+import math
+import sys
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import boto3
+
+from motores import MotorArrow
+from perfil_gravacao import MB, colunas_ordenacao, escolher_perfil_gravacao, opcoes_arrow
+from instrumentacao import Instrumentacao
+from layout_particoes import projecao_habilitada
+
+PREFIXO_COMPACTACAO = "_compactacao"
+TARGET_FILE_MB_PADRAO = 128
+# Limite de entradas por chamada do batch_update_partition
+LOTE_CATALOGO = 100
+# Campos do Partition retornado pelo Glue aceitos no PartitionInput
+CAMPOS_PARTITION_INPUT = ["Values", "StorageDescriptor", "Parameters", "LastAccessTime", "LastAnalyzedTime"]
+
+
+class JobCompactacaoB3:
+    def __init__(self, database_name, table_name, region='sa-east-1', start_date=None, end_date=None, month=None,
+                 target_file_mb=TARGET_FILE_MB_PADRAO, write_profile="consulta", force=False, instrumentacao=None):
+        self.database_name = database_name
+        self.table_name = table_name
+        self.region = region
+        self.inicio, self.fim = janela_compactacao(start_date, end_date, month)
+        self.tamanho_alvo = int(target_file_mb * MB)
+        # O tamanho de arquivo do perfil é substituído pelo alvo da compactação
+        self.perfil = escolher_perfil_gravacao(write_profile)._replace(arquivo_bytes=self.tamanho_alvo)
+        self.force = force
+        self.glue_client = boto3.client('glue', region_name=self.region)
+        self.motor = MotorArrow(region=self.region)
+        self.execucao = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.instrumentacao = instrumentacao or Instrumentacao("JobCompactacaoB3", Tabela=table_name)
+
+    def listar_particoes_janela(self):
+        """
+        Partições da tabela no catálogo cuja data (data_pregao, ou ano/mes/dia) está na janela. Tabelas
+        com partition projection não são compactadas (nenhuma partição é retornada).
+        """
+        tabela = self.glue_client.get_table(DatabaseName=self.database_name, Name=self.table_name)['Table']
+        chaves = [chave['Name'] for chave in tabela.get('PartitionKeys', [])]
+        location = tabela['StorageDescriptor']['Location'].rstrip("/")
+        if projecao_habilitada(tabela.get('Parameters')):
+            print(f"[JobCompactacaoB3] '{self.database_name}.{self.table_name}' usa partition projection: sem "
+                  f"location por partição no catálogo a troca dos arquivos não seria atômica. Tabela ignorada.")
+            return location, chaves, []
+
+        particoes, token = [], None
+        while True:
+            parametros = {'DatabaseName': self.database_name, 'TableName': self.table_name}
+            if token:
+                parametros['NextToken'] = token
+            resposta = self.glue_client.get_partitions(**parametros)
+            for particao in resposta.get('Partitions', []):
+                if self.inicio <= data_da_particao(dict(zip(chaves, particao['Values']))) <= self.fim:
+                    particoes.append(particao)
+            token = resposta.get('NextToken')
+            if not token:
+                break
+        print(f"[JobCompactacaoB3] {len(particoes)} partição(ões) de '{self.database_name}.{self.table_name}' "
+              f"entre {self.inicio} e {self.fim}.")
+        return location, chaves, particoes
+
+    def listar_arquivos(self, caminho):
+        """
+        Arquivos Parquet diretamente sob o caminho: [(caminho no filesystem, tamanho)]. Nomes iniciados
+        por '_' ou '.' (marcadores e checksums) e subdiretórios são ignorados, como no Athena.
+        """
+        from pyarrow import fs
+        sistema, diretorio = self.motor._filesystem(caminho)
+        seletor = fs.FileSelector(diretorio.rstrip("/"), allow_not_found=True)
+        return sorted(
+            (info.path, info.size) for info in sistema.get_file_info(seletor)
+            if info.type == fs.FileType.File and not info.base_name.startswith(("_", "."))
+        )
+
+    def compactar_particao(self, padrao, versao):
+        """
+        Grava em 'versao' os arquivos compactados da partição cujo diretório é 'padrao'.
+
+        Returns:
+            dict | None: arquivos/bytes antes e depois, ou None quando a partição já está no tamanho
+                         alvo (ou vazia).
+        """
+        import pyarrow.parquet as pq
+
+        arquivos = self.listar_arquivos(padrao)
+        bytes_total = sum(tamanho for _, tamanho in arquivos)
+        alvo = max(1, math.ceil(bytes_total / self.tamanho_alvo))
+        if not arquivos or (len(arquivos) <= alvo and not self.force):
+            return None
+
+        sistema, _ = self.motor._filesystem(padrao)
+        # Sem partitioning: as colunas de partição ficam só nos diretórios, não dentro dos arquivos
+        tabela = pq.read_table([caminho for caminho, _ in arquivos], filesystem=sistema, partitioning=None)
+        ordenacao = colunas_ordenacao(self.perfil, tabela.column_names)
+        if ordenacao:
+            tabela = tabela.sort_by([(coluna, "ascending") for coluna in ordenacao])
+
+        sistema_versao, diretorio = self.motor._filesystem(versao)
+        pq.write_to_dataset(
+            tabela,
+            root_path=diretorio.rstrip("/"),
+            filesystem=sistema_versao,
+            basename_template=f"part-{self.execucao}-{{i}}.parquet",
+            **opcoes_arrow(self.perfil, tabela.column_names, bytes_total / max(tabela.num_rows, 1)),
+        )
+
+        novos = self.listar_arquivos(versao)
+        linhas_gravadas = sum(pq.ParquetFile(caminho, filesystem=sistema_versao).metadata.num_rows
+                              for caminho, _ in novos)
+        if linhas_gravadas != tabela.num_rows:
+            raise RuntimeError(f"Compactação de '{padrao}' gravou {linhas_gravadas} linhas, esperadas {tabela.num_rows}.")
+        return {"arquivos_antes": len(arquivos), "arquivos_depois": len(novos),
+                "bytes_antes": bytes_total, "bytes_depois": sum(tamanho for _, tamanho in novos)}
+
+    def atualizar_locations(self, particoes_locations):
+        """
+        Atualiza o location das partições [(partição do catálogo, novo location)] em lotes de até 100.
+        Cada troca de location é atômica para quem consulta pelo catálogo.
+        """
+        entradas = []
+        for particao, location in particoes_locations:
+            entrada = {campo: particao[campo] for campo in CAMPOS_PARTITION_INPUT if campo in particao}
+            entrada['StorageDescriptor'] = dict(particao['StorageDescriptor'], Location=location)
+            entradas.append({'PartitionValueList': particao['Values'], 'PartitionInput': entrada})
+
+        for inicio in range(0, len(entradas), LOTE_CATALOGO):
+            response = self.glue_client.batch_update_partition(
+                DatabaseName=self.database_name,
+                TableName=self.table_name,
+                Entries=entradas[inicio:inicio + LOTE_CATALOGO]
+            )
+            if response.get('Errors'):
+                raise RuntimeError(f"Erro ao atualizar o location das partições no Glue Catalog: {response['Errors']}")
+
+    def substituir_arquivos(self, padrao, versao):
+        """
+        Com o catálogo apontando para 'versao', deixa no diretório padrão exatamente os arquivos dela:
+        copia os novos e apaga os demais. Retorna a quantidade de arquivos antigos apagados.
+        """
+        sistema, diretorio = self.motor._filesystem(padrao)
+        novos = set()
+        for caminho, _ in self.listar_arquivos(versao):
+            nome = caminho.rsplit("/", 1)[-1]
+            sistema.copy_file(caminho, f"{diretorio.rstrip('/')}/{nome}")
+            novos.add(nome)
+
+        removidos = 0
+        for caminho, _ in self.listar_arquivos(padrao):
+            if caminho.rsplit("/", 1)[-1] not in novos:
+                sistema.delete_file(caminho)
+                removidos += 1
+        return removidos
+
+    def remover_versoes(self, location, sufixo):
+        """
+        Apaga as versões compactadas da partição; só é chamado com o catálogo apontando para o diretório padrão.
+        """
+        from pyarrow import fs
+        sistema, diretorio = self.motor._filesystem(f"{location}/{PREFIXO_COMPACTACAO}/{sufixo}")
+        if sistema.get_file_info(diretorio).type == fs.FileType.Directory:
+            sistema.delete_dir(diretorio)
+
+    def run(self):
+        try:
+            with self.instrumentacao.etapa("listagem_particoes") as medicao:
+                location, chaves, particoes = self.listar_particoes_janela()
+                medicao.registrar(particoes=len(particoes))
+
+            # (partição, diretório padrão, versão compactada)
+            trocas, estatisticas = [], []
+            with self.instrumentacao.etapa("compactacao") as medicao:
+                for particao in particoes:
+                    sufixo = sufixo_particao(chaves, particao['Values'])
+                    padrao = f"{location}/{sufixo}/"
+                    atual = particao['StorageDescriptor']['Location']
+                    if atual.rstrip("/") != padrao.rstrip("/"):
+                        # Execução anterior interrompida entre os passos 2 e 4: a versão do catálogo é a vigente
+                        print(f"[JobCompactacaoB3] Finalizando troca pendente de '{sufixo}' ({atual}).")
+                        trocas.append((particao, padrao, atual))
+                        continue
+                    versao = f"{location}/{PREFIXO_COMPACTACAO}/{sufixo}/{self.execucao}/"
+                    compactada = self.compactar_particao(padrao, versao)
+                    if compactada:
+                        trocas.append((particao, padrao, versao))
+                        estatisticas.append(compactada)
+                medicao.registrar(
+                    particoes=len(estatisticas),
+                    arquivos=sum(item["arquivos_depois"] for item in estatisticas),
+                    bytes_lidos=sum(item["bytes_antes"] for item in estatisticas),
+                    bytes_gravados=sum(item["bytes_depois"] for item in estatisticas),
+                )
+
+            with self.instrumentacao.etapa("troca_arquivos") as medicao:
+                self.atualizar_locations([(particao, versao) for particao, _, versao in trocas if
+                                          particao['StorageDescriptor']['Location'] != versao])
+                removidos = sum(self.substituir_arquivos(padrao, versao) for _, padrao, versao in trocas)
+                self.atualizar_locations([(particao, padrao) for particao, padrao, _ in trocas])
+                medicao.registrar(particoes=len(trocas), arquivos=removidos)
+
+            with self.instrumentacao.etapa("limpeza_versoes") as medicao:
+                for particao in particoes:
+                    self.remover_versoes(location, sufixo_particao(chaves, particao['Values']))
+                medicao.registrar(particoes=len(particoes))
+
+            antes = sum(item["arquivos_antes"] for item in estatisticas)
+            depois = sum(item["arquivos_depois"] for item in estatisticas)
+            print(f"[JobCompactacaoB3] {len(estatisticas)} de {len(particoes)} partição(ões) compactada(s): "
+                  f"{antes} -> {depois} arquivo(s); {removidos} arquivo(s) antigo(s) removido(s).")
+            return estatisticas
+
+        except Exception as e:
+            print(f"[JobCompactacaoB3] Erro na compactação: {e}")
+            raise
+
+
+def janela_compactacao(start_date=None, end_date=None, month=None):
+    """
+    Intervalo de datas compactado: --MONTH (YYYY-MM), --START_DATE/--END_DATE ou, sem argumentos,
+    o mês anterior (execução agendada no início de cada mês).
+    """
+    if start_date or end_date:
+        inicio = datetime.strptime(start_date or end_date, "%Y-%m-%d").date()
+        fim = datetime.strptime(end_date or start_date, "%Y-%m-%d").date()
+        if inicio > fim:
+            raise ValueError(f"START_DATE ({inicio}) posterior a END_DATE ({fim}).")
+        return inicio, fim
+    if month:
+        inicio = datetime.strptime(month, "%Y-%m").date()
+    else:
+        inicio = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+    proximo_mes = (inicio.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return inicio, proximo_mes - timedelta(days=1)
+
+
+def data_da_particao(valores):
+    if "data_pregao" in valores:
+        return datetime.strptime(valores["data_pregao"], "%Y-%m-%d").date()
+    return date(int(valores["ano"]), int(valores["mes"]), int(valores.get("dia", 1)))
+
+
+def sufixo_particao(chaves, valores):
+    return "/".join(f"{chave}={valor}" for chave, valor in zip(chaves, valores))
+
+
+if __name__ == "__main__":
+    from argumentos_job import parse_bool_argumento, parse_lista_argumento, resolver_argumentos, resolver_argumentos_opcionais
+
+    # Lendo argumentos passados pelo Terraform (TABLE_NAMES: tabelas refinadas separadas por vírgula)
+    args = resolver_argumentos(sys.argv, ['DATABASE_NAME', 'TABLE_NAMES'])
+    args.update(resolver_argumentos_opcionais(sys.argv, ['START_DATE', 'END_DATE', 'MONTH', 'TARGET_FILE_MB',
+                                                         'WRITE_PROFILE', 'FORCE']))
+
+    for table_name in parse_lista_argumento(args['TABLE_NAMES']):
+        JobCompactacaoB3(args['DATABASE_NAME'], table_name,
+                         start_date=args.get('START_DATE'),
+                         end_date=args.get('END_DATE'),
+                         month=args.get('MONTH'),
+                         target_file_mb=float(args.get('TARGET_FILE_MB', TARGET_FILE_MB_PADRAO)),
+                         write_profile=args.get('WRITE_PROFILE', 'consulta'),
+                         force=parse_bool_argumento(args.get('FORCE'))).run()
@@ -5,28 +5,73 @@
 # e atualiza o catálogo do Glue com a nova tabela criada para acesso as consultas no AWS Athena.                  #
 ###################################################################################################################
 
-from pyspark.sql import SparkSession
-from awsglue.context import GlueContext
-from awsglue.transforms import *
-from awsglue.dynamicframe import DynamicFrame
-from awsglue.utils import getResolvedOptions
-from awsglue.job import Job
-from pyspark.sql.functions import year, month, dayofmonth,to_date,regexp_replace,col,current_date,col, sum, avg,to_date, lag, datediff,when,lpad, lit
-from pyspark.sql.window import Window
 import re
 import boto3
 import time
 import sys
+from datetime import date, datetime
 
 ###### Habilitar caso tenha subido via esteira git ###### 
 
 #from modulos.catalog_glue_table import CatalogGlueTable 
 
+from manifesto_particoes import ManifestoParticoes
+from motores import MotorSpark, escolher_motor, estimar_bytes_entrada, listar_parquet
+from transformacoes_b3 import TransformacoesB3
+from janelas_incrementais import JanelasIncrementais
+from dimensao_acoes import DimensaoAcoes
+from instrumentacao import Instrumentacao
+from perfil_spark import aplicar_perfil, escolher_perfil
+from perfil_gravacao import PERFIL_GRAVACAO_PADRAO, colunas_ordenacao, opcoes_spark, perfil_da_tabela
+from layout_particoes import LAYOUT_PADRAO, colunas_descartadas, colunas_particao, escolher_layout, prefixo_particao
+from catalogo_glue import CatalogoGlue
+from referencias_snapshot import ReplicadorReferencias, data_particao_raw
+from qualidade_dados import ValidacaoQualidade, verificar_relatorio
+from argumentos_job import (parse_bool_argumento, parse_lista_argumento, parse_mapa_argumento, resolver_argumentos,
+                            resolver_argumentos_opcionais)
+
+# Entradas até este tamanho (soma dos Parquet RAW) são processadas só com pyarrow no modo --ENGINE auto
+ARROW_MAX_BYTES_PADRAO = 64 * 1024 * 1024
+
+# StorageLevel do DataFrame transformado (ou LOCAL_CHECKPOINT / NONE), ver MotorSpark.materializar
+PERSIST_LEVEL_PADRAO = "MEMORY_AND_DISK"
+
 class JobELTB3:
-    def __init__(self, spark, glueContext, input_path, output_path, database_name,table_name, output_table_name,output_bucket,region='sa-east-1'):
+    def __init__(self, spark, glueContext, input_path, output_path, database_name,table_name, output_table_name,output_bucket,region='sa-east-1',
+                 input_paths=None, start_date=None, end_date=None, partitions=None,
+                 incremental=False, manifest_path=None, engine="auto", arrow_max_bytes=ARROW_MAX_BYTES_PADRAO,
+                 window_table_name=None, window_state_path=None, window_periodo=3,
+                 metrics_row_counts=False, instrumentacao=None, persist_level=PERSIST_LEVEL_PADRAO, preview_rows=0,
+                 spark_profile="auto", write_profile=PERFIL_GRAVACAO_PADRAO, write_profiles=None,
+                 partition_layout=LAYOUT_PADRAO, aggregate_table_name=None, history_table_name=None,
+                 latest_table_name=None, quality_checks=True, quality_thresholds=None, quality_report_path=None):
         self.spark = spark
         self.glueContext = glueContext
         self.input_path = input_path
+        # Lista de partições do lote (--INPUT_PATHS); quando ausente, apenas input_path é processado
+        self.input_paths = input_paths
+        # Modo backfill: intervalo (--START_DATE/--END_DATE) ou lista de datas (--PARTITIONS) da tabela RAW
+        self.start_date = start_date
+        self.end_date = end_date
+        self.partitions = partitions
+        # Modo incremental: processa apenas partições RAW novas/alteradas segundo o manifesto
+        self.incremental = incremental
+        self.manifest_path = manifest_path
+        self._particoes_backfill = None
+        # Motor das transformações; o Spark é o padrão até selecionar_motor() avaliar a entrada
+        self.engine = (engine or "auto").lower()
+        self.arrow_max_bytes = arrow_max_bytes
+        self.motor = MotorSpark(spark, region=region)
+        self.transformacoes = TransformacoesB3(self.motor)
+        # Janelas incrementais (variação diária e média móvel), gravadas em uma tabela própria
+        self.window_table_name = window_table_name
+        self.window_state_path = window_state_path
+        self.window_periodo = window_periodo
+        # Agregado diário por tipo (somas e contagens por pregão), regravado só nas partições do lote
+        self.aggregate_table_name = aggregate_table_name
+        # Dimensão das ações (dimensao_acoes.py): histórico SCD tipo 2 e carteira atual, um arquivo cada
+        self.history_table_name = history_table_name
+        self.latest_table_name = latest_table_name
         self.output_path = output_path
         self.database_name = database_name
         self.table_name = table_name
@@ -35,43 +80,150 @@ class JobELTB3:
         self.region=region
         self.client = boto3.client('athena', region_name=self.region)
         self.glue_client = boto3.client('glue', region_name=self.region)
+        # Metadados de tabela em cache e registro de partições em lote (catalogo_glue.py)
+        self.catalogo = CatalogoGlue(self.glue_client, region=self.region)
+        # Métricas por etapa em EMF no stdout. No Spark as contagens de linhas custam uma ação extra
+        # cada, então só são feitas com --METRICS_ROW_COUNTS (no Arrow são gratuitas e sempre medidas).
+        self.instrumentacao = instrumentacao or Instrumentacao("JobELTB3", Job=output_table_name)
+        self.metrics_row_counts = metrics_row_counts
+        self.bytes_entrada = None
+        # O DataFrame transformado é materializado uma única vez (--PERSIST_LEVEL) e alimenta todas as
+        # saídas; --PREVIEW_ROWS (opcional) mostra uma amostra dele sem recomputar a entrada.
+        self.persist_level = persist_level
+        self.preview_rows = preview_rows
+        self.df_materializado = None
+        self.linhas_materializadas = None
+        # Perfil de execução do Spark (partições de shuffle, AQE, broadcast, tarefas de gravação), ver perfil_spark.py
+        self.spark_profile = (spark_profile or "auto").lower()
+        self.perfil_spark = None
+        # Perfil de gravação Parquet por tabela (--WRITE_PROFILES tabela=perfil,...; demais: --WRITE_PROFILE)
+        self.write_profile = write_profile
+        self.write_profiles = write_profiles or {}
+        # Layout de partição das tabelas refinadas (--PARTITION_LAYOUT), ver layout_particoes.py. Com partition
+        # projection as partições não são registradas no catálogo: o Athena as deriva do template da tabela.
+        self.layout = escolher_layout(partition_layout)
+        # Partições RAW com o marcador _MESMO_QUE.json (conteúdo igual ao de um pregão anterior) não são lidas:
+        # as partições da referência na tabela refinada e no agregado por tipo são copiadas (referencias_snapshot.py)
+        tabelas_replicadas = [output_table_name] + ([aggregate_table_name] if aggregate_table_name else [])
+        self.replicador = ReplicadorReferencias(self.catalogo, database_name, tabelas_replicadas, region=region)
+        self.referencias = []
+        # Validação de qualidade (qualidade_dados.py): uma agregação sobre o resultado materializado, antes de
+        # qualquer gravação; limites por --QUALITY_THRESHOLDS e relatório de cada execução em --QUALITY_REPORT_PATH
+        self.quality_checks = quality_checks
+        self.quality_thresholds = quality_thresholds or {}
+        self.quality_report_path = quality_report_path
+
+    def caminhos_entrada(self):
+        """
+        Diretórios de partição RAW lidos pela execução: as partições selecionadas pelo backfill
+        (particoes_backfill) ou o lote do gatilho (--INPUT_PATHS ou INPUT_PATH).
+        """
+        if self.modo_backfill():
+            raiz = self.raw_table_root()
+            return [f"{raiz}{particao}/" for particao in sorted(self.particoes_backfill())]
+        return self.input_paths or [self.input_path]
 
     def read_parquet_from_s3(self):
-        print(f"Lendo os dados do S3: {self.input_path}")
+        caminhos = self.caminhos_entrada()
+        print(f"Lendo os dados do S3: {len(caminhos)} partição(ões) {caminhos[:5]}{' ...' if len(caminhos) > 5 else ''}")
         try:
-            # 1. Lê o DataFrame diretamente do caminho da partição.
-            # As colunas de partição (ano, mes, dia) NÃO estarão presentes neste DataFrame.
-            df = self.spark.read.parquet(self.input_path)
-            print("Dados lidos do arquivo parquet com sucesso.")
-
-            # 2. Extrai os valores de ano, mês e dia do caminho S3 usando expressões regulares.
-            ano_match = re.search(r"ano=(\d{4})", self.input_path)
-            mes_match = re.search(r"mes=(\d{2})", self.input_path)
-            dia_match = re.search(r"dia=(\d{2})", self.input_path)
-
-            if not (ano_match and mes_match and dia_match):
-                raise ValueError(f"Não foi possível extrair ano, mês e dia do caminho: {self.input_path}")
-
-            ano = ano_match.group(1)
-            mes = mes_match.group(1)
-            dia = dia_match.group(1)
-            print(f"Partições extraídas do caminho: ano={ano}, mes={mes}, dia={dia}")
-
-            # 3. Adiciona as colunas de partição extraídas ao DataFrame.
-            df_with_partitions = df.withColumn("ano", lit(ano)) \
-                                   .withColumn("mes", lit(mes)) \
-                                   .withColumn("dia", lit(dia))
-            
-            return df_with_partitions
+            # 1. Valida que todos os caminhos apontam para uma partição ano=/mes=/dia= da mesma tabela.
+            base_path = self.extrair_base_path(caminhos)
+
+            # 2. Lê as partições explicitamente (nada fora delas é listado). Cada arquivo (Arrow) ou grupo de
+            # arquivos com o mesmo schema (Spark) é convertido para o schema RAW tipado antes da união, então
+            # partições gravadas em texto pelo scraper antigo e partições tipadas são lidas juntas.
+            df = self.motor.ler_parquet(caminhos, base_path, normalizar=self.transformacoes.normalizar_raw)
+            print(f"Dados lidos de {len(caminhos)} partição(ões) com {self.motor.nome} (basePath={base_path}).")
+            return df
         except Exception as e:
             print(f"[read_parquet_from_s3] Erro ao ler parquet e adicionar colunas de partição: {e}")
             raise
 
+    def modo_backfill(self):
+        return bool(self.start_date or self.end_date or self.partitions)
+
+    def raw_table_root(self):
+        """
+        Raiz da tabela RAW: o prefixo anterior a 'ano=' quando INPUT_PATH aponta para uma partição,
+        ou <INPUT_PATH>/<TABLE_NAME>/ quando aponta para o bucket (valor padrão do job).
+        """
+        if "ano=" in self.input_path:
+            return self.input_path[:self.input_path.index("ano=")]
+        return f"{self.input_path.rstrip('/')}/{self.table_name}/"
+
+    def data_no_backfill(self, data):
+        """
+        Indica se o pregão (datetime.date) está entre as datas selecionadas pelo backfill.
+        """
+        if self.partitions:
+            return data in {datetime.strptime(particao, "%Y-%m-%d").date() for particao in self.partitions}
+        inicio = datetime.strptime(self.start_date or self.end_date, "%Y-%m-%d").date()
+        fim = datetime.strptime(self.end_date or self.start_date, "%Y-%m-%d").date()
+        return inicio <= data <= fim
+
+    def particoes_backfill(self):
+        """
+        Objetos Parquet das partições RAW selecionadas pelo backfill, no formato do manifesto
+        ({"ano=YYYY/mes=MM/dia=DD": {objeto: {"etag", "size"}}}), a partir de uma única listagem
+        da raiz da tabela (sem abrir os arquivos).
+        """
+        if self._particoes_backfill is None:
+            particoes = ManifestoParticoes(None, region=self.region).listar_particoes(self.raw_table_root())
+            self._particoes_backfill = {
+                particao: objetos for particao, objetos in particoes.items()
+                if self.data_no_backfill(datetime.strptime(particao, "ano=%Y/mes=%m/dia=%d").date())}
+        return self._particoes_backfill
+
+    def estimar_bytes_backfill(self):
+        """
+        Soma os arquivos RAW das partições selecionadas pelo backfill.
+        """
+        return sum(objeto["size"] for objetos in self.particoes_backfill().values() for objeto in objetos.values())
+
+    def extrair_base_path(self, caminhos):
+        """
+        Retorna a raiz da tabela (tudo antes de 'ano=') comum a todos os caminhos de partição.
+        """
+        bases = set()
+        for caminho in caminhos:
+            if not re.search(r"ano=(\d{4})/mes=(\d{2})/dia=(\d{2})", caminho):
+                raise ValueError(f"Não foi possível extrair ano, mês e dia do caminho: {caminho}")
+            bases.add(caminho[:caminho.index("ano=")])
+
+        if len(bases) != 1:
+            raise ValueError(f"Os caminhos de entrada pertencem a tabelas diferentes: {sorted(bases)}")
+        return bases.pop()
+
+    def perfil_gravacao(self, table_name):
+        perfil = perfil_da_tabela(table_name, self.write_profiles, self.write_profile)
+        print(f"Perfil de gravação da tabela '{table_name}': {perfil.nome} ({perfil.codec}, ordenação={perfil.ordenacao}, "
+              f"bloom filter={perfil.bloom_filter})")
+        return perfil
+
+    def bytes_por_linha(self):
+        """
+        Tamanho médio de uma linha em Parquet, estimado pela entrada RAW desta execução; converte
+        os tamanhos alvo do perfil de gravação em quantidade de linhas.
+        """
+        if self.bytes_entrada and self.linhas_materializadas:
+            return self.bytes_entrada / self.linhas_materializadas
+        return None
+
+    def ordenar_para_gravacao(self, df, colunas_particao, perfil):
+        ordenacao = colunas_ordenacao(perfil, df.columns)
+        if ordenacao:
+            # Mantém as colunas de partição na frente: o Spark não reordena o que já chega agrupado por partição
+            df = df.sortWithinPartitions(*colunas_particao, *ordenacao)
+        return df
+
     def write_parquet_to_s3(self, df):
         try:
-            df.write\
+            perfil = self.perfil_gravacao(self.output_table_name)
+            self.ordenar_para_gravacao(df, ["ano", "mes", "dia"], perfil).write\
               .mode("overwrite")\
               .option("partitionOverwriteMode", "DYNAMIC") \
+              .options(**opcoes_spark(perfil, self.bytes_por_linha())) \
               .partitionBy("ano", "mes", "dia")\
               .parquet(f"{self.output_path}{self.output_table_name}")
             
@@ -82,24 +234,40 @@ class JobELTB3:
             print(f"[write_parquet_to_s3] Erro na gravação dos dados : {e}")
             raise
 
-    def update_glue_catalog(self, df):
+    def update_glue_catalog(self, df, table_name=None):
+      table_name = table_name or self.output_table_name
       try:
-          refined_table_location = self.get_table_location(self.database_name, self.output_table_name)
-          spark = self.glueContext.spark_session
+          refined_table_location = self.get_table_location(self.database_name, table_name)
+          spark = self.motor.spark
           spark.conf.set("spark.sql.sources.partitionOverwriteMode", "dynamic")
 
           print(f"Constructed output path for saveAsTable: {self.output_path}")  # Debugging
           print(f"Output table location: {refined_table_location}")
-          print(f"Database: {self.database_name}, Table: {self.output_table_name}")  # Debugging
-          print(f"Initiating dynamic partition overwrite for table '{self.database_name}.{self.output_table_name}'...")
+          print(f"Database: {self.database_name}, Table: {table_name}")  # Debugging
+          print(f"Initiating dynamic partition overwrite for table '{self.database_name}.{table_name}'...")
+
+          chaves = colunas_particao(self.layout)
+          if self.perfil_spark:
+              # Cada partição de saída fica em uma única tarefa: um arquivo por pregão, sem arquivos minúsculos
+              df = df.repartition(self.perfil_spark.tarefas_gravacao, *chaves)
+          perfil = self.perfil_gravacao(table_name)
+          df = self.ordenar_para_gravacao(df, chaves, perfil)
 
-          df.write \
+          writer = df.write \
           .mode("overwrite") \
           .format("parquet") \
-          .partitionBy("ano", "mes", "dia", "data_pregao") \
-          .option("path", refined_table_location) \
-          .saveAsTable(f"{self.database_name}.{self.output_table_name}") 
-          print(f"Data saved to '{refined_table_location}' and catalog '{self.database_name}.{self.output_table_name}' updated successfully.")
+          .options(**opcoes_spark(perfil, self.bytes_por_linha())) \
+          .partitionBy(*chaves)
+          if self.layout.projecao:
+              # Com partition projection basta gravar os diretórios: o saveAsTable recriaria a tabela sem
+              # os parâmetros de projeção e registraria no catálogo partições que o Athena não consulta
+              if not refined_table_location:
+                  raise ValueError(f"Tabela '{self.database_name}.{table_name}' sem location no catálogo.")
+              writer.option("partitionOverwriteMode", "dynamic").parquet(refined_table_location)
+          else:
+              writer.option("path", refined_table_location).saveAsTable(f"{self.database_name}.{table_name}")
+          print(f"Data saved to '{refined_table_location}' and catalog '{self.database_name}.{table_name}' updated successfully.")
+          return refined_table_location
 
       except Exception as e:
           print(f"[update_glue_catalog] Error overwriting data and updating catalog: {e}")
@@ -107,155 +275,434 @@ class JobELTB3:
 
     def get_table_location(self, db_name, tbl_name):
         """
-        Consulta o AWS Glue Catalog usando Boto3 para obter o S3 location de uma tabela.
+        Consulta o AWS Glue Catalog para obter o S3 location de uma tabela (get_table em cache).
         """
         try:
-            print(f"Consultando o location da tabela '{db_name}.{tbl_name}' via Boto3...")
-            response = self.glue_client.get_table(
-                DatabaseName=db_name,
-                Name=tbl_name
-            )
-            location = response['Table']['StorageDescriptor']['Location']
+            print(f"Consultando o location da tabela '{db_name}.{tbl_name}' no Glue Catalog...")
+            location = self.catalogo.location_tabela(db_name, tbl_name)
+            if location is None:
+                print(f"A tabela '{db_name}.{tbl_name}' não foi encontrada no catálogo.")
+                return None
             print(f"Location encontrado: {location}")
             return location
-        except self.glue_client.exceptions.EntityNotFoundException:
-            print(f"A tabela '{db_name}.{tbl_name}' não foi encontrada no catálogo.")
-            return None
         except Exception as e:
             print(f"Erro ao consultar a tabela no Glue: {e}")
             raise
 
 
     def adicionar_data_pregao(self,df):
-        # Adiciona a data do pregão baseada na data atual da execução
-        df_partition = df.withColumn("data_pregao", to_date(current_date(), "yyyy-MM-dd"))
-        return df_partition
+        return self.transformacoes.adicionar_data_pregao(df)
 
+    def raw_schema_tipado(self, df):
+        return self.transformacoes.raw_schema_tipado(df)
 
     def transform_dataframe(self, df):
+        return self.transformacoes.transform_dataframe(df)
+
+    def sumarizacao_tipo(self,df):
+        return self.transformacoes.sumarizacao_tipo(df)
+
+    def window_variacoes_diarias(self,df):
+        return self.transformacoes.window_variacoes_diarias(df)
+
+    def window_media_movel(self,df, periodo=3):
+        return self.transformacoes.window_media_movel(df, periodo)
+
+    def selecionar_motor(self):
+        """
+        Escolhe o motor das transformações (--ENGINE spark|arrow|auto). No modo 'auto' a entrada é
+        estimada pela listagem do S3 e, abaixo de --ARROW_MAX_BYTES, o job roda só com pyarrow,
+        sem estágios Spark. O backfill lê uma lista explícita de partições, como o lote do gatilho.
+        """
+        if self.modo_backfill():
+            bytes_entrada = self.estimar_bytes_backfill()
+        else:
+            bytes_entrada = estimar_bytes_entrada(self.input_paths or [self.input_path], region=self.region)
+        self.motor = escolher_motor(self.spark, self.engine, bytes_entrada, self.arrow_max_bytes, region=self.region)
+
+        self.transformacoes = TransformacoesB3(self.motor)
+        self.bytes_entrada = bytes_entrada
+        print(f"Motor selecionado: {self.motor.nome} (engine={self.engine}, bytes de entrada={bytes_entrada}, "
+              f"limite Arrow={self.arrow_max_bytes})")
+
+        if self.motor.nome == "spark":
+            self.perfil_spark = escolher_perfil(bytes_entrada, self.spark_profile)
+            configuracoes = aplicar_perfil(self.motor.spark, self.perfil_spark)
+            print(f"Perfil Spark '{self.perfil_spark.nome}' (--SPARK_PROFILE={self.spark_profile}): "
+                  f"tarefas de gravação={self.perfil_spark.tarefas_gravacao}, configurações={configuracoes}")
+        return self.motor
+
+    def contar_linhas(self, df):
+        if df is self.df_materializado:
+            return self.linhas_materializadas
+        if self.motor.nome == "arrow" or self.metrics_row_counts:
+            return self.motor.contar(df)
+        return None
+
+    def gravar_refinado(self, df, table_name=None, etapa="gravacao_refinado"):
+        """
+        Grava o resultado na tabela do catálogo com o motor selecionado, medindo linhas, arquivos,
+        bytes e partições gravados. No Spark é nesta etapa que a leitura e as transformações
+        (avaliação preguiçosa) são de fato executadas.
+        """
+        table_name = table_name or self.output_table_name
+        with self.instrumentacao.etapa(etapa, Motor=self.motor.nome, Tabela=table_name) as medicao:
+            medicao.registrar(linhas_saida=self.contar_linhas(df))
+            # Colunas de partição do layout legado fora do layout escolhido não são gravadas
+            for coluna in colunas_descartadas(self.layout):
+                if coluna in self.motor.colunas(df):
+                    df = self.motor.remover(df, coluna)
+            if self.motor.nome == "arrow":
+                location, particoes = self.gravar_refinado_arrow(df, table_name)
+                prefixos = ["/".join(f"{nome}={valor}" for nome, valor in
+                                     zip(colunas_particao(self.layout), particao)) for particao in particoes]
+            else:
+                location = self.update_glue_catalog(df, table_name)
+                # Cada partição RAW ano=/mes=/dia= lida gera a partição do mesmo pregão na saída
+                prefixos = [] if self.modo_backfill() else [
+                    prefixo_particao(self.layout, date(*(int(valor) for valor in re.search(
+                        r"ano=(\d{4})/mes=(\d{2})/dia=(\d{2})", caminho).groups())))
+                    for caminho in self.input_paths or [self.input_path]]
+            if location and prefixos:
+                arquivos, bytes_gravados = listar_parquet([f"{location.rstrip('/')}/{prefixo}/" for prefixo in prefixos],
+                                                          region=self.region)
+                medicao.registrar(arquivos=arquivos, bytes_gravados=bytes_gravados, particoes=len(prefixos))
+
+    def gravar_refinado_arrow(self, tabela, table_name=None):
+        """
+        Grava a tabela refinada (motor Arrow) no location da tabela do catálogo, sobrescrevendo só as
+        partições presentes, e registra essas partições no Glue Catalog (exceto com partition projection).
+        """
+        table_name = table_name or self.output_table_name
         try:
-            print("Iniciando tratamento rename columns ...")
-            df_renamed = df.withColumnRenamed("segment", "segmento") \
-                           .withColumnRenamed("cod", "codigo_bovespa") \
-                           .withColumnRenamed("asset", "nome_acao") \
-                           .withColumnRenamed("type", "nome_tipo_acao") \
-                           .withColumnRenamed("part", "percentual_participacao_acao") \
-                           .withColumnRenamed("partacum", "percentual_participacao_acumulada") \
-                           .withColumnRenamed("theoricalqty", "quantidade_teorica")
-    
-            print("Iniciando conversão de tipos e limpeza...")
-            df_transformed = df_renamed \
-                .withColumn("quantidade_teorica", regexp_replace(col("quantidade_teorica"), "\\.", "").cast("decimal(18,0)")) \
-                .withColumn("percentual_participacao_acumulada", regexp_replace(col("percentual_participacao_acumulada"), ",", ".").cast("decimal(18,3)")) \
-                .withColumn("percentual_participacao_acao", regexp_replace(col("percentual_participacao_acao"), ",", ".").cast("decimal(18,3)")) \
-                .withColumn("ano", col("ano").cast("string")) \
-                .withColumn("mes", lpad(col("mes").cast("string"), 2, '0')) \
-                .withColumn("dia", lpad(col("dia").cast("string"), 2, '0'))
-    
-            # As colunas de string não precisam de cast explícito se já foram lidas como string.
-            # Ex: .withColumn("segmento", col("segmento").cast("string"))
-    
-            return df_transformed
+            chaves = colunas_particao(self.layout)
+            refined_table_location = self.get_table_location(self.database_name, table_name)
+            if not refined_table_location:
+                raise ValueError(f"Tabela '{self.database_name}.{table_name}' sem location no catálogo.")
+
+            particoes = self.motor.gravar_particionado(tabela, refined_table_location, chaves,
+                                                       self.perfil_gravacao(table_name), self.bytes_por_linha())
+            print(f"{tabela.num_rows} linhas gravadas em {len(particoes)} partição(ões) de '{refined_table_location}'.")
+            if not self.layout.projecao:
+                self.registrar_particoes_catalogo(refined_table_location, chaves, particoes, table_name)
+            return refined_table_location, particoes
         except Exception as e:
-            print(f"Erro na etapa de tratamento do dataframe: {e}")
+            print(f"[gravar_refinado_arrow] Erro na gravação dos dados refinados: {e}")
             raise
 
-        def agrupar_faixa_teorica_qtde(self,df):
-            """
-            Agrupa ações em faixas de Qtde. Teórica.
-            
-            Faixas:
-            - Muito Alta: acima de 5 bilhões
-            - Alta: entre 3 e 5 bilhões
-            - Média: entre 1 e 3 bilhões
-            - Baixa: abaixo de 1 bilhão
-            """
-            print("Classificando ações em faixas de Qtde. Teórica ...")
-            df = df.withColumn(
-                "classificcao_quantidade_teorica",
-                when(col("quantidade_teorica") > 5_000_000_000, "Muito Alta")
-                .when((col("quantidade_teorica") > 3_000_000_000), "Alta")
-                .when((col("quantidade_teorica") > 1_000_000_000), "Média")
-                .otherwise("Baixa")
-            )
-            return df
-            
-    def sumarizacao_tipo(self,df):
+    def registrar_particoes_catalogo(self, location, colunas_particao, particoes, table_name):
+        """
+        Registra as partições gravadas fora do Spark na tabela do catálogo em lotes de até 100
+        (batch_create_partition). Partições já existentes são ignoradas.
         """
-        Sumarização dos dados por 'Tipo' e calcula:
-        - Soma de Qtde. Teórica
-        - Média de Qtde. Teórica
-        - Soma de Part (%)
-        - Média de Part (%)
-        """
-        # Aplica agregações
-        print("Realizando sumarização dos dados por 'Tipo' ...")
-        sumarizacao = df.groupBy("nome_tipo_acao").agg(
-            sum("quantidade_teorica").alias("total_quantidade_teorica"),
-            avg("quantidade_teorica").alias("media_quantidade_teorica"),
-            sum("percentual_participacao_acao").alias("total_percentual_participacao_acao"),
-            avg("percentual_participacao_acao").alias("media_percentual_participacao_acao")
-            )   
-             
-        return sumarizacao
+        entradas = []
+        for valores in particoes:
+            sufixo = "/".join(f"{nome}={valor}" for nome, valor in zip(colunas_particao, valores))
+            entradas.append((valores, f"{location.rstrip('/')}/{sufixo}/"))
+        resumo = self.catalogo.criar_particoes(self.database_name, table_name, entradas)
+        print(f"{len(entradas)} partição(ões) registrada(s) em '{self.database_name}.{table_name}'.")
+        return resumo
 
-    def window_variacoes_diarias(self,df):
-            """
-            Aplica função de janela para calcular variações diarias
-            """
-            # Janela ordenada por data para cada código
-            print("Calculando variações diárias ...")
-            janela = Window.partitionBy("codigo_bovespa").orderBy("data_pregao")
-            
-            df = df.withColumn("quantidade_teorica_anterior", lag("quantidade_teorica").over(janela))
-            df = df.withColumn("percentual_participacao_acao_anterior", lag("percentual_participacao_acao").over(janela))
-            
-            df = df.withColumn("variacao_quantidade_teorica", col("quantidade_teorica") - col("quantidade_teorica_anterior")) \
-                   .withColumn("variacao_percentual_participacao_acao_anterior", col("percentual_participacao_acao") - col("percentual_participacao_acao_anterior")) \
-                   .withColumn("intervalo", datediff(col("data_pregao"), lag("data_pregao").over(janela)))
-            
-            return df
-            
-    def window_media_movel(self,df, periodo=3):
-            """
-            Parâmetro
-            - periodo: número de dias para a média móvel (default = 3)
-            """
-            print(f"Calculando média móvel de {periodo} dias ...")
-            # Janela por codigo_bovespa, ordenada por data_pregao, com N dias anteriores
-            janela = Window.partitionBy("codigo_bovespa").orderBy("data_pregao").rowsBetween(-periodo + 1, 0)
-            # Calcula média móvel
-            df = df.withColumn("media_movel_quantidade_teorica", avg("quantidade_teorica").over(janela))
+    def agregado_diario_tipo(self, df):
+        return self.transformacoes.agregado_diario_tipo(df)
+
+    def processar_janelas(self, df):
+        """
+        Calcula a variação diária e a média móvel do lote a partir do estado incremental das janelas,
+        grava o resultado na tabela de janelas (--WINDOW_TABLE_NAME) e só então atualiza o estado.
+        No modo backfill o estado só guarda as últimas observações e não serve de histórico para um
+        intervalo antigo: as janelas são calculadas apenas sem estado (recálculo completo).
+        """
+        try:
+            if not self.window_state_path:
+                raise ValueError("O cálculo das janelas exige o argumento WINDOW_STATE_PATH.")
+            janelas = JanelasIncrementais(self.motor, self.window_state_path, self.window_periodo)
+            estado = janelas.carregar_estado()
+            if self.modo_backfill() and estado is not None:
+                print(f"Backfill com estado das janelas em '{self.window_state_path}': janelas não calculadas. Para "
+                      f"o recálculo completo, apague o estado e execute o backfill do histórico inteiro.")
+                return
+            df_janelas, novo_estado = janelas.calcular(df, estado)
+
+            self.gravar_refinado(df_janelas, self.window_table_name, etapa="gravacao_janelas")
+            with self.instrumentacao.etapa("estado_janelas", Motor=self.motor.nome) as medicao:
+                # Contado antes da gravação: no Spark o estado novo ainda depende dos arquivos do estado anterior
+                medicao.registrar(linhas_saida=self.contar_linhas(novo_estado))
+                janelas.salvar_estado(novo_estado)
+        except Exception as e:
+            print(f"[processar_janelas] Erro no cálculo incremental das janelas: {e}")
+            raise
+
+    def processar_dimensao_acoes(self, df):
+        """
+        Aplica as diferenças dos pregões do lote ao histórico SCD tipo 2 das ações (--HISTORY_TABLE_NAME)
+        e regrava a carteira atual (--LATEST_TABLE_NAME), sem reler a tabela refinada. Índices cujo lote
+        termina antes do último pregão já aplicado (backfill de um período antigo, gatilho atrasado) são
+        ignorados pela dimensão, que não é rebobinada (ver dimensao_acoes.rebobinar).
+        """
+        try:
+            locations = {}
+            for table_name in (self.history_table_name, self.latest_table_name):
+                locations[table_name] = self.get_table_location(self.database_name, table_name)
+                if not locations[table_name]:
+                    raise ValueError(f"Tabela '{self.database_name}.{table_name}' sem location no catálogo.")
+            dimensao = DimensaoAcoes(self.motor, locations[self.history_table_name],
+                                     locations[self.latest_table_name], region=self.region)
+            with self.instrumentacao.etapa("gravacao_dimensao_acoes", Motor=self.motor.nome) as medicao:
+                resumo = dimensao.atualizar(df)
+                medicao.registrar(linhas_entrada=resumo["linhas_lote"], linhas_saida=resumo["versoes"],
+                                  bytes_gravados=resumo["bytes_gravados"], arquivos=2 if resumo["bytes_gravados"] else 0)
+            return resumo
+        except Exception as e:
+            print(f"[processar_dimensao_acoes] Erro na atualização da dimensão das ações: {e}")
+            raise
+
+    def validar_qualidade(self, df):
+        """
+        Valida o DataFrame materializado em uma única agregação por índice e pregão e grava o relatório
+        da execução. No Spark a agregação é a varredura que preenche o cache da materialização (e, com
+        --PERSIST_LEVEL NONE, uma leitura a mais da entrada).
+
+        Returns:
+            dict: relatório de qualidade (o job é interrompido por verificar_relatorio quando há falha).
+        """
+        try:
+            validacao = ValidacaoQualidade(self.motor, self.quality_thresholds, self.quality_report_path,
+                                           region=self.region)
+            if self.modo_backfill():
+                contexto = {"start_date": self.start_date, "end_date": self.end_date, "partitions": self.partitions}
+            else:
+                contexto = {"entradas": self.input_paths or [self.input_path]}
+            relatorio = validacao.validar(df, tabela=self.output_table_name, **contexto)
+            validacao.gravar_relatorio(relatorio, self.output_table_name)
+            return relatorio
+        except Exception as e:
+            print(f"[validar_qualidade] Erro na validação de qualidade dos dados: {e}")
+            raise
+
+    def selecionar_particoes_incrementais(self):
+        """
+        Define input_paths com as partições RAW novas ou alteradas desde a última execução.
+        Retorna o snapshot a ser gravado no manifesto, ou None quando não há nada a processar.
+        """
+        if self.modo_backfill():
+            raise ValueError("O modo incremental não pode ser combinado com START_DATE/END_DATE/PARTITIONS.")
+        if not self.manifest_path:
+            raise ValueError("O modo incremental exige o argumento MANIFEST_PATH.")
+
+        self.manifesto = ManifestoParticoes(self.manifest_path, region=self.region)
+        caminhos, snapshot = self.manifesto.particoes_pendentes(self.raw_table_root())
+        if not caminhos:
+            return None
+        self.input_paths = caminhos
+        return snapshot
+
+    def snapshot_particoes_lote(self):
+        """
+        Snapshot das partições RAW lidas por uma execução não incremental (gatilho com --INPUT_PATHS
+        ou backfill), gravado no manifesto ao fim da execução como no modo incremental: a execução
+        incremental seguinte só recupera as partições que nenhum gatilho processou.
+        """
+        self.manifesto = ManifestoParticoes(self.manifest_path, region=self.region)
+        if self.modo_backfill():
+            return self.particoes_backfill()
+        return self.manifesto.snapshot_caminhos(self.input_paths or [self.input_path])
+
+    def separar_referencias(self):
+        """
+        Retira do lote as partições RAW marcadas como iguais a um pregão anterior e copia para elas a
+        partição refinada da referência. Quando a referência ainda não tem partição refinada (o
+        processamento dela falhou ou está na fila), a partição RAW da referência entra no lote e a
+        cópia é refeita depois da gravação (replicar_referencias).
+
+        Returns:
+            int: quantidade de partições do lote que eram referências.
+        """
+        caminhos = self.input_paths or [self.input_path]
+        reais, marcadas = [], 0
+        for caminho in caminhos:
+            marcador = self.replicador.ler_marcador(caminho) if data_particao_raw(caminho) else None
+            if marcador is None:
+                reais.append(caminho)
+                continue
+            marcadas += 1
+            _, faltantes = self.replicador.replicar(caminho, marcador)
+            if faltantes:
+                prefixo = marcador["prefixo_referencia"]
+                referencia = f"{caminho[:caminho.index('ano=')]}{prefixo[prefixo.index('ano='):]}"
+                print(f"Partição refinada do pregão {marcador['data_referencia']} ausente: {referencia} entra no lote.")
+                if referencia not in reais and referencia not in caminhos:
+                    reais.append(referencia)
+                self.referencias.append((caminho, marcador))
+        if marcadas:
+            self.input_paths = sorted(reais)
+            self.input_path = self.input_paths[0] if reais else self.input_path
+        return marcadas
+
+    def separar_referencias_backfill(self):
+        """
+        Partições RAW do intervalo do backfill marcadas como iguais a um pregão anterior. Elas não têm
+        Parquet e ficam fora da leitura; a cópia da partição refinada da referência é feita depois da
+        gravação (replicar_referencias), já que a própria referência pode estar sendo regravada.
+
+        Returns:
+            int: quantidade de partições marcadas no intervalo.
+        """
+        marcadas = 0
+        for caminho in self.replicador.listar_marcadores(self.raw_table_root()):
+            if not self.data_no_backfill(data_particao_raw(caminho)):
+                continue
+            marcador = self.replicador.ler_marcador(caminho)
+            if marcador is not None:
+                self.referencias.append((caminho, marcador))
+                marcadas += 1
+        return marcadas
+
+    def replicar_referencias(self):
+        for caminho, marcador in self.referencias:
+            _, faltantes = self.replicador.replicar(caminho, marcador)
+            if faltantes:
+                raise ValueError(f"Partição refinada do pregão de referência {marcador['data_referencia']} não "
+                                 f"encontrada em {faltantes} para replicar {caminho}.")
+        self.referencias = []
 
     def run(self):
         try:
-            df_full_b3 = self.read_parquet_from_s3()
-            df_full_b3 = self.adicionar_data_pregao(df_full_b3)
-            df_full_b3 = self.transform_dataframe(df_full_b3)
-            #self.write_parquet_to_s3(df_full_b3)
-            df_full_b3.show()
-            # O método update_glue_catalog não precisa mais do dataframe
-            self.update_glue_catalog(df_full_b3)
+            snapshot_manifesto = None
+            if self.incremental:
+                snapshot_manifesto = self.selecionar_particoes_incrementais()
+                if snapshot_manifesto is None:
+                    print("Nenhuma partição RAW nova ou alterada desde a última execução. Nada a processar.")
+                    return
+            elif self.manifest_path:
+                # Listado antes da leitura: registra os objetos que esta execução lê, não os gravados depois.
+                snapshot_manifesto = self.snapshot_particoes_lote()
+
+            if self.modo_backfill():
+                with self.instrumentacao.etapa("referencias") as medicao:
+                    medicao.registrar(particoes=self.separar_referencias_backfill())
+                if not self.particoes_backfill():
+                    print("Nenhuma partição RAW com dados no intervalo do backfill. Só as referências são replicadas.")
+                    self.replicar_referencias()
+                    return
+            else:
+                with self.instrumentacao.etapa("referencias") as medicao:
+                    marcadas = self.separar_referencias()
+                    medicao.registrar(particoes=marcadas)
+                if marcadas and not self.input_paths:
+                    print(f"Todas as {marcadas} partição(ões) do lote são iguais a pregões já processados e foram "
+                          f"copiadas. Nada a transformar.")
+                    return
+
+            with self.instrumentacao.etapa("selecao_motor") as medicao:
+                self.selecionar_motor()
+                medicao.registrar(bytes_lidos=self.bytes_entrada)
+
+            # No Spark leitura e transformação apenas montam o plano (inferência de schema incluída);
+            # a varredura da entrada acontece uma única vez, na etapa de materialização (ou na de qualidade).
+            with self.instrumentacao.etapa("leitura", Motor=self.motor.nome) as medicao:
+                df_full_b3 = self.read_parquet_from_s3()
+                medicao.registrar(bytes_lidos=self.bytes_entrada, linhas_entrada=self.contar_linhas(df_full_b3),
+                                  particoes=None if self.modo_backfill() else len(self.input_paths or [self.input_path]))
+
+            with self.instrumentacao.etapa("transformacao", Motor=self.motor.nome):
+                df_full_b3 = self.adicionar_data_pregao(df_full_b3)
+                df_full_b3 = self.transform_dataframe(df_full_b3)
+
+            with self.instrumentacao.etapa("materializacao", Motor=self.motor.nome, Nivel=self.persist_level) as medicao:
+                # Com a validação de qualidade, a agregação dela é a ação que preenche o cache no lugar do count()
+                df_full_b3, self.linhas_materializadas = self.motor.materializar(df_full_b3, self.persist_level,
+                                                                                 contar=not self.quality_checks)
+                self.df_materializado = df_full_b3
+                medicao.registrar(linhas_saida=self.linhas_materializadas)
+
+            try:
+                #self.write_parquet_to_s3(df_full_b3)
+                if self.quality_checks:
+                    with self.instrumentacao.etapa("qualidade", Motor=self.motor.nome) as medicao:
+                        relatorio = self.validar_qualidade(df_full_b3)
+                        if self.linhas_materializadas is None:
+                            self.linhas_materializadas = relatorio["linhas"]
+                        status = [resultado["status"] for resultado in relatorio["regras"]]
+                        medicao.registrar(linhas_entrada=relatorio["linhas"], particoes=relatorio["pregoes"],
+                                          alertas=status.count("alerta"), falhas=status.count("falha"))
+                    # Falha de qualidade interrompe o job antes de qualquer gravação
+                    verificar_relatorio(relatorio)
+
+                if self.preview_rows:
+                    with self.instrumentacao.etapa("preview", Motor=self.motor.nome):
+                        self.motor.mostrar(df_full_b3, self.preview_rows)
+
+                # Todas as saídas abaixo partem do mesmo resultado materializado
+                self.gravar_refinado(df_full_b3)
+
+                with self.instrumentacao.etapa("sumarizacao_tipo", Motor=self.motor.nome) as medicao:
+                    df_sumarizacao = self.sumarizacao_tipo(df_full_b3)
+                    self.motor.mostrar(df_sumarizacao)
+                    medicao.registrar(linhas_entrada=self.linhas_materializadas)
+
+                if self.aggregate_table_name:
+                    with self.instrumentacao.etapa("agregado_tipo", Motor=self.motor.nome):
+                        self.gravar_refinado(self.agregado_diario_tipo(df_full_b3), self.aggregate_table_name,
+                                             etapa="gravacao_agregado")
+
+                if self.window_table_name:
+                    with self.instrumentacao.etapa("janelas", Motor=self.motor.nome):
+                        self.processar_janelas(df_full_b3)
+
+                if self.history_table_name and self.latest_table_name:
+                    with self.instrumentacao.etapa("dimensao_acoes", Motor=self.motor.nome):
+                        self.processar_dimensao_acoes(df_full_b3)
+            finally:
+                self.motor.liberar(df_full_b3)
+
+            if self.referencias:
+                with self.instrumentacao.etapa("referencias_pendentes") as medicao:
+                    medicao.registrar(particoes=len(self.referencias))
+                    self.replicar_referencias()
+
+            if snapshot_manifesto:
+                with self.instrumentacao.etapa("manifesto") as medicao:
+                    self.manifesto.registrar_processadas(snapshot_manifesto)
+                    medicao.registrar(particoes=len(snapshot_manifesto))
 
         except Exception as e:
             print(f"Erro ao executar o job: {e}")
             raise
 
+
 if __name__ == "__main__":
     # Lendo argumentos passados pelo Terraform para desacoplar o código da infraestrutura
-    args = getResolvedOptions(sys.argv, ['JOB_NAME',
-                                         'INPUT_PATH',
-                                         'OUTPUT_PATH',
-                                         'DATABASE_NAME',
-                                         'TABLE_NAME',
-                                         'OUTPUT_TABLE_NAME',
-                                         'ATHENA_OUTPUT_BUCKET'])
-    spark = SparkSession.builder.appName("job_elt_b3").getOrCreate()
-    glueContext = GlueContext(spark)
-    job = Job(glueContext)
-    job.init(args['JOB_NAME'], args)
-
-    print("Glue Job iniciado com sucesso")
+    args = resolver_argumentos(sys.argv, ['INPUT_PATH',
+                                          'OUTPUT_PATH',
+                                          'DATABASE_NAME',
+                                          'TABLE_NAME',
+                                          'OUTPUT_TABLE_NAME',
+                                          'ATHENA_OUTPUT_BUCKET'])
+    args.update(resolver_argumentos_opcionais(sys.argv, ['INPUT_PATHS', 'START_DATE', 'END_DATE', 'PARTITIONS',
+                                                             'INCREMENTAL', 'MANIFEST_PATH', 'ENGINE', 'ARROW_MAX_BYTES',
+                                                             'WINDOW_TABLE_NAME', 'WINDOW_STATE_PATH', 'WINDOW_PERIODO',
+                                                             'METRICS_ROW_COUNTS', 'PERSIST_LEVEL', 'PREVIEW_ROWS',
+                                                             'SPARK_PROFILE', 'WRITE_PROFILE', 'WRITE_PROFILES',
+                                                             'PARTITION_LAYOUT', 'AGGREGATE_TABLE_NAME',
+                                                             'HISTORY_TABLE_NAME', 'LATEST_TABLE_NAME',
+                                                             'QUALITY_CHECKS', 'QUALITY_THRESHOLDS',
+                                                             'QUALITY_REPORT_PATH', 'JOB_NAME']))
+
+    # Com --ENGINE arrow (job Python shell ou execução local) o job roda sem SparkSession, GlueContext
+    # nem Job: Glue e Spark só são importados aqui e pelo MotorSpark
+    spark, glueContext, job = None, None, None
+    if args.get('ENGINE', 'auto').lower() != "arrow":
+        from awsglue.context import GlueContext
+        from awsglue.job import Job
+        from pyspark.sql import SparkSession
+
+        spark = SparkSession.builder.appName("job_elt_b3").getOrCreate()
+        glueContext = GlueContext(spark)
+        job = Job(glueContext)
+        job.init(args['JOB_NAME'], args)
+
+    print(f"Glue Job iniciado com sucesso (engine={args.get('ENGINE', 'auto')})")
 
     # Instanciando a classe com os argumentos dinâmicos
     job_b3 = JobELTB3(spark, glueContext,
@@ -264,7 +711,32 @@ if __name__ == "__main__":
                       args['DATABASE_NAME'],
                       args['TABLE_NAME'],
                       args['OUTPUT_TABLE_NAME'],
-                      args['ATHENA_OUTPUT_BUCKET'])
+                      args['ATHENA_OUTPUT_BUCKET'],
+                      input_paths=parse_lista_argumento(args.get('INPUT_PATHS')),
+                      start_date=args.get('START_DATE'),
+                      end_date=args.get('END_DATE'),
+                      partitions=parse_lista_argumento(args.get('PARTITIONS')),
+                      incremental=parse_bool_argumento(args.get('INCREMENTAL')),
+                      manifest_path=args.get('MANIFEST_PATH'),
+                      engine=args.get('ENGINE', 'auto'),
+                      arrow_max_bytes=int(args.get('ARROW_MAX_BYTES', ARROW_MAX_BYTES_PADRAO)),
+                      window_table_name=args.get('WINDOW_TABLE_NAME'),
+                      window_state_path=args.get('WINDOW_STATE_PATH'),
+                      window_periodo=int(args.get('WINDOW_PERIODO', 3)),
+                      metrics_row_counts=parse_bool_argumento(args.get('METRICS_ROW_COUNTS')),
+                      persist_level=args.get('PERSIST_LEVEL', PERSIST_LEVEL_PADRAO),
+                      preview_rows=int(args.get('PREVIEW_ROWS', 0)),
+                      spark_profile=args.get('SPARK_PROFILE', 'auto'),
+                      write_profile=args.get('WRITE_PROFILE', PERFIL_GRAVACAO_PADRAO),
+                      write_profiles=parse_mapa_argumento(args.get('WRITE_PROFILES')),
+                      partition_layout=args.get('PARTITION_LAYOUT', LAYOUT_PADRAO),
+                      aggregate_table_name=args.get('AGGREGATE_TABLE_NAME'),
+                      history_table_name=args.get('HISTORY_TABLE_NAME'),
+                      latest_table_name=args.get('LATEST_TABLE_NAME'),
+                      quality_checks=parse_bool_argumento(args.get('QUALITY_CHECKS', 'true')),
+                      quality_thresholds=parse_mapa_argumento(args.get('QUALITY_THRESHOLDS')),
+                      quality_report_path=args.get('QUALITY_REPORT_PATH'))
     job_b3.run()
 
-    job.commit()
\ No newline at end of file
+    if job is not None:
+        job.commit()
\ No newline at end of file
@@ -0,0 +1,196 @@
+###################################################################################################################
+# Migração das tabelas refinadas do layout legado (ano=/mes=/dia=/data_pregao=) para o layout 'data_pregao'       #
+# com partition projection (layout_particoes.py). Roda com pyarrow, fora do Glue, pelo operador:                  #
+#   1. python app/src/migracao_layout.py --database <db> --tables <tabela> ...                                    #
+#      grava, na mesma raiz da tabela, um diretório data_pregao=<data>/ por pregão do layout legado (ordenado     #
+#      conforme o perfil de gravação) e confere as linhas; os diretórios ano=/mes=/dia= continuam intactos;       #
+#   2. terraform apply com refined_partition_layout = "data_pregao": a tabela passa a usar projection e o         #
+#      JobELTB3 (--PARTITION_LAYOUT) a gravar no layout novo;                                                     #
+#   3. repete o passo 1 com --remover-origem: migra o que mudou desde o passo 1, apaga os diretórios legados e    #
+#      remove do Glue Catalog as partições legadas (batch_delete_partition).                                      #
+# A reexecução é idempotente: pregões cujo destino já tem as mesmas linhas e é mais novo que a origem não são     #
+# regravados. Não deve rodar ao mesmo tempo que o JobELTB3.                                                       #
+###################################################################################################################
+
+import argparse
+import os
+import sys
+import uuid
+from datetime import datetime
+
+import boto3
+
+from motores import MotorArrow
+from perfil_gravacao import colunas_ordenacao, escolher_perfil_gravacao, opcoes_arrow
+from layout_particoes import COLUNAS_LEGADO, colunas_particao, escolher_layout, listar_diretorios_particao, prefixo_particao
+from instrumentacao import Instrumentacao
+
+# Limite de entradas por chamada do batch_delete_partition
+LOTE_REMOCAO_CATALOGO = 25
+
+
+class MigracaoLayoutB3:
+    def __init__(self, database_name, table_name, layout="data_pregao", location=None, region='sa-east-1',
+                 write_profile="consulta", remover_origem=False, instrumentacao=None):
+        self.database_name = database_name
+        self.table_name = table_name
+        self.layout = escolher_layout(layout)
+        if not self.layout.projecao:
+            raise ValueError(f"O layout de destino deve usar partition projection (recebido: {self.layout.nome}).")
+        self.location = location
+        self.region = region
+        self.perfil = escolher_perfil_gravacao(write_profile)
+        self.remover_origem = remover_origem
+        self.glue_client = boto3.client('glue', region_name=self.region)
+        self.motor = MotorArrow(region=self.region)
+        self.execucao = f"{datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.instrumentacao = instrumentacao or Instrumentacao("MigracaoLayoutB3", Tabela=table_name)
+
+    def localizar_tabela(self):
+        if not self.location:
+            tabela = self.glue_client.get_table(DatabaseName=self.database_name, Name=self.table_name)['Table']
+            self.location = tabela['StorageDescriptor']['Location']
+        self.location = self.location.rstrip("/")
+        return self.location
+
+    def listar_arquivos(self, sistema, diretorio):
+        """
+        Arquivos Parquet diretamente sob o diretório: [(caminho, tamanho, mtime)], ignorando marcadores.
+        """
+        from pyarrow import fs
+        return sorted(
+            (info.path, info.size, info.mtime) for info in
+            sistema.get_file_info(fs.FileSelector(diretorio.rstrip("/"), allow_not_found=True))
+            if info.type == fs.FileType.File and not info.base_name.startswith(("_", "."))
+        )
+
+    def contar_linhas(self, sistema, arquivos):
+        import pyarrow.parquet as pq
+        return sum(pq.ParquetFile(caminho, filesystem=sistema).metadata.num_rows for caminho, _, _ in arquivos)
+
+    def migrar_particao(self, sistema, raiz, valores):
+        """
+        Regrava o pregão da partição legada 'valores' no diretório do layout novo.
+
+        Returns:
+            dict | None: arquivos e linhas migrados, ou None quando o destino já está atualizado.
+        """
+        import pyarrow.parquet as pq
+
+        legado = dict(zip(COLUNAS_LEGADO, valores))
+        origem = "/".join([raiz] + [f"{nome}={valor}" for nome, valor in legado.items()])
+        destino = f"{raiz}/{prefixo_particao(self.layout, datetime.strptime(legado['data_pregao'], '%Y-%m-%d').date())}"
+
+        arquivos = self.listar_arquivos(sistema, origem)
+        existentes = self.listar_arquivos(sistema, destino)
+        linhas = self.contar_linhas(sistema, arquivos)
+        if not arquivos:
+            return None
+        if existentes and self.contar_linhas(sistema, existentes) == linhas and \
+                min(mtime for _, _, mtime in existentes) >= max(mtime for _, _, mtime in arquivos):
+            return None
+
+        # Sem partitioning: as colunas de partição ficam só nos diretórios, não dentro dos arquivos
+        tabela = pq.read_table([caminho for caminho, _, _ in arquivos], filesystem=sistema, partitioning=None)
+        ordenacao = colunas_ordenacao(self.perfil, tabela.column_names)
+        if ordenacao:
+            tabela = tabela.sort_by([(coluna, "ascending") for coluna in ordenacao])
+        bytes_origem = sum(tamanho for _, tamanho, _ in arquivos)
+        pq.write_to_dataset(
+            tabela,
+            root_path=destino,
+            filesystem=sistema,
+            basename_template=f"part-{self.execucao}-{{i}}.parquet",
+            **opcoes_arrow(self.perfil, tabela.column_names, bytes_origem / max(tabela.num_rows, 1)),
+        )
+
+        # Os arquivos de uma migração anterior (desatualizada) só saem depois que os novos foram gravados
+        novos = [arquivo for arquivo in self.listar_arquivos(sistema, destino) if self.execucao in arquivo[0]]
+        linhas_gravadas = self.contar_linhas(sistema, novos)
+        if linhas_gravadas != tabela.num_rows:
+            raise RuntimeError(f"Migração de '{origem}' gravou {linhas_gravadas} linhas, esperadas {tabela.num_rows}.")
+        for caminho, _, _ in existentes:
+            sistema.delete_file(caminho)
+        return {"arquivos_antes": len(arquivos), "arquivos_depois": len(novos), "linhas": linhas_gravadas}
+
+    def remover_particoes_catalogo(self, particoes):
+        """
+        Remove do Glue Catalog as partições legadas, em lotes de até 25; as já ausentes são ignoradas.
+        """
+        for inicio in range(0, len(particoes), LOTE_REMOCAO_CATALOGO):
+            response = self.glue_client.batch_delete_partition(
+                DatabaseName=self.database_name,
+                TableName=self.table_name,
+                PartitionsToDelete=[{'Values': list(valores)} for valores in particoes[inicio:inicio + LOTE_REMOCAO_CATALOGO]]
+            )
+            erros = [erro for erro in response.get('Errors', [])
+                     if erro.get('ErrorDetail', {}).get('ErrorCode') != 'EntityNotFoundException']
+            if erros:
+                raise RuntimeError(f"Erro ao remover partições legadas do Glue Catalog: {erros}")
+
+    def run(self):
+        try:
+            with self.instrumentacao.etapa("listagem_particoes") as medicao:
+                location = self.localizar_tabela()
+                sistema, raiz = self.motor._filesystem(location)
+                raiz = raiz.rstrip("/")
+                particoes = listar_diretorios_particao(sistema, raiz, COLUNAS_LEGADO)
+                medicao.registrar(particoes=len(particoes))
+            print(f"[MigracaoLayoutB3] {len(particoes)} partição(ões) legada(s) em '{location}' -> layout "
+                  f"'{self.layout.nome}' ({'/'.join(colunas_particao(self.layout))}).")
+
+            estatisticas = []
+            with self.instrumentacao.etapa("migracao") as medicao:
+                for valores in particoes:
+                    migrada = self.migrar_particao(sistema, raiz, valores)
+                    if migrada:
+                        estatisticas.append(migrada)
+                medicao.registrar(
+                    particoes=len(estatisticas),
+                    arquivos=sum(item["arquivos_depois"] for item in estatisticas),
+                    linhas_saida=sum(item["linhas"] for item in estatisticas),
+                )
+
+            if self.remover_origem and particoes:
+                with self.instrumentacao.etapa("remocao_origem") as medicao:
+                    for valores in particoes:
+                        sistema.delete_dir("/".join([raiz] + [f"{nome}={valor}" for nome, valor in
+                                                              zip(COLUNAS_LEGADO, valores)]))
+                    # Diretórios ano=/mes=/dia= que ficaram vazios
+                    for nivel in range(len(COLUNAS_LEGADO) - 1, 0, -1):
+                        for valores in listar_diretorios_particao(sistema, raiz, COLUNAS_LEGADO[:nivel]):
+                            diretorio = "/".join([raiz] + [f"{nome}={valor}" for nome, valor in
+                                                           zip(COLUNAS_LEGADO, valores)])
+                            if not self.listar_arquivos(sistema, diretorio) and \
+                                    not listar_diretorios_particao(sistema, diretorio, COLUNAS_LEGADO[nivel:nivel + 1]):
+                                sistema.delete_dir(diretorio)
+                    self.remover_particoes_catalogo(particoes)
+                    medicao.registrar(particoes=len(particoes))
+
+            print(f"[MigracaoLayoutB3] {len(estatisticas)} de {len(particoes)} pregão(ões) migrado(s) "
+                  f"({sum(item['linhas'] for item in estatisticas)} linhas)"
+                  f"{'; layout legado removido' if self.remover_origem else ''}.")
+            return estatisticas
+
+        except Exception as e:
+            print(f"[MigracaoLayoutB3] Erro na migração de layout: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra tabelas refinadas do layout legado para partition projection.")
+    parser.add_argument("--database", required=True)
+    parser.add_argument("--tables", nargs="+", required=True)
+    parser.add_argument("--layout", default="data_pregao")
+    parser.add_argument("--location", help="raiz da tabela (padrão: location do Glue Catalog); só com uma tabela")
+    parser.add_argument("--write-profile", default="consulta")
+    parser.add_argument("--remover-origem", action="store_true",
+                        help="apaga os diretórios e as partições do catálogo do layout legado após migrar")
+    parser.add_argument("--region", default=os.environ.get("AWS_DEFAULT_REGION", "sa-east-1"))
+    args = parser.parse_args()
+    if args.location and len(args.tables) > 1:
+        sys.exit("--location só pode ser usado com uma única tabela.")
+
+    for table_name in args.tables:
+        MigracaoLayoutB3(args.database, table_name, layout=args.layout, location=args.location, region=args.region,
+                         write_profile=args.write_profile, remover_origem=args.remover_origem).run()
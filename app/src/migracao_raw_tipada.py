@@ -0,0 +1,159 @@
+###################################################################################################################
+# Migração única da camada RAW para o schema tipado gravado pelo scraper (theoricalQty bigint, part/partAcum      #
+# decimal(18,3), indice). Partições gravadas antes dele guardam os numéricos como texto no formato brasileiro,    #
+# o que a tabela RAW do Glue Catalog (já tipada) não consegue ler no Athena. Roda com pyarrow, fora do Glue:      #
+#   python app/src/migracao_raw_tipada.py --location s3://<bucket>/<tabela RAW>/ [--dry-run]                      #
+# Cada arquivo em texto é convertido com as mesmas validações do scraper (valor fora do formato interrompe a      #
+# migração) e regravado com a mesma chave; arquivos já tipados são ignorados, então a reexecução é idempotente.   #
+# A regravação dispara a notificação do S3: com a Lambda de gatilho ativa, as partições migradas são              #
+# reprocessadas pelo JobELTB3 (mesmo resultado). Para evitar, rode com lambda_state = "DISABLED".                 #
+###################################################################################################################
+
+import argparse
+import os
+import re
+import uuid
+
+# Mesmos formatos validados pelo scraper (lambda_functions_scrapper.py)
+PADRAO_INTEIRO_BR = r'^\d{1,3}(\.\d{3})*$'
+PADRAO_DECIMAL_BR = r'^\d+(,\d+)?$'
+
+PADRAO_PARTICAO = re.compile(r"ano=\d{4}/mes=\d{2}/dia=\d{2}/")
+
+# Arquivos anteriores à raspagem multi-índice não têm a coluna 'indice' (eram sempre IBOV)
+INDICE_LEGADO = "IBOV"
+
+
+def raw_schema():
+    """
+    Schema tipado dos arquivos RAW; deve acompanhar raw_schema() do scraper e infra/modules/table/raw.
+    """
+    import pyarrow as pa
+    return pa.schema([
+        pa.field('segment', pa.string()),
+        pa.field('cod', pa.string()),
+        pa.field('asset', pa.string()),
+        pa.field('type', pa.string()),
+        pa.field('part', pa.decimal128(18, 3)),
+        pa.field('partAcum', pa.decimal128(18, 3)),
+        pa.field('theoricalQty', pa.int64()),
+        pa.field('indice', pa.string()),
+    ])
+
+
+def _texto(tabela, coluna):
+    import pyarrow as pa
+    tipo = tabela.schema.field(coluna).type
+    return pa.types.is_string(tipo) or pa.types.is_large_string(tipo)
+
+
+def _validar_formato(tabela, coluna, padrao):
+    import pyarrow.compute as pc
+    valores = tabela.column(coluna)
+    validos = pc.fill_null(pc.match_substring_regex(valores, padrao), False)
+    invalidos = len(valores) - pc.sum(validos).as_py() if len(valores) else 0
+    if invalidos:
+        exemplos = pc.filter(valores, pc.invert(validos)).slice(0, 5).to_pylist()
+        raise ValueError(f"Coluna '{coluna}' com {invalidos} valor(es) fora do formato esperado. Exemplos: {exemplos}")
+    return valores
+
+
+def tipar_arquivo(tabela):
+    """
+    Converte uma tabela RAW em texto para raw_schema(); None quando ela já está tipada.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not any(_texto(tabela, coluna) for coluna in ('part', 'partAcum', 'theoricalQty')):
+        return None
+    schema = raw_schema()
+    colunas = {nome: tabela.column(nome).cast(pa.string()) for nome in ('segment', 'cod', 'asset', 'type')}
+    for coluna in ('part', 'partAcum'):
+        valores = tabela.column(coluna)
+        if _texto(tabela, coluna):
+            valores = pc.replace_substring(_validar_formato(tabela, coluna, PADRAO_DECIMAL_BR), ',', '.')
+        colunas[coluna] = pc.cast(valores, pa.decimal128(18, 3))
+    quantidade = tabela.column('theoricalQty')
+    if _texto(tabela, 'theoricalQty'):
+        quantidade = pc.replace_substring(_validar_formato(tabela, 'theoricalQty', PADRAO_INTEIRO_BR), '.', '')
+    colunas['theoricalQty'] = pc.cast(quantidade, pa.int64())
+    if 'indice' in tabela.column_names:
+        colunas['indice'] = pc.fill_null(tabela.column('indice').cast(pa.string()), INDICE_LEGADO)
+    else:
+        colunas['indice'] = pa.array([INDICE_LEGADO] * tabela.num_rows, pa.string())
+    return pa.Table.from_pydict(colunas, schema=schema)
+
+
+class MigracaoRawTipada:
+    def __init__(self, location, region='sa-east-1', dry_run=False):
+        self.location = location.rstrip("/")
+        self.region = region
+        self.dry_run = dry_run
+
+    def _filesystem(self):
+        from pyarrow import fs
+        if self.location.startswith("s3://"):
+            return fs.S3FileSystem(region=self.region), self.location[len("s3://"):]
+        return fs.LocalFileSystem(), self.location
+
+    def listar_arquivos(self, sistema, raiz):
+        """
+        Arquivos Parquet das partições ano=/mes=/dia= sob a raiz, ignorando marcadores e temporários.
+        """
+        from pyarrow import fs
+        return sorted(
+            info.path for info in sistema.get_file_info(fs.FileSelector(raiz, recursive=True))
+            if info.type == fs.FileType.File and info.path.endswith(".parquet")
+            and not info.base_name.startswith(("_", ".")) and PADRAO_PARTICAO.search(info.path)
+        )
+
+    def migrar_arquivo(self, sistema, caminho):
+        """
+        Regrava o arquivo com o schema tipado. A troca é atômica: no S3 o put do objeto substitui o anterior
+        de uma vez; no disco local o arquivo é gravado ao lado e renomeado por cima.
+
+        Returns:
+            int | None: linhas migradas, ou None quando o arquivo já estava tipado.
+        """
+        import pyarrow.parquet as pq
+
+        tabela = tipar_arquivo(pq.read_table(caminho, filesystem=sistema, partitioning=None))
+        if tabela is None:
+            return None
+        if self.dry_run:
+            return tabela.num_rows
+        if self.location.startswith("s3://"):
+            pq.write_table(tabela, caminho, filesystem=sistema)
+        else:
+            temporario = os.path.join(os.path.dirname(caminho), f".migracao-{uuid.uuid4().hex}.parquet")
+            pq.write_table(tabela, temporario)
+            os.replace(temporario, caminho)
+        return tabela.num_rows
+
+    def run(self):
+        try:
+            sistema, raiz = self._filesystem()
+            arquivos = self.listar_arquivos(sistema, raiz)
+            migrados, linhas = 0, 0
+            for caminho in arquivos:
+                migradas = self.migrar_arquivo(sistema, caminho)
+                if migradas is not None:
+                    migrados += 1
+                    linhas += migradas
+                    print(f"[MigracaoRawTipada] {'(dry-run) ' if self.dry_run else ''}{caminho}: {migradas} linha(s).")
+            print(f"[MigracaoRawTipada] {migrados} de {len(arquivos)} arquivo(s) RAW em texto "
+                  f"{'a migrar' if self.dry_run else 'migrado(s)'} ({linhas} linhas) em '{self.location}'.")
+            return {"arquivos": len(arquivos), "migrados": migrados, "linhas": linhas}
+        except Exception as e:
+            print(f"[MigracaoRawTipada] Erro na migração da camada RAW: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra os arquivos RAW em texto para o schema tipado do scraper.")
+    parser.add_argument("--location", required=True, help="raiz da tabela RAW (s3://bucket/tabela/ ou diretório local)")
+    parser.add_argument("--dry-run", action="store_true", help="só lista os arquivos que seriam migrados")
+    parser.add_argument("--region", default=os.environ.get("AWS_DEFAULT_REGION", "sa-east-1"))
+    args = parser.parse_args()
+    MigracaoRawTipada(args.location, region=args.region, dry_run=args.dry_run).run()
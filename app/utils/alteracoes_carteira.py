@@ -0,0 +1,102 @@
+###################################################################################################################
+# Alterações da carteira teórica entre pregões (change-set), calculadas pelo scraper na ingestão.                 #
+# A cada snapshot gravado de fato, o scraper compara as carteiras raspadas com as do pregão anterior por um       #
+# índice em memória (dicionário por cod: O(ações), sem janelas sobre o histórico) e grava na partição RAW do dia, #
+# junto dos Parquet, o _ALTERACOES.json com, por índice:                                                          #
+#   - entradas e saídas de ações da carteira;                                                                     #
+#   - alterações de participação (part) e de quantidade teórica (theoricalQty), com o valor anterior, o novo e a  #
+#     diferença.                                                                                                  #
+# O estado da comparação (carteira de cada índice no último pregão e no pregão anterior a ele) fica em            #
+# <tabela RAW>/_conteudo/ultima_carteira.json e só é lido quando o conteúdo mudou: um dia com o marcador          #
+# _MESMO_QUE.json não tem alterações por definição e não grava o arquivo. Regravar o mesmo pregão (conteúdo novo  #
+# no mesmo dia ou forcar_gravacao) compara de novo com o pregão anterior, não com a gravação anterior do dia.     #
+###################################################################################################################
+
+from decimal import Decimal
+
+# Change-set gravado na partição RAW do dia junto dos Parquet ('_': ignorado pelo Athena, Spark e gatilho)
+ARQUIVO_ALTERACOES = "_ALTERACOES.json"
+
+# Estado da comparação, relativo à raiz da tabela RAW
+CHAVE_ULTIMA_CARTEIRA = "_conteudo/ultima_carteira.json"
+
+
+def indexar_carteira(results):
+    """
+    Índice {cod: {'part', 'theoricalQty'}} dos registros da API, com os numéricos normalizados:
+    "3,003" -> "3.003" (texto, sem perder a precisão decimal) e "1.482.105.837" -> 1482105837.
+    """
+    return {
+        registro['cod']: {
+            'part': str(Decimal(registro['part'].replace(',', '.'))),
+            'theoricalQty': int(registro['theoricalQty'].replace('.', '')),
+        }
+        for registro in results
+    }
+
+
+def comparar_carteiras(anterior, atual):
+    """
+    Diferenças entre dois índices de carteira (indexar_carteira): uma consulta ao dicionário por ação.
+
+    Returns:
+        dict: 'entradas', 'saidas' e 'alteracoes' (ordenadas por cod) e a quantidade de 'inalteradas'.
+    """
+    entradas, saidas, alteracoes = [], [], []
+    for cod, valores in atual.items():
+        valores_anteriores = anterior.get(cod)
+        if valores_anteriores is None:
+            entradas.append(dict(cod=cod, **valores))
+        elif valores_anteriores != valores:
+            alteracao = {'cod': cod}
+            if valores_anteriores['part'] != valores['part']:
+                alteracao.update(part_anterior=valores_anteriores['part'], part=valores['part'],
+                                 delta_part=str(Decimal(valores['part']) - Decimal(valores_anteriores['part'])))
+            if valores_anteriores['theoricalQty'] != valores['theoricalQty']:
+                alteracao.update(theoricalQty_anterior=valores_anteriores['theoricalQty'],
+                                 theoricalQty=valores['theoricalQty'],
+                                 delta_theoricalQty=valores['theoricalQty'] - valores_anteriores['theoricalQty'])
+            alteracoes.append(alteracao)
+    for cod, valores in anterior.items():
+        if cod not in atual:
+            saidas.append({'cod': cod, 'part_anterior': valores['part'],
+                           'theoricalQty_anterior': valores['theoricalQty']})
+
+    def por_cod(itens):
+        return sorted(itens, key=lambda item: item['cod'])
+
+    return {'entradas': por_cod(entradas), 'saidas': por_cod(saidas), 'alteracoes': por_cod(alteracoes),
+            'inalteradas': len(atual) - len(entradas) - len(alteracoes)}
+
+
+def calcular_alteracoes(estado, carteiras, data_pregao, conteudo=None):
+    """
+    Compara as carteiras raspadas {indice: results} do pregão 'data_pregao' (datetime.date) com as do
+    pregão anterior de cada índice no estado (conteúdo de CHAVE_ULTIMA_CARTEIRA, ou None).
+
+    Um índice sem pregão anterior no estado tem todas as ações como entradas ('data_anterior' nulo).
+    Índices do estado que não foram raspados agora são mantidos no estado sem aparecer no change-set.
+
+    Returns:
+        tuple: (change-set a gravar em ARQUIVO_ALTERACOES, novo estado)
+    """
+    hoje = data_pregao.isoformat()
+    indices_estado = dict((estado or {}).get('indices', {}))
+    alteracoes = {'data_pregao': hoje, 'sha256': conteudo, 'indices': {},
+                  'resumo': {'entradas': 0, 'saidas': 0, 'alteracoes': 0, 'inalteradas': 0}}
+    for indice, results in sorted(carteiras.items()):
+        atual = indexar_carteira(results)
+        anterior = indices_estado.get(indice) or {}
+        if anterior.get('data_pregao') == hoje:
+            # Regravação do mesmo pregão: a base continua sendo o pregão anterior
+            base_data, base = anterior.get('data_anterior'), anterior.get('carteira_anterior')
+        else:
+            base_data, base = anterior.get('data_pregao'), anterior.get('carteira')
+        diferencas = comparar_carteiras(base or {}, atual)
+        alteracoes['indices'][indice] = dict(data_anterior=base_data, **diferencas)
+        for chave in ('entradas', 'saidas', 'alteracoes'):
+            alteracoes['resumo'][chave] += len(diferencas[chave])
+        alteracoes['resumo']['inalteradas'] += diferencas['inalteradas']
+        indices_estado[indice] = {'data_pregao': hoje, 'carteira': atual,
+                                  'data_anterior': base_data, 'carteira_anterior': base}
+    return alteracoes, {'indices': indices_estado}
@@ -0,0 +1,53 @@
+###################################################################################################################
+# Leitura dos argumentos dos jobs do Glue (JobELTB3 e compactação) passados pelo Terraform / start_job_run.       #
+###################################################################################################################
+
+def resolver_argumentos(argv, nomes):
+    """
+    getResolvedOptions do Glue (jobs Spark e Python shell); sem o awsglue instalado (execução local
+    com o motor Arrow) os mesmos argumentos --NOME valor são lidos com argparse.
+    """
+    try:
+        from awsglue.utils import getResolvedOptions
+    except ImportError:
+        import argparse
+        parser = argparse.ArgumentParser()
+        for nome in nomes:
+            parser.add_argument(f"--{nome}", required=True)
+        return vars(parser.parse_known_args(argv[1:])[0])
+    return getResolvedOptions(argv, nomes)
+
+
+def resolver_argumentos_opcionais(argv, nomes):
+    """
+    getResolvedOptions falha quando um argumento não é informado; aqui só são
+    resolvidos os argumentos opcionais efetivamente presentes na chamada do job.
+    """
+    presentes = [nome for nome in nomes if f"--{nome}" in argv]
+    return resolver_argumentos(argv, presentes) if presentes else {}
+
+
+def parse_lista_argumento(valor):
+    """
+    Converte um argumento separado por vírgulas em lista, ignorando itens vazios.
+    """
+    if not valor:
+        return None
+    return [item.strip() for item in valor.split(",") if item.strip()]
+
+
+def parse_mapa_argumento(valor):
+    """
+    Converte 'chave=valor,chave=valor' em dicionário.
+    """
+    mapa = {}
+    for item in parse_lista_argumento(valor) or []:
+        chave, separador, conteudo = item.partition("=")
+        if not separador:
+            raise ValueError(f"Item sem '=' no argumento: {item}")
+        mapa[chave.strip()] = conteudo.strip()
+    return mapa
+
+
+def parse_bool_argumento(valor):
+    return str(valor).strip().lower() in ("true", "1", "yes", "sim")
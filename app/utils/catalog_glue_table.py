@@ -1,52 +1,87 @@
 ###################################################################################################################
 # Este script responsável por criar uma tabela no catálogo do AWS Glue                                            #
 # Definindo a estrutura da tabela, incluindo colunas, tipos de dados e partições.                                 #
+# Com partition_layout (layout_particoes.py) as chaves de partição seguem o layout e, quando ele usa partition    #
+# projection, a tabela já é criada com os parâmetros de projeção do Athena.                                       #
 ###################################################################################################################
 
 import boto3
 from botocore.exceptions import ClientError
 
+from layout_particoes import escolher_layout, parametros_projecao
+from catalogo_glue import CatalogoGlue
+
 class CatalogGlueTable:
-    def __init__(self, database_name, table_name, output_path, region='sa-east-1'):
+    def __init__(self, database_name, table_name, output_path, region='sa-east-1', partition_layout=None):
         self.database_name = database_name
         self.table_name = table_name
         self.output_path = output_path
         self.region = region
+        self.partition_layout = partition_layout
         self.glue = boto3.client('glue', region_name=self.region)
+        self.catalogo = CatalogoGlue(self.glue, region=self.region)
 
     def check_table_exists(self):
+        # Um único get_table (em cache): o Glue responde EntityNotFoundException também para o banco inexistente
         try:
-            self.glue.get_database(Name=self.database_name)
-            print(f"Banco de dados '{self.database_name}' existe")
-            
-            self.glue.get_table(DatabaseName=self.database_name, Name=self.table_name)
-            print(f"[CatalogGlueTable] Tabela '{self.table_name}' já existe no banco '{self.database_name}'.")
-            return True
+            if self.catalogo.tabela_existe(self.database_name, self.table_name):
+                print(f"[CatalogGlueTable] Tabela '{self.table_name}' já existe no banco '{self.database_name}'.")
+                return True
+            print(f"[CatalogGlueTable] Tabela '{self.table_name}' NÃO existe no banco '{self.database_name}'.")
+            return False
         except ClientError as e:
-            if e.response['Error']['Code'] == 'EntityNotFoundException':
-                print(f"[CatalogGlueTable] Tabela '{self.table_name}' NÃO existe no banco '{self.database_name}'.")
-                return False
-            else:
-                print(f"[CatalogGlueTable] Erro ao verificar existência da tabela: {e}")
-                raise
+            print(f"[CatalogGlueTable] Erro ao verificar existência da tabela: {e}")
+            raise
+
+    def chaves_e_parametros(self, colunas):
+        """
+        Colunas de dados, chaves de partição e parâmetros da tabela. Sem partition_layout mantém as
+        chaves ano/mes/dia originais; com ele, as colunas que viram chave saem das colunas de dados.
+        """
+        parametros = {'classification': 'parquet', 'EXTERNAL': 'TRUE'}
+        if not self.partition_layout:
+            chaves = [{'Name': 'ano', 'Type': 'int'}, {'Name': 'mes', 'Type': 'int'}, {'Name': 'dia', 'Type': 'int'}]
+            return colunas, chaves, parametros
+
+        layout = escolher_layout(self.partition_layout)
+        chaves = [{'Name': nome, 'Type': tipo} for nome, tipo in layout.chaves]
+        nomes_chaves = {chave['Name'] for chave in chaves}
+        parametros.update(parametros_projecao(layout, self.output_path))
+        return [coluna for coluna in colunas if coluna['Name'] not in nomes_chaves], chaves, parametros
+
+    def esquema_tabela(self):
+        return self.chaves_e_parametros([
+            {'Name': 'codigo_bovespa', 'Type': 'string'},
+            {'Name': 'nome_acao', 'Type': 'string'},
+            {'Name': 'nome_tipo_acao', 'Type': 'string'},
+            {'Name': 'quantidade_teorica', 'Type': 'decimal(18,2)'},
+            {'Name': 'percentual_participacao_acao', 'Type': 'decimal(18,2)'},
+            {'Name': 'data_pregao', 'Type': 'date'}
+        ])
+
+    def catalog_update_table(self):
+        """
+        Alinha colunas, chaves de partição e parâmetros da tabela existente ao esquema deste script;
+        o update_table só é chamado quando algo difere.
+        """
+        colunas, chaves, parametros = self.esquema_tabela()
+        try:
+            return self.catalogo.atualizar_tabela(self.database_name, self.table_name, colunas, chaves, parametros)
+        except Exception as e:
+            print(f"[CatalogGlueTable] Erro ao atualizar tabela: {e}")
+            raise
 
     def catalog_create_table(self):
         print(f"[CatalogGlueTable] Criando tabela '{self.table_name}' no catálogo Glue ...")
         try:
+            colunas, chaves, parametros = self.esquema_tabela()
             self.glue.create_table(
                 DatabaseName=self.database_name,
                 TableInput={
                     'Name': self.table_name,
                     'Description': 'Tabela com dados de ações da B3 por pregão',
                     'StorageDescriptor': {
-                        'Columns': [
-                            {'Name': 'codigo_bovespa', 'Type': 'string'},
-                            {'Name': 'nome_acao', 'Type': 'string'},
-                            {'Name': 'nome_tipo_acao', 'Type': 'string'},
-                            {'Name': 'quantidade_teorica', 'Type': 'decimal(18,2)'},
-                            {'Name': 'percentual_participacao_acao', 'Type': 'decimal(18,2)'},
-                            {'Name': 'data_pregao', 'Type': 'date'}
-                        ],
+                        'Columns': colunas,
                         'Location': self.output_path,
                         'InputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetInputFormat',
                         'OutputFormat': 'org.apache.hadoop.hive.ql.io.parquet.MapredParquetOutputFormat',
@@ -56,18 +91,12 @@ class CatalogGlueTable:
                             'Parameters': {'serialization.format': '1'}
                         }
                     },
-                    'PartitionKeys': [
-                        {'Name': 'ano', 'Type': 'int'},
-                        {'Name': 'mes', 'Type': 'int'},
-                        {'Name': 'dia', 'Type': 'int'}
-                    ],
+                    'PartitionKeys': chaves,
                     'TableType': 'EXTERNAL_TABLE',
-                    'Parameters': {
-                        'classification': 'parquet',
-                        'EXTERNAL': 'TRUE'
-                    }
+                    'Parameters': parametros
                 }
             )
+            self.catalogo.invalidar(self.database_name, self.table_name)
             print(f"[CatalogGlueTable] Tabela '{self.table_name}' criada com sucesso!")
         except Exception as e:
             print(f"[CatalogGlueTable] Erro ao criar tabela: {e}")
@@ -87,4 +116,5 @@ if __name__ == "__main__":
        creator.catalog_create_table()
        
     else:
-        print(f"[CatalogGlueTable] A tabela '{table_name}' já existe no banco '{database_name}'.")
\ No newline at end of file
+        print(f"[CatalogGlueTable] A tabela '{table_name}' já existe no banco '{database_name}'.")
+        creator.catalog_update_table()
\ No newline at end of file
@@ -0,0 +1,220 @@
+###################################################################################################################
+# Cliente do Glue Data Catalog compartilhado pelo pipeline (JobELTB3, scraper, CatalogGlueTable).                 #
+#   - metadados de tabela em cache com TTL: execuções e invocações "quentes" da Lambda não repetem o get_table;   #
+#   - batch_create_partition / batch_get_partition em lotes de 100 (limite da API), repetindo com backoff apenas  #
+#     as entradas que falharam por erro transitório (throttling, erro interno, timeout);                          #
+#   - update_table apenas quando colunas, chaves de partição ou parâmetros informados de fato diferem.            #
+# O cliente boto3 é injetável (glue_client), então o módulo roda com um Glue falso em benchmarks e testes locais. #
+###################################################################################################################
+
+import random
+import time
+
+from botocore.exceptions import ClientError
+
+# Limites por chamada de batch_create_partition e batch_get_partition
+LOTE_PARTICOES = 100
+
+TTL_TABELA_SEGUNDOS = 300
+
+# Campos do Table retornado pelo get_table aceitos no TableInput do update_table
+CAMPOS_TABLE_INPUT = ["Name", "Description", "Owner", "LastAccessTime", "LastAnalyzedTime", "Retention",
+                      "StorageDescriptor", "PartitionKeys", "ViewOriginalText", "ViewExpandedText", "TableType",
+                      "Parameters", "TargetTable"]
+
+
+class CatalogoGlue:
+    ERROS_REPETIVEIS = {'ThrottlingException', 'InternalServiceException', 'OperationTimeoutException',
+                        'ConcurrentModificationException'}
+
+    def __init__(self, glue_client=None, region='sa-east-1', ttl_segundos=TTL_TABELA_SEGUNDOS, max_tentativas=5,
+                 backoff_base=0.2, backoff_max=5.0, sleep=time.sleep, relogio=time.monotonic):
+        if glue_client is None:
+            import boto3  # sob demanda: quem injeta o cliente (Lambdas, benchmarks) não paga o import
+            glue_client = boto3.client('glue', region_name=region)
+        self.glue = glue_client
+        self.ttl_segundos = ttl_segundos
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self.relogio = relogio
+        # (database, tabela) -> (expira_em, Table)
+        self._tabelas = {}
+        # Chamadas feitas à API por operação, para métricas e benchmarks
+        self.chamadas = {}
+
+    def _chamar(self, operacao, **parametros):
+        self.chamadas[operacao] = self.chamadas.get(operacao, 0) + 1
+        return getattr(self.glue, operacao)(**parametros)
+
+    def _espera_backoff(self, tentativa):
+        # Full jitter: espera aleatória entre 0 e o teto exponencial da tentativa
+        teto = min(self.backoff_max, self.backoff_base * (2 ** tentativa))
+        espera = random.uniform(0, teto)
+        self.sleep(espera)
+        return espera
+
+    def _chamar_com_backoff(self, operacao, **parametros):
+        for tentativa in range(self.max_tentativas):
+            try:
+                return self._chamar(operacao, **parametros)
+            except ClientError as e:
+                codigo = e.response['Error']['Code']
+                if codigo not in self.ERROS_REPETIVEIS or tentativa + 1 == self.max_tentativas:
+                    raise
+                espera = self._espera_backoff(tentativa)
+                print(f"[CatalogoGlue] {operacao}: {codigo} (tentativa {tentativa + 1}/{self.max_tentativas}). "
+                      f"Nova tentativa em {espera:.2f}s.")
+
+    # ------------------------------------------------------------------------------------------ tabelas
+    def obter_tabela(self, database_name, table_name, forcar=False):
+        """
+        Table do get_table (ou None quando a tabela não existe), reaproveitado por ttl_segundos.
+        """
+        chave = (database_name, table_name)
+        agora = self.relogio()
+        if not forcar and chave in self._tabelas and self._tabelas[chave][0] > agora:
+            return self._tabelas[chave][1]
+        try:
+            tabela = self._chamar_com_backoff('get_table', DatabaseName=database_name, Name=table_name)['Table']
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'EntityNotFoundException':
+                raise
+            # A ausência não fica em cache: a tabela pode ser criada logo em seguida
+            self._tabelas.pop(chave, None)
+            return None
+        self._tabelas[chave] = (agora + self.ttl_segundos, tabela)
+        return tabela
+
+    def invalidar(self, database_name=None, table_name=None):
+        if database_name is None:
+            self._tabelas.clear()
+        else:
+            self._tabelas.pop((database_name, table_name), None)
+
+    def tabela_existe(self, database_name, table_name):
+        # O get_table responde EntityNotFoundException tanto para a tabela quanto para o banco inexistente
+        return self.obter_tabela(database_name, table_name) is not None
+
+    def location_tabela(self, database_name, table_name):
+        tabela = self.obter_tabela(database_name, table_name)
+        return tabela['StorageDescriptor']['Location'] if tabela else None
+
+    def atualizar_tabela(self, database_name, table_name, colunas=None, chaves_particao=None, parametros=None):
+        """
+        Atualiza colunas, chaves de partição e parâmetros (mesclados aos existentes) da tabela, mas só
+        chama o update_table quando algum deles difere do catálogo. Retorna True quando atualizou.
+        """
+        tabela = self.obter_tabela(database_name, table_name, forcar=True)
+        if tabela is None:
+            raise ValueError(f"Tabela '{database_name}.{table_name}' não encontrada no Glue Catalog.")
+
+        def esquema(campos):
+            return [(campo['Name'], campo['Type']) for campo in campos or []]
+
+        entrada = {campo: tabela[campo] for campo in CAMPOS_TABLE_INPUT if campo in tabela}
+        alterada = False
+        if colunas is not None and esquema(colunas) != esquema(tabela['StorageDescriptor'].get('Columns')):
+            entrada['StorageDescriptor'] = dict(tabela['StorageDescriptor'], Columns=colunas)
+            alterada = True
+        if chaves_particao is not None and esquema(chaves_particao) != esquema(tabela.get('PartitionKeys')):
+            entrada['PartitionKeys'] = chaves_particao
+            alterada = True
+        atuais = tabela.get('Parameters', {})
+        if parametros and any(atuais.get(nome) != str(valor) for nome, valor in parametros.items()):
+            entrada['Parameters'] = dict(atuais, **{nome: str(valor) for nome, valor in parametros.items()})
+            alterada = True
+
+        if not alterada:
+            print(f"[CatalogoGlue] Tabela '{database_name}.{table_name}' já está atualizada. update_table não chamado.")
+            return False
+        self._chamar_com_backoff('update_table', DatabaseName=database_name, TableInput=entrada)
+        self.invalidar(database_name, table_name)
+        print(f"[CatalogoGlue] Tabela '{database_name}.{table_name}' atualizada.")
+        return True
+
+    # ---------------------------------------------------------------------------------------- partições
+    def entrada_particao(self, database_name, table_name, valores, location):
+        """
+        PartitionInput com o StorageDescriptor da tabela apontando para 'location'. O descritor da
+        partição leva só as colunas de dados (sem as chaves de partição).
+        """
+        tabela = self.obter_tabela(database_name, table_name)
+        if tabela is None:
+            raise ValueError(f"Tabela '{database_name}.{table_name}' não encontrada no Glue Catalog.")
+        descritor = tabela['StorageDescriptor']
+        chaves = {chave['Name'] for chave in tabela.get('PartitionKeys', [])}
+        colunas = [coluna for coluna in descritor.get('Columns', []) if coluna['Name'] not in chaves]
+        return {'Values': [str(valor) for valor in valores],
+                'StorageDescriptor': dict(descritor, Columns=colunas, Location=location)}
+
+    def criar_particoes(self, database_name, table_name, particoes):
+        """
+        Registra as partições [(valores, location)] em lotes de até 100. Partições já existentes são
+        ignoradas; entradas com erro transitório são reenviadas (só elas) com backoff.
+
+        Returns:
+            dict: partições criadas, já existentes e chamadas ao batch_create_partition.
+        """
+        pendentes = [self.entrada_particao(database_name, table_name, valores, location)
+                     for valores, location in particoes]
+        resumo = {'criadas': 0, 'existentes': 0, 'chamadas': 0}
+        for tentativa in range(self.max_tentativas):
+            repetir = []
+            for inicio in range(0, len(pendentes), LOTE_PARTICOES):
+                lote = pendentes[inicio:inicio + LOTE_PARTICOES]
+                response = self._chamar_com_backoff('batch_create_partition', DatabaseName=database_name,
+                                                    TableName=table_name, PartitionInputList=lote)
+                resumo['chamadas'] += 1
+                falhas = {}
+                for erro in response.get('Errors', []):
+                    falhas[tuple(erro.get('PartitionValues', []))] = erro.get('ErrorDetail', {}).get('ErrorCode')
+                for entrada in lote:
+                    codigo = falhas.get(tuple(entrada['Values']))
+                    if codigo is None:
+                        resumo['criadas'] += 1
+                    elif codigo == 'AlreadyExistsException':
+                        resumo['existentes'] += 1
+                    elif codigo in self.ERROS_REPETIVEIS:
+                        repetir.append(entrada)
+                    else:
+                        raise RuntimeError(f"Erro ao registrar a partição {entrada['Values']} no Glue Catalog: {codigo}")
+            if not repetir:
+                break
+            if tentativa + 1 == self.max_tentativas:
+                raise RuntimeError(f"{len(repetir)} partição(ões) não registrada(s) após {self.max_tentativas} tentativas.")
+            espera = self._espera_backoff(tentativa)
+            print(f"[CatalogoGlue] {len(repetir)} partição(ões) com erro transitório. Nova tentativa em {espera:.2f}s.")
+            pendentes = repetir
+
+        print(f"[CatalogoGlue] {resumo['criadas']} partição(ões) criada(s) e {resumo['existentes']} já existente(s) em "
+              f"'{database_name}.{table_name}' ({resumo['chamadas']} chamada(s) ao batch_create_partition).")
+        return resumo
+
+    def obter_particoes(self, database_name, table_name, lista_valores):
+        """
+        Partições existentes entre 'lista_valores', em lotes de até 100; as UnprocessedKeys são
+        reenviadas com backoff.
+
+        Returns:
+            dict: tupla de valores -> Partition (ausentes não aparecem).
+        """
+        encontradas = {}
+        pendentes = [{'Values': [str(valor) for valor in valores]} for valores in lista_valores]
+        for tentativa in range(self.max_tentativas):
+            repetir = []
+            for inicio in range(0, len(pendentes), LOTE_PARTICOES):
+                response = self._chamar_com_backoff('batch_get_partition', DatabaseName=database_name,
+                                                    TableName=table_name,
+                                                    PartitionsToGet=pendentes[inicio:inicio + LOTE_PARTICOES])
+                for particao in response.get('Partitions', []):
+                    encontradas[tuple(particao['Values'])] = particao
+                repetir.extend(response.get('UnprocessedKeys', []))
+            if not repetir:
+                break
+            if tentativa + 1 == self.max_tentativas:
+                raise RuntimeError(f"{len(repetir)} partição(ões) não consultada(s) após {self.max_tentativas} tentativas.")
+            self._espera_backoff(tentativa)
+            pendentes = repetir
+        return encontradas
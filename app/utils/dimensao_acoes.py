@@ -0,0 +1,298 @@
+###################################################################################################################
+# Dimensão das ações da carteira teórica mantida de forma incremental pelo JobELTB3.                              #
+#   - histórico (SCD tipo 2): uma versão por período em que a ação ficou na carteira com os mesmos atributos      #
+#     (tipo, quantidade teórica, participação...), com valid_from (primeiro pregão da versão) e valid_to (pregão  #
+#     em que deixou de valer: mudança de atributo ou saída da carteira; nulo na versão vigente);                  #
+#   - carteira atual: uma linha por ação (indice, codigo_bovespa) presente no último pregão processado.           #
+# Cada execução aplica só as diferenças dos pregões do lote sobre o histórico anterior, pregão a pregão, sem      #
+# reler a tabela refinada. As duas tabelas são pequenas e ficam cada uma em um único arquivo Parquet, regravado   #
+# inteiro a cada execução: "composição atual" e "quando a ação X entrou/saiu" viram a leitura de um arquivo.      #
+###################################################################################################################
+
+from transformacoes_b3 import CHAVE_ACAO
+
+# Atributos versionados: qualquer mudança fecha a versão vigente e abre uma nova
+COLUNAS_VERSIONADAS = ["segmento", "nome_acao", "nome_tipo_acao", "quantidade_teorica", "percentual_participacao_acao"]
+
+# Colunas lidas do lote (já transformado) para o merge
+COLUNAS_LOTE = CHAVE_ACAO + ["data_pregao"] + COLUNAS_VERSIONADAS
+
+# Cada tabela é um único arquivo, sobrescrito a cada execução (o PUT do S3 é atômico)
+ARQUIVO_DIMENSAO = "dados.parquet"
+
+# Linhas do lote levadas ao driver por coleta: pregões consecutivos até este total (ver fatias_pregoes)
+LINHAS_POR_COLETA = 200_000
+
+
+def esquema_historico():
+    import pyarrow as pa
+    return pa.schema([
+        ("indice", pa.string()),
+        ("codigo_bovespa", pa.string()),
+        ("segmento", pa.string()),
+        ("nome_acao", pa.string()),
+        ("nome_tipo_acao", pa.string()),
+        ("quantidade_teorica", pa.decimal128(18, 0)),
+        ("percentual_participacao_acao", pa.decimal128(18, 3)),
+        ("valid_from", pa.date32()),
+        ("valid_to", pa.date32()),
+    ])
+
+
+def esquema_atual():
+    import pyarrow as pa
+    campos = [campo for campo in esquema_historico() if campo.name != "valid_to"]
+    return pa.schema(campos + [("data_entrada", pa.date32()), ("data_pregao", pa.date32())])
+
+
+def rebobinar(historico, ultimos_pregoes, intervalos, resumo):
+    """
+    Prepara o histórico para os pregões do lote, índice a índice.
+
+    Um índice cujo lote começa em um pregão já processado (reprocessamento) tem o histórico
+    rebobinado para antes desse pregão: versões iniciadas a partir dele são descartadas e as
+    encerradas a partir dele voltam a ficar vigentes. Isso só é feito quando o lote chega até o
+    último pregão processado do índice (um backfill até o fim do histórico, por exemplo); um lote
+    que termina antes dele (backfill de um período antigo, gatilho atrasado de uma partição antiga)
+    é ignorado para o índice, com aviso, e o histórico dele fica como estava.
+
+    Args:
+        historico: versões atuais do histórico (dicionários no esquema_historico)
+        ultimos_pregoes: {indice: último pregão processado}
+        intervalos: {indice: (primeiro, último pregão do lote)}
+        resumo: acumulador de aplicar_pregoes; recebe os índices ignorados
+
+    Returns:
+        tuple: (versões do histórico, {indice: último pregão})
+    """
+    versoes = [dict(versao) for versao in historico]
+    ultimos = dict(ultimos_pregoes)
+    for indice, (inicio, fim) in sorted(intervalos.items()):
+        if indice in ultimos and fim < ultimos[indice]:
+            # Rebobinar descartaria as versões dos pregões posteriores ao lote, que ele não traz de volta
+            print(f"[DimensaoAcoes] Lote de '{indice}' ({inicio} a {fim}) termina antes do último pregão "
+                  f"processado ({ultimos[indice]}). Índice ignorado: reprocesse até {ultimos[indice]} para "
+                  f"atualizar o histórico.")
+            resumo["ignorados"].append(indice)
+            continue
+        if indice in ultimos and inicio <= ultimos[indice]:
+            print(f"[DimensaoAcoes] Lote de '{indice}' começa em {inicio}, já processado (último: {ultimos[indice]}). "
+                  f"Histórico rebobinado para antes de {inicio}.")
+            versoes = [versao for versao in versoes if versao["indice"] != indice or versao["valid_from"] < inicio]
+            for versao in versoes:
+                if versao["indice"] == indice and versao["valid_to"] is not None and versao["valid_to"] >= inicio:
+                    versao["valid_to"] = None
+    return versoes, ultimos
+
+
+def versoes_vigentes(versoes):
+    """
+    {indice: {codigo_bovespa: versão vigente}}, atualizado por aplicar_pregoes.
+    """
+    vigentes = {}
+    for versao in versoes:
+        if versao["valid_to"] is None:
+            vigentes.setdefault(versao["indice"], {})[versao["codigo_bovespa"]] = versao
+    return vigentes
+
+
+def aplicar_pregoes(versoes, vigentes, ultimos, linhas, resumo):
+    """
+    Aplica, em ordem, os pregões presentes em 'linhas' (com as COLUNAS_LOTE; cada pregão completo e
+    posterior aos já aplicados) sobre as versões rebobinadas. Atualiza versoes, vigentes, ultimos e
+    as contagens de entradas, saídas e alterações do resumo; índices ignorados não são aplicados.
+    """
+    carteiras = {}
+    for linha in linhas:
+        if linha["indice"] in resumo["ignorados"]:
+            continue
+        carteiras.setdefault((linha["data_pregao"], linha["indice"]), {})[linha["codigo_bovespa"]] = \
+            {coluna: linha[coluna] for coluna in COLUNAS_VERSIONADAS}
+
+    for (data_pregao, indice), carteira in sorted(carteiras.items()):
+        vigentes_indice = vigentes.setdefault(indice, {})
+        for codigo in [codigo for codigo in vigentes_indice if codigo not in carteira]:
+            vigentes_indice.pop(codigo)["valid_to"] = data_pregao
+            resumo["saidas"] += 1
+        for codigo, atributos in carteira.items():
+            vigente = vigentes_indice.get(codigo)
+            if vigente is not None and all(vigente[coluna] == atributos[coluna] for coluna in COLUNAS_VERSIONADAS):
+                continue
+            if vigente is None:
+                resumo["entradas"] += 1
+            else:
+                vigente["valid_to"] = data_pregao
+                resumo["alteracoes"] += 1
+            vigentes_indice[codigo] = dict(indice=indice, codigo_bovespa=codigo, **atributos,
+                                           valid_from=data_pregao, valid_to=None)
+            versoes.append(vigentes_indice[codigo])
+        ultimos[indice] = data_pregao
+
+
+def novo_resumo():
+    return {"entradas": 0, "saidas": 0, "alteracoes": 0, "ignorados": []}
+
+
+def aplicar_lote(historico, ultimos_pregoes, linhas_lote):
+    """
+    Aplica todos os pregões do lote, já coletados, sobre as versões do histórico (rebobinar +
+    aplicar_pregoes). DimensaoAcoes.atualizar faz o mesmo coletando o lote em fatias de pregões.
+
+    Returns:
+        tuple: (versões do histórico, {indice: último pregão}, {'entradas', 'saidas', 'alteracoes', 'ignorados'})
+    """
+    intervalos = {}
+    for linha in linhas_lote:
+        inicio, fim = intervalos.get(linha["indice"], (linha["data_pregao"], linha["data_pregao"]))
+        intervalos[linha["indice"]] = (min(inicio, linha["data_pregao"]), max(fim, linha["data_pregao"]))
+    resumo = novo_resumo()
+    versoes, ultimos = rebobinar(historico, ultimos_pregoes, intervalos, resumo)
+    aplicar_pregoes(versoes, versoes_vigentes(versoes), ultimos, linhas_lote, resumo)
+    versoes.sort(key=lambda versao: (versao["indice"], versao["codigo_bovespa"], versao["valid_from"]))
+    return versoes, ultimos, resumo
+
+
+def fatias_pregoes(contagens, limite_linhas):
+    """
+    Agrupa os pregões do lote (contagens: [{'data_pregao', 'linhas'}], uma por índice e pregão) em
+    intervalos consecutivos [(primeiro, último pregão)] de até 'limite_linhas' linhas (um pregão
+    maior que o limite fica sozinho na fatia).
+    """
+    linhas_por_pregao = {}
+    for contagem in contagens:
+        data_pregao = contagem["data_pregao"]
+        linhas_por_pregao[data_pregao] = linhas_por_pregao.get(data_pregao, 0) + contagem["linhas"]
+
+    fatias, inicio, anterior, acumulado = [], None, None, 0
+    for data_pregao in sorted(linhas_por_pregao):
+        if inicio is not None and acumulado + linhas_por_pregao[data_pregao] > limite_linhas:
+            fatias.append((inicio, anterior))
+            inicio, acumulado = None, 0
+        if inicio is None:
+            inicio = data_pregao
+        acumulado += linhas_por_pregao[data_pregao]
+        anterior = data_pregao
+    if inicio is not None:
+        fatias.append((inicio, anterior))
+    return fatias
+
+
+def carteira_atual(versoes, ultimos_pregoes):
+    """
+    Versões vigentes, uma por ação, com o pregão de entrada na carteira (início da sequência de
+    versões contíguas que termina na vigente) e o último pregão processado do índice.
+    """
+    por_acao = {}
+    for versao in versoes:
+        por_acao.setdefault((versao["indice"], versao["codigo_bovespa"]), []).append(versao)
+
+    atual = []
+    for (indice, _), historico_acao in sorted(por_acao.items()):
+        vigente = historico_acao[-1]
+        if vigente["valid_to"] is not None:
+            continue
+        data_entrada = vigente["valid_from"]
+        for anterior in reversed(historico_acao[:-1]):
+            if anterior["valid_to"] != data_entrada:
+                break
+            data_entrada = anterior["valid_from"]
+        linha = {coluna: valor for coluna, valor in vigente.items() if coluna != "valid_to"}
+        atual.append(dict(linha, data_entrada=data_entrada, data_pregao=ultimos_pregoes[indice]))
+    return atual
+
+
+class DimensaoAcoes:
+    def __init__(self, motor, location_historico, location_atual, region='sa-east-1'):
+        """
+        Parâmetros
+        - motor: MotorSpark ou MotorArrow (ver motores.py), conta as linhas do lote por pregão e as
+          coleta em fatias de pregões
+        - location_historico / location_atual: diretórios das tabelas (S3 ou local)
+        """
+        from motores import MotorArrow
+        self.motor = motor
+        self.location_historico = location_historico.rstrip("/")
+        self.location_atual = location_atual.rstrip("/")
+        # As duas tabelas são lidas e gravadas com pyarrow em qualquer motor
+        self.arrow = MotorArrow(region=region)
+
+    def ler(self, location):
+        import pyarrow.parquet as pq
+        from pyarrow import fs
+        sistema, diretorio = self.arrow._filesystem(location)
+        caminho = f"{diretorio}/{ARQUIVO_DIMENSAO}"
+        if sistema.get_file_info(caminho).type == fs.FileType.NotFound:
+            return []
+        return pq.read_table(caminho, filesystem=sistema).to_pylist()
+
+    def gravar(self, location, linhas, esquema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        sistema, diretorio = self.arrow._filesystem(location)
+        if not location.startswith("s3://"):
+            sistema.create_dir(diretorio, recursive=True)
+        caminho = f"{diretorio}/{ARQUIVO_DIMENSAO}"
+        pq.write_table(pa.Table.from_pylist(linhas, schema=esquema), caminho, filesystem=sistema, compression="zstd")
+        return sistema.get_file_info(caminho).size
+
+    def carregar_estado(self):
+        """
+        Histórico anterior e o último pregão processado de cada índice (da carteira atual; na falta
+        dela, a maior data do histórico).
+        """
+        historico = self.ler(self.location_historico)
+        if not historico:
+            print(f"[DimensaoAcoes] Histórico '{self.location_historico}' não encontrado. Iniciando vazio.")
+        ultimos = {}
+        for linha in self.ler(self.location_atual):
+            ultimos[linha["indice"]] = max(ultimos.get(linha["indice"], linha["data_pregao"]), linha["data_pregao"])
+        datas_historico = {}
+        for versao in historico:
+            datas = [data for data in (versao["valid_from"], versao["valid_to"]) if data is not None]
+            datas_historico[versao["indice"]] = max(datas + [datas_historico.get(versao["indice"], min(datas))])
+        for indice, data in datas_historico.items():
+            ultimos.setdefault(indice, data)
+        return historico, ultimos
+
+    def atualizar(self, df, linhas_por_coleta=LINHAS_POR_COLETA):
+        """
+        Aplica o lote ao histórico e regrava as duas tabelas (o histórico primeiro: a carteira atual
+        é derivada dele). O motor agrega o lote em uma contagem por índice e pregão e só fatias de
+        pregões consecutivos (até 'linhas_por_coleta' linhas) são coletadas para o driver, em ordem.
+
+        Returns:
+            dict: linhas do lote, versões do histórico, ações na carteira atual, bytes gravados, as
+                  entradas, saídas e alterações aplicadas e os índices ignorados (ver rebobinar).
+        """
+        lote = self.motor.selecionar(df, COLUNAS_LOTE)
+        contagens = self.motor.coletar(
+            self.motor.agregar(lote, ["indice", "data_pregao"], [("linhas", "count", "codigo_bovespa")]),
+            ["indice", "data_pregao", "linhas"])
+        linhas_lote = sum(contagem["linhas"] for contagem in contagens)
+        intervalos = {}
+        for contagem in contagens:
+            inicio, fim = intervalos.get(contagem["indice"], (contagem["data_pregao"], contagem["data_pregao"]))
+            intervalos[contagem["indice"]] = (min(inicio, contagem["data_pregao"]), max(fim, contagem["data_pregao"]))
+
+        historico, ultimos = self.carregar_estado()
+        resumo = novo_resumo()
+        versoes, ultimos = rebobinar(historico, ultimos, intervalos, resumo)
+        if intervalos and len(resumo["ignorados"]) == len(intervalos):
+            print("[DimensaoAcoes] Nenhum índice do lote aplicado. Histórico e carteira atual mantidos.")
+            return dict(resumo, linhas_lote=linhas_lote, versoes=len(historico), atuais=None, bytes_gravados=0)
+
+        vigentes = versoes_vigentes(versoes)
+        fatias = fatias_pregoes(contagens, linhas_por_coleta)
+        for inicio, fim in fatias:
+            linhas = self.motor.coletar(self.motor.filtrar_entre(lote, "data_pregao", inicio, fim), COLUNAS_LOTE)
+            aplicar_pregoes(versoes, vigentes, ultimos, linhas, resumo)
+        versoes.sort(key=lambda versao: (versao["indice"], versao["codigo_bovespa"], versao["valid_from"]))
+        atual = carteira_atual(versoes, ultimos)
+
+        bytes_gravados = self.gravar(self.location_historico, versoes, esquema_historico())
+        bytes_gravados += self.gravar(self.location_atual, atual, esquema_atual())
+        print(f"[DimensaoAcoes] {resumo['entradas']} entrada(s), {resumo['saidas']} saída(s) e {resumo['alteracoes']} "
+              f"alteração(ões) aplicadas em {len(fatias)} coleta(s): {len(versoes)} versão(ões) no histórico e "
+              f"{len(atual)} ação(ões) na carteira atual.")
+        return dict(resumo, linhas_lote=linhas_lote, versoes=len(versoes), atuais=len(atual),
+                    bytes_gravados=bytes_gravados)
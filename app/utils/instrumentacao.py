@@ -0,0 +1,136 @@
+###################################################################################################################
+# Instrumentação das etapas do pipeline (scraper, Lambda de gatilho e JobELTB3) com um único esquema de métricas. #
+# Cada etapa medida gera um registro JSON no CloudWatch Embedded Metric Format (EMF) impresso no stdout: o        #
+# CloudWatch Logs extrai as métricas sem chamadas extras à API. Também é empacotado junto das Lambdas.            #
+#                                                                                                                 #
+# Sinks: 'emf' (padrão, stdout), 'nulo' (descarta; testes) e SinkMemoria (guarda os registros; benchmarks).       #
+# Variáveis de ambiente: INSTRUMENTACAO_SINK (emf|nulo) e INSTRUMENTACAO_NAMESPACE (default B3Pipeline).          #
+###################################################################################################################
+
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+NAMESPACE_PADRAO = os.environ.get('INSTRUMENTACAO_NAMESPACE', 'B3Pipeline')
+
+# Esquema único de métricas: atributo da medição -> (nome da métrica, unidade do CloudWatch)
+METRICAS = {
+    "duracao_ms": ("DuracaoMs", "Milliseconds"),
+    "linhas_entrada": ("LinhasEntrada", "Count"),
+    "linhas_saida": ("LinhasSaida", "Count"),
+    "bytes_lidos": ("BytesLidos", "Bytes"),
+    "bytes_gravados": ("BytesGravados", "Bytes"),
+    "arquivos": ("Arquivos", "Count"),
+    "particoes": ("Particoes", "Count"),
+    "tentativas": ("Tentativas", "Count"),
+    "sucesso": ("Sucesso", "Count"),
+    "alertas": ("Alertas", "Count"),
+    "falhas": ("Falhas", "Count"),
+}
+
+# Dimensões das métricas no CloudWatch; as demais propriedades vão apenas para o log
+DIMENSOES = ["Componente", "Etapa"]
+
+
+class SinkNulo:
+    def emitir(self, registro):
+        pass
+
+
+class SinkMemoria:
+    def __init__(self):
+        self.registros = []
+
+    def emitir(self, registro):
+        self.registros.append(registro)
+
+
+class SinkEMF:
+    def __init__(self, namespace=NAMESPACE_PADRAO, stream=None):
+        self.namespace = namespace
+        self.stream = stream
+
+    def emitir(self, registro):
+        metricas = [{"Name": nome, "Unit": unidade} for nome, unidade in METRICAS.values() if nome in registro]
+        documento = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{"Namespace": self.namespace, "Dimensions": [DIMENSOES], "Metrics": metricas}],
+            },
+            **registro,
+        }
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(documento, default=str) + "\n")
+        stream.flush()
+
+
+def criar_sink(nome=None):
+    nome = (nome or os.environ.get('INSTRUMENTACAO_SINK', 'emf')).lower()
+    if nome == "nulo":
+        return SinkNulo()
+    if nome == "emf":
+        return SinkEMF()
+    raise ValueError(f"Sink de instrumentação desconhecido: {nome} (use 'emf' ou 'nulo').")
+
+
+class Medicao:
+    """
+    Métricas de uma etapa em andamento; o código medido preenche o que souber (linhas, bytes, ...).
+    """
+
+    def __init__(self):
+        self.valores = {}
+
+    def registrar(self, **metricas):
+        for nome, valor in metricas.items():
+            if nome not in METRICAS:
+                raise ValueError(f"Métrica desconhecida: {nome}")
+            if valor is not None:
+                self.valores[nome] = valor
+
+    def somar(self, **metricas):
+        self.registrar(**{nome: self.valores.get(nome, 0) + valor for nome, valor in metricas.items()})
+
+
+class Instrumentacao:
+    def __init__(self, componente, sink=None, **propriedades):
+        self.componente = componente
+        self.sink = sink or criar_sink()
+        self.propriedades = propriedades
+
+    @contextmanager
+    def etapa(self, nome, **propriedades):
+        """
+        Mede a etapa: duração sempre; as demais métricas conforme preenchidas na Medicao.
+        Exceções são registradas (Sucesso = 0) e propagadas.
+        """
+        medicao = Medicao()
+        inicio = time.perf_counter()
+        sucesso = 0
+        try:
+            yield medicao
+            sucesso = 1
+        finally:
+            medicao.registrar(duracao_ms=round((time.perf_counter() - inicio) * 1000, 3), sucesso=sucesso)
+            registro = {"Componente": self.componente, "Etapa": nome, **self.propriedades, **propriedades}
+            registro.update({METRICAS[chave][0]: valor for chave, valor in medicao.valores.items()})
+            try:
+                self.sink.emitir(registro)
+            except Exception as e:
+                # Falha na emissão de métricas nunca interrompe o pipeline
+                print(f"[Instrumentacao] Erro ao emitir métricas da etapa '{nome}': {e}")
+
+    def medir(self, nome, **propriedades):
+        """
+        Decorator equivalente a etapa(); a função decorada só tem a duração medida.
+        """
+        def decorator(funcao):
+            @functools.wraps(funcao)
+            def wrapper(*args, **kwargs):
+                with self.etapa(nome, **propriedades):
+                    return funcao(*args, **kwargs)
+            return wrapper
+        return decorator
@@ -0,0 +1,82 @@
+###################################################################################################################
+# Janelas (variação diária e média móvel) calculadas de forma incremental.                                        #
+# Em vez de reler todo o histórico a cada execução, mantém um estado compacto com as últimas N observações de     #
+# cada ação (indice, codigo_bovespa) e aplica as janelas do TransformacoesB3 apenas sobre estado + lote novo.     #
+# O custo diário fica proporcional ao número de ações, não ao tamanho do histórico.                               #
+###################################################################################################################
+
+from transformacoes_b3 import CHAVE_ACAO, TransformacoesB3
+
+# Colunas guardadas no estado (e necessárias no lote) para recalcular as janelas
+COLUNAS_ESTADO = CHAVE_ACAO + ["data_pregao", "ano", "mes", "dia",
+                               "quantidade_teorica", "percentual_participacao_acao"]
+
+# Marca a origem de cada linha durante o cálculo: histórico (estado) ou lote novo
+COLUNA_ORIGEM = "__origem"
+
+
+class JanelasIncrementais:
+    def __init__(self, motor, state_path, periodo=3):
+        """
+        Parâmetros
+        - motor: MotorSpark ou MotorArrow (ver motores.py)
+        - state_path: diretório Parquet do estado (S3 ou local)
+        - periodo: número de observações da média móvel (default = 3)
+        """
+        if periodo < 1:
+            raise ValueError(f"O período da média móvel deve ser positivo: {periodo}")
+        self.motor = motor
+        self.transformacoes = TransformacoesB3(motor)
+        self.state_path = state_path
+        self.periodo = periodo
+        # A média móvel precisa de periodo - 1 observações anteriores e a variação de 1; guardar 'periodo'
+        # (no mínimo 2) deixa margem para reprocessar o último pregão sem perder histórico.
+        self.observacoes_estado = max(periodo, 2)
+
+    def carregar_estado(self):
+        estado = self.motor.ler_tabela(self.state_path)
+        if estado is None:
+            print(f"[JanelasIncrementais] Estado '{self.state_path}' não encontrado. Iniciando sem histórico.")
+        return estado
+
+    def calcular(self, df, estado=None):
+        """
+        Calcula as janelas para as linhas do lote usando o estado como histórico.
+
+        Observações do estado dentro do intervalo do lote (reprocessamento) são substituídas pelas do lote;
+        as anteriores e as posteriores ao lote são mantidas. Um lote que termina antes do último pregão do
+        estado (gatilho atrasado de uma partição antiga) não recua o estado: o próximo pregão continua sendo
+        comparado ao seu anterior de fato, mas as janelas já gravadas dos pregões posteriores ao lote não são
+        recalculadas. Reprocessar pregões mais antigos que os guardados no estado exige o recálculo completo:
+        apagar o estado e enviar o histórico inteiro como lote.
+
+        Returns:
+            tuple: (linhas do lote com as colunas das janelas, novo estado)
+        """
+        motor = self.motor
+        lote = motor.com_constante(motor.selecionar(df, COLUNAS_ESTADO), COLUNA_ORIGEM, "lote")
+        inicio_lote, fim_lote = motor.intervalo(lote, "data_pregao")
+
+        if estado is not None:
+            estado = motor.selecionar(estado, COLUNAS_ESTADO)
+            fim_estado = motor.intervalo(estado, "data_pregao")[1]
+            if fim_estado is not None and fim_estado > fim_lote:
+                print(f"[JanelasIncrementais] Lote ({inicio_lote} a {fim_lote}) anterior ao último pregão do estado "
+                      f"({fim_estado}). Observações posteriores ao lote mantidas; as janelas já gravadas desses "
+                      f"pregões não são recalculadas.")
+            estado = motor.filtrar_fora(estado, "data_pregao", inicio_lote, fim_lote)
+            historico = motor.unir(motor.com_constante(estado, COLUNA_ORIGEM, "estado"), lote)
+        else:
+            historico = lote
+
+        historico = self.transformacoes.window_variacoes_diarias(historico)
+        historico = self.transformacoes.window_media_movel(historico, self.periodo)
+        resultado = motor.remover(motor.filtrar_igual(historico, COLUNA_ORIGEM, "lote"), COLUNA_ORIGEM)
+
+        novo_estado = motor.ultimos_n(motor.selecionar(historico, COLUNAS_ESTADO), CHAVE_ACAO, "data_pregao",
+                                      self.observacoes_estado)
+        return resultado, novo_estado
+
+    def salvar_estado(self, novo_estado):
+        self.motor.gravar_tabela(novo_estado, self.state_path)
+        print(f"[JanelasIncrementais] Estado atualizado em '{self.state_path}'.")
@@ -0,0 +1,111 @@
+###################################################################################################################
+# Layouts de partição das tabelas refinadas (--PARTITION_LAYOUT) e parâmetros de partition projection do Athena.  #
+#                                                                                                                 #
+#   layout      | diretórios                                 | partições no catálogo                              #
+#   ------------+--------------------------------------------+-------------------------------------------------   #
+#   legado      | ano=/mes=/dia=/data_pregao=                | registradas no Glue (saveAsTable/batch_create)     #
+#   data_pregao | data_pregao=                               | nenhuma: partition projection por data             #
+#                                                                                                                 #
+# No layout 'legado' o Athena consulta o Glue Catalog a cada planejamento (GetPartitions), custo que cresce com   #
+# os dias guardados. Com projection as localizações são calculadas a partir do intervalo e do template da         #
+# tabela, sem consulta a partições: o planejamento tem custo constante e nenhum job precisa registrar partições.  #
+# Os mesmos parâmetros são gerados pelo Terraform (infra/modules/table/*) e pelo CatalogGlueTable.                #
+###################################################################################################################
+
+from collections import namedtuple
+
+LayoutParticao = namedtuple("LayoutParticao", ["nome", "chaves", "projecao"])
+
+# Primeiro pregão projetado; o fim do intervalo acompanha a data corrente (NOW)
+PROJECAO_DATA_INICIO = "2020-01-01"
+
+LAYOUTS = {
+    "legado": LayoutParticao(
+        "legado",
+        [("ano", "string"), ("mes", "string"), ("dia", "string"), ("data_pregao", "date")],
+        {},
+    ),
+    "data_pregao": LayoutParticao(
+        "data_pregao",
+        [("data_pregao", "date")],
+        {"data_pregao": {"type": "date", "range": f"{PROJECAO_DATA_INICIO},NOW", "format": "yyyy-MM-dd",
+                         "interval": "1", "interval.unit": "DAYS"}},
+    ),
+}
+
+LAYOUT_PADRAO = "legado"
+
+# Colunas de partição do layout legado: as que o layout escolhido não usa são descartadas na gravação
+COLUNAS_LEGADO = [nome for nome, _ in LAYOUTS["legado"].chaves]
+
+
+def escolher_layout(nome=None):
+    nome = (nome or LAYOUT_PADRAO).lower()
+    if nome not in LAYOUTS:
+        raise ValueError(f"Layout de partição desconhecido: {nome} (use {', '.join(LAYOUTS)}).")
+    return LAYOUTS[nome]
+
+
+def colunas_particao(layout):
+    return [nome for nome, _ in layout.chaves]
+
+
+def colunas_descartadas(layout):
+    return [nome for nome in COLUNAS_LEGADO if nome not in colunas_particao(layout)]
+
+
+def valores_particao(chaves, data):
+    """
+    Valores (como texto) das chaves de partição 'chaves' para o pregão 'data' (datetime.date).
+    """
+    valores = {"ano": f"{data.year}", "mes": f"{data.month:02d}", "dia": f"{data.day:02d}",
+               "data_pregao": data.isoformat()}
+    return [valores[nome] for nome in chaves]
+
+
+def prefixo_particao(layout, data):
+    """
+    Diretório (relativo à raiz da tabela) da partição do pregão 'data' (datetime.date) no layout.
+    """
+    chaves = colunas_particao(layout)
+    return "/".join(f"{nome}={valor}" for nome, valor in zip(chaves, valores_particao(chaves, data)))
+
+
+def parametros_projecao(layout, location):
+    """
+    Parâmetros de tabela do Glue que habilitam o partition projection do Athena no layout; vazio
+    quando o layout usa partições registradas no catálogo.
+    """
+    if not layout.projecao:
+        return {}
+    template = "/".join(f"{nome}=${{{nome}}}" for nome in colunas_particao(layout))
+    parametros = {
+        "projection.enabled": "true",
+        "storage.location.template": f"{location.rstrip('/')}/{template}/",
+    }
+    for coluna, propriedades in layout.projecao.items():
+        for propriedade, valor in propriedades.items():
+            parametros[f"projection.{coluna}.{propriedade}"] = valor
+    return parametros
+
+
+def projecao_habilitada(parametros_tabela):
+    return str((parametros_tabela or {}).get("projection.enabled", "")).lower() == "true"
+
+
+def listar_diretorios_particao(sistema, raiz, chaves):
+    """
+    Valores das partições existentes sob 'raiz' em um filesystem do pyarrow, descendo um nível de
+    diretório (chave=valor) por chave. Diretórios de outras chaves (outro layout) são ignorados.
+    """
+    from pyarrow import fs
+    encontrados = [[]]
+    for chave in chaves:
+        proximos = []
+        for valores in encontrados:
+            diretorio = "/".join([raiz.rstrip("/")] + [f"{nome}={valor}" for nome, valor in zip(chaves, valores)])
+            for info in sistema.get_file_info(fs.FileSelector(diretorio, allow_not_found=True)):
+                if info.type == fs.FileType.Directory and info.base_name.startswith(f"{chave}="):
+                    proximos.append(valores + [info.base_name.split("=", 1)[1]])
+        encontrados = proximos
+    return sorted(encontrados)
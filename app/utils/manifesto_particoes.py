@@ -0,0 +1,123 @@
+###################################################################################################################
+# Manifesto (high-water mark) das partições RAW já processadas pelo JobELTB3.                                     #
+# Guarda, por partição ano=/mes=/dia=, os objetos Parquet lidos (ETag e tamanho) para que cada execução           #
+# incremental processe apenas partições novas ou alteradas desde a última execução.                               #
+# O manifesto pode ficar no S3 (s3://bucket/chave.json) ou em um arquivo local (testes e execuções locais).       #
+###################################################################################################################
+
+import os
+import re
+from datetime import datetime, timezone
+
+from objetos_s3 import AcessoS3, atualizar_json, gravar_json, ler_json, separar_s3
+
+PADRAO_PARTICAO = re.compile(r"(ano=\d{4}/mes=\d{2}/dia=\d{2})/")
+
+
+class ManifestoParticoes(AcessoS3):
+    def __init__(self, manifest_path, region='sa-east-1', s3_client=None):
+        self.manifest_path = manifest_path
+        self.region = region
+        self._s3 = s3_client
+
+    def carregar(self):
+        """
+        Lê o manifesto; retorna um manifesto vazio se ainda não existir.
+        """
+        manifesto = ler_json(self.manifest_path, self.cliente_para(self.manifest_path))
+        if manifesto is None:
+            print(f"[ManifestoParticoes] Manifesto '{self.manifest_path}' não encontrado. Iniciando vazio.")
+            return {"particoes": {}}
+        return manifesto
+
+    def salvar(self, manifesto):
+        gravar_json(self.manifest_path, manifesto, self.cliente_para(self.manifest_path))
+
+    def _listar_objetos(self, raiz):
+        """
+        Lista os arquivos Parquet sob a raiz como (caminho relativo, etag, tamanho).
+        No sistema de arquivos local o mtime faz o papel do ETag.
+        """
+        if raiz.startswith("s3://"):
+            bucket, prefixo = separar_s3(raiz)
+            paginator = self.s3.get_paginator('list_objects_v2')
+            for pagina in paginator.paginate(Bucket=bucket, Prefix=prefixo):
+                for objeto in pagina.get('Contents', []):
+                    if objeto['Key'].endswith(".parquet"):
+                        yield objeto['Key'][len(prefixo):], objeto['ETag'].strip('"'), objeto['Size']
+        else:
+            for diretorio, _, arquivos in os.walk(raiz):
+                for nome in arquivos:
+                    if nome.endswith(".parquet"):
+                        caminho = os.path.join(diretorio, nome)
+                        info = os.stat(caminho)
+                        yield os.path.relpath(caminho, raiz).replace(os.sep, "/"), str(info.st_mtime_ns), info.st_size
+
+    def listar_particoes(self, raiz):
+        """
+        Agrupa os objetos da raiz por partição: {"ano=YYYY/mes=MM/dia=DD": {objeto: {"etag", "size"}}}.
+        """
+        particoes = {}
+        for relativo, etag, tamanho in self._listar_objetos(raiz):
+            match = PADRAO_PARTICAO.search(relativo)
+            if match:
+                particoes.setdefault(match.group(1), {})[relativo] = {"etag": etag, "size": tamanho}
+        return particoes
+
+    def particoes_pendentes(self, raiz):
+        """
+        Compara a listagem atual da raiz com o manifesto.
+
+        Returns:
+            tuple: (lista de caminhos de partição novos ou alterados, snapshot dessas partições
+                    para ser gravado com registrar_processadas após o processamento).
+        """
+        processadas = self.carregar().get("particoes", {})
+        atuais = self.listar_particoes(raiz)
+
+        snapshot = {
+            particao: objetos
+            for particao, objetos in atuais.items()
+            if processadas.get(particao, {}).get("objetos") != objetos
+        }
+        raiz = raiz if raiz.endswith("/") else f"{raiz}/"
+        caminhos = [f"{raiz}{particao}/" for particao in sorted(snapshot)]
+        print(f"[ManifestoParticoes] {len(atuais)} partição(ões) na raiz, {len(caminhos)} nova(s) ou alterada(s).")
+        return caminhos, snapshot
+
+    def snapshot_caminhos(self, caminhos):
+        """
+        Snapshot (no formato de particoes_pendentes) das partições de uma lista de caminhos
+        ano=/mes=/dia=, listando só o prefixo de cada uma. Usado pelas execuções não incrementais
+        (gatilho com --INPUT_PATHS) para que o modo incremental não as processe de novo.
+        """
+        snapshot = {}
+        for caminho in caminhos:
+            caminho = caminho if caminho.endswith("/") else f"{caminho}/"
+            match = PADRAO_PARTICAO.search(caminho)
+            if not match:
+                continue
+            objetos = {f"{match.group(1)}/{relativo}": {"etag": etag, "size": tamanho}
+                       for relativo, etag, tamanho in self._listar_objetos(caminho)}
+            if objetos:
+                snapshot[match.group(1)] = objetos
+        return snapshot
+
+    def registrar_processadas(self, snapshot):
+        """
+        Grava no manifesto as partições processadas com os objetos que foram lidos.
+        A gravação é um compare-and-swap (atualizar_json): execuções concorrentes que registram
+        partições diferentes não sobrescrevem as entradas umas das outras.
+        """
+        if not snapshot:
+            return
+        agora = datetime.now(timezone.utc).isoformat()
+
+        def _registrar(manifesto):
+            manifesto = manifesto or {"particoes": {}}
+            for particao, objetos in snapshot.items():
+                manifesto.setdefault("particoes", {})[particao] = {"objetos": objetos, "processado_em": agora}
+            return manifesto, None
+
+        atualizar_json(self.manifest_path, _registrar, self.cliente_para(self.manifest_path))
+        print(f"[ManifestoParticoes] Manifesto atualizado com {len(snapshot)} partição(ões).")
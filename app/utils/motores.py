@@ -0,0 +1,631 @@
+###################################################################################################################
+# Motores de execução das transformações da B3.                                                                   #
+# Cada motor implementa o mesmo conjunto pequeno de operações (renomear, converter, agregar, janelas, ...):       #
+#   - MotorSpark: sobre DataFrames do PySpark (Glue ETL).                                                         #
+#   - MotorArrow: sobre tabelas do pyarrow, para cargas pequenas sem cluster (Lambda / Glue Python shell).        #
+# As regras de negócio ficam em transformacoes_b3.py e são escritas uma única vez sobre essas operações.          #
+###################################################################################################################
+
+import os
+import re
+import uuid
+
+from objetos_s3 import cliente_s3, separar_s3
+from perfil_gravacao import colunas_ordenacao, opcoes_arrow
+
+
+def _filesystem(caminho, region='sa-east-1'):
+    """
+    (FileSystem do pyarrow, caminho nele) para um caminho S3 ou local.
+    """
+    from pyarrow import fs
+    if caminho.startswith("s3://"):
+        return fs.S3FileSystem(region=region), caminho[len("s3://"):]
+    return fs.LocalFileSystem(), caminho
+
+
+def arquivos_parquet(caminho, region='sa-east-1'):
+    """
+    (FileSystem, arquivos Parquet diretamente sob o diretório, ordenados), ignorando marcadores '_' e '.'.
+    """
+    from pyarrow import fs
+    sistema, diretorio = _filesystem(caminho, region)
+    arquivos = sorted(info.path for info in sistema.get_file_info(fs.FileSelector(diretorio.rstrip("/")))
+                      if info.path.endswith(".parquet") and not info.base_name.startswith(("_", ".")))
+    return sistema, arquivos
+
+
+def agrupar_por_schema(caminhos, region='sa-east-1', max_workers=16):
+    """
+    Agrupa os arquivos Parquet dos diretórios pelo schema gravado no rodapé de cada um (só o rodapé é
+    lido, em paralelo). Partições RAW gravadas antes e depois do schema tipado caem em grupos diferentes.
+
+    Returns:
+        dict: {schema (tupla de (coluna, tipo)): [caminhos dos arquivos no formato do caminho de entrada]}
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import pyarrow.parquet as pq
+
+    arquivos = []
+    for caminho in caminhos:
+        sistema, encontrados = arquivos_parquet(caminho, region)
+        prefixo = "s3://" if caminho.startswith("s3://") else ""
+        arquivos.extend((sistema, arquivo, f"{prefixo}{arquivo}") for arquivo in encontrados)
+    if not arquivos:
+        raise ValueError(f"Nenhum arquivo Parquet encontrado em: {caminhos}")
+
+    def _schema(item):
+        sistema, arquivo, _ = item
+        return tuple((campo.name.lower(), str(campo.type)) for campo in pq.read_schema(arquivo, filesystem=sistema))
+
+    grupos = {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(arquivos))) as executor:
+        for (_, _, uri), schema in zip(arquivos, executor.map(_schema, arquivos)):
+            grupos.setdefault(schema, []).append(uri)
+    return grupos
+
+
+def _concatenar(tabelas):
+    """
+    Concatena tabelas Arrow; schemas diferentes só são unificados quando compatíveis (null -> tipo,
+    colunas ausentes). Tipos conflitantes (texto x decimal) continuam sendo erro: devem ser
+    normalizados por arquivo antes (ver MotorArrow.ler_parquet).
+    """
+    import pyarrow as pa
+    if len({tabela.schema for tabela in tabelas}) == 1:
+        return pa.concat_tables(tabelas)
+    # promote_options substituiu promote=True no pyarrow 14
+    if tuple(int(parte) for parte in pa.__version__.split(".")[:2]) >= (14, 0):
+        return pa.concat_tables(tabelas, promote_options="default")
+    return pa.concat_tables(tabelas, promote=True)
+
+
+def listar_parquet(caminhos, region='sa-east-1', s3_client=None):
+    """
+    Conta os arquivos Parquet sob os caminhos (S3 ou locais) e soma seus tamanhos usando apenas
+    a listagem, sem abrir nenhum arquivo.
+
+    Returns:
+        tuple: (quantidade de arquivos, total de bytes)
+    """
+    arquivos_total, bytes_total = 0, 0
+    for caminho in caminhos:
+        if caminho.startswith("s3://"):
+            s3_client = cliente_s3(s3_client, region)
+            bucket, prefixo = separar_s3(caminho)
+            paginator = s3_client.get_paginator('list_objects_v2')
+            for pagina in paginator.paginate(Bucket=bucket, Prefix=prefixo):
+                tamanhos = [obj['Size'] for obj in pagina.get('Contents', []) if obj['Key'].endswith(".parquet")]
+                arquivos_total, bytes_total = arquivos_total + len(tamanhos), bytes_total + sum(tamanhos)
+        else:
+            for diretorio, _, arquivos in os.walk(caminho):
+                tamanhos = [os.path.getsize(os.path.join(diretorio, nome)) for nome in arquivos if nome.endswith(".parquet")]
+                arquivos_total, bytes_total = arquivos_total + len(tamanhos), bytes_total + sum(tamanhos)
+    return arquivos_total, bytes_total
+
+
+def estimar_bytes_entrada(caminhos, region='sa-east-1', s3_client=None):
+    """
+    Soma o tamanho dos arquivos Parquet sob os caminhos (S3 ou locais) usando apenas a listagem.
+    """
+    return listar_parquet(caminhos, region=region, s3_client=s3_client)[1]
+
+
+class MotorSpark:
+    """
+    Operações sobre DataFrames do Spark.
+    'avg' (agregação e média móvel) é sempre calculada em double, como no MotorArrow.
+    """
+
+    nome = "spark"
+
+    def __init__(self, spark=None, region='sa-east-1'):
+        self._spark = spark
+        self.region = region
+
+    @property
+    def spark(self):
+        if self._spark is None:
+            from pyspark.sql import SparkSession
+            self._spark = SparkSession.builder.getOrCreate()
+        return self._spark
+
+    def colunas(self, df):
+        return df.columns
+
+    def renomear(self, df, mapeamento):
+        for origem, destino in mapeamento.items():
+            df = df.withColumnRenamed(origem, destino)
+        return df
+
+    def tipo_texto(self, df, coluna):
+        from pyspark.sql.types import StringType
+        tipos = {field.name.lower(): field.dataType for field in df.schema.fields}
+        return isinstance(tipos.get(coluna.lower()), StringType)
+
+    def com_constante(self, df, coluna, valor):
+        from pyspark.sql.functions import lit
+        return df.withColumn(coluna, lit(valor))
+
+    def com_nulos(self, df, coluna, tipo):
+        from pyspark.sql.functions import lit
+        return df.withColumn(coluna, lit(None).cast(tipo))
+
+    def preencher_nulos(self, df, coluna, valor):
+        from pyspark.sql.functions import coalesce, col, lit
+        return df.withColumn(coluna, coalesce(col(coluna), lit(valor)))
+
+    def data_particao(self, df, coluna):
+        from pyspark.sql.functions import expr
+        return df.withColumn(coluna, expr("make_date(cast(ano as int), cast(mes as int), cast(dia as int))"))
+
+    def numero_br(self, df, coluna, padrao, substituto, tipo):
+        from pyspark.sql.functions import col, regexp_replace
+        return df.withColumn(coluna, regexp_replace(col(coluna), padrao, substituto).cast(tipo))
+
+    def converter(self, df, coluna, tipo):
+        from pyspark.sql.functions import col
+        return df.withColumn(coluna, col(coluna).cast(tipo))
+
+    def lpad(self, df, coluna, tamanho, caractere):
+        from pyspark.sql.functions import col, lpad
+        return df.withColumn(coluna, lpad(col(coluna), tamanho, caractere))
+
+    def agregar(self, df, chaves, agregacoes):
+        from pyspark.sql import functions as F
+        funcoes = {
+            "sum": lambda c: F.sum(c),
+            "avg": lambda c: F.avg(F.col(c).cast("double")),
+            "count": lambda c: F.count(c),
+            # Contagens condicionais e de distintos usadas pelas regras de qualidade (qualidade_dados.py)
+            "count_null": lambda c: F.sum(F.when(F.col(c).isNull(), 1).otherwise(0)),
+            "count_negative": lambda c: F.sum(F.when(F.col(c) < 0, 1).otherwise(0)),
+            # Exata: com ~90 valores por grupo o approx_count_distinct não distingue uma duplicada. O Spark
+            # reescreve o distinct como Expand + shuffle por (chaves, valor), sem conjunto por grupo em memória
+            "count_distinct": lambda c: F.countDistinct(c),
+        }
+        return df.groupBy(*chaves).agg(*[funcoes[funcao](coluna).alias(alias) for alias, funcao, coluna in agregacoes])
+
+    def _janela(self, particao, ordem):
+        from pyspark.sql.window import Window
+        return Window.partitionBy(*particao).orderBy(ordem)
+
+    def lag(self, df, particao, ordem, coluna, alias):
+        from pyspark.sql.functions import lag
+        return df.withColumn(alias, lag(coluna).over(self._janela(particao, ordem)))
+
+    def diferenca(self, df, coluna_a, coluna_b, alias):
+        from pyspark.sql.functions import col
+        return df.withColumn(alias, col(coluna_a) - col(coluna_b))
+
+    def dias_entre(self, df, inicio, fim, alias):
+        from pyspark.sql.functions import col, datediff
+        return df.withColumn(alias, datediff(col(fim), col(inicio)))
+
+    def media_movel(self, df, particao, ordem, coluna, periodo, alias):
+        from pyspark.sql.functions import avg, col
+        janela = self._janela(particao, ordem).rowsBetween(-periodo + 1, 0)
+        return df.withColumn(alias, avg(col(coluna).cast("double")).over(janela))
+
+    def remover(self, df, coluna):
+        return df.drop(coluna)
+
+    def selecionar(self, df, colunas):
+        return df.select(*colunas)
+
+    def ler_parquet(self, caminhos, base_path, normalizar=None):
+        """
+        Lê os diretórios de partição ano=/mes=/dia= sob base_path (o Spark infere as colunas de partição).
+        Com 'normalizar', os arquivos são agrupados pelo schema gravado (agrupar_por_schema) e cada grupo
+        é lido e normalizado antes da união: arquivos com tipos conflitantes para a mesma coluna (RAW em
+        texto x RAW tipado) nunca entram na mesma leitura.
+        """
+        leitor = self.spark.read.option("basePath", base_path)
+        if normalizar is None:
+            return leitor.parquet(*caminhos)
+        grupos = agrupar_por_schema(caminhos, self.region)
+        if len(grupos) > 1:
+            print(f"[MotorSpark] {len(grupos)} schemas diferentes nos arquivos de entrada; lidos e normalizados "
+                  f"separadamente ({', '.join(str(len(arquivos)) for arquivos in grupos.values())} arquivo(s)).")
+        df = None
+        for arquivos in grupos.values():
+            parte = normalizar(leitor.parquet(*arquivos))
+            df = parte if df is None else df.unionByName(parte)
+        return df
+
+    def unir(self, df_a, df_b):
+        return df_a.unionByName(df_b)
+
+    def filtrar_igual(self, df, coluna, valor):
+        from pyspark.sql.functions import col
+        return df.where(col(coluna) == valor)
+
+    def filtrar_fora(self, df, coluna, inicio, fim):
+        from pyspark.sql.functions import col
+        return df.where((col(coluna) < inicio) | (col(coluna) > fim))
+
+    def filtrar_entre(self, df, coluna, inicio, fim):
+        from pyspark.sql.functions import col
+        return df.where(col(coluna).between(inicio, fim))
+
+    def intervalo(self, df, coluna):
+        from pyspark.sql.functions import max as max_, min as min_
+        linha = df.agg(min_(coluna), max_(coluna)).first()
+        return linha[0], linha[1]
+
+    def ultimos_n(self, df, particao, ordem, n):
+        from pyspark.sql.functions import col, desc, row_number
+        from pyspark.sql.window import Window
+        janela = Window.partitionBy(*particao).orderBy(desc(ordem))
+        return df.withColumn("__posicao", row_number().over(janela)).where(col("__posicao") <= n).drop("__posicao")
+
+    def ler_tabela(self, caminho):
+        """
+        Lê um diretório Parquet não particionado; retorna None se ainda não existir.
+        """
+        from pyspark.sql.utils import AnalysisException
+        try:
+            return self.spark.read.parquet(caminho)
+        except AnalysisException as e:
+            if "Path does not exist" in str(e):
+                return None
+            raise
+
+    def gravar_tabela(self, df, caminho):
+        # localCheckpoint materializa o DataFrame antes do overwrite, que pode apagar a própria origem
+        df.localCheckpoint(eager=True).write.mode("overwrite").parquet(caminho)
+
+    def materializar(self, df, nivel="MEMORY_AND_DISK", contar=True):
+        """
+        Materializa o DataFrame uma única vez para as ações seguintes não relerem a entrada:
+            - nível de StorageLevel (MEMORY_AND_DISK, DISK_ONLY, MEMORY_ONLY, ...): persist;
+            - LOCAL_CHECKPOINT: checkpoint no disco local dos executores (corta a linhagem);
+            - NONE: sem materialização (cada ação recomputa o plano inteiro).
+        Com contar=False o persist não dispara a contagem: a primeira ação de quem chamou (a validação
+        de qualidade do JobELTB3) é a varredura da entrada que preenche o cache.
+
+        Returns:
+            tuple: (DataFrame materializado, quantidade de linhas ou None quando NONE ou sem contagem)
+        """
+        from pyspark import StorageLevel
+        nivel = (nivel or "NONE").upper()
+        if nivel == "NONE":
+            return df, None
+        if nivel == "LOCAL_CHECKPOINT":
+            df = df.localCheckpoint(eager=True)
+        else:
+            if not hasattr(StorageLevel, nivel):
+                raise ValueError(f"Nível de persistência desconhecido: {nivel}")
+            df = df.persist(getattr(StorageLevel, nivel))
+        if not contar:
+            return df, None
+        # A contagem é a única varredura da entrada; as demais ações leem do cache/checkpoint
+        return df, df.count()
+
+    def liberar(self, df):
+        if df.is_cached:
+            df.unpersist()
+
+    def contar(self, df):
+        return df.count()
+
+    def coletar(self, df, colunas):
+        # Só para resultados pequenos: as linhas vão para o driver como dicionários
+        return [linha.asDict() for linha in df.select(*colunas).collect()]
+
+    def mostrar(self, df, linhas=20):
+        df.show(linhas)
+
+
+class MotorArrow:
+    """
+    Operações sobre tabelas do pyarrow (pyarrow.compute), para entradas pequenas.
+    Janelas exigem a tabela ordenada por partição + ordem; o resultado sai nessa ordem.
+    """
+
+    nome = "arrow"
+
+    def __init__(self, region='sa-east-1'):
+        self.region = region
+        import pyarrow  # noqa: F401  (falha cedo se o pyarrow não estiver disponível)
+
+    # ----------------------------------------------------------------- tipos e utilitários
+    def _tipo(self, tipo):
+        import pyarrow as pa
+        match = re.fullmatch(r"decimal\((\d+),\s*(\d+)\)", tipo)
+        if match:
+            return pa.decimal128(int(match.group(1)), int(match.group(2)))
+        return {"string": pa.string(), "double": pa.float64(), "bigint": pa.int64(),
+                "int": pa.int32(), "date": pa.date32()}[tipo]
+
+    def _definir(self, tabela, coluna, valores):
+        if coluna in tabela.column_names:
+            return tabela.set_column(tabela.column_names.index(coluna), coluna, valores)
+        return tabela.append_column(coluna, valores)
+
+    def _ordenar_e_agrupar(self, tabela, particao, ordem):
+        """
+        Ordena a tabela e retorna (tabela, máscara numpy 'mesmo grupo da linha anterior').
+        """
+        import numpy as np
+        import pyarrow.compute as pc
+        tabela = tabela.sort_by([(c, "ascending") for c in list(particao) + [ordem]])
+        mesmo_grupo = np.zeros(tabela.num_rows, dtype=bool)
+        if tabela.num_rows > 1:
+            mesmo_grupo[1:] = True
+            for coluna in particao:
+                valores = tabela.column(coluna).combine_chunks()
+                iguais = pc.fill_null(pc.equal(valores.slice(1), valores.slice(0, len(valores) - 1)), False)
+                mesmo_grupo[1:] &= iguais.to_numpy(zero_copy_only=False)
+        return tabela, mesmo_grupo
+
+    # ----------------------------------------------------------------- operações
+    def colunas(self, tabela):
+        return tabela.column_names
+
+    def renomear(self, tabela, mapeamento):
+        # Mesmo comportamento do Spark: a correspondência de nomes ignora maiúsculas/minúsculas
+        mapa = {origem.lower(): destino for origem, destino in mapeamento.items()}
+        return tabela.rename_columns([mapa.get(nome.lower(), nome) for nome in tabela.column_names])
+
+    def tipo_texto(self, tabela, coluna):
+        import pyarrow as pa
+        nomes = {nome.lower(): nome for nome in tabela.column_names}
+        if coluna.lower() not in nomes:
+            return False
+        tipo = tabela.schema.field(nomes[coluna.lower()]).type
+        return pa.types.is_string(tipo) or pa.types.is_large_string(tipo)
+
+    def com_constante(self, tabela, coluna, valor):
+        import pyarrow as pa
+        return self._definir(tabela, coluna, pa.array([valor] * tabela.num_rows, pa.string()))
+
+    def com_nulos(self, tabela, coluna, tipo):
+        import pyarrow as pa
+        return self._definir(tabela, coluna, pa.nulls(tabela.num_rows, self._tipo(tipo)))
+
+    def preencher_nulos(self, tabela, coluna, valor):
+        import pyarrow.compute as pc
+        return self._definir(tabela, coluna, pc.fill_null(tabela.column(coluna), valor))
+
+    def data_particao(self, tabela, coluna):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        partes = [pc.cast(pc.cast(tabela.column(c), pa.int32()), pa.string()) for c in ("ano", "mes", "dia")]
+        texto = pc.binary_join_element_wise(partes[0], pc.utf8_lpad(partes[1], 2, "0"), pc.utf8_lpad(partes[2], 2, "0"), "-")
+        datas = pc.cast(pc.strptime(texto, format="%Y-%m-%d", unit="s"), pa.date32())
+        return self._definir(tabela, coluna, datas)
+
+    def numero_br(self, tabela, coluna, padrao, substituto, tipo):
+        import pyarrow.compute as pc
+        limpo = pc.replace_substring_regex(tabela.column(coluna), padrao, substituto)
+        # Como o cast do Spark (não-ANSI), valores que não formam um número viram nulo em vez de erro
+        valido = pc.match_substring_regex(limpo, r"^-?\d+(\.\d+)?$")
+        limpo = pc.if_else(valido, limpo, None)
+        return self._definir(tabela, coluna, pc.cast(limpo, self._tipo(tipo)))
+
+    def converter(self, tabela, coluna, tipo):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        valores = tabela.column(coluna)
+        destino = self._tipo(tipo)
+        if pa.types.is_integer(valores.type) and pa.types.is_decimal(destino):
+            # O pyarrow exige precisão para o maior inteiro possível (bigint -> 19 dígitos);
+            # passando por decimal(38,0) a checagem é feita pelos valores, como no Spark.
+            valores = pc.cast(valores, pa.decimal128(38, 0))
+        return self._definir(tabela, coluna, pc.cast(valores, destino))
+
+    def lpad(self, tabela, coluna, tamanho, caractere):
+        import pyarrow.compute as pc
+        return self._definir(tabela, coluna, pc.utf8_lpad(tabela.column(coluna), tamanho, caractere))
+
+    def agregar(self, tabela, chaves, agregacoes):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        funcoes = {"sum": "sum", "avg": "mean", "count": "count", "count_null": "count", "count_negative": "sum",
+                   "count_distinct": "count_distinct"}
+        opcoes = {"count_null": pc.CountOptions(mode="only_null")}
+        colunas_origem = {}
+        for alias, funcao, coluna in agregacoes:
+            valores = tabela.column(coluna)
+            if funcao == "avg":
+                valores = pc.cast(valores, pa.float64())
+            elif funcao == "count_negative":
+                negativo = pc.less(valores, pa.scalar(0, valores.type))
+                valores = pc.cast(pc.fill_null(negativo, False), pa.int64())
+            colunas_origem[f"__{alias}"] = valores
+        base = pa.table({**{c: tabela.column(c) for c in chaves}, **colunas_origem})
+        resultado = base.group_by(chaves).aggregate([(f"__{alias}", funcoes[funcao], opcoes.get(funcao))
+                                                     for alias, funcao, _ in agregacoes])
+        nomes = {f"__{alias}_{funcoes[funcao]}": alias for alias, funcao, _ in agregacoes}
+        resultado = resultado.rename_columns([nomes.get(nome, nome) for nome in resultado.column_names])
+        return resultado.select(list(chaves) + [alias for alias, _, _ in agregacoes])
+
+    def lag(self, tabela, particao, ordem, coluna, alias):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        tabela, mesmo_grupo = self._ordenar_e_agrupar(tabela, particao, ordem)
+        valores = tabela.column(coluna).combine_chunks()
+        if len(valores):
+            anteriores = pa.concat_arrays([pa.nulls(1, valores.type), valores.slice(0, len(valores) - 1)])
+        else:
+            anteriores = valores
+        return self._definir(tabela, alias, pc.if_else(pa.array(mesmo_grupo), anteriores, pa.scalar(None, valores.type)))
+
+    def diferenca(self, tabela, coluna_a, coluna_b, alias):
+        import pyarrow.compute as pc
+        return self._definir(tabela, alias, pc.subtract(tabela.column(coluna_a), tabela.column(coluna_b)))
+
+    def dias_entre(self, tabela, inicio, fim, alias):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        dias = pc.cast(pc.days_between(tabela.column(inicio), tabela.column(fim)), pa.int32())
+        return self._definir(tabela, alias, dias)
+
+    def media_movel(self, tabela, particao, ordem, coluna, periodo, alias):
+        """
+        Média das últimas 'periodo' linhas de cada grupo (rowsBetween(-periodo + 1, 0) no Spark),
+        calculada de forma vetorizada com somas acumuladas; nulos são ignorados como no avg do Spark.
+        """
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        tabela, mesmo_grupo = self._ordenar_e_agrupar(tabela, particao, ordem)
+        valores = pc.cast(tabela.column(coluna), pa.float64()).combine_chunks()
+        presentes = pc.is_valid(valores).to_numpy(zero_copy_only=False)
+        numeros = np.where(presentes, pc.fill_null(valores, 0.0).to_numpy(zero_copy_only=False), 0.0)
+
+        indices = np.arange(tabela.num_rows)
+        inicio_grupo = np.maximum.accumulate(np.where(mesmo_grupo, 0, indices)) if tabela.num_rows else indices
+        inicio_janela = np.maximum(indices - periodo + 1, inicio_grupo)
+
+        soma_acumulada = np.concatenate([[0.0], np.cumsum(numeros)])
+        contagem_acumulada = np.concatenate([[0], np.cumsum(presentes)])
+        soma = soma_acumulada[indices + 1] - soma_acumulada[inicio_janela]
+        contagem = contagem_acumulada[indices + 1] - contagem_acumulada[inicio_janela]
+        media = np.divide(soma, contagem, out=np.zeros_like(soma), where=contagem > 0)
+        return self._definir(tabela, alias, pa.array(media, type=pa.float64(), mask=contagem == 0))
+
+    def remover(self, tabela, coluna):
+        return tabela.drop_columns([coluna])
+
+    def selecionar(self, tabela, colunas):
+        return tabela.select(list(colunas))
+
+    def unir(self, tabela_a, tabela_b):
+        import pyarrow as pa
+        return pa.concat_tables([tabela_a, tabela_b.select(tabela_a.column_names).cast(tabela_a.schema)])
+
+    def filtrar_igual(self, tabela, coluna, valor):
+        import pyarrow.compute as pc
+        return tabela.filter(pc.equal(tabela.column(coluna), valor))
+
+    def filtrar_fora(self, tabela, coluna, inicio, fim):
+        import pyarrow.compute as pc
+        valores = tabela.column(coluna)
+        return tabela.filter(pc.or_(pc.less(valores, inicio), pc.greater(valores, fim)))
+
+    def filtrar_entre(self, tabela, coluna, inicio, fim):
+        import pyarrow.compute as pc
+        valores = tabela.column(coluna)
+        return tabela.filter(pc.and_(pc.greater_equal(valores, inicio), pc.less_equal(valores, fim)))
+
+    def intervalo(self, tabela, coluna):
+        import pyarrow.compute as pc
+        extremos = pc.min_max(tabela.column(coluna))
+        return extremos["min"].as_py(), extremos["max"].as_py()
+
+    def ultimos_n(self, tabela, particao, ordem, n):
+        import numpy as np
+        tabela, mesmo_grupo = self._ordenar_e_agrupar(tabela, particao, ordem)
+        # Posição da linha contada a partir do fim do grupo (0 = mais recente)
+        indices = np.arange(tabela.num_rows)
+        fim_grupo = np.ones(tabela.num_rows, dtype=bool)
+        if tabela.num_rows:
+            fim_grupo[:-1] = ~mesmo_grupo[1:]
+        ultimo = np.minimum.accumulate(np.where(fim_grupo, indices, tabela.num_rows)[::-1])[::-1]
+        return tabela.filter(ultimo - indices < n)
+
+    def ler_tabela(self, caminho):
+        """
+        Lê um diretório Parquet não particionado; retorna None se ainda não existir.
+        """
+        import pyarrow.parquet as pq
+        from pyarrow import fs
+        sistema, diretorio = self._filesystem(caminho)
+        if sistema.get_file_info(diretorio.rstrip("/")).type == fs.FileType.NotFound:
+            return None
+        return pq.read_table(diretorio.rstrip("/"), filesystem=sistema)
+
+    def gravar_tabela(self, tabela, caminho):
+        import pyarrow.parquet as pq
+        sistema, diretorio = self._filesystem(caminho)
+        pq.write_to_dataset(tabela, root_path=diretorio.rstrip("/"), filesystem=sistema,
+                            existing_data_behavior="delete_matching",
+                            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet")
+
+    def materializar(self, tabela, nivel=None, contar=True):
+        # Tabelas Arrow já estão materializadas em memória
+        return tabela, tabela.num_rows
+
+    def liberar(self, tabela):
+        pass
+
+    def contar(self, tabela):
+        return tabela.num_rows
+
+    def coletar(self, tabela, colunas):
+        return tabela.select(colunas).to_pylist()
+
+    def mostrar(self, tabela, linhas=20):
+        for linha in tabela.slice(0, linhas).to_pylist():
+            print(linha)
+
+    # ----------------------------------------------------------------- leitura e gravação
+    def _filesystem(self, caminho):
+        return _filesystem(caminho, self.region)
+
+    def ler_parquet(self, caminhos, base_path=None, normalizar=None):
+        """
+        Lê os arquivos Parquet de cada diretório de partição ano=/mes=/dia=, adicionando as colunas
+        de partição como inteiros (mesma inferência de tipos do Spark). Com 'normalizar', cada arquivo
+        é normalizado antes da concatenação (arquivos RAW em texto e tipados convivem na mesma leitura).
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        tabelas = []
+        for caminho in caminhos:
+            sistema, arquivos = arquivos_parquet(caminho, self.region)
+            valores = dict(re.findall(r"(ano|mes|dia)=(\d+)", caminho))
+            for arquivo in arquivos:
+                tabela = pq.read_table(arquivo, filesystem=sistema)
+                for nome in ("ano", "mes", "dia"):
+                    tabela = tabela.append_column(nome, pa.array([int(valores[nome])] * tabela.num_rows, pa.int32()))
+                tabelas.append(normalizar(tabela) if normalizar else tabela)
+
+        if not tabelas:
+            raise ValueError(f"Nenhum arquivo Parquet encontrado em: {caminhos}")
+        return _concatenar(tabelas)
+
+    def gravar_particionado(self, tabela, destino, colunas_particao, perfil=None, bytes_por_linha=None):
+        """
+        Grava a tabela particionada no destino sobrescrevendo apenas as partições presentes nela
+        (equivalente ao partitionOverwriteMode=dynamic do Spark), com as opções do perfil de
+        gravação (perfil_gravacao.py) quando informado.
+
+        Returns:
+            list: valores distintos das colunas de partição gravadas (como texto), na ordem das colunas.
+        """
+        import pyarrow.parquet as pq
+        sistema, raiz = self._filesystem(destino)
+        opcoes = {}
+        if perfil:
+            colunas = [nome for nome in tabela.column_names if nome not in colunas_particao]
+            ordenacao = colunas_ordenacao(perfil, colunas)
+            if ordenacao:
+                tabela = tabela.sort_by([(nome, "ascending") for nome in list(colunas_particao) + ordenacao])
+            opcoes = opcoes_arrow(perfil, colunas, bytes_por_linha)
+        pq.write_to_dataset(
+            tabela,
+            root_path=raiz.rstrip("/"),
+            partition_cols=list(colunas_particao),
+            filesystem=sistema,
+            existing_data_behavior="delete_matching",
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            **opcoes,
+        )
+        distintos = tabela.select(list(colunas_particao)).group_by(list(colunas_particao)).aggregate([])
+        return sorted({tuple(str(v) for v in linha.values()) for linha in distintos.to_pylist()})
+
+
+def escolher_motor(spark, engine, bytes_entrada, arrow_max_bytes, region='sa-east-1'):
+    """
+    Escolhe o motor de execução:
+        - engine 'spark' ou 'arrow': força o motor;
+        - engine 'auto': Arrow quando a entrada cabe no limite de bytes, Spark caso contrário.
+    """
+    engine = (engine or "auto").lower()
+    if engine == "arrow" or (engine == "auto" and bytes_entrada is not None and bytes_entrada <= arrow_max_bytes):
+        return MotorArrow(region=region)
+    return MotorSpark(spark, region=region)
@@ -0,0 +1,151 @@
+###################################################################################################################
+# Acesso a objetos do pipeline no S3 ou no disco local, compartilhado pelo Glue Job e pelas Lambdas.              #
+#   - caminhos s3://bucket/chave e caminhos locais (testes, benchmarks e execuções locais) com a mesma API;       #
+#   - cliente S3 criado sob demanda: quem injeta o cliente (Lambdas, benchmarks) não paga o import do boto3;      #
+#   - ler_json / gravar_json para manifestos, marcadores e relatórios;                                            #
+#   - atualizar_json: leitura-modificação-gravação com compare-and-swap (IfMatch no ETag lido, IfNoneMatch para   #
+#     objeto novo), repetida quando outra execução alterou o objeto entre a leitura e a gravação.                 #
+###################################################################################################################
+
+import json
+import os
+import time
+
+from botocore.exceptions import ClientError
+
+ERROS_OBJETO_INEXISTENTE = ('NoSuchKey', '404')
+ERROS_CONFLITO = ('PreconditionFailed', 'ConditionalRequestConflict')
+
+
+def separar_s3(caminho):
+    """
+    (bucket, chave) de um caminho s3://bucket/chave.
+    """
+    bucket, _, chave = caminho[len("s3://"):].partition("/")
+    return bucket, chave
+
+
+def cliente_s3(s3_client=None, region=None):
+    """
+    Cliente injetado ou um novo; o boto3 só é importado quando nenhum cliente é passado.
+    """
+    if s3_client is not None:
+        return s3_client
+    import boto3
+    return boto3.client('s3', region_name=region)
+
+
+class AcessoS3:
+    """
+    Cliente S3 preguiçoso para as classes do pipeline: usa o cliente injetado em self._s3 ou cria
+    um na região self.region no primeiro acesso.
+    """
+
+    _s3 = None
+    region = None
+
+    @property
+    def s3(self):
+        if self._s3 is None:
+            self._s3 = cliente_s3(None, self.region)
+        return self._s3
+
+    def cliente_para(self, caminho):
+        """
+        Cliente S3 para caminhos s3://; None para caminhos locais, sem criar cliente.
+        """
+        return self.s3 if caminho.startswith("s3://") else None
+
+
+def _ler_versao(caminho, s3_client=None):
+    """
+    (conteúdo, versão) do JSON: a versão é o ETag no S3 e o mtime no disco local; (None, None) quando não existe.
+    """
+    try:
+        if caminho.startswith("s3://"):
+            bucket, chave = separar_s3(caminho)
+            resposta = cliente_s3(s3_client).get_object(Bucket=bucket, Key=chave)
+            return json.loads(resposta['Body'].read()), resposta['ETag']
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo), os.fstat(arquivo.fileno()).st_mtime_ns
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ERROS_OBJETO_INEXISTENTE:
+            raise
+    except FileNotFoundError:
+        pass
+    return None, None
+
+
+def ler_json(caminho, s3_client=None):
+    """
+    Conteúdo JSON de um objeto S3 (s3://bucket/chave) ou arquivo local; None quando não existe.
+    """
+    return _ler_versao(caminho, s3_client)[0]
+
+
+def _corpo_json(conteudo):
+    return json.dumps(conteudo, indent=2, sort_keys=True, default=str)
+
+
+def gravar_json(caminho, conteudo, s3_client=None):
+    corpo = _corpo_json(conteudo)
+    if caminho.startswith("s3://"):
+        bucket, chave = separar_s3(caminho)
+        cliente_s3(s3_client).put_object(Bucket=bucket, Key=chave, Body=corpo.encode("utf-8"),
+                                         ContentType="application/json")
+    else:
+        os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            arquivo.write(corpo)
+
+
+def _gravar_local_se_inalterado(caminho, corpo, versao):
+    """
+    Compare-and-swap local: o lock exclusivo em <caminho>.lock serializa as gravações e a versão (mtime)
+    relida sob o lock confirma que ninguém gravou desde a leitura. A troca é atômica (os.replace).
+    """
+    import fcntl
+
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    with open(f"{caminho}.lock", "w") as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        try:
+            atual = os.stat(caminho).st_mtime_ns if os.path.exists(caminho) else None
+            if atual != versao:
+                return False
+            temporario = f"{caminho}.{os.getpid()}.tmp"
+            with open(temporario, "w", encoding="utf-8") as arquivo:
+                arquivo.write(corpo)
+            os.replace(temporario, caminho)
+            return True
+        finally:
+            fcntl.flock(trava, fcntl.LOCK_UN)
+
+
+def atualizar_json(caminho, funcao, s3_client=None, max_tentativas=10, espera_base=0.05, sleep=time.sleep):
+    """
+    Aplica funcao(conteúdo atual ou None) -> (novo conteúdo, retorno) e grava o resultado só se o objeto
+    não mudou desde a leitura; em caso de conflito relê e reaplica a função.
+
+    Returns:
+        o retorno da última aplicação de 'funcao' (a que foi gravada).
+    """
+    for tentativa in range(max_tentativas):
+        conteudo, versao = _ler_versao(caminho, s3_client)
+        novo_conteudo, retorno = funcao(conteudo)
+        corpo = _corpo_json(novo_conteudo)
+        if caminho.startswith("s3://"):
+            bucket, chave = separar_s3(caminho)
+            condicao = {'IfMatch': versao} if versao else {'IfNoneMatch': '*'}
+            try:
+                cliente_s3(s3_client).put_object(Bucket=bucket, Key=chave, Body=corpo.encode("utf-8"),
+                                                 ContentType="application/json", **condicao)
+                return retorno
+            except ClientError as e:
+                if e.response['Error']['Code'] not in ERROS_CONFLITO:
+                    raise
+        elif _gravar_local_se_inalterado(caminho, corpo, versao):
+            return retorno
+        print(f"[objetos_s3] Conflito ao gravar {caminho} (tentativa {tentativa + 1}). Relendo ...")
+        sleep(espera_base * (tentativa + 1))
+    raise RuntimeError(f"Não foi possível atualizar {caminho} após {max_tentativas} tentativas.")
@@ -0,0 +1,121 @@
+###################################################################################################################
+# Perfis de gravação Parquet das tabelas refinadas, selecionáveis por tabela (--WRITE_PROFILE/--WRITE_PROFILES).  #
+#                                                                                                                 #
+#   perfil   | codec       | dicionário | row group | arquivo até | ordenação          | bloom filter             #
+#   ---------+-------------+------------+-----------+-------------+--------------------+-----------------------   #
+#   padrao   | snappy      | sim        | (motor)   | sem limite  | -                  | -                        #
+#   consulta | zstd (3)    | sim        | 8 MB      | 128 MB      | codigo_bovespa     | codigo_bovespa, indice   #
+#   compacto | zstd (9)    | sim        | 128 MB    | 512 MB      | codigo_bovespa     | -                        #
+#                                                                                                                 #
+# 'padrao' reproduz a gravação original (row group padrão de cada motor). 'consulta' é voltado ao Athena: dentro  #
+# de cada partição as linhas ficam ordenadas pelo ticker, então as estatísticas min/max de cada row group         #
+# descartam os grupos que não contêm o ticker procurado, e o bloom filter descarta os que ficam no intervalo mas  #
+# não têm o valor. 'compacto' prioriza o tamanho em disco (tabelas de histórico pouco consultadas por ticker).    #
+#                                                                                                                 #
+# Os tamanhos de row group e de arquivo são alvos: no Spark o row group é em bytes (parquet.block.size), mas o    #
+# limite de arquivo e, no Arrow, os dois limites são em linhas, convertidos pelo tamanho médio de uma linha.      #
+###################################################################################################################
+
+from collections import namedtuple
+
+MB = 1024 * 1024
+
+PerfilGravacao = namedtuple("PerfilGravacao", ["nome", "codec", "nivel_compressao", "dicionario", "row_group_bytes",
+                                               "arquivo_bytes", "ordenacao", "bloom_filter"])
+
+PERFIS_GRAVACAO = {
+    "padrao": PerfilGravacao("padrao", "snappy", None, True, None, None, [], []),
+    "consulta": PerfilGravacao("consulta", "zstd", 3, True, 8 * MB, 128 * MB, ["codigo_bovespa"],
+                               ["codigo_bovespa", "indice"]),
+    "compacto": PerfilGravacao("compacto", "zstd", 9, True, 128 * MB, 512 * MB, ["codigo_bovespa"], []),
+}
+
+PERFIL_GRAVACAO_PADRAO = "padrao"
+
+# Valores distintos esperados por arquivo nas colunas com bloom filter (tickers da carteira com folga)
+BLOOM_NDV = 2000
+BLOOM_FPP = 0.01
+
+# Tamanho médio de uma linha refinada em Parquet, usado quando não há estimativa da execução
+BYTES_POR_LINHA_PADRAO = 64
+
+
+def escolher_perfil_gravacao(nome=None):
+    nome = (nome or PERFIL_GRAVACAO_PADRAO).lower()
+    if nome not in PERFIS_GRAVACAO:
+        raise ValueError(f"Perfil de gravação desconhecido: {nome} (use {', '.join(PERFIS_GRAVACAO)}).")
+    return PERFIS_GRAVACAO[nome]
+
+
+def perfil_da_tabela(tabela, perfis_por_tabela=None, padrao=None):
+    """
+    Perfil da tabela conforme --WRITE_PROFILES (tabela=perfil,...); as demais usam --WRITE_PROFILE.
+    """
+    return escolher_perfil_gravacao((perfis_por_tabela or {}).get(tabela, padrao))
+
+
+def linhas_por_tamanho(bytes_alvo, bytes_por_linha=None):
+    if not bytes_alvo:
+        return None
+    return max(1, int(bytes_alvo // (bytes_por_linha or BYTES_POR_LINHA_PADRAO)))
+
+
+def colunas_ordenacao(perfil, colunas):
+    # Tabelas sem a coluna de ordenação são gravadas sem ordenação
+    return [coluna for coluna in perfil.ordenacao if coluna in colunas]
+
+
+def opcoes_spark(perfil, bytes_por_linha=None):
+    """
+    Opções do DataFrameWriter; as chaves parquet.* são repassadas pelo Spark à configuração do parquet-mr.
+    """
+    opcoes = {
+        "compression": perfil.codec,
+        "parquet.enable.dictionary": str(perfil.dicionario).lower(),
+    }
+    if perfil.row_group_bytes:
+        opcoes["parquet.block.size"] = str(perfil.row_group_bytes)
+    if perfil.nivel_compressao is not None and perfil.codec == "zstd":
+        opcoes["parquet.compression.codec.zstd.level"] = str(perfil.nivel_compressao)
+    linhas_arquivo = linhas_por_tamanho(perfil.arquivo_bytes, bytes_por_linha)
+    if linhas_arquivo:
+        opcoes["maxRecordsPerFile"] = str(linhas_arquivo)
+    for coluna in perfil.bloom_filter:
+        opcoes[f"parquet.bloom.filter.enabled#{coluna}"] = "true"
+        opcoes[f"parquet.bloom.filter.expected.ndv#{coluna}"] = str(BLOOM_NDV)
+        opcoes[f"parquet.bloom.filter.fpp#{coluna}"] = str(BLOOM_FPP)
+    return opcoes
+
+
+def opcoes_arrow(perfil, colunas, bytes_por_linha=None):
+    """
+    Argumentos de pyarrow.parquet.write_to_dataset. 'colunas' são as colunas gravadas nos arquivos
+    (sem as de partição), usadas para declarar a ordenação no rodapé. Versões do pyarrow sem
+    suporte a bloom filter gravam sem ele.
+    """
+    import inspect
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    opcoes = {"compression": perfil.codec, "use_dictionary": perfil.dicionario}
+    if perfil.nivel_compressao is not None:
+        opcoes["compression_level"] = perfil.nivel_compressao
+    linhas_row_group = linhas_por_tamanho(perfil.row_group_bytes, bytes_por_linha)
+    if linhas_row_group:
+        # Sem o mínimo, o write_dataset grava um row group por lote interno (~32 mil linhas)
+        opcoes["row_group_size"] = linhas_row_group
+        opcoes["min_rows_per_group"] = linhas_row_group
+    linhas_arquivo = linhas_por_tamanho(perfil.arquivo_bytes, bytes_por_linha)
+    if linhas_arquivo:
+        # O pyarrow exige arquivo >= row group
+        opcoes["max_rows_per_file"] = max(linhas_arquivo, linhas_row_group or 0)
+    ordenacao = colunas_ordenacao(perfil, colunas)
+    if ordenacao:
+        opcoes["sorting_columns"] = [pq.SortingColumn(colunas.index(coluna)) for coluna in ordenacao]
+        # Com use_threads o write_dataset pode reordenar os lotes da tabela já ordenada
+        if "preserve_order" in inspect.signature(ds.write_dataset).parameters:
+            opcoes["preserve_order"] = True
+    if perfil.bloom_filter and "bloom_filter_options" in inspect.signature(pq.write_table).parameters:
+        opcoes["bloom_filter_options"] = {coluna: {"ndv": BLOOM_NDV, "fpp": BLOOM_FPP}
+                                          for coluna in perfil.bloom_filter if coluna in colunas}
+    return opcoes
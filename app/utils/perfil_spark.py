@@ -0,0 +1,79 @@
+###################################################################################################################
+# Perfil de execução do Spark dimensionado pelo tamanho estimado da entrada (soma dos Parquet RAW listados).      #
+#                                                                                                                 #
+# Tabela de dimensionamento (bytes Parquet comprimidos na entrada; em memória ocupam ~4x):                        #
+#                                                                                                                 #
+#   perfil   | entrada até | shuffle partitions    | AQE advisory | broadcast | tarefas de gravação               #
+#   ---------+-------------+-----------------------+--------------+-----------+-------------------------------    #
+#   minimo   | 16 MB       | 1                     | 16 MB        | 10 MB     | 1                                 #
+#   pequeno  | 256 MB      | 8                     | 32 MB        | 10 MB     | 4                                 #
+#   medio    | 4 GB        | 64                    | 64 MB        | 32 MB     | 32                                #
+#   grande   | sem limite  | 4 x entrada / 128 MB  | 128 MB       | 64 MB     | metade das shuffle partitions     #
+#                                                                                                                 #
+# O AQE fica sempre ligado com coalescência de partições, então o número de shuffle partitions é um teto: o       #
+# Spark junta as partições pequenas até o tamanho 'advisory'. As tarefas de gravação definem o repartition por    #
+# ano/mes/dia/data_pregao antes da escrita: cada partição de saída fica em uma única tarefa (um arquivo por       #
+# pregão) e o número de tarefas controla apenas o paralelismo da gravação.                                        #
+###################################################################################################################
+
+import math
+from collections import namedtuple
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+PerfilSpark = namedtuple("PerfilSpark", ["nome", "shuffle_partitions", "advisory_bytes", "broadcast_bytes",
+                                         "tarefas_gravacao"])
+
+# (limite de bytes de entrada, perfil); o último vale para qualquer tamanho acima do penúltimo
+TABELA_PERFIS = [
+    (16 * MB, PerfilSpark("minimo", 1, 16 * MB, 10 * MB, 1)),
+    (256 * MB, PerfilSpark("pequeno", 8, 32 * MB, 10 * MB, 4)),
+    (4 * GB, PerfilSpark("medio", 64, 64 * MB, 32 * MB, 32)),
+]
+
+# Fator de expansão do Parquet comprimido para linhas em memória, usado no perfil 'grande'
+FATOR_EXPANSAO = 4
+
+
+def perfil_grande(bytes_entrada):
+    shuffle = max(200, math.ceil(bytes_entrada * FATOR_EXPANSAO / (128 * MB)))
+    return PerfilSpark("grande", shuffle, 128 * MB, 64 * MB, max(1, shuffle // 2))
+
+
+def escolher_perfil(bytes_entrada, nome=None):
+    """
+    Escolhe o perfil pela tabela acima. 'nome' força um perfil (--SPARK_PROFILE); bytes_entrada
+    desconhecido (None) cai no perfil 'medio', o mais próximo dos padrões do Spark.
+    """
+    perfis = {perfil.nome: perfil for _, perfil in TABELA_PERFIS}
+    if nome and nome != "auto":
+        if nome == "grande":
+            return perfil_grande(bytes_entrada or 4 * GB)
+        if nome not in perfis:
+            raise ValueError(f"Perfil Spark desconhecido: {nome} (use auto, {', '.join(perfis)} ou grande).")
+        return perfis[nome]
+
+    if bytes_entrada is None:
+        return perfis["medio"]
+    for limite, perfil in TABELA_PERFIS:
+        if bytes_entrada <= limite:
+            return perfil
+    return perfil_grande(bytes_entrada)
+
+
+def aplicar_perfil(spark, perfil):
+    """
+    Aplica o perfil na sessão (configurações SQL alteráveis em tempo de execução).
+    """
+    configuracoes = {
+        "spark.sql.shuffle.partitions": str(perfil.shuffle_partitions),
+        "spark.sql.adaptive.enabled": "true",
+        "spark.sql.adaptive.coalescePartitions.enabled": "true",
+        "spark.sql.adaptive.advisoryPartitionSizeInBytes": str(perfil.advisory_bytes),
+        "spark.sql.adaptive.skewJoin.enabled": "true",
+        "spark.sql.autoBroadcastJoinThreshold": str(perfil.broadcast_bytes),
+    }
+    for chave, valor in configuracoes.items():
+        spark.conf.set(chave, valor)
+    return configuracoes
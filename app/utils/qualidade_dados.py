@@ -0,0 +1,244 @@
+###################################################################################################################
+# Validação de qualidade dos dados transformados pelo JobELTB3, em uma única agregação sobre o DataFrame já       #
+# materializado. Cada regra declara uma agregação (contagem condicional, soma ou contagem de distintos) que é     #
+# compilada junto com as demais em um só agrupamento por índice e pregão; as regras são avaliadas no driver sobre #
+# as linhas agregadas (uma por índice x pregão), sem ações extras sobre os dados.                                 #
+#                                                                                                                 #
+#   regra                                   | medida                                        | alerta | falha      #
+#   ----------------------------------------+-----------------------------------------------+--------+---------   #
+#   nulos_codigo_bovespa                    | fração de linhas sem código de negociação     | 0      | 0          #
+#   nulos_quantidade_teorica                | fração de linhas com o numérico nulo          | 0      | 0.01       #
+#   nulos_percentual_participacao_acao      |   (ausente ou não numérico na RAW: o cast     | 0      | 0.01       #
+#   nulos_percentual_participacao_acumulada |    não-ANSI converte em nulo sem erro)        | 0      | -          #
+#   negativos_quantidade_teorica            | fração de linhas com valor negativo           | 0      | 0          #
+#   negativos_percentual_participacao_acao  |                                               | 0      | 0          #
+#   duplicadas                              | fração de linhas repetidas por ação/pregão    | 0      | 0          #
+#   soma_participacao                       | maior desvio de 100 da soma das participações | 0.5    | 5          #
+#                                           | de um índice em um pregão (em p.p.)           |        |            #
+#                                                                                                                 #
+# Uma medida acima do limite de alerta só é registrada no relatório; acima do limite de falha interrompe o job    #
+# antes da gravação. Os limites são alterados por --QUALITY_THRESHOLDS regra=alerta:falha,... (limite vazio ou    #
+# '-' desativa o nível) e o relatório de cada execução é gravado em --QUALITY_REPORT_PATH (S3 ou local).          #
+###################################################################################################################
+
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from objetos_s3 import AcessoS3, gravar_json
+
+RegraQualidade = namedtuple("RegraQualidade", ["nome", "descricao", "agregacao", "medida", "alerta", "falha"])
+
+REGRAS = [
+    RegraQualidade("nulos_codigo_bovespa", "Linhas sem código de negociação",
+                   ("count_null", "codigo_bovespa"), "fracao", 0, 0),
+    RegraQualidade("nulos_quantidade_teorica", "Quantidade teórica nula (ausente ou não numérica na RAW)",
+                   ("count_null", "quantidade_teorica"), "fracao", 0, 0.01),
+    RegraQualidade("nulos_percentual_participacao_acao", "Participação nula (ausente ou não numérica na RAW)",
+                   ("count_null", "percentual_participacao_acao"), "fracao", 0, 0.01),
+    RegraQualidade("nulos_percentual_participacao_acumulada", "Participação acumulada nula",
+                   ("count_null", "percentual_participacao_acumulada"), "fracao", 0, None),
+    RegraQualidade("negativos_quantidade_teorica", "Quantidade teórica negativa",
+                   ("count_negative", "quantidade_teorica"), "fracao", 0, 0),
+    RegraQualidade("negativos_percentual_participacao_acao", "Participação negativa",
+                   ("count_negative", "percentual_participacao_acao"), "fracao", 0, 0),
+    RegraQualidade("duplicadas", "Linhas repetidas da mesma ação no mesmo índice e pregão",
+                   ("count_distinct", "codigo_bovespa"), "duplicadas", 0, 0),
+    RegraQualidade("soma_participacao", "Desvio de 100 da soma das participações de um índice em um pregão",
+                   ("sum", "percentual_participacao_acao"), "desvio_100", 0.5, 5),
+]
+
+# Granularidade da agregação: as regras são avaliadas por índice e pregão
+CHAVE_PREGAO = ["indice", "data_pregao"]
+
+# Pregões listados por regra no relatório (os de maior medida)
+LIMITE_PREGOES_RELATORIO = 10
+
+STATUS = ["ok", "alerta", "falha"]
+
+
+def _limite(texto):
+    texto = texto.strip()
+    return None if texto in ("", "-") else float(texto)
+
+
+def aplicar_limites(limites=None, regras=REGRAS):
+    """
+    Regras com os limites de --QUALITY_THRESHOLDS ({'regra': 'alerta:falha'}); as não informadas
+    mantêm os limites padrão.
+    """
+    limites = dict(limites or {})
+    nomes = {regra.nome for regra in regras}
+    desconhecidas = sorted(set(limites) - nomes)
+    if desconhecidas:
+        raise ValueError(f"Regras de qualidade desconhecidas: {desconhecidas} (use {', '.join(sorted(nomes))}).")
+    resultado = []
+    for regra in regras:
+        if regra.nome in limites:
+            alerta, separador, falha = limites[regra.nome].partition(":")
+            if not separador:
+                raise ValueError(f"Limite da regra '{regra.nome}' deve ser 'alerta:falha': {limites[regra.nome]}")
+            regra = regra._replace(alerta=_limite(alerta), falha=_limite(falha))
+        resultado.append(regra)
+    return resultado
+
+
+def agregacoes(regras):
+    """
+    Compila as regras nas agregações de uma única chamada a motor.agregar: cada regra vira uma
+    coluna com o seu nome, além da contagem de linhas do pregão.
+    """
+    # data_pregao faz parte da chave e nunca é nula: a contagem dela é a de linhas do grupo
+    resultado = [("linhas", "count", "data_pregao")]
+    for regra in regras:
+        funcao, coluna = regra.agregacao
+        resultado.append((regra.nome, funcao, coluna))
+        if regra.medida == "duplicadas":
+            # Linhas com a coluna preenchida: as nulas não são repetidas (ficam com a regra de nulos)
+            resultado.append((f"{regra.nome}_linhas", "count", coluna))
+    return resultado
+
+
+def medida_pregao(regra, linha):
+    """
+    Medida da regra em um índice/pregão: linhas afetadas ('fracao' e 'duplicadas') ou o desvio
+    absoluto da soma para 100 ('desvio_100'; soma nula conta como desvio de 100).
+    """
+    valor = linha[regra.nome]
+    if regra.medida == "fracao":
+        return int(valor or 0)
+    if regra.medida == "duplicadas":
+        return int(linha[f"{regra.nome}_linhas"]) - int(valor or 0)
+    if regra.medida == "desvio_100":
+        return abs(Decimal(100) - Decimal(valor if valor is not None else 0))
+    raise ValueError(f"Medida de qualidade desconhecida: {regra.medida}")
+
+
+def status_regra(regra, valor):
+    if regra.falha is not None and valor > regra.falha:
+        return "falha"
+    if regra.alerta is not None and valor > regra.alerta:
+        return "alerta"
+    return "ok"
+
+
+def avaliar(regras, linhas_pregao):
+    """
+    Avalia as regras sobre as linhas agregadas por índice e pregão.
+
+    Returns:
+        list: por regra, a medida total ('fracao'/'duplicadas': linhas afetadas / linhas; 'desvio_100':
+              maior desvio), o status e os pregões afetados (com linhas afetadas ou, em 'desvio_100', acima
+              do alerta), com os LIMITE_PREGOES_RELATORIO de maior medida como exemplos.
+    """
+    total_linhas = sum(int(linha["linhas"]) for linha in linhas_pregao)
+    resultados = []
+    for regra in regras:
+        medidas = [(medida_pregao(regra, linha), linha) for linha in linhas_pregao]
+        # O arredondamento das participações a 3 casas sempre desvia a soma um pouco de 100
+        tolerancia = (regra.alerta or 0) if regra.medida == "desvio_100" else 0
+        afetados = sorted((item for item in medidas if item[0] > tolerancia), key=lambda item: item[0], reverse=True)
+        if regra.medida == "desvio_100":
+            valor = float(max((medida for medida, _ in medidas), default=0))
+        else:
+            valor = sum(medida for medida, _ in medidas) / total_linhas if total_linhas else 0.0
+        resultados.append({
+            "regra": regra.nome,
+            "descricao": regra.descricao,
+            "medida": regra.medida,
+            "valor": round(valor, 6),
+            "alerta": regra.alerta,
+            "falha": regra.falha,
+            "status": status_regra(regra, valor),
+            "pregoes_afetados": len(afetados),
+            "exemplos": [{"indice": linha["indice"], "data_pregao": str(linha["data_pregao"]), "valor": float(medida)}
+                         for medida, linha in afetados[:LIMITE_PREGOES_RELATORIO]],
+        })
+    return resultados
+
+
+def verificar_relatorio(relatorio):
+    """
+    Interrompe o job quando alguma regra do relatório passou do limite de falha.
+    """
+    falhas = [resultado["regra"] for resultado in relatorio["regras"] if resultado["status"] == "falha"]
+    if falhas:
+        raise ValueError(f"Validação de qualidade falhou nas regras {falhas} (ver relatório de qualidade).")
+
+
+class ValidacaoQualidade(AcessoS3):
+    def __init__(self, motor, limites=None, report_path=None, region='sa-east-1', s3_client=None):
+        self.motor = motor
+        self.regras = aplicar_limites(limites)
+        self.report_path = report_path
+        self.region = region
+        self._s3 = s3_client
+
+    def regras_aplicaveis(self, df):
+        colunas = set(self.motor.colunas(df))
+        return [regra for regra in self.regras if regra.agregacao[1] in colunas]
+
+    def metricas_por_pregao(self, df, regras=None):
+        """
+        A única ação da validação: agrega as colunas de todas as regras por índice e pregão e traz
+        o resultado (uma linha por índice x pregão) para o driver.
+        """
+        regras = self.regras_aplicaveis(df) if regras is None else regras
+        colunas_agregadas = agregacoes(regras)
+        df_metricas = self.motor.agregar(df, CHAVE_PREGAO, colunas_agregadas)
+        return self.motor.coletar(df_metricas, CHAVE_PREGAO + [alias for alias, _, _ in colunas_agregadas])
+
+    def validar(self, df, **contexto):
+        """
+        Valida o DataFrame transformado. Regras sobre colunas ausentes nele são ignoradas.
+
+        Returns:
+            dict: relatório da execução ('status' é o pior status entre as regras).
+        """
+        inicio = time.perf_counter()
+        gerado_em = datetime.now(timezone.utc)
+        regras = self.regras_aplicaveis(df)
+        ignoradas = [regra.nome for regra in self.regras if regra not in regras]
+        if ignoradas:
+            print(f"[ValidacaoQualidade] Regras ignoradas (coluna ausente): {ignoradas}")
+
+        linhas_pregao = self.metricas_por_pregao(df, regras)
+        resultados = avaliar(regras, linhas_pregao)
+        relatorio = {
+            **contexto,
+            "gerado_em": gerado_em.isoformat(),
+            "motor": self.motor.nome,
+            "linhas": sum(int(linha["linhas"]) for linha in linhas_pregao),
+            "pregoes": len({linha["data_pregao"] for linha in linhas_pregao}),
+            "indices": sorted({linha["indice"] for linha in linhas_pregao}),
+            "status": max((resultado["status"] for resultado in resultados), key=STATUS.index, default="ok"),
+            "regras": resultados,
+            "regras_ignoradas": ignoradas,
+            "duracao_ms": round((time.perf_counter() - inicio) * 1000, 3),
+        }
+        for resultado in resultados:
+            if resultado["status"] != "ok":
+                print(f"[ValidacaoQualidade] {resultado['status'].upper()} {resultado['regra']}: {resultado['valor']} "
+                      f"(alerta={resultado['alerta']}, falha={resultado['falha']}) em "
+                      f"{resultado['pregoes_afetados']} índice(s)/pregão(ões); exemplos: {resultado['exemplos'][:3]}")
+        print(f"[ValidacaoQualidade] {relatorio['linhas']} linhas de {relatorio['pregoes']} pregão(ões) validadas: "
+              f"status {relatorio['status']}.")
+        return relatorio
+
+    def gravar_relatorio(self, relatorio, tabela):
+        """
+        Grava o relatório em <report_path>/<tabela>/<gerado_em>.json (um arquivo por execução); sem
+        report_path o relatório só vai para o log.
+        """
+        if not self.report_path:
+            return None
+        nome = datetime.fromisoformat(relatorio["gerado_em"]).strftime("%Y%m%dT%H%M%S%fZ")
+        caminho = f"{self.report_path.rstrip('/')}/{tabela}/{nome}.json"
+        try:
+            gravar_json(caminho, relatorio, self.cliente_para(caminho))
+            print(f"[ValidacaoQualidade] Relatório de qualidade gravado em {caminho}")
+            return caminho
+        except Exception as e:
+            print(f"[ValidacaoQualidade] Erro ao gravar o relatório de qualidade em {caminho}: {e}")
+            raise
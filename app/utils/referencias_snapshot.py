@@ -0,0 +1,201 @@
+###################################################################################################################
+# Deduplicação dos snapshots diários da carteira teórica por hash de conteúdo.                                    #
+# A carteira só muda nos rebalanceamentos, mas o scraper raspa todos os dias. Com este módulo:                    #
+#   - o scraper calcula um SHA-256 canônico das carteiras (independente da ordem de páginas, registros e campos)  #
+#     e o compara com o do último snapshot gravado (<tabela RAW>/_conteudo/ultimo_snapshot.json);                 #
+#   - conteúdo igual: em vez dos Parquet, grava na partição do dia só o marcador _MESMO_QUE.json, que aponta para #
+#     o pregão em que aquele conteúdo foi gravado de fato (a referência nunca é outro marcador);                  #
+#   - a Lambda de gatilho e o JobELTB3 tratam o marcador copiando (cópia no próprio S3) a partição refinada da    #
+#     referência para o pregão do marcador e registrando-a no catálogo, sem Spark. As colunas de partição ficam   #
+#     só nos diretórios, então os arquivos copiados são idênticos aos que o job gravaria.                         #
+# A tabela de janelas não é replicada: um dia sem mudança não é uma nova observação, e a variação do próximo      #
+# pregão com mudança é calculada contra o último snapshot gravado (o intervalo em dias cobre o período).          #
+# Arquivos e diretórios iniciados por '_' são ignorados pelo Athena e pelo Spark ao listar as tabelas.            #
+###################################################################################################################
+
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import date
+
+from layout_particoes import projecao_habilitada, valores_particao
+from objetos_s3 import AcessoS3, ler_json, separar_s3
+
+# Marcador gravado na partição RAW do dia no lugar dos Parquet quando o conteúdo não mudou
+MARCADOR_REFERENCIA = "_MESMO_QUE.json"
+
+# Último snapshot gravado de fato, relativo à raiz da tabela RAW
+CHAVE_ULTIMO_SNAPSHOT = "_conteudo/ultimo_snapshot.json"
+
+PADRAO_PARTICAO_RAW = re.compile(r"ano=(\d{4})/mes=(\d{2})/dia=(\d{2})/")
+
+
+def hash_carteiras(carteiras):
+    """
+    SHA-256 canônico das carteiras {indice: results}. Cada registro é serializado com as chaves
+    ordenadas e os registros de cada índice são ordenados, então a ordem em que a API devolve
+    páginas, registros e campos não altera o hash; índices diferentes geram hashes diferentes.
+    """
+    canonico = {
+        indice: sorted(json.dumps(registro, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+                       for registro in results)
+        for indice, results in carteiras.items()
+    }
+    corpo = json.dumps(canonico, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(corpo.encode("utf-8")).hexdigest()
+
+
+def data_particao_raw(caminho):
+    """
+    Pregão (datetime.date) da partição ano=/mes=/dia= do caminho, ou None quando ele não aponta para uma.
+    """
+    match = PADRAO_PARTICAO_RAW.search(caminho if caminho.endswith("/") else f"{caminho}/")
+    return date(*(int(valor) for valor in match.groups())) if match else None
+
+
+def decidir_gravacao(ultimo_snapshot, conteudo, hoje):
+    """
+    Compara o hash das carteiras raspadas com o último snapshot gravado.
+
+    Returns:
+        str: 'gravar' (conteúdo novo, ou sem snapshot anterior), 'referencia' (igual a um pregão
+             anterior: basta o marcador) ou 'gravado' (igual ao que já foi gravado hoje).
+    """
+    if not ultimo_snapshot or ultimo_snapshot.get("sha256") != conteudo:
+        return "gravar"
+    if ultimo_snapshot.get("data_pregao") == hoje.isoformat():
+        return "gravado"
+    return "referencia"
+
+
+class ReplicadorReferencias(AcessoS3):
+    """
+    Replica as partições refinadas do pregão de referência para os pregões marcados com
+    MARCADOR_REFERENCIA, copiando os arquivos no próprio S3 (copy_object) e registrando a partição
+    no Glue Catalog quando a tabela não usa partition projection.
+
+    As chaves de partição de cada tabela vêm do catálogo, então o mesmo código atende os layouts
+    'legado' e 'data_pregao'. Caminhos locais são aceitos para execuções locais e benchmarks.
+    """
+
+    def __init__(self, catalogo, database_name, table_names, s3_client=None, region='sa-east-1'):
+        self.catalogo = catalogo
+        self.database_name = database_name
+        self.table_names = list(table_names)
+        self.region = region
+        self._s3 = s3_client
+
+    def ler_marcador(self, particao):
+        """
+        Marcador da partição RAW (s3://.../ano=/mes=/dia=/), ou None quando ela tem dados próprios.
+        """
+        caminho = f"{particao.rstrip('/')}/{MARCADOR_REFERENCIA}"
+        return ler_json(caminho, self.cliente_para(caminho))
+
+    def listar_marcadores(self, raiz):
+        """
+        Partições RAW sob a raiz da tabela que têm o MARCADOR_REFERENCIA (caminhos terminados em '/').
+        """
+        sufixo = f"/{MARCADOR_REFERENCIA}"
+        particoes = []
+        if raiz.startswith("s3://"):
+            bucket, prefixo = separar_s3(raiz)
+            paginator = self.s3.get_paginator('list_objects_v2')
+            for pagina in paginator.paginate(Bucket=bucket, Prefix=prefixo):
+                for objeto in pagina.get('Contents', []):
+                    if objeto['Key'].endswith(sufixo):
+                        particoes.append(f"s3://{bucket}/{objeto['Key'][:-len(MARCADOR_REFERENCIA)]}")
+        else:
+            for diretorio, _, arquivos in os.walk(raiz):
+                if MARCADOR_REFERENCIA in arquivos:
+                    particoes.append(f"{diretorio.rstrip(os.sep)}/")
+        return sorted(particao for particao in particoes if data_particao_raw(particao))
+
+    def listar_arquivos(self, diretorio):
+        """
+        Arquivos Parquet diretamente sob o diretório: {nome: caminho}, ignorando marcadores.
+        """
+        if diretorio.startswith("s3://"):
+            bucket, prefixo = separar_s3(diretorio)
+            arquivos = {}
+            paginator = self.s3.get_paginator('list_objects_v2')
+            for pagina in paginator.paginate(Bucket=bucket, Prefix=prefixo, Delimiter="/"):
+                for objeto in pagina.get('Contents', []):
+                    nome = objeto['Key'][len(prefixo):]
+                    if nome.endswith(".parquet") and not nome.startswith(("_", ".")):
+                        arquivos[nome] = f"s3://{bucket}/{objeto['Key']}"
+            return arquivos
+        if not os.path.isdir(diretorio):
+            return {}
+        return {nome: os.path.join(diretorio, nome) for nome in os.listdir(diretorio)
+                if nome.endswith(".parquet") and not nome.startswith(("_", "."))}
+
+    def copiar_particao(self, origem, destino):
+        """
+        Deixa no diretório 'destino' exatamente os arquivos Parquet de 'origem', copiados com o mesmo
+        nome (reexecuções sobrescrevem a cópia anterior). Os arquivos que sobram no destino só são
+        apagados depois da cópia.
+
+        Returns:
+            int | None: arquivos copiados, ou None quando a origem não tem arquivos.
+        """
+        arquivos = self.listar_arquivos(origem)
+        if not arquivos:
+            return None
+        existentes = self.listar_arquivos(destino)
+        for nome, caminho in sorted(arquivos.items()):
+            alvo = f"{destino}{nome}"
+            if caminho.startswith("s3://"):
+                bucket, chave = separar_s3(caminho)
+                bucket_destino, chave_destino = separar_s3(alvo)
+                self.s3.copy_object(Bucket=bucket_destino, Key=chave_destino, CopySource={'Bucket': bucket, 'Key': chave})
+            else:
+                os.makedirs(destino, exist_ok=True)
+                shutil.copyfile(caminho, alvo)
+        for nome, caminho in existentes.items():
+            if nome not in arquivos:
+                if caminho.startswith("s3://"):
+                    bucket, chave = separar_s3(caminho)
+                    self.s3.delete_object(Bucket=bucket, Key=chave)
+                else:
+                    os.remove(caminho)
+        return len(arquivos)
+
+    def replicar(self, particao, marcador):
+        """
+        Replica, em cada tabela, a partição do pregão de referência do marcador para o pregão da
+        partição RAW 'particao'.
+
+        Returns:
+            tuple: ({tabela: arquivos copiados}, tabelas em que a referência ainda não foi processada)
+        """
+        data_destino = data_particao_raw(particao)
+        if data_destino is None:
+            raise ValueError(f"Não foi possível extrair ano, mês e dia do caminho: {particao}")
+        data_referencia = date.fromisoformat(marcador["data_referencia"])
+
+        copiados, faltantes = {}, []
+        for table_name in self.table_names:
+            tabela = self.catalogo.obter_tabela(self.database_name, table_name)
+            if tabela is None:
+                raise ValueError(f"Tabela '{self.database_name}.{table_name}' não encontrada no Glue Catalog.")
+            location = tabela['StorageDescriptor']['Location'].rstrip("/")
+            chaves = [chave['Name'] for chave in tabela.get('PartitionKeys', [])]
+
+            def diretorio(data):
+                return "/".join([location] + [f"{nome}={valor}" for nome, valor in
+                                              zip(chaves, valores_particao(chaves, data))]) + "/"
+
+            arquivos = self.copiar_particao(diretorio(data_referencia), diretorio(data_destino))
+            if arquivos is None:
+                faltantes.append(table_name)
+                continue
+            if not projecao_habilitada(tabela.get('Parameters')):
+                self.catalogo.criar_particoes(self.database_name, table_name,
+                                              [(valores_particao(chaves, data_destino), diretorio(data_destino))])
+            copiados[table_name] = arquivos
+            print(f"[ReplicadorReferencias] '{table_name}': {arquivos} arquivo(s) do pregão {data_referencia} "
+                  f"copiado(s) para {data_destino}.")
+        return copiados, faltantes
@@ -0,0 +1,177 @@
+###################################################################################################################
+# Regras de transformação dos dados da B3, escritas uma única vez sobre as operações de um motor                  #
+# (MotorSpark ou MotorArrow, ver motores.py). Usadas pelo JobELTB3 em qualquer um dos motores.                    #
+###################################################################################################################
+
+# Colunas da camada RAW (API da B3) -> colunas da camada refinada
+MAPA_COLUNAS = {
+    "segment": "segmento",
+    "cod": "codigo_bovespa",
+    "asset": "nome_acao",
+    "type": "nome_tipo_acao",
+    "part": "percentual_participacao_acao",
+    "partacum": "percentual_participacao_acumulada",
+    "theoricalqty": "quantidade_teorica",
+}
+
+COLUNAS_NUMERICAS = ["quantidade_teorica", "percentual_participacao_acao", "percentual_participacao_acumulada"]
+
+# Schema tipado dos arquivos RAW (raw_schema() do scraper e tabela em infra/modules/table/raw)
+SCHEMA_RAW = [
+    ("segment", "string"),
+    ("cod", "string"),
+    ("asset", "string"),
+    ("type", "string"),
+    ("part", "decimal(18,3)"),
+    ("partAcum", "decimal(18,3)"),
+    ("theoricalQty", "bigint"),
+    ("indice", "string"),
+]
+
+# Partições RAW anteriores ao schema tipado guardam os numéricos como texto no formato brasileiro:
+# coluna -> (padrão removido/substituído, substituto) da limpeza via regexp_replace
+LIMPEZA_TEXTO_RAW = {"part": (",", "."), "partAcum": (",", "."), "theoricalQty": ("\\.", "")}
+
+COLUNAS_PARTICAO_RAW = ["ano", "mes", "dia"]
+
+# Uma ação é identificada pelo índice da carteira e pelo código de negociação
+CHAVE_ACAO = ["indice", "codigo_bovespa"]
+
+# Chave do agregado diário por tipo, além do pregão (as colunas de partição ano/mes/dia/data_pregao)
+CHAVE_AGREGADO_TIPO = ["indice", "nome_tipo_acao"]
+COLUNAS_PREGAO = ["ano", "mes", "dia", "data_pregao"]
+
+
+class TransformacoesB3:
+    def __init__(self, motor):
+        self.motor = motor
+
+    def adicionar_data_pregao(self, df):
+        # Adiciona a data do pregão a partir da partição RAW (ano/mes/dia) de origem de cada linha,
+        # para que reprocessamentos e backfills mantenham a data original da raspagem.
+        return self.motor.data_particao(df, "data_pregao")
+
+    def normalizar_raw(self, df):
+        """
+        Converte um arquivo RAW (ou um grupo de arquivos com o mesmo schema) para SCHEMA_RAW antes da união
+        com os demais: numéricos em texto passam pela limpeza via regexp_replace e colunas ausentes ('indice',
+        antes da raspagem multi-índice) entram nulas. Assim partições legadas e tipadas são lidas juntas.
+        """
+        motor = self.motor
+        nomes = {nome.lower(): nome for nome in motor.colunas(df)}
+        for coluna, tipo in SCHEMA_RAW:
+            atual = nomes.get(coluna.lower())
+            if atual is None:
+                df = motor.com_nulos(df, coluna, tipo)
+                continue
+            if atual != coluna:
+                df = motor.renomear(df, {atual: coluna})
+            if coluna in LIMPEZA_TEXTO_RAW and motor.tipo_texto(df, coluna):
+                padrao, substituto = LIMPEZA_TEXTO_RAW[coluna]
+                df = motor.numero_br(df, coluna, padrao, substituto, tipo)
+            else:
+                df = motor.converter(df, coluna, tipo)
+        particao = [coluna for coluna in COLUNAS_PARTICAO_RAW if coluna in nomes]
+        return motor.selecionar(df, [coluna for coluna, _ in SCHEMA_RAW] + particao)
+
+    def raw_schema_tipado(self, df):
+        """
+        Indica se os arquivos RAW já foram gravados com os numéricos tipados pelo scraper
+        (theoricalQty bigint, part/partAcum decimal) em vez de texto no formato brasileiro.
+        """
+        colunas = {nome.lower() for nome in self.motor.colunas(df)}
+        return all(nome in colunas and not self.motor.tipo_texto(df, nome) for nome in COLUNAS_NUMERICAS)
+
+    def transform_dataframe(self, df):
+        motor = self.motor
+        try:
+            print("Iniciando tratamento rename columns ...")
+            df_renamed = motor.renomear(df, MAPA_COLUNAS)
+
+            # Arquivos anteriores à raspagem multi-índice não possuem a coluna 'indice' (eram sempre IBOV)
+            if "indice" not in motor.colunas(df_renamed):
+                df_renamed = motor.com_constante(df_renamed, "indice", "IBOV")
+            else:
+                df_renamed = motor.preencher_nulos(df_renamed, "indice", "IBOV")
+
+            if self.raw_schema_tipado(df_renamed):
+                # Fast path: o scraper já grava os numéricos tipados (bigint/decimal), basta o cast final.
+                print("Schema RAW já tipado, pulando a limpeza via regexp_replace ...")
+                df_numerico = motor.converter(df_renamed, "quantidade_teorica", "decimal(18,0)")
+                df_numerico = motor.converter(df_numerico, "percentual_participacao_acumulada", "decimal(18,3)")
+                df_numerico = motor.converter(df_numerico, "percentual_participacao_acao", "decimal(18,3)")
+            else:
+                print("Iniciando conversão de tipos e limpeza...")
+                df_numerico = motor.numero_br(df_renamed, "quantidade_teorica", "\\.", "", "decimal(18,0)")
+                df_numerico = motor.numero_br(df_numerico, "percentual_participacao_acumulada", ",", ".", "decimal(18,3)")
+                df_numerico = motor.numero_br(df_numerico, "percentual_participacao_acao", ",", ".", "decimal(18,3)")
+
+            df_transformed = motor.converter(df_numerico, "ano", "string")
+            df_transformed = motor.lpad(motor.converter(df_transformed, "mes", "string"), "mes", 2, "0")
+            df_transformed = motor.lpad(motor.converter(df_transformed, "dia", "string"), "dia", 2, "0")
+
+            return df_transformed
+        except Exception as e:
+            print(f"Erro na etapa de tratamento do dataframe: {e}")
+            raise
+
+    def sumarizacao_tipo(self, df):
+        """
+        Sumarização dos dados por 'Tipo' e calcula:
+        - Soma de Qtde. Teórica
+        - Média de Qtde. Teórica
+        - Soma de Part (%)
+        - Média de Part (%)
+        """
+        print("Realizando sumarização dos dados por 'Tipo' ...")
+        return self.motor.agregar(df, ["nome_tipo_acao"], [
+            ("total_quantidade_teorica", "sum", "quantidade_teorica"),
+            ("media_quantidade_teorica", "avg", "quantidade_teorica"),
+            ("total_percentual_participacao_acao", "sum", "percentual_participacao_acao"),
+            ("media_percentual_participacao_acao", "avg", "percentual_participacao_acao"),
+        ])
+
+    def agregado_diario_tipo(self, df):
+        """
+        Estado agregável da sumarização por 'Tipo', por pregão e índice: somas e contagens em vez
+        de médias, para que meses e anos sejam consolidados somando os parciais diários (a média
+        de um período é soma / contagem, nunca a média das médias). Cada pregão depende só das
+        próprias linhas, então regravar as partições do lote mantém a tabela exata.
+        """
+        motor = self.motor
+        print("Calculando o agregado diário por 'Tipo' ...")
+        chaves = [coluna for coluna in COLUNAS_PREGAO if coluna in motor.colunas(df)] + CHAVE_AGREGADO_TIPO
+        df = motor.agregar(df, chaves, [
+            ("soma_quantidade_teorica", "sum", "quantidade_teorica"),
+            ("contagem_quantidade_teorica", "count", "quantidade_teorica"),
+            ("soma_percentual_participacao_acao", "sum", "percentual_participacao_acao"),
+            ("contagem_percentual_participacao_acao", "count", "percentual_participacao_acao"),
+        ])
+        # Mesmos tipos nos dois motores (a soma de decimal do pyarrow sai com precisão 38)
+        df = motor.converter(df, "soma_quantidade_teorica", "decimal(28,0)")
+        return motor.converter(df, "soma_percentual_participacao_acao", "decimal(28,3)")
+
+    def window_variacoes_diarias(self, df):
+        """
+        Aplica função de janela para calcular variações diarias
+        """
+        motor = self.motor
+        print("Calculando variações diárias ...")
+        df = motor.lag(df, CHAVE_ACAO, "data_pregao", "quantidade_teorica", "quantidade_teorica_anterior")
+        df = motor.lag(df, CHAVE_ACAO, "data_pregao", "percentual_participacao_acao", "percentual_participacao_acao_anterior")
+        df = motor.lag(df, CHAVE_ACAO, "data_pregao", "data_pregao", "data_pregao_anterior")
+
+        df = motor.diferenca(df, "quantidade_teorica", "quantidade_teorica_anterior", "variacao_quantidade_teorica")
+        df = motor.diferenca(df, "percentual_participacao_acao", "percentual_participacao_acao_anterior",
+                             "variacao_percentual_participacao_acao_anterior")
+        df = motor.dias_entre(df, "data_pregao_anterior", "data_pregao", "intervalo")
+        return motor.remover(df, "data_pregao_anterior")
+
+    def window_media_movel(self, df, periodo=3):
+        """
+        Parâmetro
+        - periodo: número de dias para a média móvel (default = 3)
+        """
+        print(f"Calculando média móvel de {periodo} dias ...")
+        return self.motor.media_movel(df, CHAVE_ACAO, "data_pregao", "quantidade_teorica", periodo,
+                                      "media_movel_quantidade_teorica")
@@ -0,0 +1,160 @@
+###################################################################################################################
+# Benchmark do agregado diário por tipo (TransformacoesB3.agregado_diario_tipo) com o MotorArrow.                 #
+# Gera um histórico RAW sintético, grava a tabela refinada e o agregado (somas e contagens por pregão, índice e   #
+# tipo) e mede as consolidações mensal e anual, as mesmas das consultas salvas do Athena, calculadas:             #
+#   - a partir da tabela refinada inteira (como a sumarização por tipo exigiria, relendo todo o histórico);       #
+#   - a partir dos parciais diários do agregado (média = soma das somas / soma das contagens).                    #
+# Mede bytes lidos e tempo, e simula a chegada de um novo pregão: só a partição dele é gravada no agregado.       #
+# A igualdade das duas consolidações é conferida em tests/test_agregado_tipo.py.                                  #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_agregado_tipo.py [--acoes 90] [--pregoes 500]                                      #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda"))
+
+from bench_job_elt import gerar_raw  # noqa: E402
+
+PERIODOS = {"mensal": 7, "anual": 4}
+
+
+def arquivos_parquet(raiz):
+    return sorted(os.path.join(diretorio, nome) for diretorio, _, nomes in os.walk(raiz)
+                  for nome in nomes if nome.endswith(".parquet"))
+
+
+def ler_tabela(raiz, colunas):
+    """
+    Lê só as colunas pedidas da tabela particionada (hive), como o Athena faria. Retorna a tabela e
+    os bytes das colunas lidas (soma dos column chunks nos metadados dos arquivos).
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    lidos = 0
+    for caminho in arquivos_parquet(raiz):
+        metadados = pq.ParquetFile(caminho).metadata
+        for grupo in range(metadados.num_row_groups):
+            row_group = metadados.row_group(grupo)
+            for indice in range(row_group.num_columns):
+                coluna = row_group.column(indice)
+                if coluna.path_in_schema in colunas:
+                    lidos += coluna.total_compressed_size
+    tabela = ds.dataset(raiz, format="parquet", partitioning="hive").to_table(columns=colunas)
+    return tabela, lidos
+
+
+def consolidar(linhas, tamanho_periodo, soma_qtd, contagem_qtd, soma_part, contagem_part):
+    """
+    {(periodo, indice, tipo): (média da quantidade teórica, média da participação)} a partir de
+    linhas com somas e contagens.
+    """
+    acumulado = {}
+    for linha in linhas:
+        chave = (str(linha["data_pregao"])[:tamanho_periodo], linha["indice"], linha["nome_tipo_acao"])
+        total = acumulado.setdefault(chave, [Decimal(0), 0, Decimal(0), 0])
+        total[0] += linha[soma_qtd]
+        total[1] += linha[contagem_qtd]
+        total[2] += linha[soma_part]
+        total[3] += linha[contagem_part]
+    return {chave: (total[0] / total[1], total[2] / total[3]) for chave, total in acumulado.items()}
+
+
+def rollup_refinado(raiz, tamanho_periodo):
+    tabela, lidos = ler_tabela(raiz, ["data_pregao", "indice", "nome_tipo_acao", "quantidade_teorica",
+                                      "percentual_participacao_acao"])
+    linhas = [dict(linha, contagem=1) for linha in tabela.to_pylist()]
+    return consolidar(linhas, tamanho_periodo, "quantidade_teorica", "contagem",
+                      "percentual_participacao_acao", "contagem"), lidos
+
+
+def rollup_agregado(raiz, tamanho_periodo):
+    tabela, lidos = ler_tabela(raiz, ["data_pregao", "indice", "nome_tipo_acao", "soma_quantidade_teorica",
+                                      "contagem_quantidade_teorica", "soma_percentual_participacao_acao",
+                                      "contagem_percentual_participacao_acao"])
+    return consolidar(tabela.to_pylist(), tamanho_periodo, "soma_quantidade_teorica", "contagem_quantidade_teorica",
+                      "soma_percentual_participacao_acao", "contagem_percentual_participacao_acao"), lidos
+
+
+def processar(motor, transformacoes, caminhos_raw, destino_refinado, destino_agregado):
+    """
+    Mesmo caminho do JobELTB3 com o layout 'data_pregao': transforma o lote RAW, grava a tabela
+    refinada e o agregado diário por tipo. Retorna as partições gravadas no agregado.
+    """
+    df = transformacoes.adicionar_data_pregao(transformacoes.transform_dataframe(motor.ler_parquet(caminhos_raw)))
+    for coluna in ("ano", "mes", "dia"):
+        df = motor.remover(df, coluna)
+    motor.gravar_particionado(df, destino_refinado, ["data_pregao"])
+    return motor.gravar_particionado(transformacoes.agregado_diario_tipo(df), destino_agregado, ["data_pregao"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--acoes", type=int, default=90)
+    parser.add_argument("--pregoes", type=int, default=500)
+    args = parser.parse_args()
+
+    from motores import MotorArrow
+    from transformacoes_b3 import TransformacoesB3
+
+    motor = MotorArrow()
+    transformacoes = TransformacoesB3(motor)
+    diretorio = tempfile.mkdtemp(prefix="bench_agregado_tipo_")
+    try:
+        caminhos_raw = gerar_raw(os.path.join(diretorio, "raw"), args.acoes, args.pregoes + 1)
+        refinado = os.path.join(diretorio, "refinado")
+        agregado = os.path.join(diretorio, "agregado")
+        processar(motor, transformacoes, caminhos_raw[:-1], refinado, agregado)
+
+        resultado = {"acoes": args.acoes, "pregoes": args.pregoes}
+        for nome, tamanho_periodo in PERIODOS.items():
+            inicio = time.perf_counter()
+            consolidado, bytes_refinado = rollup_refinado(refinado, tamanho_periodo)
+            tempo_refinado = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            _, bytes_agregado = rollup_agregado(agregado, tamanho_periodo)
+            tempo_agregado = time.perf_counter() - inicio
+            resultado[nome] = {
+                "grupos": len(consolidado),
+                "refinado": {"bytes_lidos": bytes_refinado, "tempo_s": round(tempo_refinado, 3)},
+                "agregado": {"bytes_lidos": bytes_agregado, "tempo_s": round(tempo_agregado, 3)},
+                "reducao_bytes": round(bytes_refinado / max(bytes_agregado, 1), 1),
+            }
+
+        # Novo pregão: o agregado só ganha a partição do dia; as demais não são tocadas
+        antes = {caminho: os.path.getmtime(caminho) for caminho in arquivos_parquet(agregado)}
+        inicio = time.perf_counter()
+        gravadas = processar(motor, transformacoes, caminhos_raw[-1:], refinado, agregado)
+        tempo_incremental = time.perf_counter() - inicio
+        depois = {caminho: os.path.getmtime(caminho) for caminho in arquivos_parquet(agregado)}
+        alterados = [caminho for caminho in depois if antes.get(caminho) != depois[caminho]]
+        resultado["incremental"] = {
+            "particoes_gravadas": [valores[0] for valores in gravadas],
+            "arquivos_alterados": len(alterados),
+            "arquivos_total": len(depois),
+            "tempo_s": round(tempo_incremental, 3),
+        }
+
+        print(f"{args.pregoes} pregões x {args.acoes} ações: consolidação mensal lendo "
+              f"{resultado['mensal']['refinado']['bytes_lidos']} bytes da tabela refinada -> "
+              f"{resultado['mensal']['agregado']['bytes_lidos']} bytes do agregado "
+              f"({resultado['mensal']['reducao_bytes']}x); novo pregão altera "
+              f"{len(alterados)} de {len(depois)} arquivo(s) do agregado")
+        print(json.dumps(resultado, indent=2))
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
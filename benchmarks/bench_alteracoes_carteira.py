@@ -0,0 +1,152 @@
+###################################################################################################################
+# Benchmark do change-set da carteira na ingestão (app/utils/alteracoes_carteira.py) com uma carteira sintética   #
+# rebalanceada a cada N pregões e parte das participações mudando todo dia.                                       #
+# Compara, para "o que mudou no último pregão":                                                                   #
+#   - antes: TransformacoesB3.window_variacoes_diarias (lag por ação) sobre a tabela refinada inteira, filtrando  #
+#     o último pregão;                                                                                            #
+#   - depois: o _ALTERACOES.json que o scraper grava a cada pregão (leitura do estado, comparação por dicionário  #
+#     e serialização do change-set e do estado), medido pregão a pregão ao longo do histórico.                    #
+# A igualdade das alterações nos dois casos é conferida em tests/test_alteracoes_carteira.py.                     #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_alteracoes_carteira.py [--acoes 90] [--pregoes 1250] [--motores arrow spark]       #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+
+from alteracoes_carteira import calcular_alteracoes  # noqa: E402
+from synthetic_b3 import dias_pregao, gerar_tickers  # noqa: E402
+
+MOTORES = ["arrow", "spark"]
+
+
+def gerar_pregoes(n_acoes, n_pregoes, rebalanceamento, fracao_diaria, seed=42):
+    """
+    Registros da API (campo 'results') de cada pregão. Nos rebalanceamentos ~5% das ações saem,
+    outras entram e todas as quantidades mudam; nos demais dias só a participação de uma fração
+    das ações muda.
+    """
+    aleatorio = random.Random(seed)
+    universo = gerar_tickers(n_acoes * 2, seed)
+    atributos = {ticker["cod"]: ticker for ticker in universo}
+    carteira = {}
+    for posicao, dia in enumerate(dias_pregao(n_pregoes)):
+        if posicao % rebalanceamento == 0:
+            for codigo in aleatorio.sample(sorted(carteira), k=len(carteira) // 20):
+                del carteira[codigo]
+            candidatos = [ticker["cod"] for ticker in universo if ticker["cod"] not in carteira]
+            for codigo in aleatorio.sample(candidatos, k=n_acoes - len(carteira)):
+                carteira[codigo] = None
+            for codigo in carteira:
+                carteira[codigo] = [aleatorio.randint(10_000_000, 10_000_000_000), aleatorio.uniform(0.01, 5.0)]
+        else:
+            for codigo in aleatorio.sample(sorted(carteira), k=int(len(carteira) * fracao_diaria)):
+                carteira[codigo][1] = aleatorio.uniform(0.01, 5.0)
+        yield dia, [{"segment": atributos[codigo]["segment"], "cod": codigo, "asset": atributos[codigo]["asset"],
+                     "type": atributos[codigo]["type"], "part": f"{participacao:.3f}".replace(".", ","),
+                     "theoricalQty": f"{quantidade:,}".replace(",", ".")}
+                    for codigo, (quantidade, participacao) in sorted(carteira.items())]
+
+
+def tabela_refinada(pregoes):
+    import pyarrow as pa
+    linhas = [{"indice": "IBOV", "codigo_bovespa": registro["cod"], "data_pregao": dia,
+               "quantidade_teorica": Decimal(registro["theoricalQty"].replace(".", "")),
+               "percentual_participacao_acao": Decimal(registro["part"].replace(",", "."))}
+              for dia, results in pregoes for registro in results]
+    esquema = pa.schema([("indice", pa.string()), ("codigo_bovespa", pa.string()), ("data_pregao", pa.date32()),
+                         ("quantidade_teorica", pa.decimal128(18, 0)),
+                         ("percentual_participacao_acao", pa.decimal128(18, 3))])
+    return pa.Table.from_pylist(linhas, schema=esquema)
+
+
+def criar_motor(nome):
+    from motores import MotorArrow, MotorSpark
+    if nome == "spark":
+        from pyspark.sql import SparkSession
+        spark = (SparkSession.builder.master("local[2]").appName("bench_alteracoes_carteira")
+                 .config("spark.ui.enabled", "false").config("spark.sql.session.timeZone", "UTC").getOrCreate())
+        spark.sparkContext.setLogLevel("ERROR")
+        return MotorSpark(spark)
+    return MotorArrow()
+
+
+def alteracoes_por_janela(motor, tabela, ultimo, anterior):
+    """
+    Alterações do último pregão pela janela sobre o histórico inteiro: ações presentes também no
+    pregão anterior com quantidade ou participação diferente.
+    """
+    from transformacoes_b3 import TransformacoesB3
+    df = tabela if motor.nome == "arrow" else motor.spark.createDataFrame(tabela.to_pandas())
+    df = TransformacoesB3(motor).window_variacoes_diarias(df)
+    colunas = ["codigo_bovespa", "data_pregao", "intervalo", "variacao_quantidade_teorica",
+               "variacao_percentual_participacao_acao_anterior"]
+    alteracoes = set()
+    for linha in motor.coletar(df, colunas):
+        if linha["data_pregao"] != ultimo or linha["intervalo"] != (ultimo - anterior).days:
+            continue
+        delta_quantidade = int(linha["variacao_quantidade_teorica"])
+        delta_participacao = Decimal(linha["variacao_percentual_participacao_acao_anterior"])
+        if delta_quantidade or delta_participacao:
+            alteracoes.add((linha["codigo_bovespa"], delta_quantidade, delta_participacao))
+    return alteracoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--acoes", type=int, default=90)
+    parser.add_argument("--pregoes", type=int, default=1250)
+    parser.add_argument("--rebalanceamento", type=int, default=21)
+    parser.add_argument("--fracao-diaria", type=float, default=0.2, help="ações com participação nova por pregão")
+    parser.add_argument("--motores", nargs="+", default=["arrow"], choices=MOTORES)
+    args = parser.parse_args()
+
+    pregoes = list(gerar_pregoes(args.acoes, args.pregoes, args.rebalanceamento, args.fracao_diaria))
+
+    # Depois: o scraper lê o estado, compara e grava change-set e estado a cada pregão (S3 simulado por JSON)
+    estado_json, tempos, tamanhos = None, [], []
+    for dia, results in pregoes:
+        inicio = time.perf_counter()
+        estado = json.loads(estado_json) if estado_json else None
+        change_set, estado = calcular_alteracoes(estado, {"IBOV": results}, dia)
+        corpo_change_set = json.dumps(change_set, indent=2, sort_keys=True)
+        estado_json = json.dumps(estado, indent=2, sort_keys=True)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        tamanhos.append(len(corpo_change_set.encode("utf-8")))
+
+    ultimo, anterior = pregoes[-1][0], pregoes[-2][0]
+    tabela = tabela_refinada(pregoes)
+    resultado = {
+        "acoes": args.acoes,
+        "pregoes": args.pregoes,
+        "linhas_refinadas": tabela.num_rows,
+        "change_set": {"ms_por_pregao_mediana": round(statistics.median(tempos), 3),
+                       "ms_por_pregao_max": round(max(tempos), 3),
+                       "bytes_mediana": int(statistics.median(tamanhos)),
+                       "bytes_estado": len(estado_json.encode("utf-8")),
+                       "ultimo_pregao": change_set["resumo"]},
+        "janela": {},
+    }
+    for nome in args.motores:
+        motor = criar_motor(nome)
+        inicio = time.perf_counter()
+        alteracoes = alteracoes_por_janela(motor, tabela, ultimo, anterior)
+        resultado["janela"][nome] = {"tempo_s": round(time.perf_counter() - inicio, 3), "alteracoes": len(alteracoes)}
+        print(f"{args.pregoes} pregões: janela sobre {tabela.num_rows} linhas ({nome}) "
+              f"{resultado['janela'][nome]['tempo_s']}s -> change-set {resultado['change_set']['ms_por_pregao_mediana']} "
+              f"ms por pregão; {len(alteracoes)} alteração(ões) no último pregão")
+    print(json.dumps(resultado, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
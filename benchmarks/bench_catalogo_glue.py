@@ -0,0 +1,164 @@
+###################################################################################################################
+# Benchmark do cliente do Glue Catalog compartilhado (app/utils/catalogo_glue.py) com um Glue falso em memória.   #
+# Registra as partições de um backfill de N dias (padrão: 365) de duas formas e compara chamadas à API e tempo    #
+# com uma latência simulada por chamada:                                                                          #
+#   - antes: get_table + create_partition por partição (como o scraper fazia a cada invocação);                   #
+#   - depois: CatalogoGlue.criar_particoes (get_table em cache + batch_create_partition em lotes de 100).         #
+# O Glue falso devolve ThrottlingException para uma fração das entradas de cada lote, para conferir que só elas   #
+# são reenviadas. Mede também a reexecução (todas já existem), o batch_get_partition, o cache do get_table e o    #
+# update_table condicional.                                                                                       #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_catalogo_glue.py [--dias 365] [--latencia-ms 20] [--fracao-throttling 0.05]        #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+COLUNAS = [{'Name': 'cod', 'Type': 'string'}, {'Name': 'part', 'Type': 'decimal(18,3)'},
+           {'Name': 'theoricalQty', 'Type': 'bigint'}, {'Name': 'indice', 'Type': 'string'}]
+CHAVES = [{'Name': 'ano', 'Type': 'string'}, {'Name': 'mes', 'Type': 'string'}, {'Name': 'dia', 'Type': 'string'}]
+
+
+class GlueFalso:
+    """
+    Glue Catalog mínimo: uma tabela, partições em memória, latência fixa por chamada e throttling
+    aleatório de entradas nos batch_*.
+    """
+
+    def __init__(self, latencia_s=0.0, fracao_throttling=0.0, seed=42):
+        self.latencia_s = latencia_s
+        self.fracao_throttling = fracao_throttling
+        self.aleatorio = random.Random(seed)
+        self.tabela = {'Name': 'tb', 'StorageDescriptor': {'Columns': list(COLUNAS), 'Location': 's3://bucket/tb',
+                                                         'InputFormat': 'in', 'OutputFormat': 'out',
+                                                         'SerdeInfo': {}},
+                       'PartitionKeys': list(CHAVES), 'Parameters': {'classification': 'parquet'}}
+        self.particoes = {}
+        self.chamadas = 0
+
+    def _latencia(self):
+        self.chamadas += 1
+        time.sleep(self.latencia_s)
+
+    def get_table(self, DatabaseName, Name):
+        self._latencia()
+        if Name != self.tabela['Name']:
+            raise ClientError({'Error': {'Code': 'EntityNotFoundException', 'Message': Name}}, 'GetTable')
+        return {'Table': json.loads(json.dumps(self.tabela))}
+
+    def update_table(self, DatabaseName, TableInput):
+        self._latencia()
+        self.tabela = dict(self.tabela, **TableInput)
+        return {}
+
+    def create_partition(self, DatabaseName, TableName, PartitionInput):
+        self._latencia()
+        chave = tuple(PartitionInput['Values'])
+        if chave in self.particoes:
+            raise ClientError({'Error': {'Code': 'AlreadyExistsException', 'Message': str(chave)}}, 'CreatePartition')
+        self.particoes[chave] = PartitionInput
+        return {}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        self._latencia()
+        assert len(PartitionInputList) <= 100
+        erros = []
+        for entrada in PartitionInputList:
+            chave = tuple(entrada['Values'])
+            if self.aleatorio.random() < self.fracao_throttling:
+                erros.append({'PartitionValues': list(chave), 'ErrorDetail': {'ErrorCode': 'ThrottlingException'}})
+            elif chave in self.particoes:
+                erros.append({'PartitionValues': list(chave), 'ErrorDetail': {'ErrorCode': 'AlreadyExistsException'}})
+            else:
+                self.particoes[chave] = entrada
+        return {'Errors': erros}
+
+    def batch_get_partition(self, DatabaseName, TableName, PartitionsToGet):
+        self._latencia()
+        assert len(PartitionsToGet) <= 100
+        encontradas, pendentes = [], []
+        for item in PartitionsToGet:
+            chave = tuple(item['Values'])
+            if self.aleatorio.random() < self.fracao_throttling:
+                pendentes.append(item)
+            elif chave in self.particoes:
+                encontradas.append(dict(self.particoes[chave], Values=list(chave)))
+        return {'Partitions': encontradas, 'UnprocessedKeys': pendentes}
+
+
+def particoes_backfill(dias):
+    inicio = date(2024, 1, 1)
+    datas = [inicio + timedelta(days=indice) for indice in range(dias)]
+    return [([f"{d.year}", f"{d.month:02d}", f"{d.day:02d}"],
+             f"s3://bucket/tb/ano={d.year}/mes={d.month:02d}/dia={d.day:02d}/") for d in datas]
+
+
+def medir(glue, funcao):
+    chamadas = glue.chamadas
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return {"chamadas_api": glue.chamadas - chamadas, "tempo_s": round(time.perf_counter() - inicio, 3)}, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--latencia-ms", type=float, default=20.0)
+    parser.add_argument("--fracao-throttling", type=float, default=0.05)
+    args = parser.parse_args()
+
+    from catalogo_glue import CatalogoGlue
+
+    particoes = particoes_backfill(args.dias)
+    latencia = args.latencia_ms / 1000
+
+    # Antes: uma ida ao get_table e uma ao create_partition por partição, sem throttling simulado
+    glue_antes = GlueFalso(latencia)
+
+    def registrar_individualmente():
+        for valores, location in particoes:
+            tabela = glue_antes.get_table(DatabaseName="db", Name="tb")['Table']
+            glue_antes.create_partition(DatabaseName="db", TableName="tb", PartitionInput={
+                'Values': valores, 'StorageDescriptor': dict(tabela['StorageDescriptor'], Location=location)})
+
+    antes, _ = medir(glue_antes, registrar_individualmente)
+
+    glue = GlueFalso(latencia, args.fracao_throttling)
+    catalogo = CatalogoGlue(glue, backoff_base=0.01, backoff_max=0.05)
+    depois, resumo = medir(glue, lambda: catalogo.criar_particoes("db", "tb", particoes))
+    reexecucao, resumo_reexecucao = medir(glue, lambda: catalogo.criar_particoes("db", "tb", particoes))
+    consulta, encontradas = medir(glue, lambda: catalogo.obter_particoes("db", "tb", [v for v, _ in particoes]))
+    cache, _ = medir(glue, lambda: [catalogo.location_tabela("db", "tb") for _ in range(100)])
+    sem_mudanca, atualizou = medir(glue, lambda: catalogo.atualizar_tabela("db", "tb", COLUNAS, CHAVES))
+    com_mudanca, atualizou_mudanca = medir(glue, lambda: catalogo.atualizar_tabela(
+        "db", "tb", COLUNAS + [{'Name': 'segment', 'Type': 'string'}], CHAVES))
+
+    resultado = {
+        "particoes": len(particoes),
+        "antes_create_partition": antes,
+        "depois_batch_create_partition": dict(depois, **resumo),
+        "reexecucao": dict(reexecucao, **resumo_reexecucao),
+        "batch_get_partition": dict(consulta, encontradas=len(encontradas)),
+        "location_tabela_100x": cache,
+        "update_table_sem_mudanca": dict(sem_mudanca, atualizou=atualizou),
+        "update_table_com_mudanca": dict(com_mudanca, atualizou=atualizou_mudanca),
+        "particoes_registradas": len(glue.particoes),
+    }
+    print(f"{len(particoes)} partições: {antes['chamadas_api']} chamadas / {antes['tempo_s']}s -> "
+          f"{depois['chamadas_api']} chamadas / {depois['tempo_s']}s (throttling simulado de "
+          f"{args.fracao_throttling:.0%} das entradas) | reexecução: {reexecucao['chamadas_api']} chamadas")
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+###################################################################################################################
+# Benchmark do cold start das Lambdas (scraper da B3, gatilho do Glue Job e coletor do Bitcoin).                  #
+# Cada medida roda em um subprocesso novo, como um container recém-criado:                                        #
+#   - init: tempo de import do módulo do handler (relógio e o cumulativo do python -X importtime, com os maiores  #
+#     imports diretos);                                                                                           #
+#   - primeira (fria) e segunda (quente) invocação do handler, pico de memória (ru_maxrss) e quais dependências   #
+#     pesadas (requests, pyarrow, boto3, bs4) ficaram carregadas.                                                 #
+# As APIs da AWS são respondidas por um S3 e um Glue falsos (a criação dos clientes boto3 é real e entra na       #
+# medida; só as chamadas à API são interceptadas) e a B3 e o Investing.com por um servidor HTTP local. Reporta    #
+# também o tamanho do pacote de cada handler (arquivos empacotados em infra/main.tf, crus e zipados) e das        #
+# dependências instaladas. Com --comparar-com, as mesmas medidas rodam sobre lambda/ e app/utils de outra         #
+# revisão do git (ex: o commit anterior à carga sob demanda) para o antes/depois.                                 #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_cold_start.py [--repeticoes 5] [--comparar-com HEAD~1]                             #
+###################################################################################################################
+
+import argparse
+import importlib
+import importlib.util
+import io
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAIZ_REPO = os.path.abspath(os.path.join(BENCH_DIR, ".."))
+
+BUCKET = "raw"
+TABELA_RAW = "tb_fiap_tech02_bovespa_raw"
+
+MODULOS = {
+    "scraper": "lambda_functions_scrapper",
+    "gatilho": "lambda_function",
+    "bitcoin": "lambda_functions_scrapper_bitcoin",
+}
+
+# Cenários por handler: variáveis de ambiente do container e os eventos da primeira e da segunda invocação
+CENARIOS = {
+    ("scraper", "projecao"): ({"RAW_PARTITION_PROJECTION": "true", "SNAPSHOT_DEDUP": "true"},
+                              {"indices": ["IBOV"]}, {"indices": ["IBOV"], "forcar_gravacao": True}),
+    ("scraper", "catalogo"): ({"RAW_PARTITION_PROJECTION": "false", "SNAPSHOT_DEDUP": "false"},
+                              {"indices": ["IBOV"]}, {"indices": ["IBOV"]}),
+    # O último snapshot (no S3 falso) já tem o conteúdo de hoje: a invocação termina na deduplicação
+    ("scraper", "dedup"): ({"RAW_PARTITION_PROJECTION": "true", "SNAPSHOT_DEDUP": "true"},
+                           {"indices": ["IBOV"]}, {"indices": ["IBOV"]}),
+    ("scraper", "pre_inicializado"): ({"RAW_PARTITION_PROJECTION": "true", "SNAPSHOT_DEDUP": "true",
+                                       "PRE_INICIALIZAR": "true"},
+                                      {"indices": ["IBOV"]}, {"indices": ["IBOV"], "forcar_gravacao": True}),
+    ("gatilho", "evento_s3"): ({"GLUE_JOB_NAME": "job", "DEBOUNCE_SECONDS": "0"}, "evento_s3", "evento_s3"),
+    ("gatilho", "pre_inicializado"): ({"GLUE_JOB_NAME": "job", "DEBOUNCE_SECONDS": "0", "PRE_INICIALIZAR": "true"},
+                                      "evento_s3", "evento_s3"),
+    ("bitcoin", "coleta"): ({"BITCOIN_INTERVALO_SEGUNDOS": "0"}, {"duracao_segundos": 0.01},
+                            {"duracao_segundos": 0.01}),
+}
+
+# Arquivos de cada pacote, como em infra/main.tf (o bitcoin ainda não é implantado pelo Terraform)
+PACOTES = {
+    "scraper": ["lambda/lambda_functions_scrapper.py", "app/utils/instrumentacao.py", "app/utils/catalogo_glue.py",
+                "app/utils/objetos_s3.py", "app/utils/referencias_snapshot.py", "app/utils/layout_particoes.py",
+                "app/utils/alteracoes_carteira.py"],
+    "gatilho": ["lambda/lambda_function.py", "app/utils/instrumentacao.py", "app/utils/referencias_snapshot.py",
+                "app/utils/layout_particoes.py", "app/utils/catalogo_glue.py", "app/utils/objetos_s3.py"],
+    "bitcoin": ["lambda/lambda_functions_scrapper_bitcoin.py"],
+}
+
+# Dependências de cada handler (layer); boto3/botocore já vêm no runtime da Lambda
+DEPENDENCIAS = {
+    "scraper": ["requests", "pyarrow"],
+    "gatilho": [],
+    "bitcoin": ["requests", "beautifulsoup4", "pyarrow"],
+}
+DEPENDENCIAS_RUNTIME = ["boto3", "botocore"]
+
+MODULOS_PESADOS = ["requests", "pyarrow", "pyarrow.parquet", "boto3", "bs4"]
+
+
+# ------------------------------------------------------------------------------------ processo filho (container)
+class AwsFalsa:
+    """
+    Respostas das operações usadas pelas Lambdas, no lugar de BaseClient._make_api_call: o cliente
+    boto3 continua sendo criado de verdade (custo do cold start), só a chamada HTTP à AWS é evitada.
+    """
+
+    def __init__(self, objetos):
+        self.objetos = dict(objetos)
+
+    def __call__(self, cliente, operacao, parametros):
+        from botocore.exceptions import ClientError
+        servico = cliente.meta.service_model.service_name
+        if servico == "s3" and operacao == "GetObject":
+            chave = (parametros["Bucket"], parametros["Key"])
+            if chave not in self.objetos:
+                raise ClientError({"Error": {"Code": "NoSuchKey"}}, operacao)
+            return {"Body": io.BytesIO(self.objetos[chave]), "ETag": '"1"'}
+        if servico == "s3" and operacao == "PutObject":
+            corpo = parametros["Body"]
+            self.objetos[(parametros["Bucket"], parametros["Key"])] = corpo if isinstance(corpo, bytes) else corpo.read()
+            return {"ETag": '"1"'}
+        if servico == "s3" and operacao == "DeleteObject":
+            self.objetos.pop((parametros["Bucket"], parametros["Key"]), None)
+            return {}
+        if servico == "glue" and operacao == "GetTable":
+            return {"Table": {"Name": parametros["Name"], "PartitionKeys": [{"Name": nome, "Type": "string"}
+                                                                            for nome in ("ano", "mes", "dia")],
+                              "StorageDescriptor": {"Columns": [{"Name": "cod", "Type": "string"}],
+                                                    "Location": f"s3://{BUCKET}/{parametros['Name']}/"}}}
+        if servico == "glue" and operacao == "BatchCreatePartition":
+            return {"Errors": []}
+        if servico == "glue" and operacao == "GetJob":
+            return {"Job": {"Name": parametros["JobName"], "ExecutionProperty": {"MaxConcurrentRuns": 3}}}
+        if servico == "glue" and operacao == "GetJobRuns":
+            return {"JobRuns": []}
+        if servico == "glue" and operacao == "StartJobRun":
+            return {"JobRunId": "jr_bench"}
+        raise NotImplementedError(f"{servico}.{operacao} não implementado no benchmark.")
+
+
+class InterceptadorBotocore:
+    """
+    Finder do sys.meta_path que troca BaseClient._make_api_call assim que botocore.client é
+    importado, sem antecipar o import do botocore (ele faz parte do que o cold start mede).
+    """
+
+    def __init__(self, aws_falsa):
+        self.aws_falsa = aws_falsa
+
+    def find_spec(self, nome, caminho, alvo=None):
+        if nome != "botocore.client":
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(nome)
+        executar_original = spec.loader.exec_module
+        aws_falsa = self.aws_falsa
+
+        def exec_module(modulo):
+            executar_original(modulo)
+            modulo.BaseClient._make_api_call = lambda cliente, operacao, parametros: \
+                aws_falsa(cliente, operacao, parametros)
+
+        spec.loader.exec_module = exec_module
+        return spec
+
+
+def evento_s3():
+    chave = f"{TABELA_RAW}/ano=2025/mes=07/dia=25/IBOV.parquet"
+    return {"Records": [{"s3": {"bucket": {"name": BUCKET}, "object": {"key": chave}}}]}
+
+
+def executar_cenario(handler, cenario, raiz):
+    """
+    Importa o handler da árvore 'raiz' e faz duas invocações. Roda em um processo novo.
+    """
+    sys.path[:0] = [os.path.join(raiz, "lambda"), os.path.join(raiz, "app", "utils")]
+    objetos = {(BUCKET, chave): valor.encode("utf-8")
+               for chave, valor in json.loads(os.environ.get("BENCH_OBJETOS_S3", "{}")).items()}
+    sys.meta_path.insert(0, InterceptadorBotocore(AwsFalsa(objetos)))
+    _, evento_frio, evento_quente = CENARIOS[(handler, cenario)]
+    evento_frio = evento_s3() if evento_frio == "evento_s3" else evento_frio
+    evento_quente = evento_s3() if evento_quente == "evento_s3" else evento_quente
+
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(MODULOS[handler])
+    init_ms = (time.perf_counter() - inicio) * 1000
+    carregados_init = [nome for nome in MODULOS_PESADOS if nome in sys.modules]
+
+    medidas = []
+    for evento in (evento_frio, evento_quente):
+        inicio = time.perf_counter()
+        resposta = modulo.lambda_handler(evento, None)
+        medidas.append(((time.perf_counter() - inicio) * 1000, resposta.get("statusCode")))
+    return {
+        "init_ms": round(init_ms, 2),
+        "primeira_invocacao_ms": round(medidas[0][0], 2),
+        "segunda_invocacao_ms": round(medidas[1][0], 2),
+        "status": [status for _, status in medidas],
+        "carregados_no_init": carregados_init,
+        "carregados_ao_final": [nome for nome in MODULOS_PESADOS if nome in sys.modules],
+        "pico_memoria_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+# ------------------------------------------------------------------------------------------- processo principal
+class ServidorStub(BaseHTTPRequestHandler):
+    """
+    Responde a API GetPortfolioDay da B3 (qualquer caminho) e a página do Bitcoin (/bitcoin).
+    """
+    resposta_b3 = b"{}"
+    pagina_bitcoin = (b'<html><body><div class="price" data-test="instrument-price-last">336.195,0</div>'
+                      b'</body></html>')
+
+    def do_GET(self):
+        corpo = self.pagina_bitcoin if self.path.startswith("/bitcoin") else self.resposta_b3
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html" if self.path.startswith("/bitcoin") else "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def extrair_arvore(ref, destino):
+    """
+    lambda/ e app/utils da revisão 'ref' em 'destino'.
+    """
+    arquivo = subprocess.run(["git", "archive", "--format=tar", ref, "lambda", "app/utils"], cwd=RAIZ_REPO,
+                             check=True, capture_output=True).stdout
+    subprocess.run(["tar", "-x", "-C", destino], input=arquivo, check=True)
+    return destino
+
+
+def ambiente_filho(raiz, variaveis, url_stub, objetos_s3):
+    ambiente = {nome: valor for nome, valor in os.environ.items()
+                if nome not in ("PYTHONPATH", "PRE_INICIALIZAR", "TRIGGER_STATE_BUCKET", "REFERENCE_TABLES")}
+    ambiente.update({
+        "AWS_DEFAULT_REGION": "sa-east-1", "AWS_ACCESS_KEY_ID": "bench", "AWS_SECRET_ACCESS_KEY": "bench",
+        "S3_BUCKET_NAME": BUCKET, "GLUE_TABLE_NAME": TABELA_RAW, "B3_API_URL": f"{url_stub}/GetPortfolioDay",
+        "BITCOIN_URL": f"{url_stub}/bitcoin", "BENCH_OBJETOS_S3": json.dumps(objetos_s3),
+    })
+    ambiente.update(variaveis)
+    return ambiente
+
+
+def medir_importtime(raiz, handler, ambiente):
+    """
+    Cumulativo do python -X importtime para o módulo do handler e os maiores imports diretos dele.
+    """
+    modulo = MODULOS[handler]
+    codigo = (f"import sys; sys.path[:0] = [{os.path.join(raiz, 'lambda')!r}, "
+              f"{os.path.join(raiz, 'app', 'utils')!r}]; import {modulo}")
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", codigo], env=ambiente, check=True,
+                           capture_output=True, text=True).stderr
+    linhas = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        linhas.append((len(nome) - len(nome.lstrip()), nome.strip(), int(cumulativo) / 1000))
+    # Os imports de um módulo são listados antes dele, um nível abaixo (até a linha de nível 1 anterior)
+    posicao = next(indice for indice, (nivel, nome, _) in enumerate(linhas) if nome == modulo and nivel == 1)
+    inicio = max([indice + 1 for indice, (nivel, _, _) in enumerate(linhas[:posicao]) if nivel == 1], default=0)
+    total = linhas[posicao][2]
+    diretos = sorted(((ms, nome) for nivel, nome, ms in linhas[inicio:posicao] if nivel == 3), reverse=True)[:5]
+    return round(total, 2), [f"{nome} ({ms:.1f} ms)" for ms, nome in diretos]
+
+
+def tamanho_pacote(raiz, handler):
+    caminhos = [os.path.join(raiz, caminho) for caminho in PACOTES[handler]]
+    existentes = [caminho for caminho in caminhos if os.path.exists(caminho)]
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as pacote:
+        for caminho in existentes:
+            pacote.write(caminho, os.path.basename(caminho))
+    return {"arquivos": len(existentes), "bytes": sum(os.path.getsize(caminho) for caminho in existentes),
+            "bytes_zip": len(buffer.getvalue())}
+
+
+def tamanho_dependencia(nome):
+    """
+    Bytes instalados da distribuição (None quando não está instalada neste ambiente).
+    """
+    from importlib import metadata
+    try:
+        arquivos = metadata.distribution(nome).files or []
+    except metadata.PackageNotFoundError:
+        return None
+    total = 0
+    for arquivo in arquivos:
+        caminho = arquivo.locate()
+        if os.path.isfile(caminho):
+            total += os.path.getsize(caminho)
+    return total
+
+
+def medir_arvore(raiz, repeticoes, url_stub, objetos_dedup):
+    resultado = {}
+    for (handler, cenario), (variaveis, _, _) in CENARIOS.items():
+        objetos_s3 = objetos_dedup if cenario == "dedup" else {}
+        ambiente = ambiente_filho(raiz, variaveis, url_stub, objetos_s3)
+        medidas = []
+        for _ in range(repeticoes):
+            saida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--cenario", handler, cenario, raiz],
+                env=ambiente, check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            medidas.append(json.loads(saida))
+        importtime_ms, maiores_imports = medir_importtime(raiz, handler, ambiente_filho(raiz, {}, url_stub, {}))
+        medianas = {chave: round(statistics.median(medida[chave] for medida in medidas), 2)
+                    for chave in ("init_ms", "primeira_invocacao_ms", "segunda_invocacao_ms", "pico_memoria_mb")}
+        resultado.setdefault(handler, {"importtime_ms": importtime_ms, "maiores_imports": maiores_imports,
+                                       "pacote": tamanho_pacote(raiz, handler)})
+        resultado[handler][cenario] = dict(medianas, status=medidas[-1]["status"],
+                                           carregados_no_init=medidas[-1]["carregados_no_init"],
+                                           carregados_ao_final=medidas[-1]["carregados_ao_final"])
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--registros", type=int, default=90, help="registros da carteira servida pelo stub da B3")
+    parser.add_argument("--comparar-com", help="revisão do git medida como 'antes' (ex: HEAD~1)")
+    parser.add_argument("--cenario", nargs=3, metavar=("HANDLER", "CENARIO", "RAIZ"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        # Execução interna em subprocesso: imprime apenas o resultado do cenário
+        print(json.dumps(executar_cenario(*args.cenario)))
+        return
+
+    sys.path.insert(0, BENCH_DIR)
+    sys.path.insert(0, os.path.join(RAIZ_REPO, "app", "utils"))
+    from referencias_snapshot import CHAVE_ULTIMO_SNAPSHOT, hash_carteiras
+    from synthetic_b3 import gerar_resultados_api
+
+    resultados_api = gerar_resultados_api(args.registros)
+    ServidorStub.resposta_b3 = json.dumps({"page": {"totalPages": 1}, "results": resultados_api}).encode("utf-8")
+    hoje = date.today()
+    objetos_dedup = {f"{TABELA_RAW}/{CHAVE_ULTIMO_SNAPSHOT}": json.dumps({
+        "sha256": hash_carteiras({"IBOV": resultados_api}), "data_pregao": hoje.isoformat(),
+        "prefixo": f"{TABELA_RAW}/ano={hoje.year}/mes={hoje.month:02d}/dia={hoje.day:02d}/",
+        "arquivos": [], "gravado_em": hoje.isoformat()})}
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), ServidorStub)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url_stub = f"http://127.0.0.1:{servidor.server_address[1]}"
+    diretorio = tempfile.mkdtemp(prefix="bench_cold_start_")
+    try:
+        arvores = {"atual": RAIZ_REPO}
+        if args.comparar_com:
+            arvores = {"antes": extrair_arvore(args.comparar_com, diretorio), "depois": RAIZ_REPO}
+        resultado = {nome: medir_arvore(raiz, args.repeticoes, url_stub, objetos_dedup) for nome, raiz in arvores.items()}
+        resultado["dependencias_bytes"] = {handler: {nome: tamanho_dependencia(nome) for nome in nomes}
+                                           for handler, nomes in DEPENDENCIAS.items()}
+        resultado["dependencias_runtime_bytes"] = {nome: tamanho_dependencia(nome) for nome in DEPENDENCIAS_RUNTIME}
+    finally:
+        servidor.shutdown()
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    for nome in arvores:
+        for (handler, cenario) in CENARIOS:
+            medida = resultado[nome][handler][cenario]
+            print(f"{nome:>6} | {handler:>7} | {cenario:>16} | init={medida['init_ms']:>7.1f}ms | "
+                  f"1a={medida['primeira_invocacao_ms']:>7.1f}ms | 2a={medida['segunda_invocacao_ms']:>6.1f}ms | "
+                  f"pico={medida['pico_memoria_mb']:>6.1f}MB | status={medida['status']}")
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
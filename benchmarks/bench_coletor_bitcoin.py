@@ -0,0 +1,153 @@
+###################################################################################################################
+# Benchmark da extração do preço do Bitcoin (lambda/lambda_functions_scrapper_bitcoin.py) em páginas HTML salvas. #
+# Compara, por tick, CPU (process_time) e pico de memória alocada (tracemalloc):                                  #
+#   - antes: BeautifulSoup(..., 'html.parser') do documento inteiro + find da <div> do preço;                     #
+#   - depois: extrair_preco_html (trecho a partir do atributo + SoupStrainer; documento inteiro só no fallback).  #
+# Sem --fixtures, usa páginas sintéticas com o tamanho e a estrutura da página do Investing.com (scripts no head, #
+# menus, tabelas e o JSON do __NEXT_DATA__), com o preço no início, no meio e no fim, uma com o atributo entre    #
+# aspas simples e uma com o atributo escrito de um jeito que o trecho não localiza (fallback no documento         #
+# inteiro). Mede também o ColetorBitcoin com HTTP e S3 falsos: ticks por lote e arquivos gravados por dia.        #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_coletor_bitcoin.py [--fixtures pagina1.html ...] [--repeticoes 20]                 #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda"))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+import lambda_functions_scrapper_bitcoin as coletor  # noqa: E402
+
+
+def pagina_sintetica(posicao, aspas='"', seed=42):
+    """
+    Página com ~1 MB no formato da página de cotação do Investing.com; 'posicao' (0 a 1) define
+    onde a <div> do preço aparece no corpo.
+    """
+    aleatorio = random.Random(seed)
+    scripts = "".join(f"<script>window.__cfg{i}={json.dumps({'k': 'x' * 2000, 'i': i})};</script>" for i in range(40))
+    estilos = "".join(f".c{i}{{margin:{i}px;padding:{i % 7}px}}" for i in range(3000))
+    blocos = []
+    for i in range(1500):
+        blocos.append(f'<div class="row r{i}"><a href="/crypto/moeda-{i}" data-test="link-{i}">Moeda {i}</a>'
+                      f'<span class="v">{aleatorio.uniform(0, 1e5):.2f}</span></div>')
+    preco = (f"<div class=\"text-5xl/9 font-bold\" data-test={aspas}instrument-price-last{aspas}>"
+             f"336.195,0</div>")
+    blocos.insert(int(len(blocos) * posicao), preco)
+    dados = json.dumps({"props": {"pageProps": {"state": [{"id": i, "nome": f"item {i}", "valores": list(range(20))}
+                                                          for i in range(2500)]}}})
+    return (f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><style>{estilos}</style>{scripts}</head><body>"
+            f"<nav>{''.join(f'<li><a href=/m{i}>Menu {i}</a></li>' for i in range(300))}</nav>"
+            f"<main>{''.join(blocos)}</main>"
+            f"<script id=\"__NEXT_DATA__\" type=\"application/json\">{dados}</script></body></html>")
+
+
+def extrair_dom_completo(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    elemento = soup.find('div', {'data-test': 'instrument-price-last'})
+    return coletor.converter_preco(elemento.get_text()) if elemento else None
+
+
+def medir(funcao, html, repeticoes):
+    funcao(html)
+    inicio = time.process_time()
+    for _ in range(repeticoes):
+        resultado = funcao(html)
+    cpu_ms = (time.process_time() - inicio) / repeticoes * 1000
+    tracemalloc.start()
+    funcao(html)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, {"cpu_ms": round(cpu_ms, 3), "pico_memoria_kb": round(pico / 1024, 1)}
+
+
+class RespostaFalsa:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class SessaoFalsa:
+    def __init__(self, html):
+        self.html = html
+        self.requisicoes = 0
+
+    def get(self, url, timeout=None):
+        self.requisicoes += 1
+        return RespostaFalsa(self.html)
+
+
+class S3Falso:
+    def __init__(self):
+        self.objetos = {}
+
+    def put_object(self, Bucket, Key, Body, ContentLength):
+        self.objetos[Key] = Body.read()
+
+
+class Relogio:
+    """
+    Relógio simulado: o sleep do coletor só avança o tempo.
+    """
+
+    def __init__(self, inicio):
+        self.agora = inicio
+
+    def __call__(self):
+        return self.agora
+
+    def dormir(self, segundos):
+        self.agora += segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixtures", nargs="*", help="páginas HTML salvas (padrão: páginas sintéticas)")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        paginas = {os.path.basename(caminho): open(caminho, encoding="utf-8").read() for caminho in args.fixtures}
+    else:
+        paginas = {f"sintetica_preco_{int(posicao * 100)}pct": pagina_sintetica(posicao) for posicao in (0.05, 0.5, 0.95)}
+        paginas["sintetica_aspas_simples"] = pagina_sintetica(0.5, aspas="'")
+        paginas["sintetica_fallback"] = pagina_sintetica(0.5).replace('data-test="instrument-price-last"',
+                                                                      'data-test="instrument&#45;price-last"')
+
+    resultado = {}
+    for nome, html in paginas.items():
+        _, antes = medir(extrair_dom_completo, html, args.repeticoes)
+        preco, depois = medir(coletor.extrair_preco_html, html, args.repeticoes)
+        resultado[nome] = {
+            "bytes_html": len(html.encode("utf-8")),
+            "preco": preco,
+            "antes": antes,
+            "depois": depois,
+            "reducao_cpu": round(antes["cpu_ms"] / max(depois["cpu_ms"], 1e-6), 1),
+            "reducao_memoria": round(antes["pico_memoria_kb"] / max(depois["pico_memoria_kb"], 1e-6), 1),
+        }
+        print(f"{nome}: CPU {antes['cpu_ms']} -> {depois['cpu_ms']} ms/tick, memória {antes['pico_memoria_kb']} -> "
+              f"{depois['pico_memoria_kb']} KB/tick")
+
+    # Coletor: 1 hora de ticks a cada 5s cruzando a meia-noite (UTC), lotes de até 300 ticks ou 5 minutos
+    relogio = Relogio(1_753_487_700.0)  # 2025-07-25 23:55:00 UTC
+    sessao, s3 = SessaoFalsa(next(iter(paginas.values()))), S3Falso()
+    resumo = coletor.ColetorBitcoin("bucket", intervalo_segundos=5, max_ticks=300, max_segundos=300, capacidade=1000,
+                                    session=sessao, s3_client=s3, relogio=relogio, sleep=relogio.dormir).executar(3600)
+    resultado["coletor"] = dict(resumo, requisicoes=sessao.requisicoes,
+                                dias=sorted({"/".join(chave.split("/")[1:4]) for chave in s3.objetos}))
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
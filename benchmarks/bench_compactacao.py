@@ -0,0 +1,186 @@
+###################################################################################################################
+# Benchmark do job de compactação (app/src/compactacao.py) sobre uma tabela refinada sintética local.             #
+# Simula o histórico deixado pelas gravações diárias antigas (vários arquivos pequenos por partição de pregão),   #
+# roda a compactação com um Glue Catalog em memória e compara, antes e depois:                                    #
+#   - objetos na tabela e requisições S3 estimadas de uma consulta (1 LIST por partição + 2 GET por arquivo:      #
+#     rodapé e dados, como o Athena faz);                                                                         #
+#   - tempo de uma busca por ticker em todas as partições, lendo arquivo a arquivo com filtro (no S3 cada         #
+#     abertura custa dezenas de ms, então o tempo local é um limite inferior do ganho).                           #
+# Em seguida mede a reexecução; conteúdo preservado e idempotência são conferidos em tests/test_compactacao.py.   #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_compactacao.py [--acoes 90] [--pregoes 120] [--arquivos-por-particao 50]           #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "src"))
+
+from bench_job_elt import gerar_raw, listar_caminhos  # noqa: E402
+
+COLUNAS_PARTICAO = ["ano", "mes", "dia", "data_pregao"]
+
+
+class GlueCatalogoMemoria:
+    """
+    Glue Catalog mínimo para a compactação: uma tabela com partições em memória.
+    """
+
+    def __init__(self, location, particoes):
+        self.location = location
+        self.particoes = {tuple(valores): {'Values': list(valores), 'StorageDescriptor': {'Location': caminho}}
+                          for valores, caminho in particoes}
+
+    def get_table(self, DatabaseName, Name):
+        return {'Table': {'StorageDescriptor': {'Location': self.location},
+                          'PartitionKeys': [{'Name': nome} for nome in COLUNAS_PARTICAO]}}
+
+    def get_partitions(self, DatabaseName, TableName, NextToken=None):
+        valores = sorted(self.particoes)
+        inicio = int(NextToken or 0)
+        pagina = valores[inicio:inicio + 100]
+        resposta = {'Partitions': [json.loads(json.dumps(self.particoes[chave])) for chave in pagina]}
+        if inicio + 100 < len(valores):
+            resposta['NextToken'] = str(inicio + 100)
+        return resposta
+
+    def batch_update_partition(self, DatabaseName, TableName, Entries):
+        for entrada in Entries:
+            self.particoes[tuple(entrada['PartitionValueList'])] = dict(entrada['PartitionInput'])
+        return {'Errors': []}
+
+
+def gerar_tabela_fragmentada(raiz_raw, destino, arquivos_por_particao):
+    """
+    Grava a tabela refinada com 'arquivos_por_particao' arquivos por pregão (como as gravações com
+    200 shuffle partitions) e retorna as partições [(valores, location)].
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from motores import MotorArrow
+    from transformacoes_b3 import TransformacoesB3
+
+    motor = MotorArrow()
+    transformacoes = TransformacoesB3(motor)
+    tabela = transformacoes.transform_dataframe(
+        transformacoes.adicionar_data_pregao(motor.ler_parquet(listar_caminhos(raiz_raw))))
+    particoes = []
+    for linha in tabela.select(COLUNAS_PARTICAO).group_by(COLUNAS_PARTICAO).aggregate([]).to_pylist():
+        valores = [str(linha[coluna]) for coluna in COLUNAS_PARTICAO]
+        filtro = None
+        for coluna in COLUNAS_PARTICAO:
+            condicao = pc.equal(pc.cast(tabela.column(coluna), "string"), str(linha[coluna]))
+            filtro = condicao if filtro is None else pc.and_(filtro, condicao)
+        dia = tabela.filter(filtro).drop_columns(COLUNAS_PARTICAO)
+        diretorio = os.path.join(destino, *(f"{coluna}={valor}" for coluna, valor in zip(COLUNAS_PARTICAO, valores)))
+        os.makedirs(diretorio)
+        tamanho = max(1, -(-dia.num_rows // arquivos_por_particao))
+        for indice, inicio in enumerate(range(0, dia.num_rows, tamanho)):
+            pq.write_table(dia.slice(inicio, tamanho), os.path.join(diretorio, f"part-{indice:05d}.snappy.parquet"))
+        particoes.append((valores, diretorio + "/"))
+    return particoes
+
+
+def medir_consulta(catalogo, ticker):
+    """
+    Busca um ticker em todas as partições do catálogo abrindo cada arquivo, como um scan do Athena.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    arquivos, linhas = 0, 0
+    inicio = time.perf_counter()
+    for particao in catalogo.particoes.values():
+        diretorio = particao['StorageDescriptor']['Location']
+        for nome in sorted(os.listdir(diretorio)):
+            if nome.startswith(("_", ".")) or not nome.endswith(".parquet"):
+                continue
+            arquivos += 1
+            tabela = pq.read_table(os.path.join(diretorio, nome), filters=[("codigo_bovespa", "=", ticker)])
+            linhas += tabela.num_rows
+    return {
+        "tempo_consulta_s": round(time.perf_counter() - inicio, 3),
+        "objetos": arquivos,
+        "requisicoes_s3_estimadas": len(catalogo.particoes) + 2 * arquivos,
+        "linhas_encontradas": linhas,
+    }
+
+
+def conteudo_tabela(catalogo):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    tabelas = []
+    for valores, particao in sorted(catalogo.particoes.items()):
+        diretorio = particao['StorageDescriptor']['Location']
+        tabela = pq.read_table(diretorio)
+        tabelas.append(tabela.append_column("particao", pa.array(["/".join(valores)] * tabela.num_rows)))
+    tabela = pa.concat_tables(tabelas)
+    return tabela.sort_by([(nome, "ascending") for nome in ["particao", "codigo_bovespa", "indice"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--acoes", type=int, default=90)
+    parser.add_argument("--pregoes", type=int, default=120)
+    parser.add_argument("--arquivos-por-particao", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault("AWS_DEFAULT_REGION", "sa-east-1")
+    from compactacao import JobCompactacaoB3
+    from instrumentacao import Instrumentacao, SinkNulo
+
+    temporario = tempfile.mkdtemp(prefix="bench_compactacao_")
+    try:
+        raiz_raw = os.path.join(temporario, "raw")
+        location = os.path.join(temporario, "refinado")
+        dias = gerar_raw(raiz_raw, args.acoes, args.pregoes)
+        catalogo = GlueCatalogoMemoria(location, gerar_tabela_fragmentada(raiz_raw, location, args.arquivos_por_particao))
+        primeiro, ultimo = min(catalogo.particoes)[3], max(catalogo.particoes)[3]
+        ticker = conteudo_tabela(catalogo).column("codigo_bovespa")[0].as_py()
+        original = conteudo_tabela(catalogo)
+        print(f"{len(dias)} pregões ({primeiro} a {ultimo}), {original.num_rows} linhas, ticker da busca: {ticker}")
+
+        antes = medir_consulta(catalogo, ticker)
+
+        def compactar():
+            job = JobCompactacaoB3("db", "tb", start_date=primeiro, end_date=ultimo,
+                                   instrumentacao=Instrumentacao("bench_compactacao", sink=SinkNulo()))
+            job.glue_client = catalogo
+            inicio = time.perf_counter()
+            estatisticas = job.run()
+            return len(estatisticas), round(time.perf_counter() - inicio, 3)
+
+        compactadas, tempo_compactacao = compactar()
+        depois = medir_consulta(catalogo, ticker)
+        recompactadas, tempo_reexecucao = compactar()
+
+        resultado = {
+            "particoes": len(catalogo.particoes),
+            "particoes_compactadas": compactadas,
+            "tempo_compactacao_s": tempo_compactacao,
+            "antes": antes,
+            "depois": depois,
+            "reexecucao": {"particoes_compactadas": recompactadas, "tempo_s": tempo_reexecucao},
+            "versoes_restantes": os.path.isdir(os.path.join(location, "_compactacao")) and
+                                 sum(len(arquivos) for _, _, arquivos in os.walk(os.path.join(location, "_compactacao"))),
+        }
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    print(f"objetos: {antes['objetos']} -> {depois['objetos']} | requisições S3 estimadas: "
+          f"{antes['requisicoes_s3_estimadas']} -> {depois['requisicoes_s3_estimadas']} | consulta: "
+          f"{antes['tempo_consulta_s']}s -> {depois['tempo_consulta_s']}s | compactação: {tempo_compactacao}s | "
+          f"reexecução compactou {recompactadas} partição(ões)")
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
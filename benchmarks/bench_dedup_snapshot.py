@@ -0,0 +1,245 @@
+###################################################################################################################
+# Benchmark da deduplicação dos snapshots por hash de conteúdo (app/utils/referencias_snapshot.py).               #
+# Simula N pregões (padrão: 250) da carteira teórica com poucos rebalanceamentos no período, passando cada dia    #
+# pelo scraper (lambda_functions_scrapper) e pela Lambda de gatilho (lambda_function) com um S3 e um Glue falsos  #
+# em memória. O Glue falso "executa" o job de forma síncrona: lê o RAW de cada partição, ordena por cod e grava   #
+# a partição refinada (ano=/mes=/dia=/data_pregao=), como o JobELTB3 faria sem as colunas de partição.            #
+# Compara, com e sem SNAPSHOT_DEDUP:                                                                              #
+#   - execuções do Glue Job e DPU-minutos estimados (--dpus x --minutos-por-execucao por execução);               #
+#   - objetos RAW gravados (Parquet e marcadores) e operações no S3;                                              #
+#   - tempo de scraper + gatilho por dia (sem o tempo do Glue).                                                   #
+# A ordem dos registros muda todo dia, como nas raspagens reais. A cópia byte a byte das partições e a            #
+# independência do hash em relação à ordem são conferidas em tests/test_referencias_snapshot.py.                  #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_dedup_snapshot.py [--dias 250] [--rebalanceamentos 3] [--registros 90]             #
+###################################################################################################################
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+import urllib.parse
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "sa-east-1")
+
+import pyarrow as pa  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+from botocore.exceptions import ClientError  # noqa: E402
+
+from synthetic_b3 import dias_pregao, gerar_resultados_api  # noqa: E402
+
+BUCKET_RAW = "raw"
+BUCKET_REFINADO = "refinado"
+TABELA_RAW = "tb_raw"
+TABELA_REFINADA = "tb_refinada"
+
+
+class S3Falso:
+    """
+    S3 mínimo em memória: objetos por (bucket, chave), contagem de operações e a lista de objetos
+    criados (para montar os eventos S3 entregues à Lambda de gatilho).
+    """
+
+    def __init__(self):
+        self.objetos = {}
+        self.operacoes = {}
+        self.criados = []
+
+    def _contar(self, operacao):
+        self.operacoes[operacao] = self.operacoes.get(operacao, 0) + 1
+
+    def put_object(self, Bucket, Key, Body, **_):
+        self._contar("put_object")
+        self.objetos[(Bucket, Key)] = Body.read() if hasattr(Body, "read") else bytes(Body)
+        self.criados.append((Bucket, Key))
+        return {"ETag": f'"{hash(self.objetos[(Bucket, Key)])}"'}
+
+    def get_object(self, Bucket, Key):
+        self._contar("get_object")
+        if (Bucket, Key) not in self.objetos:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject")
+        return {"Body": io.BytesIO(self.objetos[(Bucket, Key)]), "ETag": '"x"'}
+
+    def delete_object(self, Bucket, Key):
+        self._contar("delete_object")
+        self.objetos.pop((Bucket, Key), None)
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self._contar("copy_object")
+        self.objetos[(Bucket, Key)] = self.objetos[(CopySource["Bucket"], CopySource["Key"])]
+        self.criados.append((Bucket, Key))
+        return {}
+
+    def get_paginator(self, _):
+        s3 = self
+
+        class Paginador:
+            def paginate(self, Bucket, Prefix, Delimiter=None):
+                s3._contar("list_objects_v2")
+                conteudo = [{"Key": chave, "Size": len(corpo), "ETag": '"x"'}
+                            for (bucket, chave), corpo in sorted(s3.objetos.items())
+                            if bucket == Bucket and chave.startswith(Prefix)
+                            and not (Delimiter and Delimiter in chave[len(Prefix):])]
+                yield {"Contents": conteudo}
+
+        return Paginador()
+
+    def evento(self):
+        # Notificação s3:ObjectCreated:* dos objetos criados desde o último evento, só do bucket RAW
+        registros = [{"s3": {"bucket": {"name": bucket}, "object": {"key": urllib.parse.quote_plus(chave)}}}
+                     for bucket, chave in self.criados if bucket == BUCKET_RAW]
+        self.criados = []
+        return {"Records": registros}
+
+
+class GlueFalso:
+    """
+    Glue mínimo: tabela refinada no layout legado, registro de partições e um job que processa as
+    partições de --INPUT_PATHS de forma síncrona (nenhuma execução fica ativa).
+    """
+
+    def __init__(self, s3):
+        self.s3 = s3
+        self.execucoes = []
+        self.particoes = {}
+        self.tabela = {"Name": TABELA_REFINADA,
+                       "StorageDescriptor": {"Location": f"s3://{BUCKET_REFINADO}/{TABELA_REFINADA}/", "Columns": []},
+                       "PartitionKeys": [{"Name": nome, "Type": "string"} for nome in ("ano", "mes", "dia", "data_pregao")],
+                       "Parameters": {"classification": "parquet"}}
+
+    def get_job(self, JobName):
+        return {"Job": {"ExecutionProperty": {"MaxConcurrentRuns": 1}}}
+
+    def get_job_runs(self, JobName, MaxResults):
+        return {"JobRuns": []}
+
+    def get_table(self, DatabaseName, Name):
+        return {"Table": json.loads(json.dumps(self.tabela))}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        for entrada in PartitionInputList:
+            self.particoes[tuple(entrada["Values"])] = entrada["StorageDescriptor"]["Location"]
+        return {"Errors": []}
+
+    def start_job_run(self, JobName, Arguments):
+        particoes = Arguments["--INPUT_PATHS"].split(",")
+        self.execucoes.append(particoes)
+        for particao in particoes:
+            prefixo = particao[len(f"s3://{BUCKET_RAW}/"):]
+            chaves = [chave for bucket, chave in sorted(self.s3.objetos)
+                      if bucket == BUCKET_RAW and chave.startswith(prefixo) and chave.endswith(".parquet")]
+            if not chaves:
+                continue
+            tabela = pa.concat_tables([pq.read_table(io.BytesIO(self.s3.objetos[(BUCKET_RAW, chave)])) for chave in chaves])
+            tabela = tabela.sort_by([("indice", "ascending"), ("cod", "ascending")])
+            ano, mes, dia = (parte.split("=")[1] for parte in prefixo.strip("/").split("/")[1:4])
+            valores = [ano, mes, dia, f"{ano}-{mes}-{dia}"]
+            destino = f"{TABELA_REFINADA}/ano={ano}/mes={mes}/dia={dia}/data_pregao={valores[3]}/"
+            sink = io.BytesIO()
+            pq.write_table(tabela, sink)
+            for bucket, chave in [k for k in self.s3.objetos if k[0] == BUCKET_REFINADO and k[1].startswith(destino)]:
+                del self.s3.objetos[(bucket, chave)]
+            self.s3.objetos[(BUCKET_REFINADO, f"{destino}part-00000.parquet")] = sink.getvalue()
+            self.particoes[tuple(valores)] = f"s3://{BUCKET_REFINADO}/{destino}"
+        return {"JobRunId": f"jr_{len(self.execucoes)}"}
+
+
+def carteiras_do_dia(versao, registros, aleatorio):
+    # Mesmo conteúdo por versão da carteira; a ordem dos registros muda a cada raspagem
+    results = gerar_resultados_api(registros, seed=versao)
+    aleatorio.shuffle(results)
+    return {"IBOV": results}
+
+
+def simular(dias, versoes, registros, dedup):
+    import lambda_function as gatilho
+    import lambda_functions_scrapper as scr
+    from catalogo_glue import CatalogoGlue
+    from referencias_snapshot import ReplicadorReferencias
+
+    s3 = S3Falso()
+    glue = GlueFalso(s3)
+    replicador = ReplicadorReferencias(CatalogoGlue(glue), "db", [TABELA_REFINADA], s3_client=s3)
+    store = gatilho.MemoriaEstadoStore()
+    aleatorio = random.Random(7)
+
+    os.environ.update(S3_BUCKET_NAME=BUCKET_RAW, GLUE_TABLE_NAME=TABELA_RAW, GLUE_JOB_NAME="job")
+    scr._s3_client = s3
+    scr.SNAPSHOT_DEDUP = dedup
+    scr.RAW_PARTITION_PROJECTION = True
+    datetime_original = scr.datetime
+
+    tempo = 0.0
+    try:
+        for dia, versao in zip(dias, versoes):
+            carteiras = carteiras_do_dia(versao, registros, aleatorio)
+            scr.buscar_carteiras = lambda indices, api_params, carteiras=carteiras: {k: list(v) for k, v in carteiras.items()}
+
+            class DataFixa(datetime):
+                @classmethod
+                def now(cls, tz=None, dia=dia):
+                    return datetime(dia.year, dia.month, dia.day, 12, 0, 0)
+
+            scr.datetime = DataFixa
+            inicio = time.perf_counter()
+            resposta = scr.lambda_handler({"indices": ["IBOV"]})
+            if resposta["statusCode"] != 200:
+                raise RuntimeError(resposta)
+            gatilho.lambda_handler(s3.evento(), None, glue_client=glue, store=store, debounce_seconds=0,
+                                   replicador=replicador)
+            tempo += time.perf_counter() - inicio
+    finally:
+        scr.datetime = datetime_original
+
+    raw = [chave for bucket, chave in s3.objetos if bucket == BUCKET_RAW]
+    refinado = {chave: corpo for (bucket, chave), corpo in s3.objetos.items() if bucket == BUCKET_REFINADO}
+    return {
+        "execucoes_glue": len(glue.execucoes),
+        "parquet_raw": sum(1 for chave in raw if chave.endswith(".parquet")),
+        "marcadores": sum(1 for chave in raw if chave.endswith("_MESMO_QUE.json")),
+        "particoes_refinadas": len({chave.rsplit("/", 1)[0] for chave in refinado}),
+        "particoes_catalogo": len(glue.particoes),
+        "operacoes_s3": dict(sorted(s3.operacoes.items())),
+        "tempo_lambdas_ms_por_dia": round(tempo / len(dias) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dias", type=int, default=250)
+    parser.add_argument("--rebalanceamentos", type=int, default=3)
+    parser.add_argument("--registros", type=int, default=90)
+    parser.add_argument("--dpus", type=float, default=2)
+    parser.add_argument("--minutos-por-execucao", type=float, default=2.0)
+    args = parser.parse_args()
+
+    dias = dias_pregao(args.dias)
+    # Versão da carteira de cada dia: muda a cada rebalanceamento, em intervalos iguais no período
+    intervalo = max(args.dias // (args.rebalanceamentos + 1), 1)
+    versoes = [indice // intervalo for indice in range(args.dias)]
+
+    resultado = {}
+    for nome, dedup in (("sem_dedup", False), ("com_dedup", True)):
+        resultado[nome] = simular(dias, versoes, args.registros, dedup)
+        resultado[nome]["dpu_minutos_estimados"] = round(
+            resultado[nome]["execucoes_glue"] * args.dpus * args.minutos_por_execucao, 1)
+
+    antes, depois = resultado["sem_dedup"], resultado["com_dedup"]
+    print(f"{args.dias} pregões, {len(set(versoes))} versões da carteira: {antes['execucoes_glue']} -> "
+          f"{depois['execucoes_glue']} execuções do Glue ({antes['dpu_minutos_estimados']} -> "
+          f"{depois['dpu_minutos_estimados']} DPU-minutos estimados); {depois['marcadores']} dia(s) resolvidos por "
+          f"cópia")
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
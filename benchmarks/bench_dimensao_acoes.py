@@ -0,0 +1,169 @@
+###################################################################################################################
+# Benchmark da dimensão das ações (app/utils/dimensao_acoes.py) com uma carteira sintética rebalanceada a cada    #
+# N pregões (entradas, saídas e novas quantidades teóricas/participações).                                        #
+# Compara, para "composição atual" e "quando a ação X entrou/saiu da carteira":                                   #
+#   - antes: varredura da tabela refinada inteira (um arquivo por pregão) com a lógica de janela no cliente;      #
+#   - depois: leitura do arquivo único da carteira atual / do histórico SCD tipo 2.                               #
+# Mede também o merge incremental de um pregão novo (DimensaoAcoes.atualizar). A equivalência com a varredura e   #
+# com o histórico aplicado pregão a pregão é conferida em tests/test_dimensao_acoes.py.                           #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_dimensao_acoes.py [--acoes 90] [--pregoes 1250] [--rebalanceamento 21]             #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+
+from synthetic_b3 import dias_pregao, gerar_tickers  # noqa: E402
+
+
+def gerar_lotes(n_acoes, n_pregoes, rebalanceamento, seed=42):
+    """
+    Linhas refinadas (COLUNAS_LOTE) de cada pregão. A carteira só muda nos rebalanceamentos:
+    ~5% das ações saem, outras entram e as quantidades e participações são recalculadas.
+    """
+    aleatorio = random.Random(seed)
+    universo = gerar_tickers(n_acoes * 2, seed)
+    carteira = {}
+
+    def rebalancear():
+        for ticker in aleatorio.sample(sorted(carteira), k=len(carteira) // 20):
+            del carteira[ticker]
+        candidatos = [ticker["cod"] for ticker in universo if ticker["cod"] not in carteira]
+        for codigo in aleatorio.sample(candidatos, k=n_acoes - len(carteira)):
+            carteira[codigo] = None
+        for codigo in carteira:
+            carteira[codigo] = (Decimal(aleatorio.randint(10_000_000, 10_000_000_000)),
+                                Decimal(f"{aleatorio.uniform(0.01, 5.0):.3f}"))
+
+    atributos = {ticker["cod"]: ticker for ticker in universo}
+    for posicao, dia in enumerate(dias_pregao(n_pregoes)):
+        if posicao % rebalanceamento == 0:
+            rebalancear()
+        yield dia, [{"indice": "IBOV", "codigo_bovespa": codigo, "data_pregao": dia,
+                     "segmento": atributos[codigo]["segment"], "nome_acao": atributos[codigo]["asset"],
+                     "nome_tipo_acao": atributos[codigo]["type"], "quantidade_teorica": quantidade,
+                     "percentual_participacao_acao": participacao}
+                    for codigo, (quantidade, participacao) in sorted(carteira.items())]
+
+
+def bytes_diretorio(raiz):
+    return sum(os.path.getsize(os.path.join(diretorio, nome)) for diretorio, _, nomes in os.walk(raiz) for nome in nomes)
+
+
+def medir(funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    return resultado, round(time.perf_counter() - inicio, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--acoes", type=int, default=90)
+    parser.add_argument("--pregoes", type=int, default=1250)
+    parser.add_argument("--rebalanceamento", type=int, default=21)
+    args = parser.parse_args()
+
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    from dimensao_acoes import DimensaoAcoes, esquema_historico
+    from motores import MotorArrow
+
+    lotes = list(gerar_lotes(args.acoes, args.pregoes, args.rebalanceamento))
+    esquema_refinado = pa.schema([campo for campo in esquema_historico() if not campo.name.startswith("valid")] +
+                                 [("data_pregao", pa.date32())])
+    diretorio = tempfile.mkdtemp(prefix="bench_dimensao_acoes_")
+    try:
+        refinado = os.path.join(diretorio, "refinado")
+        for dia, linhas in lotes:
+            destino = os.path.join(refinado, f"data_pregao={dia}")
+            os.makedirs(destino)
+            pq.write_table(pa.Table.from_pylist(linhas, schema=esquema_refinado).drop(["data_pregao"]),
+                           os.path.join(destino, "part-0.parquet"), compression="zstd")
+
+        motor = MotorArrow()
+        dimensao = DimensaoAcoes(motor, os.path.join(diretorio, "historico"), os.path.join(diretorio, "atual"))
+        todas = [linha for _, linhas in lotes[:-1] for linha in linhas]
+        _, tempo_carga = medir(lambda: dimensao.atualizar(pa.Table.from_pylist(todas, schema=esquema_refinado)))
+        ultimo = pa.Table.from_pylist(lotes[-1][1], schema=esquema_refinado)
+        resumo_incremental, tempo_incremental = medir(lambda: dimensao.atualizar(ultimo))
+
+        # Antes: composição atual e entradas/saídas a partir da tabela refinada inteira
+        def composicao_refinado():
+            tabela = ds.dataset(refinado, format="parquet", partitioning="hive").to_table(
+                columns=["codigo_bovespa", "data_pregao"])
+            linhas = tabela.to_pylist()
+            ultimo_pregao = max(str(linha["data_pregao"]) for linha in linhas)
+            return sorted(linha["codigo_bovespa"] for linha in linhas if str(linha["data_pregao"]) == ultimo_pregao)
+
+        def periodos_refinado(codigo):
+            tabela = ds.dataset(refinado, format="parquet", partitioning="hive").to_table(
+                columns=["codigo_bovespa", "data_pregao"])
+            pregoes = sorted({str(linha["data_pregao"]) for linha in tabela.to_pylist()})
+            presentes = {str(linha["data_pregao"]) for linha in tabela.to_pylist() if linha["codigo_bovespa"] == codigo}
+            periodos, inicio = [], None
+            for pregao in pregoes:
+                if pregao in presentes and inicio is None:
+                    inicio = pregao
+                elif pregao not in presentes and inicio is not None:
+                    periodos.append((inicio, pregao))
+                    inicio = None
+            return periodos + ([(inicio, None)] if inicio else [])
+
+        def composicao_dimensao():
+            return sorted(linha["codigo_bovespa"] for linha in dimensao.ler(dimensao.location_atual))
+
+        def periodos_dimensao(codigo):
+            periodos = []
+            for versao in dimensao.ler(dimensao.location_historico):
+                if versao["codigo_bovespa"] != codigo:
+                    continue
+                inicio, fim = str(versao["valid_from"]), versao["valid_to"] and str(versao["valid_to"])
+                if periodos and periodos[-1][1] == inicio:
+                    periodos[-1] = (periodos[-1][0], fim)
+                else:
+                    periodos.append((inicio, fim))
+            return periodos
+
+        # Ação que entrou e saiu mais vezes no período
+        codigo = max(sorted({linha["codigo_bovespa"] for linha in todas}), key=lambda cod: len(periodos_dimensao(cod)))
+        _, tempo_composicao_antes = medir(composicao_refinado)
+        _, tempo_composicao_depois = medir(composicao_dimensao)
+        _, tempo_periodos_antes = medir(lambda: periodos_refinado(codigo))
+        periodos_depois, tempo_periodos_depois = medir(lambda: periodos_dimensao(codigo))
+
+        resultado = {
+            "acoes": args.acoes,
+            "pregoes": args.pregoes,
+            "linhas_refinadas": sum(len(linhas) for _, linhas in lotes),
+            "versoes_historico": len(dimensao.ler(dimensao.location_historico)),
+            "refinado": {"arquivos": len(lotes), "bytes": bytes_diretorio(refinado),
+                         "composicao_s": tempo_composicao_antes, "entradas_saidas_s": tempo_periodos_antes},
+            "dimensao": {"arquivos": 2, "bytes_historico": bytes_diretorio(dimensao.location_historico),
+                         "bytes_atual": bytes_diretorio(dimensao.location_atual),
+                         "composicao_s": tempo_composicao_depois, "entradas_saidas_s": tempo_periodos_depois},
+            "carga_inicial_s": tempo_carga,
+            "merge_um_pregao": dict(resumo_incremental, tempo_s=tempo_incremental),
+            "periodos_exemplo": {codigo: periodos_depois},
+        }
+        print(f"{args.pregoes} pregões: composição atual {tempo_composicao_antes}s lendo {len(lotes)} arquivo(s) -> "
+              f"{tempo_composicao_depois}s lendo 1; entradas/saídas de {codigo} {tempo_periodos_antes}s -> "
+              f"{tempo_periodos_depois}s; merge de um pregão {tempo_incremental}s")
+        print(json.dumps(resultado, indent=2, default=str))
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+###################################################################################################################
+# Benchmark das etapas do JobELTB3 sobre dados sintéticos da carteira da B3.                                      #
+# Gera a camada RAW (arquivos por pregão em ano=/mes=/dia=, no formato gravado pelo scraper) em várias escalas    #
+# e executa as etapas do job em cada motor (Spark local e Arrow), medindo tempo por etapa, pico de memória e      #
+# arquivos gravados. As etapas usam o TransformacoesB3/motores, as mesmas classes para as quais o JobELTB3        #
+# delega, sem depender do awsglue. Cada cenário roda em um subprocesso isolado.                                   #
+#                                                                                                                 #
+# Uso:                                                                                                            #
+#   python benchmarks/bench_job_elt.py --saida baseline.json                 # gera o baseline                    #
+#   python benchmarks/bench_job_elt.py --comparar baseline.json [--limite 0.2] # compara e aponta regressões      #
+#   python benchmarks/bench_job_elt.py --escalas 1dia custom:500:20 --motores arrow                               #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda"))
+
+# Escalas padrão: nome -> (ações, pregões)
+ESCALAS = {
+    "1dia": (90, 1),
+    "1ano": (90, 252),
+    "10anos": (90, 2520),
+    "5k_tickers": (5000, 5),
+}
+
+MOTORES = ["spark", "arrow"]
+
+# Métricas comparadas no modo --comparar (maior é pior)
+METRICAS_COMPARADAS = ["tempo_total_s", "pico_memoria_mb"]
+
+# Etapas mais rápidas que isto no baseline não são comparadas individualmente (ruído de medição)
+ETAPA_MINIMA_S = 0.05
+
+
+def parse_escala(texto):
+    """
+    '1ano' (escala padrão) ou 'nome:acoes:pregoes'.
+    """
+    if texto in ESCALAS:
+        return texto, ESCALAS[texto]
+    nome, acoes, pregoes = texto.split(":")
+    return nome, (int(acoes), int(pregoes))
+
+
+def gerar_raw(destino, n_tickers, n_dias, n_segmentos=None):
+    """
+    Grava a camada RAW sintética com o código do scraper (tipar_carteira), um arquivo por pregão.
+    """
+    os.environ.setdefault("AWS_DEFAULT_REGION", "sa-east-1")
+    import pyarrow.parquet as pq
+    import lambda_functions_scrapper as scrapper
+    from synthetic_b3 import gerar_historico_api
+
+    caminhos = []
+    for dia, resultados in gerar_historico_api(n_tickers, n_dias, n_segmentos=n_segmentos):
+        diretorio = os.path.join(destino, f"ano={dia.year}", f"mes={dia.month:02d}", f"dia={dia.day:02d}")
+        os.makedirs(diretorio, exist_ok=True)
+        pq.write_table(scrapper.tipar_carteira(resultados, "IBOV"), os.path.join(diretorio, "IBOV.parquet"))
+        caminhos.append(diretorio + "/")
+    return caminhos
+
+
+def listar_caminhos(raiz):
+    caminhos = []
+    for diretorio, _, arquivos in os.walk(raiz):
+        if any(nome.endswith(".parquet") for nome in arquivos):
+            caminhos.append(diretorio + "/")
+    return sorted(caminhos)
+
+
+def pico_memoria_mb(motor):
+    """
+    Pico de memória residente do processo Python e, no Spark, da JVM do driver (VmHWM), em MB.
+    """
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if motor.nome == "spark":
+        try:
+            pid = motor.spark._jvm.java.lang.ProcessHandle.current().pid()
+            with open(f"/proc/{pid}/status") as status:
+                for linha in status:
+                    if linha.startswith("VmHWM:"):
+                        pico += int(linha.split()[1]) / 1024
+        except Exception as e:
+            print(f"Não foi possível medir a memória da JVM: {e}", file=sys.stderr)
+    return round(pico, 1)
+
+
+def executar_cenario(nome_motor, raiz, destino):
+    from instrumentacao import Instrumentacao, SinkMemoria
+    from motores import MotorArrow, MotorSpark, listar_parquet
+    from transformacoes_b3 import TransformacoesB3
+
+    if nome_motor == "spark":
+        from pyspark.sql import SparkSession
+        spark = (SparkSession.builder.master("local[*]").appName("bench_job_elt")
+                 .config("spark.ui.enabled", "false").getOrCreate())
+        spark.sparkContext.setLogLevel("ERROR")
+        motor = MotorSpark(spark)
+    else:
+        motor = MotorArrow()
+
+    transformacoes = TransformacoesB3(motor)
+    sink = SinkMemoria()
+    instrumentacao = Instrumentacao("bench_job_elt", sink=sink, Motor=nome_motor)
+    caminhos = listar_caminhos(raiz)
+
+    def materializar(df):
+        # No Spark cada etapa termina em uma ação, para que o tempo seja atribuído à etapa certa
+        if motor.nome == "spark":
+            df = df.cache()
+        return df, motor.contar(df)
+
+    def ler(caminhos_leitura):
+        if motor.nome == "spark":
+            return motor.spark.read.option("basePath", raiz).parquet(*caminhos_leitura)
+        return motor.ler_parquet(caminhos_leitura)
+
+    # Aquecimento: inicialização da JVM/imports preguiçosos não entram na medição
+    motor.contar(transformacoes.transform_dataframe(transformacoes.adicionar_data_pregao(ler(caminhos[:1]))))
+
+    with instrumentacao.etapa("leitura") as medicao:
+        df, linhas = materializar(ler(caminhos))
+        medicao.registrar(linhas_entrada=linhas, bytes_lidos=listar_parquet([raiz])[1], particoes=len(caminhos))
+
+    with instrumentacao.etapa("transformacao") as medicao:
+        df_transformado, linhas = materializar(transformacoes.transform_dataframe(transformacoes.adicionar_data_pregao(df)))
+        medicao.registrar(linhas_saida=linhas)
+
+    with instrumentacao.etapa("sumarizacao_tipo") as medicao:
+        medicao.registrar(linhas_saida=motor.contar(transformacoes.sumarizacao_tipo(df_transformado)))
+
+    with instrumentacao.etapa("janelas") as medicao:
+        df_janelas = transformacoes.window_media_movel(transformacoes.window_variacoes_diarias(df_transformado))
+        medicao.registrar(linhas_saida=motor.contar(df_janelas))
+
+    with instrumentacao.etapa("gravacao") as medicao:
+        colunas_particao = ["ano", "mes", "dia", "data_pregao"]
+        if motor.nome == "spark":
+            df_transformado.write.mode("overwrite").partitionBy(*colunas_particao).parquet(destino)
+        else:
+            motor.gravar_particionado(df_transformado, destino, colunas_particao)
+        arquivos, bytes_gravados = listar_parquet([destino])
+        medicao.registrar(arquivos=arquivos, bytes_gravados=bytes_gravados)
+
+    etapas = {registro["Etapa"]: registro for registro in sink.registros}
+    resultado = {
+        "motor": nome_motor,
+        "linhas": etapas["leitura"]["LinhasEntrada"],
+        "etapas_s": {nome: round(registro["DuracaoMs"] / 1000, 4) for nome, registro in etapas.items()},
+        "tempo_total_s": round(sum(registro["DuracaoMs"] for registro in etapas.values()) / 1000, 4),
+        "pico_memoria_mb": pico_memoria_mb(motor),
+        "arquivos_saida": etapas["gravacao"]["Arquivos"],
+        "bytes_saida": etapas["gravacao"]["BytesGravados"],
+    }
+    if motor.nome == "spark":
+        motor.spark.stop()
+    return resultado
+
+
+def executar(escalas, motores, diretorio_dados, repeticoes):
+    resultados = {}
+    for nome_escala, (acoes, pregoes) in escalas:
+        raiz = os.path.join(diretorio_dados, f"raw_{acoes}x{pregoes}")
+        if not os.path.isdir(raiz):
+            inicio = time.perf_counter()
+            gerar_raw(raiz, acoes, pregoes)
+            print(f"[{nome_escala}] RAW sintético gerado ({acoes} ações x {pregoes} pregões) "
+                  f"em {time.perf_counter() - inicio:.1f}s")
+
+        for nome_motor in motores:
+            medidas = []
+            for _ in range(repeticoes):
+                destino = os.path.join(diretorio_dados, f"saida_{nome_escala}_{nome_motor}")
+                shutil.rmtree(destino, ignore_errors=True)
+                saida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--cenario", nome_motor, raiz, destino],
+                    check=True, capture_output=True, text=True,
+                ).stdout.strip().splitlines()[-1]
+                medidas.append(json.loads(saida))
+                shutil.rmtree(destino, ignore_errors=True)
+            # Com repetições, fica a execução mais rápida (menos sujeita a ruído da máquina)
+            resultado = min(medidas, key=lambda medida: medida["tempo_total_s"])
+            resultado.update(escala=nome_escala, acoes=acoes, pregoes=pregoes)
+            resultados[f"{nome_escala}/{nome_motor}"] = resultado
+            etapas = " ".join(f"{nome}={tempo:.3f}s" for nome, tempo in resultado["etapas_s"].items())
+            print(f"[{nome_escala}/{nome_motor}] linhas={resultado['linhas']} total={resultado['tempo_total_s']:.3f}s "
+                  f"memoria={resultado['pico_memoria_mb']}MB arquivos={resultado['arquivos_saida']} | {etapas}")
+    return resultados
+
+
+def comparar(baseline, atual, limite):
+    """
+    Aponta os cenários cujo tempo total, tempo de alguma etapa ou pico de memória piorou mais
+    que o limite relativo.
+    """
+    regressoes = []
+    for cenario, medida in atual.items():
+        referencia = baseline.get("resultados", {}).get(cenario)
+        if not referencia:
+            print(f"[{cenario}] sem referência no baseline.")
+            continue
+        pares = [(metrica, referencia.get(metrica), medida.get(metrica)) for metrica in METRICAS_COMPARADAS]
+        pares += [(f"etapa {etapa}", antes, medida.get("etapas_s", {}).get(etapa))
+                  for etapa, antes in referencia.get("etapas_s", {}).items() if antes >= ETAPA_MINIMA_S]
+        for metrica, antes, depois in pares:
+            if not antes or depois is None:
+                continue
+            variacao = (depois - antes) / antes
+            situacao = "REGRESSÃO" if variacao > limite else "ok"
+            print(f"[{cenario}] {metrica}: {antes} -> {depois} ({variacao:+.1%}) {situacao}")
+            if variacao > limite:
+                regressoes.append(f"{cenario} {metrica} {variacao:+.1%}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--escalas", nargs="+", default=list(ESCALAS), help="escalas padrão ou nome:acoes:pregoes")
+    parser.add_argument("--motores", nargs="+", default=MOTORES, choices=MOTORES)
+    parser.add_argument("--dados", help="diretório para os dados sintéticos (reaproveitados entre execuções)")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--saida", help="grava os resultados (baseline) neste arquivo JSON")
+    parser.add_argument("--comparar", help="baseline JSON para comparar com esta execução")
+    parser.add_argument("--limite", type=float, default=0.2, help="piora relativa tolerada no modo --comparar")
+    parser.add_argument("--cenario", nargs=3, metavar=("MOTOR", "RAIZ", "DESTINO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        # Execução interna em subprocesso: imprime apenas o resultado do cenário
+        os.environ.setdefault("INSTRUMENTACAO_SINK", "nulo")
+        print(json.dumps(executar_cenario(*args.cenario)))
+        return
+
+    diretorio_dados = args.dados or tempfile.mkdtemp(prefix="bench_job_elt_")
+    try:
+        resultados = executar([parse_escala(escala) for escala in args.escalas], args.motores,
+                              diretorio_dados, args.repeticoes)
+    finally:
+        if not args.dados:
+            shutil.rmtree(diretorio_dados, ignore_errors=True)
+
+    documento = {
+        "metadados": {
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "resultados": resultados,
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(documento, arquivo, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        regressoes = comparar(baseline, resultados, args.limite)
+        if regressoes:
+            print(f"{len(regressoes)} regressão(ões) acima de {args.limite:.0%}:")
+            for regressao in regressoes:
+                print(f"  - {regressao}")
+            sys.exit(1)
+        print(f"Nenhuma regressão acima de {args.limite:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+###################################################################################################################
+# Benchmark da materialização única do DataFrame transformado no JobELTB3.run (Spark local).                      #
+#   - legado:       show() + gravação + sumarizacao_tipo, cada ação relendo e retransformando a entrada           #
+#   - materializado: materializar (--PERSIST_LEVEL) + preview + gravação + sumarizacao_tipo a partir do cache     #
+# Mede o tempo total, o número de jobs Spark e os arquivos/bytes lidos da entrada pelos scans Parquet (métricas   #
+# SQL via API REST da Spark UI) — no Glue, essas leituras correspondem ao tráfego de GET no S3.                   #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_materializacao.py [--acoes 90] [--pregoes 252] [--niveis MEMORY_AND_DISK ...]      #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+
+from bench_job_elt import gerar_raw, listar_caminhos  # noqa: E402
+
+
+def metricas_spark(spark):
+    """
+    Soma os arquivos e bytes lidos pelos nós 'Scan parquet' de todas as consultas (métricas SQL
+    'number of files read' / 'size of files read') e conta os jobs da aplicação.
+    """
+    contexto = spark.sparkContext
+    base = f"{contexto.uiWebUrl}/api/v1/applications/{contexto.applicationId}"
+    with urllib.request.urlopen(f"{base}/sql?details=true&length=10000") as resposta:
+        consultas = json.load(resposta)
+    with urllib.request.urlopen(f"{base}/jobs") as resposta:
+        jobs = json.load(resposta)
+
+    arquivos, tamanho = 0, 0
+    for consulta in consultas:
+        for no in consulta.get("nodes", []):
+            if not no.get("nodeName", "").startswith("Scan parquet"):
+                continue
+            for metrica in no.get("metrics", []):
+                valor = metrica.get("value", "")
+                if metrica.get("name") == "number of files read":
+                    arquivos += int(valor.replace(",", ""))
+                elif metrica.get("name") == "size of files read":
+                    tamanho += _bytes_metrica(valor)
+    return arquivos, tamanho, len(jobs)
+
+
+def _bytes_metrica(valor):
+    # Métricas de tamanho vêm formatadas ("total (min, med, max ...)\n3.2 MiB (...)") ou como número simples
+    match = re.search(r"([\d.,]+)\s*(B|KiB|MiB|GiB)", valor)
+    if not match:
+        return int(re.sub(r"\D", "", valor) or 0)
+    multiplicador = {"B": 1, "KiB": 1024, "MiB": 1024 ** 2, "GiB": 1024 ** 3}[match.group(2)]
+    return int(float(match.group(1).replace(",", "")) * multiplicador)
+
+
+def executar_cenario(modo, raiz, destino):
+    from pyspark.sql import SparkSession
+    from motores import MotorSpark
+    from transformacoes_b3 import TransformacoesB3
+
+    spark = (SparkSession.builder.master("local[*]").appName("bench_materializacao")
+             .config("spark.ui.enabled", "true").config("spark.ui.port", "0").getOrCreate())
+    spark.sparkContext.setLogLevel("ERROR")
+    motor = MotorSpark(spark)
+    transformacoes = TransformacoesB3(motor)
+    caminhos = listar_caminhos(raiz)
+
+    # Aquecimento da JVM fora da medição; as métricas são descontadas a seguir
+    motor.contar(spark.read.option("basePath", raiz).parquet(caminhos[0]))
+    arquivos_antes, bytes_antes, jobs_antes = metricas_spark(spark)
+
+    inicio = time.perf_counter()
+    df = transformacoes.transform_dataframe(
+        transformacoes.adicionar_data_pregao(spark.read.option("basePath", raiz).parquet(*caminhos)))
+    if modo == "legado":
+        df.show()
+    else:
+        df, _ = motor.materializar(df, modo)
+        df.show(5)
+    df.write.mode("overwrite").partitionBy("ano", "mes", "dia", "data_pregao").parquet(destino)
+    transformacoes.sumarizacao_tipo(df).show()
+    tempo = time.perf_counter() - inicio
+    motor.liberar(df)
+
+    # A API REST da UI é atualizada de forma assíncrona pelo listener
+    time.sleep(2)
+    arquivos_depois, bytes_depois, jobs_depois = metricas_spark(spark)
+    spark.stop()
+    return {
+        "modo": modo,
+        "tempo_s": round(tempo, 3),
+        "jobs_spark": jobs_depois - jobs_antes,
+        "arquivos_lidos_entrada": arquivos_depois - arquivos_antes,
+        "bytes_lidos_entrada": bytes_depois - bytes_antes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--acoes", type=int, default=90)
+    parser.add_argument("--pregoes", type=int, default=252)
+    parser.add_argument("--niveis", nargs="+", default=["MEMORY_AND_DISK", "DISK_ONLY", "LOCAL_CHECKPOINT"])
+    parser.add_argument("--cenario", nargs=3, metavar=("MODO", "RAIZ", "DESTINO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        print(json.dumps(executar_cenario(*args.cenario)))
+        return
+
+    temporario = tempfile.mkdtemp(prefix="bench_materializacao_")
+    try:
+        raiz = os.path.join(temporario, "raw")
+        gerar_raw(raiz, args.acoes, args.pregoes)
+        resultados = []
+        for modo in ["legado"] + args.niveis:
+            destino = os.path.join(temporario, f"saida_{modo}")
+            saida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--cenario", modo, raiz, destino],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            resultado = json.loads(saida)
+            resultados.append(resultado)
+            print(f"{modo:>17} | tempo={resultado['tempo_s']:>7.3f}s | jobs={resultado['jobs_spark']:>3} | "
+                  f"arquivos lidos={resultado['arquivos_lidos_entrada']:>5} | "
+                  f"bytes lidos={resultado['bytes_lidos_entrada']}")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+###################################################################################################################
+# Benchmark da gravação do Parquet bruto pelo scraper:                                                            #
+#   - legado:  pandas DataFrame -> arquivo em /tmp -> upload_file                                                 #
+#   - memoria: tabela Arrow -> buffer Parquet em memória -> put_object / multipart                                #
+# Cada cenário roda em um subprocesso isolado para medir o pico de memória (ru_maxrss) de forma justa.            #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_parquet_upload.py [--rows 1000 10000 100000 1000000]                               #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+
+CHUNK = 1024 * 1024
+
+
+class DescarteS3Client:
+    """
+    Stand-in do cliente S3 que consome o corpo enviado (como a rede faria) e descarta os bytes.
+    """
+
+    def __init__(self):
+        self.bytes_enviados = 0
+
+    def _consumir(self, fileobj):
+        while True:
+            bloco = fileobj.read(CHUNK)
+            if not bloco:
+                break
+            self.bytes_enviados += len(bloco)
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self._consumir(Body)
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, **kwargs):
+        self._consumir(Fileobj)
+
+    def upload_file(self, Filename, Bucket, Key, **kwargs):
+        with open(Filename, "rb") as f:
+            self._consumir(f)
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        return {"UploadId": "bench"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, **kwargs):
+        self.bytes_enviados += len(Body)
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, **kwargs):
+        pass
+
+    def abort_multipart_upload(self, **kwargs):
+        pass
+
+
+def _maxrss_mb():
+    # ru_maxrss é reportado em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def gravar_legado(resultados, client):
+    import pandas as pd
+    df = pd.DataFrame(resultados)
+    temp_file_path = f"/tmp/bench_parquet_upload_{os.getpid()}.parquet"
+    df.to_parquet(temp_file_path, index=False)
+    client.upload_file(temp_file_path, "bucket", "key")
+    os.remove(temp_file_path)
+
+
+def gravar_memoria(resultados, client):
+    import pyarrow as pa
+    import lambda_functions_scrapper as scrapper
+    table = pa.Table.from_pylist(resultados)
+    scrapper.escrever_parquet_s3(table, "bucket", "key", s3_client=client)
+
+
+def executar_cenario(modo, rows):
+    os.environ.setdefault("AWS_DEFAULT_REGION", "sa-east-1")
+    from synthetic_b3 import gerar_resultados_api
+
+    gravar = gravar_legado if modo == "legado" else gravar_memoria
+    # Aquecimento: imports e inicializações preguiçosas não entram na medição
+    gravar(gerar_resultados_api(10), DescarteS3Client())
+
+    resultados = gerar_resultados_api(rows)
+    client = DescarteS3Client()
+
+    rss_antes = _maxrss_mb()
+    inicio = time.perf_counter()
+    gravar(resultados, client)
+    tempo = time.perf_counter() - inicio
+    return {
+        "modo": modo,
+        "rows": rows,
+        "tempo_s": round(tempo, 4),
+        "pico_memoria_incremental_mb": round(_maxrss_mb() - rss_antes, 1),
+        "bytes_enviados": client.bytes_enviados,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--cenario", nargs=2, metavar=("MODO", "ROWS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        # Execução interna em subprocesso: imprime apenas o resultado do cenário
+        print(json.dumps(executar_cenario(args.cenario[0], int(args.cenario[1]))))
+        return
+
+    resultados = []
+    for rows in args.rows:
+        for modo in ("legado", "memoria"):
+            saida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--cenario", modo, str(rows)],
+                check=True, capture_output=True, text=True,
+            ).stdout.strip().splitlines()[-1]
+            resultado = json.loads(saida)
+            resultados.append(resultado)
+            print(f"{modo:>8} | rows={rows:>9} | tempo={resultado['tempo_s']:>8.4f}s | "
+                  f"pico_memoria=+{resultado['pico_memoria_incremental_mb']:>7.1f}MB | bytes={resultado['bytes_enviados']}")
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
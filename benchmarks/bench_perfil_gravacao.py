@@ -0,0 +1,167 @@
+###################################################################################################################
+# Benchmark dos perfis de gravação Parquet (perfil_gravacao.py) da tabela refinada.                               #
+# Grava o mesmo resultado refinado com cada perfil (Arrow e, com --spark, Spark local) e mede o tamanho em disco, #
+# os row groups gravados e, para buscas representativas por ticker (primeiro, mediano, último e um ticker         #
+# ausente dentro do intervalo), quantos row groups são descartados pelas estatísticas min/max de codigo_bovespa   #
+# dos rodapés — o mesmo descarte que o Athena faz antes de ler os dados. O descarte adicional pelos bloom filters #
+# não é simulado (o pyarrow não lê bloom filters); é informado apenas quantos column chunks têm bloom filter.     #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_perfil_gravacao.py [--escala 500000:2] [--perfis padrao consulta] [--spark]        #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+
+from bench_job_elt import gerar_raw, listar_caminhos  # noqa: E402
+
+COLUNAS_PARTICAO = ["ano", "mes", "dia", "data_pregao"]
+COLUNA_BUSCA = "codigo_bovespa"
+
+
+def arquivos_parquet(destino):
+    return sorted(
+        os.path.join(diretorio, nome)
+        for diretorio, _, nomes in os.walk(destino) for nome in nomes if nome.endswith(".parquet")
+    )
+
+
+def tickers_busca(tabela):
+    import pyarrow.compute as pc
+    codigos = pc.unique(tabela.column(COLUNA_BUSCA)).sort().to_pylist()
+    # Sufixo 'X' ordena logo após o ticker mediano: cai dentro do intervalo min/max sem existir
+    return {
+        "primeiro": codigos[0],
+        "mediano": codigos[len(codigos) // 2],
+        "ultimo": codigos[-1],
+        "ausente": codigos[len(codigos) // 2] + "X",
+    }
+
+
+def analisar_rodapes(destino, buscas):
+    """
+    Lê só os rodapés dos arquivos: tamanho, row groups, colunas com bloom filter e, por busca,
+    os row groups (e bytes comprimidos) que sobrevivem ao filtro min/max de codigo_bovespa.
+    """
+    import pyarrow.parquet as pq
+
+    arquivos = arquivos_parquet(destino)
+    resultado = {
+        "arquivos": len(arquivos),
+        "bytes": sum(os.path.getsize(arquivo) for arquivo in arquivos),
+        "row_groups": 0,
+        "colunas_bloom_filter": 0,
+        "buscas": {nome: {"row_groups_lidos": 0, "bytes_lidos": 0} for nome in buscas},
+    }
+    for arquivo in arquivos:
+        metadados = pq.ParquetFile(arquivo).metadata
+        resultado["row_groups"] += metadados.num_row_groups
+        for indice in range(metadados.num_row_groups):
+            row_group = metadados.row_group(indice)
+            colunas = [row_group.column(k) for k in range(row_group.num_columns)]
+            # O parquet-mr (Spark) grava o offset do bloom filter sem o tamanho: contam-se as colunas com bloom
+            resultado["colunas_bloom_filter"] += sum(1 for coluna in colunas
+                                                     if getattr(coluna, "bloom_filter_offset", None) is not None)
+            busca = next(coluna for coluna in colunas if coluna.path_in_schema == COLUNA_BUSCA)
+            estatisticas = busca.statistics
+            for nome, ticker in buscas.items():
+                if estatisticas is not None and estatisticas.has_min_max and \
+                        not estatisticas.min <= ticker <= estatisticas.max:
+                    continue
+                resultado["buscas"][nome]["row_groups_lidos"] += 1
+                resultado["buscas"][nome]["bytes_lidos"] += sum(coluna.total_compressed_size for coluna in colunas)
+
+    for busca in resultado["buscas"].values():
+        busca["row_groups_descartados"] = resultado["row_groups"] - busca["row_groups_lidos"]
+    return resultado
+
+
+def gravar_arrow(motor, tabela, destino, perfil, bytes_por_linha):
+    motor.gravar_particionado(tabela, destino, COLUNAS_PARTICAO, perfil, bytes_por_linha)
+
+
+def gravar_spark(df, destino, perfil, bytes_por_linha):
+    from perfil_gravacao import colunas_ordenacao, opcoes_spark
+    df = df.repartition(*COLUNAS_PARTICAO)
+    ordenacao = colunas_ordenacao(perfil, df.columns)
+    if ordenacao:
+        df = df.sortWithinPartitions(*COLUNAS_PARTICAO, *ordenacao)
+    df.write.mode("overwrite").options(**opcoes_spark(perfil, bytes_por_linha)) \
+        .partitionBy(*COLUNAS_PARTICAO).parquet(destino)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--escala", default="500000:2", help="ações:pregões")
+    parser.add_argument("--perfis", nargs="+", default=None)
+    parser.add_argument("--spark", action="store_true", help="grava também com o Spark local")
+    args = parser.parse_args()
+
+    from motores import MotorArrow, listar_parquet
+    from perfil_gravacao import PERFIS_GRAVACAO, escolher_perfil_gravacao
+    from transformacoes_b3 import TransformacoesB3
+
+    acoes, pregoes = (int(valor) for valor in args.escala.split(":"))
+    perfis = [escolher_perfil_gravacao(nome) for nome in (args.perfis or list(PERFIS_GRAVACAO))]
+
+    temporario = tempfile.mkdtemp(prefix="bench_perfil_gravacao_")
+    resultados = []
+    try:
+        raiz = os.path.join(temporario, "raw")
+        gerar_raw(raiz, acoes, pregoes)
+        caminhos = listar_caminhos(raiz)
+
+        motor = MotorArrow()
+        transformacoes = TransformacoesB3(motor)
+        tabela = transformacoes.transform_dataframe(transformacoes.adicionar_data_pregao(motor.ler_parquet(caminhos)))
+        # O gerador sintético e a API entregam os tickers em ordem; no job o shuffle do Spark não preserva
+        # essa ordem, então a entrada é embaralhada para o perfil 'padrao' não se beneficiar dela
+        tabela = tabela.take(numpy.random.default_rng(42).permutation(tabela.num_rows))
+        # Mesma estimativa do JobELTB3.bytes_por_linha: bytes RAW / linhas
+        bytes_por_linha = listar_parquet([raiz])[1] / tabela.num_rows
+        buscas = tickers_busca(tabela)
+        print(f"{tabela.num_rows} linhas, {bytes_por_linha:.1f} bytes/linha, buscas: {buscas}")
+
+        motores = [("arrow", lambda destino, perfil: gravar_arrow(motor, tabela, destino, perfil, bytes_por_linha))]
+        if args.spark:
+            from pyspark.sql import SparkSession
+            spark = (SparkSession.builder.master("local[*]").appName("bench_perfil_gravacao")
+                     .config("spark.ui.enabled", "false").getOrCreate())
+            spark.sparkContext.setLogLevel("ERROR")
+            df = spark.createDataFrame(tabela.to_pandas()).cache()
+            df.count()
+            motores.append(("spark", lambda destino, perfil: gravar_spark(df, destino, perfil, bytes_por_linha)))
+
+        for nome_motor, gravar in motores:
+            for perfil in perfis:
+                destino = os.path.join(temporario, f"saida_{nome_motor}_{perfil.nome}")
+                inicio = time.perf_counter()
+                gravar(destino, perfil)
+                tempo = time.perf_counter() - inicio
+                resultado = {"motor": nome_motor, "perfil": perfil.nome, "tempo_gravacao_s": round(tempo, 3),
+                             **analisar_rodapes(destino, buscas)}
+                resultados.append(resultado)
+                descartes = " ".join(f"{nome}={busca['row_groups_descartados']}/{resultado['row_groups']}"
+                                     for nome, busca in resultado["buscas"].items())
+                print(f"{nome_motor:>5} | {perfil.nome:>8} | tempo={tempo:>6.2f}s | arquivos={resultado['arquivos']:>3} | "
+                      f"bytes={resultado['bytes']:>10} | bloom={resultado['colunas_bloom_filter']:>3} | "
+                      f"row groups descartados: {descartes}")
+                shutil.rmtree(destino, ignore_errors=True)
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+###################################################################################################################
+# Benchmark do perfil de execução do Spark (perfil_spark.py) nas etapas do JobELTB3 (Spark local).                #
+#   - padrao: configurações padrão do Spark (200 shuffle partitions), gravação sem repartition                    #
+#   - perfil: perfil escolhido pela tabela de dimensionamento a partir do tamanho da entrada                      #
+# Mede o tempo total, o número de tarefas executadas (API REST da Spark UI) e os arquivos Parquet gravados.       #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_perfil_spark.py [--escalas 1dia 1ano custom:500:20]                                #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+
+from bench_job_elt import gerar_raw, listar_caminhos, parse_escala  # noqa: E402
+
+COLUNAS_PARTICAO = ["ano", "mes", "dia", "data_pregao"]
+
+
+def tarefas_executadas(spark):
+    contexto = spark.sparkContext
+    base = f"{contexto.uiWebUrl}/api/v1/applications/{contexto.applicationId}"
+    with urllib.request.urlopen(f"{base}/stages") as resposta:
+        estagios = json.load(resposta)
+    return sum(estagio.get("numCompleteTasks", 0) for estagio in estagios)
+
+
+def contar_arquivos(destino):
+    return sum(
+        1 for _, _, arquivos in os.walk(destino) for nome in arquivos if nome.endswith(".parquet")
+    )
+
+
+def executar_cenario(modo, raiz, destino):
+    from pyspark.sql import SparkSession
+    from motores import MotorSpark, listar_parquet
+    from perfil_spark import aplicar_perfil, escolher_perfil
+    from transformacoes_b3 import TransformacoesB3
+
+    spark = (SparkSession.builder.master("local[*]").appName("bench_perfil_spark")
+             .config("spark.ui.enabled", "true").config("spark.ui.port", "0").getOrCreate())
+    spark.sparkContext.setLogLevel("ERROR")
+    motor = MotorSpark(spark)
+    transformacoes = TransformacoesB3(motor)
+    caminhos = listar_caminhos(raiz)
+
+    perfil = None
+    if modo == "perfil":
+        _, bytes_entrada = listar_parquet(caminhos)
+        perfil = escolher_perfil(bytes_entrada)
+        aplicar_perfil(spark, perfil)
+
+    # Aquecimento da JVM fora da medição; as tarefas do aquecimento são descontadas a seguir
+    motor.contar(spark.read.option("basePath", raiz).parquet(caminhos[0]))
+    time.sleep(1)
+    tarefas_antes = tarefas_executadas(spark)
+
+    inicio = time.perf_counter()
+    df = transformacoes.transform_dataframe(
+        transformacoes.adicionar_data_pregao(spark.read.option("basePath", raiz).parquet(*caminhos)))
+    df, _ = motor.materializar(df)
+    gravacao = df.repartition(perfil.tarefas_gravacao, *COLUNAS_PARTICAO) if perfil else df
+    gravacao.write.mode("overwrite").partitionBy(*COLUNAS_PARTICAO).parquet(destino)
+    transformacoes.sumarizacao_tipo(df).collect()
+    motor.contar(transformacoes.window_media_movel(transformacoes.window_variacoes_diarias(df)))
+    tempo = time.perf_counter() - inicio
+    motor.liberar(df)
+
+    # A API REST da UI é atualizada de forma assíncrona pelo listener
+    time.sleep(2)
+    tarefas = tarefas_executadas(spark) - tarefas_antes
+    spark.stop()
+    return {
+        "modo": modo,
+        "perfil": perfil.nome if perfil else "padrao",
+        "tempo_s": round(tempo, 3),
+        "tarefas": tarefas,
+        "arquivos_gravados": contar_arquivos(destino),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--escalas", nargs="+", default=["1dia", "1ano"])
+    parser.add_argument("--cenario", nargs=3, metavar=("MODO", "RAIZ", "DESTINO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        print(json.dumps(executar_cenario(*args.cenario)))
+        return
+
+    resultados = []
+    for texto in args.escalas:
+        escala, (acoes, pregoes) = parse_escala(texto)
+        temporario = tempfile.mkdtemp(prefix="bench_perfil_spark_")
+        try:
+            raiz = os.path.join(temporario, "raw")
+            gerar_raw(raiz, acoes, pregoes)
+            for modo in ["padrao", "perfil"]:
+                destino = os.path.join(temporario, f"saida_{modo}")
+                saida = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--cenario", modo, raiz, destino],
+                    check=True, capture_output=True, text=True,
+                ).stdout.strip().splitlines()[-1]
+                resultado = {"escala": escala, **json.loads(saida)}
+                resultados.append(resultado)
+                print(f"{escala:>10} | {modo:>6} ({resultado['perfil']:>7}) | tempo={resultado['tempo_s']:>7.3f}s | "
+                      f"tarefas={resultado['tarefas']:>5} | arquivos gravados={resultado['arquivos_gravados']:>5}")
+        finally:
+            shutil.rmtree(temporario, ignore_errors=True)
+
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == "__main__":
+    main()
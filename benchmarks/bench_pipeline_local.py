@@ -0,0 +1,869 @@
+###################################################################################################################
+# Harness local de ponta a ponta do pipeline: do disparo do scraper até a partição consultável.                   #
+# Encadeia, no mesmo processo e sem AWS:                                                                          #
+#   lambda_functions_scrapper.lambda_handler -> evento S3 -> lambda_function.lambda_handler -> JobELTB3.run       #
+#   (Spark local ou Arrow) -> registro das partições no catálogo.                                                 #
+# O S3 é um diretório local (o Spark lê os Parquet gravados pelo scraper), o Glue é um catálogo e um executor de  #
+# jobs em memória que respeita o MaxConcurrentRuns, e a API da B3 é um servidor HTTP local que repete respostas   #
+# gravadas (--gravacoes <dir>/<AAAA-MM-DD>/<INDICE>/pagina_<n>.json) ou sintéticas. Cada objeto criado no bucket  #
+# RAW vira uma invocação da Lambda de gatilho (como a notificação s3:ObjectCreated:*) e a drenagem agendada da    #
+# fila roda a cada --intervalo-drenagem segundos.                                                                 #
+# Reporta, por partição RAW de uma rajada de N dias e/ou N índices, a latência de cada etapa (scraper, entrega do #
+# evento, agendamento, fila do Glue, job e total) e a vazão, e falha (código 1) em execuções duplicadas do job,   #
+# execuções com erro, partições não consultáveis ao fim ou requisições HTTP serializadas.                         #
+#                                                                                                                 #
+# Uso:                                                                                                            #
+#   python benchmarks/bench_pipeline_local.py --dias 5 --saida baseline.json       # gera o baseline              #
+#   python benchmarks/bench_pipeline_local.py --dias 5 --comparar baseline.json    # compara e aponta regressões  #
+#   python benchmarks/bench_pipeline_local.py --indices 8 --motor arrow --gravacoes gravacoes/                    #
+###################################################################################################################
+
+import argparse
+import base64
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "src"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+os.environ.setdefault("AWS_DEFAULT_REGION", "sa-east-1")
+
+from botocore.exceptions import ClientError  # noqa: E402
+
+from instrumentacao import Instrumentacao, SinkMemoria  # noqa: E402
+from layout_particoes import (LAYOUT_PADRAO, LAYOUTS, escolher_layout, parametros_projecao,  # noqa: E402
+                              prefixo_particao)
+from referencias_snapshot import MARCADOR_REFERENCIA, ReplicadorReferencias, data_particao_raw  # noqa: E402
+from synthetic_b3 import dias_pregao, gerar_resultados_api  # noqa: E402
+
+BUCKET_RAW = "raw"
+BUCKET_REFINADO = "refined"
+DATABASE_REFINADO = "refined_db"
+TABELA_RAW = "tb_fiap_tech02_bovespa_raw"
+TABELA_REFINADA = "tb_fiap_tech02_bovespa_refined"
+TABELA_AGREGADA = "tb_fiap_tech02_bovespa_sumarizacao_tipo"
+JOB_NAME = "job_elt_b3"
+
+# Índices raspados com --indices N (os N primeiros)
+INDICES_B3 = ["IBOV", "IBXX", "SMLL", "IDIV", "IBRA", "IBXL", "ICO2", "IGCT", "ITAG", "IFNC", "IMAT", "INDX",
+              "UTIL", "IEEX", "IMOB", "ICON"]
+
+# pageSize enviado pelo scraper: as respostas sintéticas são paginadas com o mesmo tamanho
+TAMANHO_PAGINA = 120
+
+# Etapas medidas por partição RAW, na ordem em que acontecem
+HOPS = ["scraper_ms", "entrega_ms", "agendamento_ms", "fila_glue_ms", "job_ms", "total_ms"]
+
+# Latências abaixo disto não entram no --comparar (ruído)
+LATENCIA_MINIMA_MS = 50
+
+# Métricas em que aumento é regressão e métricas em que queda é regressão
+CONTAGENS_COMPARADAS = ["execucoes_job"]
+CONCORRENCIAS_COMPARADAS = ["concorrencia_max_http", "concorrencia_max_upload"]
+
+
+def resumir(valores):
+    valores = sorted(valores)
+    if not valores:
+        return None
+    p95 = statistics.quantiles(valores, n=20, method="inclusive")[18] if len(valores) > 1 else valores[0]
+    return {"mediana": round(statistics.median(valores), 1), "p95": round(p95, 1), "max": round(valores[-1], 1),
+            "n": len(valores)}
+
+
+# ------------------------------------------------------------------------------------------------------ B3 e S3
+def paginar(results, tamanho=TAMANHO_PAGINA):
+    paginas = [results[inicio:inicio + tamanho] for inicio in range(0, len(results), tamanho)] or [[]]
+    return {numero: json.dumps({"page": {"pageNumber": numero, "pageSize": tamanho, "totalRecords": len(results),
+                                         "totalPages": len(paginas)},
+                                "results": pagina}).encode("utf-8")
+            for numero, pagina in enumerate(paginas, 1)}
+
+
+def gerar_respostas(dias, indices, registros, rebalanceamento):
+    """
+    Respostas sintéticas da API por (dia, índice, página). O conteúdo de cada índice só muda a cada
+    'rebalanceamento' pregões: os dias repetidos exercitam a deduplicação do scraper (marcadores).
+    """
+    respostas = {}
+    for posicao, dia in enumerate(dias):
+        versao = posicao // rebalanceamento
+        for numero_indice, indice in enumerate(indices):
+            results = gerar_resultados_api(registros, seed=versao * 1000 + numero_indice)
+            for numero, corpo in paginar(results).items():
+                respostas[(dia, indice, numero)] = corpo
+    return respostas
+
+
+def carregar_gravacoes(diretorio):
+    """
+    Respostas gravadas da API por (dia, índice, página), de <dir>/<AAAA-MM-DD>/<INDICE>/pagina_<n>.json.
+    """
+    respostas = {}
+    for nome_dia in sorted(os.listdir(diretorio)):
+        caminho_dia = os.path.join(diretorio, nome_dia)
+        if not os.path.isdir(caminho_dia):
+            continue
+        dia = date.fromisoformat(nome_dia)
+        for indice in sorted(os.listdir(caminho_dia)):
+            for nome in os.listdir(os.path.join(caminho_dia, indice)):
+                pagina = re.fullmatch(r"pagina_(\d+)\.json", nome)
+                if pagina:
+                    with open(os.path.join(caminho_dia, indice, nome), "rb") as arquivo:
+                        respostas[(dia, indice, int(pagina.group(1)))] = arquivo.read()
+    if not respostas:
+        raise SystemExit(f"Nenhuma gravação <AAAA-MM-DD>/<INDICE>/pagina_<n>.json encontrada em {diretorio}.")
+    return respostas
+
+
+class ServidorB3:
+    """
+    Servidor HTTP local no lugar da API GetPortfolioDay: decodifica os parâmetros em base64 do caminho
+    e responde a página do índice no pregão 'dia' (definido pelo harness antes de cada raspagem).
+    Índices sem resposta voltam com 'results' vazio. Mede a concorrência máxima de requisições.
+    """
+
+    def __init__(self, respostas, latencia_s=0.0):
+        self.respostas = respostas
+        self.latencia_s = latencia_s
+        self.dia = None
+        self.requisicoes = 0
+        self.concorrencia_max = 0
+        self._ativas = 0
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.responder(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.http.daemon_threads = True
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.http.server_address[1]}/indexProxy/indexCall/GetPortfolioDay"
+
+    def responder(self, handler):
+        with self._lock:
+            self.requisicoes += 1
+            self._ativas += 1
+            self.concorrencia_max = max(self.concorrencia_max, self._ativas)
+        try:
+            time.sleep(self.latencia_s)
+            # O base64 pode conter '/': os parâmetros são tudo o que vem depois do nome da operação
+            codificado = urllib.parse.unquote(handler.path.split("/GetPortfolioDay/", 1)[1])
+            parametros = json.loads(base64.b64decode(codificado))
+            corpo = self.respostas.get((self.dia, parametros["index"], int(parametros.get("pageNumber", 1))))
+            if corpo is None:
+                corpo = json.dumps({"page": {"pageNumber": 1, "totalPages": 1}, "results": []}).encode("utf-8")
+            handler.send_response(200)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(corpo)))
+            handler.end_headers()
+            handler.wfile.write(corpo)
+        finally:
+            with self._lock:
+                self._ativas -= 1
+
+    def encerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+
+class S3Local:
+    """
+    S3 em diretório local (raiz/<bucket>/<chave>), para que o Spark leia os Parquet gravados pelo
+    scraper. Os objetos aparecem de forma atômica (arquivo temporário oculto + rename) e cada objeto
+    criado dispara ao_criar(bucket, chave), como a notificação s3:ObjectCreated:*. latencia_s simula
+    o tempo de rede de cada requisição de escrita; a concorrência máxima de uploads é medida.
+    """
+
+    def __init__(self, raiz, latencia_s=0.0, ao_criar=None):
+        self.raiz = raiz
+        self.latencia_s = latencia_s
+        self.ao_criar = ao_criar
+        self.operacoes = {}
+        self.concorrencia_max_upload = 0
+        self._uploads_ativos = 0
+        self._multipart = {}
+        self._lock = threading.Lock()
+
+    def caminho(self, bucket, chave=""):
+        return os.path.join(self.raiz, bucket, chave)
+
+    def local(self, uri):
+        bucket, _, chave = uri[len("s3://"):].partition("/")
+        return self.caminho(bucket, chave)
+
+    def _contar(self, operacao):
+        with self._lock:
+            self.operacoes[operacao] = self.operacoes.get(operacao, 0) + 1
+
+    @contextlib.contextmanager
+    def _upload(self):
+        with self._lock:
+            self._uploads_ativos += 1
+            self.concorrencia_max_upload = max(self.concorrencia_max_upload, self._uploads_ativos)
+        try:
+            time.sleep(self.latencia_s)
+            yield
+        finally:
+            with self._lock:
+                self._uploads_ativos -= 1
+
+    def _gravar(self, bucket, chave, corpo):
+        destino = self.caminho(bucket, chave)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = os.path.join(os.path.dirname(destino), f".{os.path.basename(destino)}.{uuid.uuid4().hex}")
+        with open(temporario, "wb") as arquivo:
+            arquivo.write(corpo)
+        os.replace(temporario, destino)
+        if self.ao_criar:
+            self.ao_criar(bucket, chave)
+
+    def put_object(self, Bucket, Key, Body, **_):
+        self._contar("put_object")
+        with self._upload():
+            corpo = Body.read() if hasattr(Body, "read") else bytes(Body)
+        self._gravar(Bucket, Key, corpo)
+        return {"ETag": f'"{uuid.uuid4().hex}"'}
+
+    def get_object(self, Bucket, Key):
+        self._contar("get_object")
+        try:
+            with open(self.caminho(Bucket, Key), "rb") as arquivo:
+                corpo = arquivo.read()
+        except FileNotFoundError:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject")
+        return {"Body": io.BytesIO(corpo), "ContentLength": len(corpo), "ETag": '"x"'}
+
+    def delete_object(self, Bucket, Key):
+        self._contar("delete_object")
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.caminho(Bucket, Key))
+        return {}
+
+    def copy_object(self, Bucket, Key, CopySource):
+        self._contar("copy_object")
+        with open(self.caminho(CopySource["Bucket"], CopySource["Key"]), "rb") as arquivo:
+            self._gravar(Bucket, Key, arquivo.read())
+        return {}
+
+    def create_multipart_upload(self, Bucket, Key, **_):
+        self._contar("create_multipart_upload")
+        upload_id = uuid.uuid4().hex
+        self._multipart[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self._contar("upload_part")
+        with self._upload():
+            self._multipart[UploadId][PartNumber] = bytes(Body)
+        return {"ETag": f'"{PartNumber}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        self._contar("complete_multipart_upload")
+        partes = self._multipart.pop(UploadId)
+        self._gravar(Bucket, Key, b"".join(partes[parte["PartNumber"]] for parte in MultipartUpload["Parts"]))
+        return {}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self._multipart.pop(UploadId, None)
+        return {}
+
+    def get_paginator(self, _):
+        s3 = self
+
+        class Paginador:
+            def paginate(self, Bucket, Prefix="", Delimiter=None):
+                s3._contar("list_objects_v2")
+                raiz = s3.caminho(Bucket)
+                conteudo = []
+                for diretorio, _, nomes in os.walk(raiz):
+                    for nome in nomes:
+                        chave = os.path.relpath(os.path.join(diretorio, nome), raiz).replace(os.sep, "/")
+                        if nome.startswith(".") or not chave.startswith(Prefix):
+                            continue
+                        if Delimiter and Delimiter in chave[len(Prefix):]:
+                            continue
+                        conteudo.append({"Key": chave, "Size": os.path.getsize(os.path.join(diretorio, nome))})
+                yield {"Contents": sorted(conteudo, key=lambda objeto: objeto["Key"])}
+
+        return Paginador()
+
+
+# ------------------------------------------------------------------------------------------------------------ Glue
+class GlueLocal:
+    """
+    Glue mínimo: catálogo (get_table, batch_create_partition, batch_get_partition) das tabelas
+    refinadas em diretórios locais e o job (get_job, get_job_runs, start_job_run). Como no serviço,
+    start_job_run acima do MaxConcurrentRuns responde ConcurrentRunsExceededException; cada execução
+    aceita roda executar_job(Arguments) em um pool com max_concurrent_runs threads, depois de
+    partida_s (provisionamento do Glue).
+    """
+
+    def __init__(self, tabelas, executar_job, max_concurrent_runs=1, partida_s=0.0):
+        self.tabelas = tabelas
+        self.executar_job = executar_job
+        self.max_concurrent_runs = max_concurrent_runs
+        self.partida_s = partida_s
+        self.particoes = {}
+        self.execucoes = []
+        self.rejeitadas = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrent_runs, thread_name_prefix="glue")
+
+    def get_table(self, DatabaseName, Name):
+        if DatabaseName != DATABASE_REFINADO or Name not in self.tabelas:
+            raise ClientError({"Error": {"Code": "EntityNotFoundException", "Message": Name}}, "GetTable")
+        return {"Table": json.loads(json.dumps(self.tabelas[Name]))}
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        erros = []
+        with self._lock:
+            for entrada in PartitionInputList:
+                chave = (TableName, tuple(entrada["Values"]))
+                if chave in self.particoes:
+                    erros.append({"PartitionValues": entrada["Values"],
+                                  "ErrorDetail": {"ErrorCode": "AlreadyExistsException"}})
+                    continue
+                self.particoes[chave] = {"Location": entrada["StorageDescriptor"]["Location"],
+                                         "registrada_em": time.perf_counter()}
+        return {"Errors": erros}
+
+    def batch_get_partition(self, DatabaseName, TableName, PartitionsToGet):
+        encontradas = [{"Values": valores["Values"], "StorageDescriptor": {"Location": particao["Location"]}}
+                       for valores in PartitionsToGet
+                       for particao in [self.particoes.get((TableName, tuple(valores["Values"])))] if particao]
+        return {"Partitions": encontradas, "UnprocessedKeys": []}
+
+    def get_job(self, JobName):
+        return {"Job": {"Name": JobName, "ExecutionProperty": {"MaxConcurrentRuns": self.max_concurrent_runs}}}
+
+    def ativas(self):
+        return sum(1 for execucao in self.execucoes if execucao["JobRunState"] in ("STARTING", "RUNNING"))
+
+    def get_job_runs(self, JobName, MaxResults=200, **_):
+        with self._lock:
+            execucoes = [{"Id": execucao["Id"], "JobRunState": execucao["JobRunState"]}
+                         for execucao in reversed(self.execucoes)]
+        return {"JobRuns": execucoes[:MaxResults]}
+
+    def start_job_run(self, JobName, Arguments):
+        with self._lock:
+            if self.ativas() >= self.max_concurrent_runs:
+                self.rejeitadas += 1
+                raise ClientError({"Error": {"Code": "ConcurrentRunsExceededException", "Message": JobName}},
+                                  "StartJobRun")
+            execucao = {"Id": f"jr_{len(self.execucoes) + 1:04d}", "JobRunState": "STARTING", "Arguments": Arguments,
+                        "particoes": Arguments["--INPUT_PATHS"].split(","), "solicitado_em": time.perf_counter()}
+            self.execucoes.append(execucao)
+        self._pool.submit(self._executar, execucao)
+        return {"JobRunId": execucao["Id"]}
+
+    def _executar(self, execucao):
+        time.sleep(self.partida_s)
+        execucao["inicio"] = time.perf_counter()
+        execucao["JobRunState"] = "RUNNING"
+        try:
+            self.executar_job(execucao["Arguments"])
+            estado = "SUCCEEDED"
+        except Exception as e:
+            execucao["erro"] = f"{type(e).__name__}: {e}"
+            estado = "FAILED"
+        execucao["fim"] = time.perf_counter()
+        with self._lock:
+            execucao["JobRunState"] = estado
+
+    def encerrar(self):
+        self._pool.shutdown(wait=True)
+
+
+def tabela_catalogo(nome, location, layout):
+    return {"Name": nome, "DatabaseName": DATABASE_REFINADO,
+            "StorageDescriptor": {"Location": location, "Columns": []},
+            "PartitionKeys": [{"Name": chave, "Type": tipo} for chave, tipo in layout.chaves],
+            "Parameters": dict({"classification": "parquet"}, **parametros_projecao(layout, location))}
+
+
+class ReplicadorMedido(ReplicadorReferencias):
+    """
+    Replicador da Lambda de gatilho que avisa quando uma partição marcada fica consultável por cópia.
+    """
+
+    def __init__(self, *args, ao_replicar=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ao_replicar = ao_replicar
+
+    def replicar(self, particao, marcador):
+        copiados, faltantes = super().replicar(particao, marcador)
+        if not faltantes and self.ao_replicar:
+            self.ao_replicar(data_particao_raw(particao))
+        return copiados, faltantes
+
+
+# -------------------------------------------------------------------------------------------------------- pipeline
+class PipelineLocal:
+    def __init__(self, diretorio, servidor, args):
+        import lambda_function as gatilho
+        import lambda_functions_scrapper as scr
+        from catalogo_glue import CatalogoGlue
+
+        self.args = args
+        self.servidor = servidor
+        self.layout = escolher_layout(args.layout)
+        self.sink = SinkMemoria()
+        self.spark = None
+        self.s3 = S3Local(os.path.join(diretorio, "s3"), latencia_s=args.latencia_s3_ms / 1000,
+                          ao_criar=self.notificar)
+        locations = {nome: self.s3.caminho(BUCKET_REFINADO, nome) for nome in (TABELA_REFINADA, TABELA_AGREGADA)}
+        tabelas = {nome: tabela_catalogo(nome, location, self.layout) for nome, location in locations.items()}
+        self.glue = GlueLocal(tabelas, self.executar_job, args.max_concurrent_runs, args.partida_glue_s)
+        self.locations = locations
+        self.store = gatilho.MemoriaEstadoStore()
+        self.replicador = ReplicadorMedido(CatalogoGlue(self.glue), DATABASE_REFINADO, list(locations),
+                                           s3_client=self.s3, ao_replicar=self.registrar_replicacao)
+        self.lambdas = ThreadPoolExecutor(max_workers=args.concorrencia_lambda, thread_name_prefix="lambda")
+        self.invocacoes = []
+        self.erros = []
+        self.drenagens = 0
+        self.raspagens = {}
+        self.eventos = {}
+        self.replicadas = {}
+        self._lock = threading.Lock()
+
+        os.environ.update(S3_BUCKET_NAME=BUCKET_RAW, GLUE_TABLE_NAME=TABELA_RAW, GLUE_JOB_NAME=JOB_NAME)
+        scr._s3_client = self.s3
+        scr.B3_API_URL = servidor.url
+        scr.SNAPSHOT_DEDUP = not args.sem_dedup
+        scr.RAW_PARTITION_PROJECTION = True
+        scr.instrumentacao = Instrumentacao("scraper_b3", sink=self.sink)
+        gatilho._glue_client = self.glue
+        gatilho._s3_client = self.s3
+        gatilho.GLUE_MAX_CONCURRENT_RUNS = None
+        gatilho.instrumentacao = Instrumentacao("gatilho_glue", sink=self.sink)
+        self.scr = scr
+        self.gatilho = gatilho
+
+    # --------------------------------------------------------------------------------------- Glue Job (JobELTB3)
+    def iniciar_spark(self, diretorio):
+        from pyspark.sql import SparkSession
+        self.spark = (SparkSession.builder.master("local[*]").appName("bench_pipeline_local")
+                      .config("spark.ui.enabled", "false").config("spark.ui.showConsoleProgress", "false")
+                      .config("spark.sql.warehouse.dir", os.path.join(diretorio, "warehouse"))
+                      .getOrCreate())
+        self.spark.sparkContext.setLogLevel("ERROR")
+        self.spark.sql(f"CREATE DATABASE IF NOT EXISTS {DATABASE_REFINADO}")
+
+    def executar_job(self, argumentos):
+        from catalogo_glue import CatalogoGlue
+        from main import JobELTB3
+
+        caminhos = [self.s3.local(uri) for uri in argumentos["--INPUT_PATHS"].split(",")]
+        # O main.py não depende do awsglue: sem GlueContext, o MotorSpark usa a sessão local (self.spark)
+        job = JobELTB3(self.spark, None, caminhos[0], self.locations[TABELA_REFINADA], DATABASE_REFINADO,
+                       TABELA_RAW, TABELA_REFINADA, self.s3.caminho("athena"), input_paths=caminhos,
+                       manifest_path=self.s3.caminho("artefatos", f"manifests/{TABELA_REFINADA}.json"),
+                       engine=self.args.motor, partition_layout=self.layout.nome, aggregate_table_name=TABELA_AGREGADA,
+                       instrumentacao=Instrumentacao("JobELTB3", sink=self.sink, Job=TABELA_REFINADA))
+        job.glue_client = self.glue
+        job.catalogo = CatalogoGlue(self.glue)
+        job.replicador.catalogo = job.catalogo
+        job.run()
+
+    # ------------------------------------------------------------------------------------ eventos S3 e gatilho
+    def notificar(self, bucket, chave):
+        # Só o bucket RAW tem notificação para a Lambda de gatilho
+        if bucket != BUCKET_RAW:
+            return
+        criado_em = time.perf_counter()
+        evento = {"Records": [{"eventName": "ObjectCreated:Put",
+                               "s3": {"bucket": {"name": bucket}, "object": {"key": urllib.parse.quote_plus(chave)}}}]}
+        # Só Parquet e marcadores contam como chegada da partição (o _ALTERACOES.json não é processado pelo gatilho)
+        nome = os.path.basename(chave)
+        dia = data_particao_raw(chave) if not nome.startswith("_") or nome == MARCADOR_REFERENCIA else None
+        self.invocacoes.append(self.lambdas.submit(self.invocar_gatilho, evento, dia, criado_em))
+
+    def invocar_gatilho(self, evento, dia=None, criado_em=None):
+        inicio = time.perf_counter()
+        if dia is not None:
+            with self._lock:
+                self.eventos.setdefault(dia, []).append((criado_em, inicio))
+        try:
+            self.gatilho.lambda_handler(evento, types.SimpleNamespace(aws_request_id=str(uuid.uuid4())),
+                                        glue_client=self.glue, store=self.store,
+                                        debounce_seconds=self.args.debounce, replicador=self.replicador)
+        except Exception as e:
+            self.erros.append(f"gatilho: {type(e).__name__}: {e}")
+
+    def registrar_replicacao(self, dia):
+        with self._lock:
+            self.replicadas.setdefault(dia, []).append(time.perf_counter())
+
+    def drenar_periodicamente(self, parar):
+        # Regra agendada do EventBridge com {"drenar": true}, com o intervalo comprimido
+        while not parar.wait(self.args.intervalo_drenagem):
+            self.drenagens += 1
+            self.invocar_gatilho({"drenar": True})
+
+    def ocioso(self):
+        return (all(invocacao.done() for invocacao in list(self.invocacoes)) and not self.glue.ativas()
+                and not self.store.ler().get("fila"))
+
+    # ---------------------------------------------------------------------------------------------------- rajada
+    def raspar(self, dia, indices):
+        class DataFixa(datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return datetime(dia.year, dia.month, dia.day, 18, 0, 0)
+
+        self.servidor.dia = dia
+        self.scr.datetime = DataFixa
+        inicio = time.perf_counter()
+        resposta = self.scr.lambda_handler({"indices": indices})
+        self.raspagens[dia] = {"inicio": inicio, "fim": time.perf_counter(), "status": resposta["statusCode"],
+                               "corpo": json.loads(resposta["body"])}
+
+    def executar(self, dias, indices):
+        datetime_original = self.scr.datetime
+        parar = threading.Event()
+        drenador = threading.Thread(target=self.drenar_periodicamente, args=(parar,), daemon=True)
+        drenador.start()
+        try:
+            for dia in dias:
+                self.raspar(dia, indices)
+                time.sleep(self.args.intervalo_dias)
+            limite = time.perf_counter() + self.args.timeout
+            while not self.ocioso():
+                if time.perf_counter() > limite:
+                    self.erros.append(f"timeout: pipeline ainda ativo após {self.args.timeout}s")
+                    break
+                time.sleep(0.05)
+        finally:
+            parar.set()
+            drenador.join()
+            self.scr.datetime = datetime_original
+            self.lambdas.shutdown(wait=True)
+            self.glue.encerrar()
+
+    # ------------------------------------------------------------------------------------------------- medidas
+    def particoes_registradas(self):
+        registradas = {}
+        for (tabela, valores) in self.glue.particoes:
+            chaves = [chave["Name"] for chave in self.glue.tabelas[tabela]["PartitionKeys"]]
+            prefixo = "/".join(f"{nome}={valor}" for nome, valor in zip(chaves, valores))
+            registradas.setdefault(tabela, set()).add(prefixo)
+        if self.spark and not self.layout.projecao:
+            # Com o Spark no layout legado o saveAsTable registra as partições no catálogo da própria sessão
+            for tabela in self.locations:
+                if self.spark.catalog.tableExists(f"{DATABASE_REFINADO}.{tabela}"):
+                    linhas = self.spark.sql(f"SHOW PARTITIONS {DATABASE_REFINADO}.{tabela}").collect()
+                    registradas.setdefault(tabela, set()).update(linha[0] for linha in linhas)
+        return registradas
+
+    def nao_consultaveis(self, dias):
+        """
+        Partições (tabela, pregão) sem arquivos Parquet ou, sem partition projection, não registradas.
+        """
+        registradas = self.particoes_registradas()
+        faltantes = []
+        for dia in dias:
+            prefixo = prefixo_particao(self.layout, dia)
+            for tabela, location in self.locations.items():
+                diretorio = os.path.join(location, prefixo)
+                arquivos = [nome for nome in os.listdir(diretorio) if nome.endswith(".parquet")] \
+                    if os.path.isdir(diretorio) else []
+                if not arquivos or (not self.layout.projecao and prefixo not in registradas.get(tabela, set())):
+                    faltantes.append(f"{tabela}/{prefixo}")
+        return faltantes
+
+    def latencias(self, dias):
+        """
+        Latência de cada etapa por partição RAW:
+          - scraper: invocação do scraper do pregão;
+          - entrega: último objeto da partição criado -> início da invocação do gatilho desse objeto;
+          - agendamento: início dessa invocação -> start_job_run aceito (debounce, backoff, drenagem) ou
+            cópia da referência concluída pelo gatilho;
+          - fila_glue: start_job_run -> início da execução; job: duração da execução;
+          - total: início do scraper -> partição consultável (fim da execução ou cópia pelo gatilho).
+        """
+        por_particao = {}
+        for dia in dias:
+            raspagem = self.raspagens.get(dia)
+            eventos = self.eventos.get(dia)
+            if not raspagem or not eventos:
+                continue
+            criado_em, entregue_em = max(eventos)
+            medidas = {"scraper_ms": raspagem["fim"] - raspagem["inicio"], "entrega_ms": entregue_em - criado_em}
+            execucoes = [execucao for execucao in self.glue.execucoes if execucao["JobRunState"] == "SUCCEEDED"
+                         and dia in {data_particao_raw(particao) for particao in execucao["particoes"]}]
+            copias = self.replicadas.get(dia, [])
+            disponivel = [execucao["fim"] for execucao in execucoes] + copias
+            if copias and min(copias) == min(disponivel):
+                medidas["agendamento_ms"] = min(copias) - entregue_em
+            elif execucoes:
+                primeira = min(execucoes, key=lambda execucao: execucao["fim"])
+                medidas.update(agendamento_ms=primeira["solicitado_em"] - entregue_em,
+                               fila_glue_ms=primeira["inicio"] - primeira["solicitado_em"],
+                               job_ms=primeira["fim"] - primeira["inicio"])
+            if disponivel:
+                medidas["total_ms"] = min(disponivel) - raspagem["inicio"]
+                medidas["disponivel_em"] = min(disponivel)
+            por_particao[dia] = {nome: round(valor * 1000, 1) if nome.endswith("_ms") else valor
+                                 for nome, valor in medidas.items()}
+        return por_particao
+
+    def processamentos(self, dias):
+        # Execuções com sucesso do job e cópias pelo gatilho que tornaram cada pregão consultável
+        contagem = {}
+        for execucao in self.glue.execucoes:
+            if execucao["JobRunState"] == "SUCCEEDED":
+                for dia in {data_particao_raw(particao) for particao in execucao["particoes"]}:
+                    contagem[dia] = contagem.get(dia, 0) + 1
+        for dia, copias in self.replicadas.items():
+            contagem[dia] = contagem.get(dia, 0) + len(copias)
+        return {dia: contagem.get(dia, 0) for dia in dias}
+
+    def etapas(self):
+        totais = {}
+        for registro in self.sink.registros:
+            chave = f"{registro['Componente']}.{registro['Etapa']}"
+            total = totais.setdefault(chave, {"n": 0, "duracao_ms": 0.0})
+            total["n"] += 1
+            total["duracao_ms"] = round(total["duracao_ms"] + registro.get("DuracaoMs", 0), 1)
+        return dict(sorted(totais.items()))
+
+
+def medir(args, dias, indices, respostas, diretorio):
+    servidor = ServidorB3(respostas, latencia_s=args.latencia_http_ms / 1000)
+    pipeline = PipelineLocal(diretorio, servidor, args)
+    try:
+        inicio_spark = time.perf_counter()
+        if args.motor != "arrow":
+            pipeline.iniciar_spark(diretorio)
+        partida_spark_s = round(time.perf_counter() - inicio_spark, 2)
+
+        with open(args.log, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+            inicio = time.perf_counter()
+            pipeline.executar(dias, indices)
+            por_particao = pipeline.latencias(dias)
+            nao_consultaveis = pipeline.nao_consultaveis(dias)
+    finally:
+        servidor.encerrar()
+        if pipeline.spark:
+            pipeline.spark.stop()
+
+    disponiveis = [medidas["disponivel_em"] for medidas in por_particao.values() if "disponivel_em" in medidas]
+    duracao_s = (max(disponiveis) - inicio) if disponiveis else None
+    linhas = sum(registro.get("LinhasSaida", 0) for registro in pipeline.sink.registros
+                 if registro["Componente"] == "scraper_b3" and registro["Etapa"] == "http")
+    processamentos = pipeline.processamentos(dias)
+    execucoes = pipeline.glue.execucoes
+    return {
+        "dias": len(dias),
+        "indices": len(indices),
+        "motor": args.motor,
+        "layout": pipeline.layout.nome,
+        "partida_spark_s": partida_spark_s,
+        "latencias_ms": {hop: resumir([medidas[hop] for medidas in por_particao.values() if hop in medidas])
+                         for hop in HOPS},
+        "vazao": {"duracao_s": duracao_s and round(duracao_s, 2),
+                  "particoes_por_s": duracao_s and round(len(disponiveis) / duracao_s, 3),
+                  "linhas_por_s": duracao_s and round(linhas / duracao_s, 1), "linhas_raspadas": linhas},
+        "invocacoes_gatilho": len(pipeline.invocacoes),
+        "drenagens": pipeline.drenagens,
+        "start_job_run_rejeitados": pipeline.glue.rejeitadas,
+        "execucoes_job": len(execucoes),
+        "execucoes_com_erro": {execucao["Id"]: execucao["erro"] for execucao in execucoes if "erro" in execucao},
+        "particoes_por_execucao": [len(execucao["particoes"]) for execucao in execucoes],
+        "copias_pelo_gatilho": sum(len(copias) for copias in pipeline.replicadas.values()),
+        "marcadores": sum(1 for raspagem in pipeline.raspagens.values() if "referencia" in raspagem["corpo"]),
+        "raspagens_com_erro": {str(dia): raspagem["corpo"].get("message")
+                               for dia, raspagem in pipeline.raspagens.items() if raspagem["status"] != 200},
+        "duplicadas": {str(dia): total for dia, total in processamentos.items() if total > 1},
+        "nao_consultaveis": nao_consultaveis,
+        "concorrencia_max_http": servidor.concorrencia_max,
+        "concorrencia_max_upload": pipeline.s3.concorrencia_max_upload,
+        "operacoes_s3": dict(sorted(pipeline.s3.operacoes.items())),
+        "etapas": pipeline.etapas(),
+        "erros": pipeline.erros,
+        "por_particao": {str(dia): {nome: valor for nome, valor in medidas.items() if nome.endswith("_ms")}
+                         for dia, medidas in por_particao.items()},
+    }
+
+
+def verificar(resultado, args):
+    """
+    Falhas de ponta a ponta que não dependem de baseline.
+    """
+    falhas = []
+    if resultado["duplicadas"] and not args.permitir_duplicadas:
+        falhas.append(f"pregões processados mais de uma vez: {resultado['duplicadas']}")
+    if resultado["execucoes_com_erro"]:
+        falhas.append(f"execuções do job com erro: {resultado['execucoes_com_erro']}")
+    if resultado["raspagens_com_erro"]:
+        falhas.append(f"raspagens com erro: {resultado['raspagens_com_erro']}")
+    if resultado["nao_consultaveis"]:
+        falhas.append(f"partições não consultáveis ao fim: {resultado['nao_consultaveis']}")
+    if resultado["erros"]:
+        falhas.append(f"erros nas Lambdas: {resultado['erros']}")
+    if resultado["indices"] > 1 and resultado["concorrencia_max_http"] < 2:
+        falhas.append("requisições HTTP à B3 serializadas (concorrência máxima 1 com mais de um índice)")
+    if args.min_concorrencia_upload and resultado["concorrencia_max_upload"] < args.min_concorrencia_upload:
+        falhas.append(f"concorrência de upload {resultado['concorrencia_max_upload']} abaixo de "
+                      f"{args.min_concorrencia_upload}")
+    total = resultado["latencias_ms"]["total_ms"]
+    if args.max_latencia_total_s and total and total["max"] > args.max_latencia_total_s * 1000:
+        falhas.append(f"latência total máxima {total['max']} ms acima de {args.max_latencia_total_s}s")
+    return falhas
+
+
+def comparar(baseline, atual, limite):
+    """
+    Aponta os cenários cuja latência (mediana ou p95) de alguma etapa ou número de execuções do job
+    piorou mais que o limite relativo, ou cuja concorrência de HTTP/upload caiu.
+    """
+    regressoes = []
+    for cenario, medida in atual.items():
+        referencia = baseline.get("resultados", {}).get(cenario)
+        if not referencia:
+            print(f"[{cenario}] sem referência no baseline.")
+            continue
+        pares = [(f"{hop} {estatistica}", (referencia["latencias_ms"].get(hop) or {}).get(estatistica),
+                  (medida["latencias_ms"].get(hop) or {}).get(estatistica))
+                 for hop in HOPS for estatistica in ("mediana", "p95")]
+        pares = [(metrica, antes, depois) for metrica, antes, depois in pares if antes and antes >= LATENCIA_MINIMA_MS]
+        pares += [(metrica, referencia.get(metrica), medida.get(metrica)) for metrica in CONTAGENS_COMPARADAS]
+        for metrica, antes, depois in pares:
+            if not antes or depois is None:
+                continue
+            variacao = (depois - antes) / antes
+            situacao = "REGRESSÃO" if variacao > limite else "ok"
+            print(f"[{cenario}] {metrica}: {antes} -> {depois} ({variacao:+.1%}) {situacao}")
+            if variacao > limite:
+                regressoes.append(f"{cenario} {metrica} {variacao:+.1%}")
+        for metrica in CONCORRENCIAS_COMPARADAS:
+            antes, depois = referencia.get(metrica), medida.get(metrica)
+            if antes is None or depois is None:
+                continue
+            situacao = "REGRESSÃO" if depois < antes else "ok"
+            print(f"[{cenario}] {metrica}: {antes} -> {depois} {situacao}")
+            if depois < antes:
+                regressoes.append(f"{cenario} {metrica} {antes} -> {depois}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dias", type=int, default=3, help="pregões raspados em sequência (rajada de N dias)")
+    parser.add_argument("--indices", type=int, default=4, help="índices raspados por pregão (rajada de N índices)")
+    parser.add_argument("--gravacoes", help="respostas gravadas da API (<dir>/<AAAA-MM-DD>/<INDICE>/pagina_<n>.json)")
+    parser.add_argument("--registros", type=int, default=90, help="registros por índice nas respostas sintéticas")
+    parser.add_argument("--rebalanceamento", type=int, default=1,
+                        help="nas respostas sintéticas, a carteira muda a cada K pregões (K > 1 gera marcadores)")
+    parser.add_argument("--motor", default="spark", choices=["spark", "arrow", "auto"])
+    parser.add_argument("--layout", default=LAYOUT_PADRAO, choices=sorted(LAYOUTS))
+    parser.add_argument("--sem-dedup", action="store_true", help="desliga o SNAPSHOT_DEDUP do scraper")
+    parser.add_argument("--debounce", type=float, default=1.0, help="janela de debounce do gatilho (Terraform: 15s)")
+    parser.add_argument("--max-concurrent-runs", type=int, default=1)
+    parser.add_argument("--intervalo-drenagem", type=float, default=1.0,
+                        help="intervalo da drenagem agendada da fila (Terraform: 5 minutos)")
+    parser.add_argument("--intervalo-dias", type=float, default=0.0, help="espera entre as raspagens da rajada")
+    parser.add_argument("--concorrencia-lambda", type=int, default=32, help="invocações simultâneas do gatilho")
+    parser.add_argument("--latencia-http-ms", type=float, default=50.0)
+    parser.add_argument("--latencia-s3-ms", type=float, default=20.0)
+    parser.add_argument("--partida-glue-s", type=float, default=0.0, help="provisionamento simulado de cada execução")
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--permitir-duplicadas", action="store_true")
+    parser.add_argument("--min-concorrencia-upload", type=int, default=0)
+    parser.add_argument("--max-latencia-total-s", type=float, default=0.0)
+    parser.add_argument("--log", default=os.path.join(tempfile.gettempdir(), "bench_pipeline_local.log"),
+                        help="arquivo com o stdout das Lambdas e do job")
+    parser.add_argument("--detalhar", action="store_true", help="inclui as latências de cada partição no resultado")
+    parser.add_argument("--saida", help="grava os resultados (baseline) neste arquivo JSON")
+    parser.add_argument("--comparar", help="baseline JSON para comparar com esta execução")
+    parser.add_argument("--limite", type=float, default=0.2, help="piora relativa tolerada no modo --comparar")
+    args = parser.parse_args()
+
+    if args.gravacoes:
+        respostas = carregar_gravacoes(args.gravacoes)
+        dias = sorted({dia for dia, _, _ in respostas})[-args.dias:]
+        disponiveis = sorted({indice for _, indice, _ in respostas})
+        indices = ([indice for indice in INDICES_B3 if indice in disponiveis] +
+                   [indice for indice in disponiveis if indice not in INDICES_B3])[:args.indices]
+    else:
+        dias, indices = dias_pregao(args.dias), INDICES_B3[:args.indices]
+        respostas = gerar_respostas(dias, indices, args.registros, max(args.rebalanceamento, 1))
+
+    diretorio = tempfile.mkdtemp(prefix="bench_pipeline_local_")
+    try:
+        resultado = medir(args, dias, indices, respostas, diretorio)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+    cenario = f"{resultado['dias']}d_{resultado['indices']}i_{args.motor}_{resultado['layout']}"
+    latencias = " | ".join(f"{hop[:-3]} {medida['mediana']}/{medida['p95']}" for hop, medida in
+                           resultado["latencias_ms"].items() if medida)
+    print(f"[{cenario}] mediana/p95 (ms): {latencias}")
+    print(f"[{cenario}] {resultado['execucoes_job']} execução(ões) do job ({resultado['start_job_run_rejeitados']} "
+          f"start_job_run rejeitado(s)), {resultado['copias_pelo_gatilho']} cópia(s) pelo gatilho, "
+          f"{resultado['vazao']['particoes_por_s']} partições/s, concorrência HTTP "
+          f"{resultado['concorrencia_max_http']} e upload {resultado['concorrencia_max_upload']}; log em {args.log}")
+    if not args.detalhar:
+        resultado.pop("por_particao")
+    print(json.dumps(resultado, indent=2))
+
+    documento = {
+        "metadados": {
+            "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "resultados": {cenario: resultado},
+    }
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump(documento, arquivo, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+
+    falhas = verificar(resultado, args)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            baseline = json.load(arquivo)
+        regressoes = comparar(baseline, documento["resultados"], args.limite)
+        if regressoes:
+            falhas.append(f"{len(regressoes)} regressão(ões) acima de {args.limite:.0%}: {regressoes}")
+        else:
+            print(f"Nenhuma regressão acima de {args.limite:.0%}.")
+    if falhas:
+        for falha in falhas:
+            print(f"FALHA: {falha}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+###################################################################################################################
+# Benchmark da validação de qualidade do JobELTB3 (app/utils/qualidade_dados.py) em um backfill de vários anos.   #
+# Gera a camada RAW sintética, injeta defeitos em alguns pregões (arquivo repetido, quantidade nula, participação #
+# negativa e carteira incompleta) e executa as etapas do job (leitura, transformação, materialização, gravação e  #
+# sumarização por tipo) em cada motor, em duas variantes, cada uma em um processo próprio:                        #
+#   - sem: sem validação, materialização pelo count();                                                            #
+#   - com: a agregação única da validação substitui o count() como ação que preenche o cache.                     #
+# O custo da validação (no Spark, a diferença entre as materializações somada à validação; no Arrow, só a         #
+# agregação), pela mediana de --repeticoes execuções alternadas, não pode passar de --limite do tempo do job. No  #
+# Spark também mede a validação ingênua (uma ação por regra) para comparação. Os pregões apontados pelo relatório #
+# são conferidos em tests/test_qualidade_dados.py.                                                                #
+#                                                                                                                 #
+# Uso: python benchmarks/bench_qualidade_dados.py [--acoes 90] [--pregoes 1250] [--motores spark arrow]           #
+#                                                  [--repeticoes 3] [--limite 0.05]                               #
+###################################################################################################################
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app", "utils"))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "lambda"))
+
+from bench_job_elt import gerar_raw, listar_caminhos  # noqa: E402
+
+MOTORES = ["spark", "arrow"]
+
+# Defeitos injetados, um por pregão, para que o relatório tenha regras em alerta/falha
+DEFEITOS = ["arquivo_repetido", "quantidade_nula", "participacao_negativa", "carteira_incompleta"]
+
+
+def injetar_defeitos(caminhos):
+    """
+    Aplica um defeito por pregão nos primeiros pregões do histórico, regravando o arquivo RAW tipado.
+
+    Returns:
+        dict: defeito -> data do pregão (AAAA-MM-DD)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    injetados = {}
+    for defeito, caminho in zip(DEFEITOS, caminhos):
+        arquivo = os.path.join(caminho, "IBOV.parquet")
+        tabela = pq.read_table(arquivo)
+        if defeito == "arquivo_repetido":
+            shutil.copy(arquivo, os.path.join(caminho, "IBOV_copia.parquet"))
+        elif defeito == "quantidade_nula":
+            indice = tabela.column_names.index("theoricalQty")
+            valores = tabela.column(indice).to_pylist()
+            valores[0] = None
+            tabela = tabela.set_column(indice, "theoricalQty", pa.array(valores, tabela.schema.field(indice).type))
+        elif defeito == "participacao_negativa":
+            indice = tabela.column_names.index("part")
+            valores = tabela.column(indice).to_pylist()
+            # A maior participação: o desvio da soma (o dobro dela) fica acima do alerta
+            maior = valores.index(max(valores))
+            valores[maior] = -valores[maior]
+            tabela = tabela.set_column(indice, "part", pa.array(valores, tabela.schema.field(indice).type))
+        elif defeito == "carteira_incompleta":
+            # Última página da API perdida: a soma das participações fica abaixo de 100
+            tabela = tabela.slice(0, tabela.num_rows - 10)
+        pq.write_table(tabela, arquivo)
+        ano, mes, dia = (int(parte.split("=")[1]) for parte in caminho.rstrip("/").split("/")[-3:])
+        injetados[defeito] = f"{ano:04d}-{mes:02d}-{dia:02d}"
+    return injetados
+
+
+def validacao_ingenua(df):
+    """
+    As mesmas verificações feitas uma a uma, cada uma com a sua ação sobre o DataFrame.
+    """
+    from pyspark.sql import functions as F
+    resultado = {}
+    for coluna in ["codigo_bovespa", "quantidade_teorica", "percentual_participacao_acao",
+                   "percentual_participacao_acumulada"]:
+        resultado[f"nulos_{coluna}"] = df.where(F.col(coluna).isNull()).count()
+    for coluna in ["quantidade_teorica", "percentual_participacao_acao"]:
+        resultado[f"negativos_{coluna}"] = df.where(F.col(coluna) < 0).count()
+    resultado["duplicadas"] = (df.groupBy("indice", "data_pregao", "codigo_bovespa").count()
+                               .where(F.col("count") > 1).count())
+    somas = df.groupBy("indice", "data_pregao").agg(F.sum("percentual_participacao_acao").alias("soma")).collect()
+    resultado["soma_participacao"] = max(abs(100 - float(linha["soma"] or 0)) for linha in somas)
+    return resultado
+
+
+def executar_cenario(nome_motor, variante, raiz, destino):
+    """
+    Etapas na ordem do JobELTB3.run (leitura, transformação, materialização, [validação], gravação e
+    sumarização por tipo):
+        - 'sem': sem validação, a materialização é feita pelo count();
+        - 'com': a agregação da validação é a ação que preenche o cache (materializar(contar=False)).
+    """
+    from motores import MotorArrow, MotorSpark, listar_parquet
+    from perfil_spark import aplicar_perfil, escolher_perfil
+    from qualidade_dados import ValidacaoQualidade
+    from transformacoes_b3 import TransformacoesB3
+
+    if nome_motor == "spark":
+        from pyspark.sql import SparkSession
+        spark = (SparkSession.builder.master("local[*]").appName("bench_qualidade_dados")
+                 .config("spark.ui.enabled", "false").config("spark.sql.session.timeZone", "UTC").getOrCreate())
+        spark.sparkContext.setLogLevel("ERROR")
+        # Mesmo perfil de execução (partições de shuffle) que o JobELTB3 escolheria para esta entrada
+        aplicar_perfil(spark, escolher_perfil(listar_parquet([raiz])[1], "auto"))
+        motor = MotorSpark(spark)
+    else:
+        motor = MotorArrow()
+    transformacoes = TransformacoesB3(motor)
+    validacao = ValidacaoQualidade(motor)
+    caminhos = listar_caminhos(raiz)
+    com_validacao = variante == "com"
+
+    def ler(caminhos_leitura):
+        if motor.nome == "spark":
+            return motor.spark.read.option("basePath", raiz).parquet(*caminhos_leitura)
+        return motor.ler_parquet(caminhos_leitura)
+
+    def transformar(df):
+        return transformacoes.transform_dataframe(transformacoes.adicionar_data_pregao(df))
+
+    # Aquecimento igual nas duas variantes: inicialização da JVM/imports preguiçosos fora da medição
+    aquecimento = transformar(ler(caminhos[-1:]))
+    validacao.metricas_por_pregao(aquecimento)
+    motor.contar(aquecimento)
+
+    tempos = {}
+    inicio = time.perf_counter()
+    df, linhas = motor.materializar(transformar(ler(caminhos)), contar=not com_validacao)
+    tempos["materializacao_s"] = time.perf_counter() - inicio
+
+    relatorio = None
+    if com_validacao:
+        inicio = time.perf_counter()
+        relatorio = validacao.validar(df, tabela="bench")
+        linhas = relatorio["linhas"]
+        tempos["validacao_s"] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    colunas_particao = ["ano", "mes", "dia", "data_pregao"]
+    if motor.nome == "spark":
+        df.write.mode("overwrite").partitionBy(*colunas_particao).parquet(destino)
+    else:
+        motor.gravar_particionado(df, destino, colunas_particao)
+    motor.coletar(transformacoes.sumarizacao_tipo(df), ["nome_tipo_acao"])
+    tempos["gravacao_s"] = time.perf_counter() - inicio
+
+    resultado = {"motor": nome_motor, "variante": variante, "linhas": linhas}
+    if com_validacao and motor.nome == "spark":
+        inicio = time.perf_counter()
+        resultado["ingenuo"] = validacao_ingenua(df)
+        tempos["ingenuo_s"] = time.perf_counter() - inicio
+    motor.liberar(df)
+    if motor.nome == "spark":
+        motor.spark.stop()
+
+    resultado.update({nome: round(tempo, 3) for nome, tempo in tempos.items()})
+    resultado["job_s"] = round(sum(tempo for nome, tempo in tempos.items() if nome != "ingenuo_s"), 3)
+    if relatorio:
+        resultado.update(pregoes=relatorio["pregoes"], status=relatorio["status"], regras={
+            regra["regra"]: {"valor": regra["valor"], "status": regra["status"],
+                             "pregoes": sorted(exemplo["data_pregao"] for exemplo in regra["exemplos"])}
+            for regra in relatorio["regras"]})
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--acoes", type=int, default=90)
+    parser.add_argument("--pregoes", type=int, default=1250)
+    parser.add_argument("--motores", nargs="+", default=MOTORES, choices=MOTORES)
+    parser.add_argument("--sem-defeitos", action="store_true", help="não injeta defeitos no RAW sintético")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções de cada variante (mediana dos tempos)")
+    parser.add_argument("--limite", type=float, default=0.05, help="fração máxima do tempo do job na validação")
+    parser.add_argument("--cenario", nargs=4, metavar=("MOTOR", "VARIANTE", "RAIZ", "DESTINO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cenario:
+        # Execução interna em subprocesso: imprime apenas o resultado do cenário
+        print(json.dumps(executar_cenario(*args.cenario), default=str))
+        return
+
+    temporario = tempfile.mkdtemp(prefix="bench_qualidade_dados_")
+    problemas, resultados = [], []
+    try:
+        raiz = os.path.join(temporario, "raw")
+        gerar_raw(raiz, args.acoes, args.pregoes)
+        injetados = {} if args.sem_defeitos else injetar_defeitos(listar_caminhos(raiz))
+        for nome_motor in args.motores:
+            medidas = {"sem": [], "com": []}
+            # Variantes alternadas a cada repetição: a variação da máquina entre processos afeta as duas
+            for _ in range(args.repeticoes):
+                for variante in medidas:
+                    saida = subprocess.run(
+                        [sys.executable, os.path.abspath(__file__), "--cenario", nome_motor, variante, raiz,
+                         os.path.join(temporario, f"saida_{nome_motor}_{variante}")],
+                        check=True, capture_output=True, text=True,
+                    ).stdout.strip().splitlines()[-1]
+                    medidas[variante].append(json.loads(saida))
+            variantes = {}
+            for variante, execucoes in medidas.items():
+                variantes[variante] = dict(execucoes[-1], **{
+                    chave: round(statistics.median(execucao[chave] for execucao in execucoes), 3)
+                    for chave, valor in execucoes[-1].items() if chave.endswith("_s")})
+            sem, com = variantes["sem"], variantes["com"]
+            # Custo da validação: no Spark, a varredura que ela faz no lugar do count(), comparada à
+            # materialização da variante sem validação (a gravação e a sumarização são iguais e só
+            # acrescentariam ruído); no Arrow a materialização não depende da contagem e o custo é a agregação
+            if nome_motor == "spark":
+                custo = com["materializacao_s"] + com["validacao_s"] - sem["materializacao_s"]
+            else:
+                custo = com["validacao_s"]
+            overhead = custo / sem["job_s"]
+            resultados.append({"motor": nome_motor, "overhead": round(overhead, 4), "custo_s": round(custo, 3),
+                               "sem": sem, "com": com})
+            ingenuo = f" | ingênuo (uma ação por regra) {com['ingenuo_s']:.3f}s" if "ingenuo_s" in com else ""
+            situacao = "REGRESSÃO" if overhead > args.limite else "ok"
+            print(f"[{nome_motor}] {com['linhas']} linhas / {com['pregoes']} pregões | job sem validação "
+                  f"{sem['job_s']:.3f}s (materialização {sem['materializacao_s']:.3f}s) | com validação: "
+                  f"materialização {com['materializacao_s']:.3f}s + validação {com['validacao_s']:.3f}s | "
+                  f"custo {custo:.3f}s ({overhead:.1%} do job, limite {args.limite:.0%}) {situacao}{ingenuo} | "
+                  f"status {com['status']}")
+            if overhead > args.limite:
+                problemas.append(f"{nome_motor}: validação em {overhead:.1%} do tempo do job")
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+
+    print(json.dumps({"defeitos": injetados, "resultados": resultados}, indent=2))
+    if problemas:
+        print("Problemas encontrados:")
+        for problema in problemas:
+            print(f"  - {problema}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+###################################################################################################################
+# Gerador de dados sintéticos da carteira teórica da B3 para os benchmarks locais.                                #
+# Produz registros no formato da API GetPortfolioDay (camada RAW).                                                #
+###################################################################################################################
+
+import random
+from datetime import date, timedelta
+
+SEGMENTOS = [
+    "Bens Indls / Máqs e Equips",
+    "Bens Indls / Mat Transporte",
+    "Consumo Cíclico / Comércio",
+    "Financeiro / Intermediários Financeiros",
+    "Materiais Básicos / Mineração",
+    "Petróleo, Gás e Biocombustíveis",
+    "Utilidade Pública / Energia Elétrica",
+]
+
+TIPOS = ["ON      NM", "PN      N1", "PN      N2", "UNT     N2", "ON      N1", "PNA     N1"]
+
+
+def _formatar_milhar(valor):
+    # 1482105837 -> "1.482.105.837"
+    return f"{valor:,}".replace(",", ".")
+
+
+def _formatar_decimal(valor):
+    # 3.003 -> "3,003"
+    return f"{valor:.3f}".replace(".", ",")
+
+
+def listar_segmentos(n_segmentos=None):
+    """
+    Os segmentos reais da lista acima, completados com nomes sintéticos quando n_segmentos for maior.
+    """
+    if n_segmentos is None:
+        return list(SEGMENTOS)
+    return [SEGMENTOS[i] if i < len(SEGMENTOS) else f"Segmento Sintético {i}" for i in range(n_segmentos)]
+
+
+def gerar_tickers(n_tickers, seed=42, n_segmentos=None):
+    rnd = random.Random(seed)
+    segmentos = listar_segmentos(n_segmentos)
+    tickers = []
+    for i in range(n_tickers):
+        tickers.append({
+            "segment": rnd.choice(segmentos),
+            "cod": f"T{i:04d}{rnd.choice('3456')}",
+            "asset": f"EMPRESA {i}",
+            "type": rnd.choice(TIPOS),
+        })
+    return tickers
+
+
+def gerar_resultados_api(n_registros, seed=42):
+    """
+    Gera uma lista de registros no formato do campo 'results' da API da B3,
+    com os numéricos formatados como texto no padrão brasileiro. As participações
+    somam 100, como em uma carteira real (regra soma_participacao do JobELTB3).
+    """
+    rnd = random.Random(seed)
+    tickers = gerar_tickers(n_registros, seed)
+    pesos = [rnd.uniform(0.01, 5.0) for _ in tickers]
+    total = sum(pesos)
+    acumulado = 0.0
+    resultados = []
+    for ticker, peso in zip(tickers, pesos):
+        part = 100.0 * peso / total
+        acumulado += part
+        resultados.append(dict(
+            ticker,
+            part=_formatar_decimal(part),
+            partAcum=_formatar_decimal(acumulado),
+            theoricalQty=_formatar_milhar(rnd.randint(10_000_000, 10_000_000_000)),
+        ))
+    return resultados
+
+
+def dias_pregao(n_dias, data_final=date(2025, 7, 25)):
+    """
+    Os últimos n_dias dias úteis (segunda a sexta) até data_final, em ordem crescente.
+    """
+    dias = []
+    dia = data_final
+    while len(dias) < n_dias:
+        if dia.weekday() < 5:
+            dias.append(dia)
+        dia -= timedelta(days=1)
+    return dias[::-1]
+
+
+def gerar_historico_api(n_tickers, n_dias, seed=42, n_segmentos=None):
+    """
+    Gera a carteira de cada pregão para o mesmo conjunto de ações, com a quantidade teórica e a
+    participação variando levemente de um dia para o outro (como em docs/dados/dados_refinados.csv).
+
+    Yields:
+        tuple: (data do pregão, registros no formato do campo 'results' da API)
+    """
+    rnd = random.Random(seed)
+    tickers = gerar_tickers(n_tickers, seed, n_segmentos)
+    quantidades = [rnd.randint(10_000_000, 10_000_000_000) for _ in tickers]
+    pesos = [rnd.uniform(0.01, 5.0) for _ in tickers]
+    for dia in dias_pregao(n_dias):
+        total = sum(pesos)
+        acumulado = 0.0
+        resultados = []
+        for ticker, quantidade, peso in zip(tickers, quantidades, pesos):
+            part = 100.0 * peso / total
+            acumulado += part
+            resultados.append(dict(
+                ticker,
+                part=_formatar_decimal(part),
+                partAcum=_formatar_decimal(acumulado),
+                theoricalQty=_formatar_milhar(quantidade),
+            ))
+        yield dia, resultados
+        # Rebalanceamentos pequenos entre os pregões
+        quantidades = [max(1, int(q * rnd.uniform(0.995, 1.005))) for q in quantidades]
+        pesos = [max(0.001, p * rnd.uniform(0.98, 1.02)) for p in pesos]
@@ -32,6 +32,14 @@ resource "aws_s3_object" "glue_etl_script" {
   etag   = filemd5("${path.module}/../app/src/main.py")
 }
 
+# Script do job de compactação de arquivos pequenos das tabelas refinadas
+resource "aws_s3_object" "glue_compactacao_script" {
+  bucket = aws_s3_bucket.bucket_artefatos.id
+  key    = "app/src/compactacao.py"
+  source = "${path.module}/../app/src/compactacao.py"
+  etag   = filemd5("${path.module}/../app/src/compactacao.py")
+}
+
 # 2. Criação do arquivo ZIP do diretório 'app/utils'
 # Este data source cria um arquivo ZIP localmente.
 data "archive_file" "python_utils_zip" {
@@ -219,6 +227,39 @@ data "aws_vpc" "default" {
 ########################
 
 
+locals {
+  # Argumentos do JobELTB3 (app/src/main.py) comuns ao job Spark e ao job Python shell do motor Arrow
+  argumentos_job_elt = merge({
+    # Passando os caminhos e nomes dinamicamente para o script Python
+    "--INPUT_PATH"                       = "s3://${aws_s3_bucket.bucket_bovespa_raw.bucket}/"
+    "--OUTPUT_PATH"                      = "s3://${aws_s3_bucket.bucket_bovespa_refined.bucket}/"
+    "--DATABASE_NAME"                    = aws_glue_catalog_database.refined_database.name
+    "--TABLE_NAME"                       = var.table_bovespa_raw
+    "--OUTPUT_TABLE_NAME"                = var.table_bovespa_refined
+    "--ATHENA_OUTPUT_BUCKET"             = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/athena-query-results/"
+    # Manifesto das partições RAW já processadas: atualizado por toda execução, lido com --INCREMENTAL true
+    "--MANIFEST_PATH"                    = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/manifests/${var.table_bovespa_refined}.json"
+    # Variação diária e média móvel incrementais: tabela de saída e estado com as últimas observações por ação
+    "--WINDOW_TABLE_NAME"                = var.table_bovespa_variacoes
+    "--WINDOW_STATE_PATH"                = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/estado-janelas/${var.table_bovespa_variacoes}/"
+    # Agregado diário por tipo (somas e contagens), regravado só nos pregões de cada execução
+    "--AGGREGATE_TABLE_NAME"             = var.table_bovespa_sumarizacao_tipo
+    # Histórico SCD tipo 2 e carteira atual das ações, atualizados só com as diferenças dos pregões do lote
+    "--HISTORY_TABLE_NAME"               = var.table_bovespa_historico_acoes
+    "--LATEST_TABLE_NAME"                = var.table_bovespa_carteira_atual
+    # Perfis de gravação Parquet por tabela (app/utils/perfil_gravacao.py): zstd, ordenação e bloom filter por ticker
+    "--WRITE_PROFILES"                   = "${var.table_bovespa_refined}=consulta,${var.table_bovespa_variacoes}=consulta,${var.table_bovespa_sumarizacao_tipo}=consulta"
+    # Layout de partição das tabelas refinadas (app/utils/layout_particoes.py), o mesmo das tabelas no catálogo
+    "--PARTITION_LAYOUT"                 = var.refined_partition_layout
+    # Validação de qualidade antes da gravação (app/utils/qualidade_dados.py) e relatório JSON de cada execução
+    "--QUALITY_CHECKS"                   = tostring(var.glue_quality_checks)
+    "--QUALITY_REPORT_PATH"              = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/qualidade/"
+  }, var.glue_quality_thresholds == "" ? {} : {
+    # Limites por regra (regra=alerta:falha,...); sem o argumento valem os limites padrão do job
+    "--QUALITY_THRESHOLDS" = var.glue_quality_thresholds
+  })
+}
+
 resource "aws_glue_job" "etl_job" {
   name              = var.glue_job_data_prep
   description       = "Glue ETL job"
@@ -241,7 +282,7 @@ resource "aws_glue_job" "etl_job" {
     notify_delay_after = 3 # delay in minutes
   }
 
-  default_arguments = {
+  default_arguments = merge({
     "--job-language"                     = "python"
     "--continuous-log-logGroup"          = "/aws-glue/jobs"
     "--enable-continuous-cloudwatch-log" = "true"
@@ -250,13 +291,80 @@ resource "aws_glue_job" "etl_job" {
     "--enable-auto-scaling"              = "true"
     "--enable-glue-datacatalog"          = "true"
     "--extra-py-files"                   = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/utils.zip"
-    # Passando os caminhos e nomes dinamicamente para o script Python
-    "--INPUT_PATH"                       = "s3://${aws_s3_bucket.bucket_bovespa_raw.bucket}/"
-    "--OUTPUT_PATH"                      = "s3://${aws_s3_bucket.bucket_bovespa_refined.bucket}/"
+  }, local.argumentos_job_elt)
+
+  execution_property {
+    max_concurrent_runs = var.glue_max_concurrent_runs
+  }
+
+  tags = {
+    "ManagedBy" = "AWS"
+  }
+}
+
+# Mesmo JobELTB3 em um job Python shell com o motor Arrow (--ENGINE arrow): sem SparkSession nem GlueContext,
+# cobrado por fração de DPU. Usado pela Lambda de gatilho quando glue_engine = "arrow".
+resource "aws_glue_job" "etl_job_arrow" {
+  name         = "${var.glue_job_data_prep}-arrow"
+  description  = "Glue ETL job (Python shell, motor Arrow)"
+  role_arn     = aws_iam_role.glue_job_role.arn
+  max_retries  = 0
+  timeout      = 5
+  max_capacity = var.glue_arrow_max_capacity
+  connections  = [aws_glue_connection.glue_connection.name]
+
+  command {
+    script_location = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/app/src/main.py"
+    name            = "pythonshell"
+    python_version  = "3.9"
+  }
+
+  default_arguments = merge({
+    "--job-language"                     = "python"
+    "--continuous-log-logGroup"          = "/aws-glue/jobs"
+    "--enable-continuous-cloudwatch-log" = "true"
+    "--extra-py-files"                   = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/utils.zip"
+    "--additional-python-modules"        = "pyarrow==${var.glue_pyarrow_version}"
+    "--ENGINE"                           = "arrow"
+  }, local.argumentos_job_elt)
+
+  execution_property {
+    max_concurrent_runs = var.glue_max_concurrent_runs
+  }
+
+  tags = {
+    "ManagedBy" = "AWS"
+  }
+}
+
+# Compactação mensal dos arquivos pequenos das tabelas refinadas (app/src/compactacao.py).
+# Sem --MONTH/--START_DATE/--END_DATE compacta o mês anterior; roda só com pyarrow no driver.
+resource "aws_glue_job" "compactacao_job" {
+  name         = "${var.glue_job_data_prep}-compactacao"
+  description  = "Compactação de arquivos pequenos das tabelas refinadas"
+  role_arn     = aws_iam_role.glue_job_role.arn
+  max_retries  = 0
+  timeout      = 30
+  # Python shell: a compactação só usa pyarrow no driver, partição a partição (1 DPU = 16 GB de memória)
+  max_capacity = 1
+  connections  = [aws_glue_connection.glue_connection.name]
+
+  command {
+    script_location = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/app/src/compactacao.py"
+    name            = "pythonshell"
+    python_version  = "3.9"
+  }
+
+  default_arguments = {
+    "--job-language"                     = "python"
+    "--continuous-log-logGroup"          = "/aws-glue/jobs"
+    "--enable-continuous-cloudwatch-log" = "true"
+    "--extra-py-files"                   = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/utils.zip"
+    "--additional-python-modules"        = "pyarrow==${var.glue_pyarrow_version}"
     "--DATABASE_NAME"                    = aws_glue_catalog_database.refined_database.name
-    "--TABLE_NAME"                       = var.table_bovespa_raw
-    "--OUTPUT_TABLE_NAME"                = var.table_bovespa_refined
-    "--ATHENA_OUTPUT_BUCKET"             = "s3://${aws_s3_bucket.bucket_artefatos.bucket}/athena-query-results/"
+    "--TABLE_NAMES"                      = "${var.table_bovespa_refined},${var.table_bovespa_variacoes},${var.table_bovespa_sumarizacao_tipo}"
+    "--TARGET_FILE_MB"                   = "128"
+    "--WRITE_PROFILE"                    = "consulta"
   }
 
   execution_property {
@@ -268,6 +376,17 @@ resource "aws_glue_job" "etl_job" {
   }
 }
 
+resource "aws_glue_trigger" "compactacao_mensal" {
+  name     = "${var.glue_job_data_prep}-compactacao-mensal"
+  type     = "SCHEDULED"
+  # Dia 1 de cada mês, antes da abertura do pregão (UTC)
+  schedule = var.compactacao_schedule
+
+  actions {
+    job_name = aws_glue_job.compactacao_job.name
+  }
+}
+
 # IAM role for Glue jobs
 resource "aws_iam_role" "glue_job_role" {
   name = "${var.environment}-glue-job-role"
@@ -333,6 +452,9 @@ resource "aws_iam_role_policy" "glue_job_s3_access" {
           "glue:GetTable",
           "glue:UpdateTable",
           "glue:BatchCreatePartition",
+          "glue:BatchGetPartition",
+          "glue:GetPartitions",        # Compactação: partições da janela
+          "glue:BatchUpdatePartition", # Compactação: troca do location das partições
           "glue:DeleteTable"
         ]
         # Permissão para acessar o Glue Catalog
@@ -384,8 +506,40 @@ resource "aws_iam_role_policy" "glue_job_s3_access" {
 
 data "archive_file" "lambda_function_zip" {
   type        = "zip"
-  source_file = "${path.module}/../lambda/lambda_function.py"
-  output_path = "${path.module}/../lambda/lambda_function.py"
+  output_path = "${path.module}/../lambda/lambda_function.zip"
+
+  source {
+    content  = file("${path.module}/../lambda/lambda_function.py")
+    filename = "lambda_function.py"
+  }
+
+  # Módulo de métricas compartilhado com o scraper e o Glue Job
+  source {
+    content  = file("${path.module}/../app/utils/instrumentacao.py")
+    filename = "instrumentacao.py"
+  }
+
+  # Replicação das partições refinadas para os dias marcados pelo scraper como iguais a um pregão anterior
+  source {
+    content  = file("${path.module}/../app/utils/referencias_snapshot.py")
+    filename = "referencias_snapshot.py"
+  }
+
+  source {
+    content  = file("${path.module}/../app/utils/layout_particoes.py")
+    filename = "layout_particoes.py"
+  }
+
+  source {
+    content  = file("${path.module}/../app/utils/catalogo_glue.py")
+    filename = "catalogo_glue.py"
+  }
+
+  # Leitura/gravação de JSON no S3 com compare-and-swap (estado do debounce e da fila)
+  source {
+    content  = file("${path.module}/../app/utils/objetos_s3.py")
+    filename = "objetos_s3.py"
+  }
 }
 
 resource "aws_lambda_function" "lambda_inicia_glue_job" {
@@ -393,13 +547,24 @@ resource "aws_lambda_function" "lambda_inicia_glue_job" {
   role          = aws_iam_role.lambda_execution_role.arn
   handler       = "lambda_function.lambda_handler"
   runtime       = "python3.9"
+  # Precisa cobrir a janela de debounce (DEBOUNCE_SECONDS) mais as chamadas ao S3 e ao Glue
+  timeout       = 60
 
   filename         = data.archive_file.lambda_function_zip.output_path
   source_code_hash = data.archive_file.lambda_function_zip.output_base64sha256
 
   environment {
     variables = {
-      GLUE_JOB_NAME = var.glue_job_data_prep
+      GLUE_JOB_NAME        = var.glue_engine == "arrow" ? aws_glue_job.etl_job_arrow.name : aws_glue_job.etl_job.name
+      DEBOUNCE_SECONDS     = var.trigger_debounce_seconds
+      TRIGGER_STATE_BUCKET = aws_s3_bucket.bucket_artefatos.bucket
+      TRIGGER_STATE_KEY    = "glue-trigger/pending.json"
+      GLUE_MAX_CONCURRENT_RUNS = var.glue_max_concurrent_runs
+      # Dias sem mudança na carteira (marcador _MESMO_QUE.json) são copiados nestas tabelas sem o Glue Job
+      REFINED_DATABASE_NAME = aws_glue_catalog_database.refined_database.name
+      REFERENCE_TABLES      = "${var.table_bovespa_refined},${var.table_bovespa_sumarizacao_tipo}"
+      # Clientes Glue/S3 criados no init da Lambda em vez de na primeira invocação
+      PRE_INICIALIZAR = tostring(var.lambda_pre_inicializar)
     }
   }
 
@@ -436,6 +601,7 @@ resource "aws_iam_role_policy" "lambda_s3_access" {
         Action = [
           "s3:GetObject",
           "s3:PutObject",
+          "s3:DeleteObject", # Scraper: remove o marcador _MESMO_QUE.json; gatilho: substitui cópias de referência
           "s3:ListBucket"
         ]
         Resource = [
@@ -471,13 +637,18 @@ resource "aws_iam_role_policy" "lambda_policy" {
       },
       {
         Effect = "Allow"
-        Action = "glue:StartJobRun"
-        Resource = aws_glue_job.etl_job.arn
+        Action = [
+            "glue:StartJobRun",
+            "glue:GetJob",
+            "glue:GetJobRuns"
+        ]
+        Resource = [aws_glue_job.etl_job.arn, aws_glue_job.etl_job_arrow.arn]
       },
       {
         Effect = "Allow",
         Action = [
             "glue:CreatePartition",
+            "glue:BatchCreatePartition", # Scraper: registro via catalogo_glue.py
             "glue:GetTable",
             "glue:GetDatabase",
             "glue:GetPartitions",
@@ -520,6 +691,29 @@ resource "aws_s3_bucket_notification" "bovespa_raw_to_lambda" {
   depends_on = [aws_lambda_permission.allow_s3_to_call_lambda]
 }
 
+# Drenagem periódica da fila de partições adiadas por falta de slots de concorrência no Glue Job
+resource "aws_cloudwatch_event_rule" "glue_trigger_drain_schedule" {
+  name                = "${var.environment}-glue-trigger-drain-schedule"
+  description         = "Drena a fila de partições pendentes da Lambda que inicia o Glue Job."
+  schedule_expression = "rate(5 minutes)"
+  state               = var.lambda_state
+}
+
+resource "aws_lambda_permission" "allow_cloudwatch_to_call_glue_trigger" {
+  statement_id  = "${var.environment}-AllowDrainFromCloudWatch"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.lambda_inicia_glue_job.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.glue_trigger_drain_schedule.arn
+}
+
+resource "aws_cloudwatch_event_target" "glue_trigger_drain_target" {
+  rule      = aws_cloudwatch_event_rule.glue_trigger_drain_schedule.name
+  target_id = "${var.environment}-glue-trigger-drain-target"
+  arn       = aws_lambda_function.lambda_inicia_glue_job.arn
+  input     = jsonencode({ drenar = true })
+}
+
 #############################################
 #####   LAMBDA SCRAPPER SALVA PARQUET  ######
 #############################################
@@ -532,7 +726,20 @@ module "lambda_functions_scrapper" {
   handler       = "lambda_functions_scrapper.lambda_handler"
   runtime       = "python3.13"
 
-  source_path = "${path.module}/../lambda/lambda_functions_scrapper.py"
+  source_path = [
+    "${path.module}/../lambda/lambda_functions_scrapper.py",
+    # Módulo de métricas compartilhado com a Lambda de gatilho e o Glue Job
+    "${path.module}/../app/utils/instrumentacao.py",
+    # Cliente do Glue Catalog com cache de tabela e registro de partições em lote
+    "${path.module}/../app/utils/catalogo_glue.py",
+    # Leitura e gravação dos JSON de estado (último snapshot, última carteira, marcadores) no S3
+    "${path.module}/../app/utils/objetos_s3.py",
+    # Hash de conteúdo dos snapshots e marcador _MESMO_QUE.json (importa layout_particoes.py)
+    "${path.module}/../app/utils/referencias_snapshot.py",
+    "${path.module}/../app/utils/layout_particoes.py",
+    # Change-set (_ALTERACOES.json) de cada pregão em relação ao anterior
+    "${path.module}/../app/utils/alteracoes_carteira.py",
+  ]
   memory_size = 512
   timeout     = 60
   create_role = false
@@ -541,6 +748,15 @@ module "lambda_functions_scrapper" {
     S3_BUCKET_NAME     = var.bucket_name_bovespa_bruto
     GLUE_DATABASE_NAME = aws_glue_catalog_database.raw_database.name
     GLUE_TABLE_NAME    = var.table_bovespa_raw
+    B3_INDICES         = var.b3_indices
+    # Com partition projection na tabela RAW a partição diária não é registrada no catálogo
+    RAW_PARTITION_PROJECTION = tostring(var.raw_partition_projection)
+    # Dias com o mesmo conteúdo do último snapshot gravam só o marcador _MESMO_QUE.json
+    SNAPSHOT_DEDUP = tostring(var.snapshot_dedup)
+    # Entradas, saídas e mudanças de part/theoricalQty em relação ao pregão anterior em _ALTERACOES.json
+    SNAPSHOT_ALTERACOES = tostring(var.snapshot_alteracoes)
+    # requests, pyarrow e os clientes AWS carregados no init da Lambda em vez de sob demanda
+    PRE_INICIALIZAR = tostring(var.lambda_pre_inicializar)
   }
 
   layers = [var.lambda_layer_scrapper_artefatos_arn]
@@ -600,6 +816,7 @@ module "raw_layer_tables" {
   environment                = var.environment
   bucket_name_bovespa_bruto  = var.bucket_name_bovespa_bruto
   table_bovespa_raw          = var.table_bovespa_raw
+  partition_projection       = var.raw_partition_projection
   
   depends_on = [aws_glue_catalog_database.raw_database, aws_s3_bucket.bucket_bovespa_raw]
 }
@@ -612,6 +829,11 @@ module "refined_layer_tables" {
   environment                = var.environment
   bucket_name_bovespa_refinado  = var.bucket_name_bovespa_refinado
   table_bovespa_refined          = var.table_bovespa_refined
+  table_bovespa_variacoes        = var.table_bovespa_variacoes
+  table_bovespa_sumarizacao_tipo = var.table_bovespa_sumarizacao_tipo
+  table_bovespa_historico_acoes  = var.table_bovespa_historico_acoes
+  table_bovespa_carteira_atual   = var.table_bovespa_carteira_atual
+  partition_layout               = var.refined_partition_layout
   
   depends_on = [aws_glue_catalog_database.refined_database, aws_s3_bucket.bucket_bovespa_refined]
 }
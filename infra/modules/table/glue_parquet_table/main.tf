@@ -1,5 +1,22 @@
 # modules/glue_table/main.tf
 
+# Partition projection do Athena: as partições são derivadas do template de diretórios (chave=valor, na ordem
+# das partition_keys) e das propriedades de cada chave, sem partições registradas no catálogo.
+locals {
+  projection_properties = merge({}, [
+    for column, properties in var.partition_projection : {
+      for property, value in properties : "projection.${column}.${property}" => value
+    }
+  ]...)
+
+  projection_parameters = {
+    for name, value in merge({
+      "projection.enabled"        = "true"
+      "storage.location.template" = "${trimsuffix(var.s3_location, "/")}/${join("/", [for key in var.partition_keys : "${key.name}=$${${key.name}}"])}/"
+    }, local.projection_properties) : name => value if length(var.partition_projection) > 0
+  }
+}
+
 resource "aws_glue_catalog_table" "this" {
   name          = var.table_name
   database_name = var.database_name
@@ -37,12 +54,12 @@ resource "aws_glue_catalog_table" "this" {
     }
   }
 
-  parameters = {
+  parameters = merge({
     EXTERNAL = "TRUE"
     "parquet.compression" = "SNAPPY"
     classification = "parquet"
     useGlueParquetWriter = true
-  }
+  }, local.projection_parameters)
 
   #lifecycle {
   #  ignore_changes = [
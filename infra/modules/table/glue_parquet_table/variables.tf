@@ -34,6 +34,12 @@ variable "partition_keys" {
   default = [] # Por padrão, não há chaves de partição
 }
 
+variable "partition_projection" {
+  description = "Propriedades de partition projection do Athena por chave de partição (ex.: { data_pregao = { type = \"date\", ... } }). Vazio desativa a projeção."
+  type        = map(map(string))
+  default     = {}
+}
+
 variable "tags" {
   description = "Um mapa de tags para aplicar à tabela Glue."
   type        = map(string)
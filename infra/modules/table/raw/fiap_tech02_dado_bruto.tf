@@ -12,9 +12,10 @@ module "table_bovespa_raw" {
     { name = "cod", type = "string" },
     { name = "asset", type = "string" },
     { name = "type", type = "string" },
-    { name = "part", type = "string" },
-    { name = "partAcum", type = "string" },
-    { name = "theoricalQty", type = "string" }
+    { name = "part", type = "decimal(18,3)" },
+    { name = "partAcum", type = "decimal(18,3)" },
+    { name = "theoricalQty", type = "bigint" },
+    { name = "indice", type = "string" }
   ]
 
   partition_keys = [
@@ -22,6 +23,14 @@ module "table_bovespa_raw" {
     { name = "mes", type = "string" },
     { name = "dia", type = "string" },
   ]
+  # Com partition projection o scraper não registra a partição diária no catálogo
+  partition_projection = {
+    for key, properties in {
+      ano = { type = "integer", range = var.projection_year_range }
+      mes = { type = "integer", range = "1,12", digits = "2" }
+      dia = { type = "integer", range = "1,31", digits = "2" }
+    } : key => properties if var.partition_projection
+  }
   tags = {
     Layer       = "Raw"
     Source      = "Bovespa"
@@ -17,3 +17,15 @@ variable "environment" {
   description = "Ambiente de implantação."
   type        = string
 }
+
+variable "partition_projection" {
+  description = "Habilita o partition projection do Athena (ano/mes/dia) na tabela RAW."
+  type        = bool
+  default     = false
+}
+
+variable "projection_year_range" {
+  description = "Intervalo de anos (início,fim) projetado na partição 'ano' da tabela RAW."
+  type        = string
+  default     = "2020,2035"
+}
@@ -14,15 +14,13 @@ module "table_bovespa_refined" {
     { name = "nome_tipo_acao", type = "string" },
     { name = "percentual_participacao_acao", type = "decimal(18,3)" },
     { name = "percentual_participacao_acumulada", type = "decimal(18,3)" },
-    { name = "quantidade_teorica", type = "decimal(18,2)" }
+    { name = "quantidade_teorica", type = "decimal(18,2)" },
+    { name = "indice", type = "string" }
   ]
 
-  partition_keys = [
-    { name = "ano", type = "string" },
-    { name = "mes", type = "string" },
-    { name = "dia", type = "string" },
-    { name = "data_pregao", type = "date" }
-  ]
+  # Chaves e projeção conforme var.partition_layout (layout.tf)
+  partition_keys       = local.partition_keys
+  partition_projection = local.partition_projection
   tags = {
     Layer       = "Refined"
     Source      = "Bovespa"
@@ -0,0 +1,59 @@
+# modules/refined_layer/fiap_tech02_dimensao_acoes.tf
+
+# Dimensão das ações mantida pelo JobELTB3 (app/utils/dimensao_acoes.py). As duas tabelas não são
+# particionadas: cada uma é um único arquivo Parquet regravado a cada execução.
+
+# Histórico SCD tipo 2: uma versão por período com os mesmos atributos; valid_to nulo na versão vigente
+module "table_bovespa_historico_acoes" {
+  source = "../glue_parquet_table" # Caminho relativo para o módulo glue_table
+
+  table_name    = var.table_bovespa_historico_acoes
+  database_name = var.database_name
+  s3_location   = "s3://${var.bucket_name_bovespa_refinado}/${var.table_bovespa_historico_acoes}"
+
+  columns = [
+    { name = "indice", type = "string" },
+    { name = "codigo_bovespa", type = "string" },
+    { name = "segmento", type = "string" },
+    { name = "nome_acao", type = "string" },
+    { name = "nome_tipo_acao", type = "string" },
+    { name = "quantidade_teorica", type = "decimal(18,0)" },
+    { name = "percentual_participacao_acao", type = "decimal(18,3)" },
+    { name = "valid_from", type = "date", comment = "Primeiro pregão da versão" },
+    { name = "valid_to", type = "date", comment = "Pregão em que a versão deixou de valer (nulo na vigente)" }
+  ]
+
+  tags = {
+    Layer       = "Refined"
+    Source      = "Bovespa"
+    Environment = var.environment
+  }
+}
+
+# Carteira atual: uma linha por ação presente no último pregão processado
+module "table_bovespa_carteira_atual" {
+  source = "../glue_parquet_table" # Caminho relativo para o módulo glue_table
+
+  table_name    = var.table_bovespa_carteira_atual
+  database_name = var.database_name
+  s3_location   = "s3://${var.bucket_name_bovespa_refinado}/${var.table_bovespa_carteira_atual}"
+
+  columns = [
+    { name = "indice", type = "string" },
+    { name = "codigo_bovespa", type = "string" },
+    { name = "segmento", type = "string" },
+    { name = "nome_acao", type = "string" },
+    { name = "nome_tipo_acao", type = "string" },
+    { name = "quantidade_teorica", type = "decimal(18,0)" },
+    { name = "percentual_participacao_acao", type = "decimal(18,3)" },
+    { name = "valid_from", type = "date", comment = "Início da versão vigente" },
+    { name = "data_entrada", type = "date", comment = "Pregão de entrada na carteira" },
+    { name = "data_pregao", type = "date", comment = "Último pregão processado do índice" }
+  ]
+
+  tags = {
+    Layer       = "Refined"
+    Source      = "Bovespa"
+    Environment = var.environment
+  }
+}
@@ -0,0 +1,60 @@
+# modules/refined_layer/fiap_tech02_sumarizacao_tipo.tf
+
+# Agregado diário por índice e tipo de ação. Guarda somas e contagens (não médias), então qualquer
+# período é consolidado somando os parciais diários: média = soma(soma) / soma(contagem).
+module "table_bovespa_sumarizacao_tipo" {
+  source = "../glue_parquet_table" # Caminho relativo para o módulo glue_table
+
+  table_name    = var.table_bovespa_sumarizacao_tipo
+  database_name = var.database_name
+  s3_location   = "s3://${var.bucket_name_bovespa_refinado}/${var.table_bovespa_sumarizacao_tipo}"
+
+  columns = [
+    { name = "indice", type = "string" },
+    { name = "nome_tipo_acao", type = "string" },
+    { name = "soma_quantidade_teorica", type = "decimal(28,0)" },
+    { name = "contagem_quantidade_teorica", type = "bigint" },
+    { name = "soma_percentual_participacao_acao", type = "decimal(28,3)" },
+    { name = "contagem_percentual_participacao_acao", type = "bigint" }
+  ]
+
+  # Chaves e projeção conforme var.partition_layout (layout.tf)
+  partition_keys       = local.partition_keys
+  partition_projection = local.partition_projection
+  tags = {
+    Layer       = "Refined"
+    Source      = "Bovespa"
+    Environment = var.environment
+  }
+}
+
+# Consolidações mensal e anual a partir dos parciais diários (lê só a tabela agregada)
+locals {
+  rollups_sumarizacao_tipo = {
+    mensal = "%Y-%m"
+    anual  = "%Y"
+  }
+}
+
+resource "aws_athena_named_query" "rollup_sumarizacao_tipo" {
+  for_each = local.rollups_sumarizacao_tipo
+
+  name        = "${var.table_bovespa_sumarizacao_tipo}_${each.key}"
+  description = "Consolidação ${each.key} do agregado diário por tipo de ação (média = soma das somas / soma das contagens)."
+  workgroup   = var.athena_workgroup
+  database    = var.database_name
+  query       = <<-SQL
+    SELECT date_format(data_pregao, '${each.value}') AS periodo,
+           indice,
+           nome_tipo_acao,
+           sum(soma_quantidade_teorica) AS soma_quantidade_teorica,
+           sum(contagem_quantidade_teorica) AS contagem_quantidade_teorica,
+           sum(soma_quantidade_teorica) / sum(contagem_quantidade_teorica) AS media_quantidade_teorica,
+           sum(soma_percentual_participacao_acao) AS soma_percentual_participacao_acao,
+           sum(contagem_percentual_participacao_acao) AS contagem_percentual_participacao_acao,
+           sum(soma_percentual_participacao_acao) / sum(contagem_percentual_participacao_acao) AS media_percentual_participacao_acao
+    FROM "${var.database_name}"."${module.table_bovespa_sumarizacao_tipo.table_name}"
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+  SQL
+}
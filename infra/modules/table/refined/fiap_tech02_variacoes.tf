@@ -0,0 +1,31 @@
+# modules/refined_layer/fiap_tech02_variacoes.tf
+
+module "table_bovespa_variacoes" {
+  source = "../glue_parquet_table" # Caminho relativo para o módulo glue_table
+
+  table_name    = var.table_bovespa_variacoes
+  database_name = var.database_name
+  s3_location   = "s3://${var.bucket_name_bovespa_refinado}/${var.table_bovespa_variacoes}"
+
+  columns = [
+    { name = "indice", type = "string" },
+    { name = "codigo_bovespa", type = "string" },
+    { name = "quantidade_teorica", type = "decimal(18,0)" },
+    { name = "percentual_participacao_acao", type = "decimal(18,3)" },
+    { name = "quantidade_teorica_anterior", type = "decimal(18,0)" },
+    { name = "percentual_participacao_acao_anterior", type = "decimal(18,3)" },
+    { name = "variacao_quantidade_teorica", type = "decimal(19,0)" },
+    { name = "variacao_percentual_participacao_acao_anterior", type = "decimal(19,3)" },
+    { name = "intervalo", type = "int" },
+    { name = "media_movel_quantidade_teorica", type = "double" }
+  ]
+
+  # Chaves e projeção conforme var.partition_layout (layout.tf)
+  partition_keys       = local.partition_keys
+  partition_projection = local.partition_projection
+  tags = {
+    Layer       = "Refined"
+    Source      = "Bovespa"
+    Environment = var.environment
+  }
+}
@@ -0,0 +1,34 @@
+# modules/refined_layer/layout.tf
+
+# Layouts de partição das tabelas refinadas (espelham app/utils/layout_particoes.py):
+#   legado      -> ano=/mes=/dia=/data_pregao=, partições registradas no Glue Catalog pelo JobELTB3
+#   data_pregao -> data_pregao=, partition projection por data (nenhuma partição no catálogo)
+locals {
+  layout_partition_keys = {
+    legado = [
+      { name = "ano", type = "string" },
+      { name = "mes", type = "string" },
+      { name = "dia", type = "string" },
+      { name = "data_pregao", type = "date" }
+    ]
+    data_pregao = [
+      { name = "data_pregao", type = "date" }
+    ]
+  }
+
+  layout_partition_projection = {
+    legado = {}
+    data_pregao = {
+      data_pregao = {
+        type            = "date"
+        range           = "${var.projection_start_date},NOW"
+        format          = "yyyy-MM-dd"
+        interval        = "1"
+        "interval.unit" = "DAYS"
+      }
+    }
+  }
+
+  partition_keys       = local.layout_partition_keys[var.partition_layout]
+  partition_projection = local.layout_partition_projection[var.partition_layout]
+}
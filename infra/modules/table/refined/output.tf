@@ -4,6 +4,10 @@ output "refined_tables_names" {
   description = "Nomes de todas as tabelas refinadas criadas."
   value = {
     bovespa_refinado = module.table_bovespa_refined.table_name
+    bovespa_variacoes = module.table_bovespa_variacoes.table_name
+    bovespa_sumarizacao_tipo = module.table_bovespa_sumarizacao_tipo.table_name
+    bovespa_historico_acoes = module.table_bovespa_historico_acoes.table_name
+    bovespa_carteira_atual = module.table_bovespa_carteira_atual.table_name
     # Adicione aqui os nomes de outras tabelas REFINADAS conforme forem criadas
   }
 }
@@ -12,6 +16,10 @@ output "refined_tables_arns" {
   description = "ARNs de todas as tabelas refinadas criadas."
   value = {
     bovespa_refinado_arn = module.table_bovespa_refined.table_arn
+    bovespa_variacoes_arn = module.table_bovespa_variacoes.table_arn
+    bovespa_sumarizacao_tipo_arn = module.table_bovespa_sumarizacao_tipo.table_arn
+    bovespa_historico_acoes_arn = module.table_bovespa_historico_acoes.table_arn
+    bovespa_carteira_atual_arn = module.table_bovespa_carteira_atual.table_arn
     # Adicione aqui os ARNs de outras tabelas REFINADAS conforme forem criadas
   }
 }
@@ -17,3 +17,46 @@ variable "environment" {
   description = "Ambiente de implantação."
   type        = string
 }
+
+variable "table_bovespa_variacoes" {
+  description = "O nome da tabela Glue com a variação diária e a média móvel da Bovespa."
+  type        = string
+}
+
+variable "table_bovespa_sumarizacao_tipo" {
+  description = "O nome da tabela Glue com o agregado diário por tipo de ação (somas e contagens)."
+  type        = string
+}
+
+variable "table_bovespa_historico_acoes" {
+  description = "O nome da tabela Glue com o histórico SCD tipo 2 das ações da carteira."
+  type        = string
+}
+
+variable "table_bovespa_carteira_atual" {
+  description = "O nome da tabela Glue com a composição atual da carteira (uma linha por ação)."
+  type        = string
+}
+
+variable "athena_workgroup" {
+  description = "Workgroup do Athena das consultas salvas de consolidação do agregado por tipo."
+  type        = string
+  default     = "primary"
+}
+
+variable "partition_layout" {
+  description = "Layout de partição das tabelas refinadas: 'legado' (ano/mes/dia/data_pregao registradas no catálogo) ou 'data_pregao' (partition projection)."
+  type        = string
+  default     = "legado"
+
+  validation {
+    condition     = contains(["legado", "data_pregao"], var.partition_layout)
+    error_message = "partition_layout deve ser 'legado' ou 'data_pregao'."
+  }
+}
+
+variable "projection_start_date" {
+  description = "Primeiro pregão (yyyy-MM-dd) do intervalo projetado no layout 'data_pregao'."
+  type        = string
+  default     = "2020-01-01"
+}
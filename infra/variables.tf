@@ -32,6 +32,30 @@ variable "table_bovespa_refined" {
   type        = string
 }
 
+variable "table_bovespa_variacoes" {
+  description = "O nome da tabela Glue com a variação diária e a média móvel calculadas pelo Glue Job."
+  type        = string
+  default     = "tb_fiap_tech02_bovespa_variacoes"
+}
+
+variable "table_bovespa_historico_acoes" {
+  description = "O nome da tabela Glue com o histórico SCD tipo 2 das ações da carteira mantido pelo Glue Job."
+  type        = string
+  default     = "tb_fiap_tech02_bovespa_historico_acoes"
+}
+
+variable "table_bovespa_carteira_atual" {
+  description = "O nome da tabela Glue com a composição atual da carteira mantida pelo Glue Job."
+  type        = string
+  default     = "tb_fiap_tech02_bovespa_carteira_atual"
+}
+
+variable "table_bovespa_sumarizacao_tipo" {
+  description = "O nome da tabela Glue com o agregado diário por tipo de ação (somas e contagens) mantido pelo Glue Job."
+  type        = string
+  default     = "tb_fiap_tech02_bovespa_sumarizacao_tipo"
+}
+
 variable "bucket_name_artefatos" {
   description = "The name of the S3 bucket armazenar os scripts."
   type        = string
@@ -48,6 +72,72 @@ variable "lambda_name_scrap_b3" {
   type        = string
 }
 
+variable "b3_indices" {
+  description = "Lista de índices da B3 (separados por vírgula) raspados pela Lambda, ex: IBOV,IBXX,SMLL,IDIV."
+  type        = string
+  default     = "IBOV"
+}
+
+variable "trigger_debounce_seconds" {
+  description = "Janela (em segundos) em que uploads na camada RAW são agrupados em uma única execução do Glue Job. 0 desativa o debounce."
+  type        = string
+  default     = "15"
+}
+
+variable "glue_max_concurrent_runs" {
+  description = "Número máximo de execuções simultâneas do Glue Job (também usado pela Lambda para controlar a admissão)."
+  type        = number
+  default     = 1
+}
+
+variable "glue_quality_checks" {
+  description = "Valida os dados transformados pelo Glue Job (nulos, negativos, duplicadas e soma das participações) antes da gravação; uma regra acima do limite de falha interrompe o job."
+  type        = bool
+  default     = true
+}
+
+variable "glue_quality_thresholds" {
+  description = "Limites das regras de qualidade do Glue Job no formato regra=alerta:falha,... (limite vazio ou '-' desativa o nível). Vazio mantém os limites padrão de app/utils/qualidade_dados.py."
+  type        = string
+  default     = ""
+}
+
+variable "compactacao_schedule" {
+  description = "Agendamento (cron do Glue) da compactação mensal dos arquivos pequenos das tabelas refinadas."
+  type        = string
+  default     = "cron(0 6 1 * ? *)"
+}
+
+variable "refined_partition_layout" {
+  description = "Layout de partição das tabelas refinadas: 'legado' ou 'data_pregao' (partition projection). Migre os dados com app/src/migracao_layout.py antes de trocar."
+  type        = string
+  default     = "legado"
+}
+
+variable "raw_partition_projection" {
+  description = "Habilita o partition projection na tabela RAW; o scraper deixa de registrar a partição diária no Glue Catalog."
+  type        = bool
+  default     = true
+}
+
+variable "snapshot_dedup" {
+  description = "Quando as carteiras raspadas têm o mesmo hash do último snapshot, o scraper grava só um marcador e a Lambda de gatilho copia a partição refinada da referência, sem iniciar o Glue Job."
+  type        = bool
+  default     = true
+}
+
+variable "snapshot_alteracoes" {
+  description = "O scraper grava na partição RAW de cada pregão gravado o _ALTERACOES.json com as entradas, saídas e mudanças de participação e quantidade teórica em relação ao pregão anterior."
+  type        = bool
+  default     = true
+}
+
+variable "lambda_pre_inicializar" {
+  description = "Cria os clientes AWS e a sessão HTTP (e importa o pyarrow no scraper) no init das Lambdas, antes da primeira invocação. Útil com provisioned concurrency; sem ela o init entra no cold start da primeira invocação."
+  type        = bool
+  default     = false
+}
+
 variable "lambda_name_inicia_glue_job" {
   description = "The name of the Lambda function that starts the Glue job."
   type        = string
@@ -81,4 +171,22 @@ variable "glue_job_sg_id" {
 
 variable "lambda_state" {
   type = string
-}
\ No newline at end of file
+}
+
+variable "glue_engine" {
+  description = "Job iniciado pela Lambda de gatilho: 'spark' (glueetl) ou 'arrow' (Python shell com --ENGINE arrow, sem Spark)."
+  type        = string
+  default     = "spark"
+}
+
+variable "glue_arrow_max_capacity" {
+  description = "DPUs do job Python shell do motor Arrow (0.0625 ou 1)."
+  type        = number
+  default     = 1
+}
+
+variable "glue_pyarrow_version" {
+  description = "Versão do pyarrow instalada (--additional-python-modules) nos jobs Python shell do Glue."
+  type        = string
+  default     = "14.0.2"
+}
@@ -1,45 +1,537 @@
 import json
-import boto3
 import os
+import random
+import time
+import threading
+import uuid
 import urllib.parse
+from botocore.exceptions import ClientError
+from instrumentacao import Instrumentacao  # empacotado junto da Lambda a partir de app/utils
+from catalogo_glue import CatalogoGlue  # idem
+from objetos_s3 import atualizar_json, cliente_s3, ler_json  # idem
+from referencias_snapshot import MARCADOR_REFERENCIA, ReplicadorReferencias  # idem
 
-glue = boto3.client('glue')
+# Clientes criados uma única vez por container e reaproveitados nas invocações "quentes" (ver get_glue_client)
+_glue_client = None
+_s3_client = None
 
-def lambda_handler(event, context):
-    glue_job_name = os.environ.get('GLUE_JOB_NAME')
+# Métricas das chamadas ao Glue em EMF no stdout (mesmo esquema do scraper e do JobELTB3)
+instrumentacao = Instrumentacao('gatilho_glue')
+
+# Janela de debounce: uploads que chegam dentro dela são agrupados em uma única execução do Glue (0 desativa)
+DEBOUNCE_SECONDS = float(os.environ.get('DEBOUNCE_SECONDS', '0'))
+
+# Pendentes registrados há mais tempo que isto sem serem reivindicados pertencem a uma invocação que morreu
+# (timeout, erro) durante o debounce; qualquer invocação, inclusive a drenagem agendada, os assume. Precisa
+# ser maior que o timeout da Lambda para nunca tomar o lote de uma invocação ainda viva.
+PENDENTES_EXPIRACAO_SECONDS = float(os.environ.get('PENDENTES_EXPIRACAO_SECONDS', '120'))
+
+# Objeto S3 que guarda as partições pendentes entre invocações concorrentes da Lambda
+TRIGGER_STATE_BUCKET = os.environ.get('TRIGGER_STATE_BUCKET')
+TRIGGER_STATE_KEY = os.environ.get('TRIGGER_STATE_KEY', 'glue-trigger/pending.json')
+
+# Limite de execuções simultâneas do job; quando ausente é lido do ExecutionProperty do job
+GLUE_MAX_CONCURRENT_RUNS = os.environ.get('GLUE_MAX_CONCURRENT_RUNS')
+
+# Máximo de partições enviadas em um único --INPUT_PATHS
+MAX_PARTICOES_POR_EXECUCAO = int(os.environ.get('MAX_PARTICOES_POR_EXECUCAO', '100'))
+
+# Prazo do lease de um lote retirado da fila: se a invocação morrer antes de confirmar o start_job_run,
+# o lote volta para a fila na próxima drenagem. Também precisa ser maior que o timeout da Lambda.
+LEASE_LOTE_SECONDS = float(os.environ.get('LEASE_LOTE_SECONDS', '120'))
+
+# Tabelas refinadas replicadas pela própria Lambda quando o scraper grava o marcador _MESMO_QUE.json
+# (conteúdo igual ao de um pregão anterior), sem iniciar o Glue Job; vazio envia os marcadores ao job
+REFINED_DATABASE_NAME = os.environ.get('REFINED_DATABASE_NAME')
+REFERENCE_TABLES = [nome.strip() for nome in os.environ.get('REFERENCE_TABLES', '').split(',') if nome.strip()]
+
+# Pré-inicialização no carregamento do módulo (init da Lambda): importa o boto3 e cria os clientes antes da
+# primeira invocação (ver pre_inicializar)
+PRE_INICIALIZAR = os.environ.get('PRE_INICIALIZAR', 'false').strip().lower() in ('true', '1', 'yes', 'sim')
+
+
+def get_glue_client():
+    """
+    Retorna o cliente Glue, criando-o (e importando o boto3) apenas na primeira chamada do container.
+    """
+    global _glue_client
+    if _glue_client is None:
+        import boto3
+        _glue_client = boto3.client('glue')
+    return _glue_client
+
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
 
-    # Extract bucket and object key from the S3 event
+
+def _chave_objeto(record):
+    s3_info = record.get('s3', {})
+    bucket_name = s3_info.get('bucket', {}).get('name')
+    encoded_key = s3_info.get('object', {}).get('key')
+    if not bucket_name or not encoded_key:
+        print("Bucket ou chave não encontrados no registro do evento. Pulando.")
+        return None, None
+    # Decodifica a chave do objeto S3 (ex: converte %3D para =)
+    return bucket_name, urllib.parse.unquote_plus(encoded_key)
+
+
+def extrair_particoes(event):
+    """
+    Agrupa os registros do evento S3 no conjunto de diretórios de partição distintos.
+    Vários objetos no mesmo ano=/mes=/dia= resultam em um único caminho. Objetos em caminhos
+    iniciados por '_' (marcadores e estado do scraper) não são dados e ficam de fora.
+
+    Returns:
+        list: caminhos s3://bucket/<prefixo da partição>/ ordenados e sem repetição.
+    """
+    particoes = set()
     for record in event.get('Records', []):
-        s3_info = record.get('s3', {})
-        bucket_name = s3_info.get('bucket', {}).get('name')
-        encoded_key = s3_info.get('object', {}).get('key')
-        
-        if not bucket_name or not encoded_key:
-            print("Bucket ou chave não encontrados no registro do evento. Pulando.")
+        bucket_name, object_key = _chave_objeto(record)
+        if not object_key:
+            continue
+        if any(parte.startswith("_") for parte in object_key.split("/")):
             continue
 
-        # Decodifica a chave do objeto S3 (ex: converte %3D para =)
-        object_key = urllib.parse.unquote_plus(encoded_key)
-        
         # OBTÉM O DIRETÓRIO DA PARTIÇÃO, NÃO O CAMINHO DO ARQUIVO.
         # Isso permite que o Spark infira as colunas de partição (ano, mes, dia) da estrutura de pastas.
         partition_directory = os.path.dirname(object_key)
-        
+
         # Constrói o caminho completo do S3 para o DIRETÓRIO da partição
-        s3_source_path = f"s3://{bucket_name}/{partition_directory}/"
-
-        try:
-            # Start Glue job
-            response = glue.start_job_run(
-                JobName=glue_job_name,
-                Arguments={'--INPUT_PATH': s3_source_path} # Sobrescreve o argumento padrão com o caminho do DIRETÓRIO da partição
-            )
-            print(f"Job do Glue iniciado: {response['JobRunId']} para a partição: {s3_source_path}")
-        except Exception as e:
-            print(f"Erro ao iniciar o job do Glue: {e}")
-            raise e
+        particoes.add(f"s3://{bucket_name}/{partition_directory}/")
+    return sorted(particoes)
+
+
+def extrair_referencias(event):
+    """
+    Partições (s3://bucket/<prefixo da partição>/) em que o scraper gravou o marcador _MESMO_QUE.json.
+    """
+    referencias = set()
+    for record in event.get('Records', []):
+        bucket_name, object_key = _chave_objeto(record)
+        if object_key and os.path.basename(object_key) == MARCADOR_REFERENCIA:
+            referencias.add(f"s3://{bucket_name}/{os.path.dirname(object_key)}/")
+    return sorted(referencias)
+
+
+def replicar_referencias(replicador, referencias, instrumentacao_etapas=None):
+    """
+    Copia a partição refinada do pregão de referência para cada partição marcada, sem o Glue Job.
+
+    Returns:
+        list: partições cuja referência ainda não tem partição refinada; seguem para o Glue Job, que
+              processa a referência e refaz a cópia.
+    """
+    instrumentacao_etapas = instrumentacao_etapas or instrumentacao
+    pendentes = []
+    for particao in referencias:
+        with instrumentacao_etapas.etapa("replicacao_referencia") as medicao:
+            marcador = replicador.ler_marcador(particao)
+            if marcador is None:
+                # O scraper trocou o marcador por dados próprios; o evento dos Parquet cuida da partição
+                print(f"Marcador de {particao} não existe mais. Nada a replicar.")
+                continue
+            copiados, faltantes = replicador.replicar(particao, marcador)
+            medicao.registrar(particoes=1, arquivos=sum(copiados.values()))
+        if faltantes:
+            print(f"Referência {marcador['data_referencia']} ainda sem partição refinada em {faltantes}: "
+                  f"{particao} segue para o Glue Job.")
+            pendentes.append(particao)
+    return pendentes
+
+
+class MemoriaEstadoStore:
+    """
+    Armazena o estado do debounce em memória. Usado em testes e execuções locais
+    no lugar do S3EstadoStore; o lock garante a mesma atomicidade do compare-and-swap.
+    """
+
+    def __init__(self):
+        self.estado = {}
+        self.lock = threading.Lock()
+
+    def ler(self):
+        with self.lock:
+            return dict(self.estado)
+
+    def atualizar(self, funcao):
+        with self.lock:
+            novo_estado, retorno = funcao(dict(self.estado))
+            self.estado = novo_estado
+            return retorno
+
+
+class S3EstadoStore:
+    """
+    Armazena o estado do debounce em um objeto JSON no S3.
+    Cada atualização é um compare-and-swap (objetos_s3.atualizar_json): grava com IfMatch (ETag lido) ou
+    IfNoneMatch (objeto novo) e repete a leitura caso outra invocação tenha alterado o objeto nesse meio tempo.
+    """
+
+    def __init__(self, bucket, key, s3_client=None, max_tentativas=10):
+        self.caminho = f"s3://{bucket}/{key}"
+        self.s3 = cliente_s3(s3_client)
+        self.max_tentativas = max_tentativas
+
+    def ler(self):
+        return ler_json(self.caminho, self.s3) or {}
+
+    def atualizar(self, funcao):
+        return atualizar_json(self.caminho, lambda estado: funcao(estado or {}), self.s3,
+                              max_tentativas=self.max_tentativas)
+
+
+def registrar_pendentes(store, particoes, token, agora=None):
+    """
+    Adiciona as partições ao conjunto pendente e marca esta invocação como a mais recente.
+    """
+    agora = agora if agora is not None else time.time()
+
+    def _registrar(estado):
+        pendentes = sorted(set(estado.get('pendentes', [])) | set(particoes))
+        return dict(estado, pendentes=pendentes, token=token, atualizado_em=agora), pendentes
+
+    return store.atualizar(_registrar)
+
+
+def reivindicar_pendentes(store, token, expiracao_seconds=None, agora=None):
+    """
+    Se nenhuma outra invocação registrou partições depois desta, assume o lote pendente
+    (esvaziando o estado) e o retorna. Caso contrário retorna uma lista vazia: a invocação
+    mais recente será a responsável por iniciar o job.
+
+    Com expiracao_seconds, o lote também é assumido quando o último registro tem mais que esse
+    tempo: a invocação responsável morreu antes de reivindicá-lo (token=None só assume lotes expirados).
+    """
+    agora = agora if agora is not None else time.time()
+
+    def _reivindicar(estado):
+        pendentes = estado.get('pendentes', [])
+        expirado = (expiracao_seconds is not None and pendentes
+                    and agora - estado.get('atualizado_em', 0) >= expiracao_seconds)
+        if not expirado and (token is None or estado.get('token') != token):
+            return estado, []
+        return dict(estado, pendentes=[], token=None), pendentes
+
+    return store.atualizar(_reivindicar)
+
+
+class AgendadorGlueJob:
+    """
+    Fila de partições pendentes com controle de admissão para o Glue Job.
+
+    As partições ficam na fila persistida no store (mesmo objeto de estado do debounce) e só
+    são despachadas enquanto houver slots livres de concorrência, verificados via get_job_runs.
+    Se o Glue ainda assim recusar a execução (ConcurrentRunsExceededException) ou limitar as
+    chamadas, a tentativa é repetida com backoff exponencial com jitter; esgotadas as tentativas,
+    o lote volta para a fila e será despachado na próxima drenagem (nenhuma partição é perdida).
+
+    Um lote retirado da fila fica em 'em_andamento' sob um lease (token + expira_em) até o
+    start_job_run devolver o JobRunId; só então é removido. Se a invocação morrer no meio (timeout),
+    a drenagem seguinte devolve à fila os leases expirados. A entrega é "pelo menos uma vez": um job
+    iniciado cuja confirmação se perdeu pode ser iniciado de novo, o que o JobELTB3 tolera (sobrescreve
+    as partições).
+    """
+
+    ESTADOS_ATIVOS = {'STARTING', 'RUNNING', 'STOPPING', 'WAITING'}
+    ERROS_REPETIVEIS = {'ConcurrentRunsExceededException', 'ThrottlingException'}
+
+    def __init__(self, glue_client, job_name, store, max_concurrent_runs=None,
+                 max_particoes_por_execucao=MAX_PARTICOES_POR_EXECUCAO, max_tentativas=5,
+                 backoff_base=1.0, backoff_max=20.0, sleep=time.sleep, relogio=time.time,
+                 instrumentacao_etapas=None, lease_seconds=LEASE_LOTE_SECONDS):
+        self.glue = glue_client
+        self.job_name = job_name
+        self.store = store
+        self.max_concurrent_runs = max_concurrent_runs
+        self.max_particoes_por_execucao = max_particoes_por_execucao
+        self.max_tentativas = max_tentativas
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+        self.relogio = relogio
+        self.instrumentacao = instrumentacao_etapas or instrumentacao
+        self.lease_seconds = lease_seconds
+
+    def limite_concorrencia(self):
+        if self.max_concurrent_runs is None:
+            job = self.glue.get_job(JobName=self.job_name)['Job']
+            self.max_concurrent_runs = int(job.get('ExecutionProperty', {}).get('MaxConcurrentRuns', 1))
+        return self.max_concurrent_runs
+
+    def execucoes_ativas(self):
+        # get_job_runs retorna as execuções mais recentes primeiro; as ativas estão sempre na primeira página
+        response = self.glue.get_job_runs(JobName=self.job_name, MaxResults=200)
+        return sum(1 for run in response.get('JobRuns', []) if run.get('JobRunState') in self.ESTADOS_ATIVOS)
+
+    def slots_livres(self):
+        return max(self.limite_concorrencia() - self.execucoes_ativas(), 0)
+
+    def enfileirar(self, particoes):
+        """
+        Adiciona partições à fila (sem duplicar as que já aguardam) e retorna a profundidade da fila.
+        """
+        agora = self.relogio()
+
+        def _enfileirar(estado):
+            fila = list(estado.get('fila', []))
+            presentes = {item['particao'] for item in fila}
+            fila.extend({'particao': p, 'enfileirado_em': agora} for p in particoes if p not in presentes)
+            return dict(estado, fila=fila), len(fila)
+
+        return self.store.atualizar(_enfileirar)
+
+    def _retirar_lote(self):
+        """
+        Move o próximo lote da fila para 'em_andamento' sob um lease novo.
+
+        Returns:
+            tuple: (token do lease, lote); lote vazio quando a fila está vazia.
+        """
+        token = str(uuid.uuid4())
+        expira_em = self.relogio() + self.lease_seconds
+
+        def _retirar(estado):
+            fila = list(estado.get('fila', []))
+            lote, restante = fila[:self.max_particoes_por_execucao], fila[self.max_particoes_por_execucao:]
+            if not lote:
+                return estado, []
+            em_andamento = dict(estado.get('em_andamento', {}), **{token: {'lote': lote, 'expira_em': expira_em}})
+            return dict(estado, fila=restante, em_andamento=em_andamento), lote
+
+        return token, self.store.atualizar(_retirar)
+
+    def _confirmar_lote(self, token):
+        # start_job_run devolveu o JobRunId: o lote sai do estado
+        def _confirmar(estado):
+            em_andamento = {t: lease for t, lease in estado.get('em_andamento', {}).items() if t != token}
+            return dict(estado, em_andamento=em_andamento), None
+
+        return self.store.atualizar(_confirmar)
+
+    def _devolver_lote(self, token):
+        # Devolve ao início da fila preservando o horário original de enfileiramento
+        def _devolver(estado):
+            em_andamento = dict(estado.get('em_andamento', {}))
+            lease = em_andamento.pop(token, None)
+            lote = lease['lote'] if lease else []
+            presentes = {item['particao'] for item in lote}
+            fila = lote + [item for item in estado.get('fila', []) if item['particao'] not in presentes]
+            return dict(estado, fila=fila, em_andamento=em_andamento), len(fila)
+
+        return self.store.atualizar(_devolver)
+
+    def recuperar_leases_expirados(self):
+        """
+        Devolve ao início da fila os lotes cujo lease expirou (invocação que morreu entre a retirada
+        do lote e a confirmação do start_job_run).
+
+        Returns:
+            int: partições devolvidas.
+        """
+        agora = self.relogio()
+
+        def _recuperar(estado):
+            em_andamento, devolvidos = {}, []
+            for token, lease in estado.get('em_andamento', {}).items():
+                if lease['expira_em'] <= agora:
+                    devolvidos.extend(lease['lote'])
+                else:
+                    em_andamento[token] = lease
+            if not devolvidos:
+                return estado, 0
+            presentes = {item['particao'] for item in devolvidos}
+            fila = devolvidos + [item for item in estado.get('fila', []) if item['particao'] not in presentes]
+            return dict(estado, fila=fila, em_andamento=em_andamento), len(devolvidos)
+
+        devolvidas = self.store.atualizar(_recuperar)
+        if devolvidas:
+            print(f"[AgendadorGlueJob] {devolvidas} partição(ões) de leases expirados devolvida(s) à fila.")
+        return devolvidas
+
+    def profundidade_fila(self):
+        return len(self.store.ler().get('fila', []))
+
+    def _espera_backoff(self, tentativa):
+        # Full jitter: espera aleatória entre 0 e o teto exponencial da tentativa
+        teto = min(self.backoff_max, self.backoff_base * (2 ** tentativa))
+        espera = random.uniform(0, teto)
+        self.sleep(espera)
+        return espera
+
+    def _iniciar_com_backoff(self, particoes):
+        for tentativa in range(self.max_tentativas):
+            try:
+                with self.instrumentacao.etapa("start_job_run", JobName=self.job_name) as medicao:
+                    medicao.registrar(particoes=len(particoes), tentativas=tentativa + 1)
+                    return iniciar_job(self.glue, self.job_name, particoes)
+            except ClientError as e:
+                codigo = e.response['Error']['Code']
+                if codigo not in self.ERROS_REPETIVEIS:
+                    raise
+                espera = self._espera_backoff(tentativa)
+                print(f"[AgendadorGlueJob] {codigo} (tentativa {tentativa + 1}/{self.max_tentativas}). "
+                      f"Nova tentativa em {espera:.2f}s.")
+        return None
+
+    def drenar(self):
+        """
+        Despacha lotes da fila enquanto houver slots livres.
+
+        Returns:
+            dict: execuções iniciadas, profundidade restante da fila e tempo de espera dos lotes despachados.
+        """
+        relatorio = {'execucoes': [], 'lotes_adiados': 0, 'leases_recuperados': self.recuperar_leases_expirados()}
+        while True:
+            livres = self.slots_livres()
+            if livres <= 0:
+                print("[AgendadorGlueJob] Sem slots de concorrência livres. Lotes permanecem na fila.")
+                break
+
+            token, lote = self._retirar_lote()
+            if not lote:
+                break
+
+            particoes = [item['particao'] for item in lote]
+            try:
+                job_run_id = self._iniciar_com_backoff(particoes)
+            except Exception:
+                self._devolver_lote(token)
+                raise
+            if job_run_id is None:
+                self._devolver_lote(token)
+                relatorio['lotes_adiados'] += 1
+                break
+            self._confirmar_lote(token)
+
+            espera = self.relogio() - min(item['enfileirado_em'] for item in lote)
+            relatorio['execucoes'].append({'job_run_id': job_run_id, 'particoes': particoes, 'espera_s': round(espera, 3)})
+
+        relatorio['profundidade_fila'] = self.profundidade_fila()
+        relatorio['espera_max_s'] = max((e['espera_s'] for e in relatorio['execucoes']), default=0)
+        print(f"[AgendadorGlueJob] {json.dumps(relatorio)}")
+        return relatorio
+
+
+def iniciar_job(glue_client, glue_job_name, particoes):
+    """
+    Inicia uma única execução do Glue para o lote de partições, passadas em --INPUT_PATHS
+    (separadas por vírgula). --INPUT_PATH recebe a primeira para compatibilidade.
+    """
+    response = glue_client.start_job_run(
+        JobName=glue_job_name,
+        Arguments={
+            '--INPUT_PATH': particoes[0],
+            '--INPUT_PATHS': ','.join(particoes),
+        }
+    )
+    print(f"Job do Glue iniciado: {response['JobRunId']} para as partições: {particoes}")
+    return response['JobRunId']
+
+
+def criar_store():
+    if TRIGGER_STATE_BUCKET:
+        return S3EstadoStore(TRIGGER_STATE_BUCKET, TRIGGER_STATE_KEY, get_s3_client())
+    return MemoriaEstadoStore()
+
+
+def criar_replicador(glue_client):
+    if REFINED_DATABASE_NAME and REFERENCE_TABLES:
+        return ReplicadorReferencias(CatalogoGlue(glue_client), REFINED_DATABASE_NAME, REFERENCE_TABLES,
+                                     s3_client=get_s3_client())
+    return None
+
+
+def pre_inicializar():
+    """
+    Antecipa o trabalho que a primeira invocação faria: cria o cliente Glue e, com o estado do
+    debounce no S3, o cliente S3 do store. Chamada no carregamento do módulo com PRE_INICIALIZAR=true
+    ou pelo evento {"aquecimento": true}.
+    """
+    get_glue_client()
+    if TRIGGER_STATE_BUCKET:
+        get_s3_client()
+
+
+def lambda_handler(event, context, glue_client=None, store=None, debounce_seconds=None, sleep=time.sleep,
+                   replicador=None):
+    """
+    Eventos do S3 enfileiram as partições afetadas (após o debounce) e drenam a fila.
+    Marcadores _MESMO_QUE.json do scraper são resolvidos aqui, copiando as partições refinadas
+    da referência; só os que não puderem ser copiados seguem para o Glue Job.
+    Eventos agendados com {"drenar": true} apenas drenam a fila de partições adiadas (e os lotes
+    de debounce e leases expirados, ver reivindicar_pendentes e AgendadorGlueJob).
+    Eventos {"aquecimento": true} só pré-inicializam o container (ver pre_inicializar).
+    """
+    if event.get('aquecimento'):
+        pre_inicializar()
+        return {
+            'statusCode': 200,
+            'body': json.dumps('Container pre-initialized.')
+        }
+
+    glue_job_name = os.environ.get('GLUE_JOB_NAME')
+    glue_client = glue_client or get_glue_client()
+    debounce_seconds = DEBOUNCE_SECONDS if debounce_seconds is None else debounce_seconds
+    store = store or criar_store()
+    max_concurrent_runs = int(GLUE_MAX_CONCURRENT_RUNS) if GLUE_MAX_CONCURRENT_RUNS else None
+    agendador = AgendadorGlueJob(glue_client, glue_job_name, store, max_concurrent_runs=max_concurrent_runs, sleep=sleep)
+
+    particoes = extrair_particoes(event)
+    referencias = extrair_referencias(event)
+    if referencias:
+        replicador = replicador or criar_replicador(glue_client)
+        pendentes = replicar_referencias(replicador, referencias) if replicador else referencias
+        print(f"{len(referencias)} partição(ões) iguais a pregões anteriores; {len(pendentes)} seguem para o Glue Job.")
+        particoes = sorted(set(particoes) | set(pendentes))
+
+    # Lote de debounce de uma invocação que morreu antes de reivindicá-lo: vai direto para a fila
+    orfas = reivindicar_pendentes(store, None, PENDENTES_EXPIRACAO_SECONDS) if debounce_seconds > 0 else []
+    if orfas:
+        print(f"Lote pendente sem reivindicação há mais de {PENDENTES_EXPIRACAO_SECONDS}s assumido por esta "
+              f"invocação: {orfas}")
+
+    if not particoes and not orfas and not event.get('drenar'):
+        print("Nenhuma partição encontrada no evento.")
+        return {
+            'statusCode': 200,
+            'body': json.dumps('No partitions to process.')
+        }
+
+    if particoes and debounce_seconds > 0:
+        token = getattr(context, 'aws_request_id', None) or str(uuid.uuid4())
+        pendentes = registrar_pendentes(store, particoes, token)
+        print(f"Partições pendentes: {pendentes}. Aguardando {debounce_seconds}s por novos uploads ...")
+        sleep(debounce_seconds)
+
+        particoes = reivindicar_pendentes(store, token)
+        if not particoes and not orfas:
+            print("Uma invocação mais recente assumiu o lote pendente. Nenhum job iniciado por esta.")
+            return {
+                'statusCode': 200,
+                'body': json.dumps('Partitions deferred to a newer invocation.')
+            }
+
+    particoes = sorted(set(particoes) | set(orfas))
+    if particoes:
+        profundidade = agendador.enfileirar(particoes)
+        print(f"{len(particoes)} partição(ões) enfileirada(s). Profundidade da fila: {profundidade}")
+
+    try:
+        relatorio = agendador.drenar()
+    except Exception as e:
+        print(f"Erro ao iniciar o job do Glue: {e}")
+        raise e
 
     return {
         'statusCode': 200,
-        'body': json.dumps('Glue job triggered successfully.')
-    }
\ No newline at end of file
+        'body': json.dumps({'message': 'Glue job scheduling completed.', **relatorio})
+    }
+
+
+if PRE_INICIALIZAR:
+    pre_inicializar()
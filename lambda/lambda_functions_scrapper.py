@@ -1,20 +1,491 @@
-import requests
-import pandas as pd
 import base64
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import boto3 # Importa a biblioteca boto3 para interagir com serviços AWS como S3 e Glue
+# requests, pyarrow e boto3 são importados sob demanda (ver get_http_session, tipar_carteira e get_s3_client):
+# o cold start só carrega o que a invocação usa (um dia deduplicado não importa o pyarrow nem cria o cliente Glue)
+from instrumentacao import Instrumentacao  # empacotado junto da Lambda a partir de app/utils
+from catalogo_glue import CatalogoGlue  # empacotado junto da Lambda a partir de app/utils
+from objetos_s3 import gravar_json, ler_json  # idem
+from referencias_snapshot import CHAVE_ULTIMO_SNAPSHOT, MARCADOR_REFERENCIA, decidir_gravacao, hash_carteiras  # idem
+from alteracoes_carteira import ARQUIVO_ALTERACOES, CHAVE_ULTIMA_CARTEIRA, calcular_alteracoes  # idem
+
+# Métricas das etapas (HTTP, tipagem, serialização, upload, catálogo) em EMF no stdout
+instrumentacao = Instrumentacao('scraper_b3')
+
+# Endpoint da API da B3. Pode ser sobrescrito (ex: por um servidor HTTP local em testes).
+B3_API_URL = os.environ.get('B3_API_URL', 'https://sistemaswebb3-listados.b3.com.br/indexProxy/indexCall/GetPortfolioDay')
+
+# Índices raspados quando o evento não informa a lista (separados por vírgula)
+DEFAULT_INDICES = os.environ.get('B3_INDICES', 'IBOV')
+
+# Número máximo de requisições simultâneas (e de conexões mantidas no pool da sessão)
+MAX_WORKERS = int(os.environ.get('SCRAPER_MAX_WORKERS', '8'))
+
+# Com partition projection na tabela RAW o Athena deriva as partições do template ano=/mes=/dia= da tabela,
+# então a partição diária não é registrada no Glue Catalog
+RAW_PARTITION_PROJECTION = os.environ.get('RAW_PARTITION_PROJECTION', 'false').strip().lower() in ('true', '1', 'yes', 'sim')
+
+# Com a deduplicação, um dia cujas carteiras têm o mesmo hash do último snapshot gravado recebe só o marcador
+# _MESMO_QUE.json (ver referencias_snapshot.py) em vez dos Parquet; o evento {"forcar_gravacao": true} a ignora
+SNAPSHOT_DEDUP = os.environ.get('SNAPSHOT_DEDUP', 'true').strip().lower() in ('true', '1', 'yes', 'sim')
+
+# Grava na partição do dia o _ALTERACOES.json (entradas, saídas e mudanças de part/theoricalQty em relação ao
+# pregão anterior), ver alteracoes_carteira.py
+SNAPSHOT_ALTERACOES = os.environ.get('SNAPSHOT_ALTERACOES', 'true').strip().lower() in ('true', '1', 'yes', 'sim')
+
+HEADERS = {
+    'accept': 'application/json, text/plain, */*',
+    'accept-language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
+    'priority': 'u=1, i',
+    'referer': 'https://sistemaswebb3-listados.b3.com.br/',
+    'sec-ch-ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
+    'sec-ch-ua-mobile': '?0',
+    'sec-ch-ua-platform': '"Windows"',
+    'sec-fetch-dest': 'empty',
+    'sec-fetch-mode': 'cors',
+    'sec-fetch-site': 'same-origin',
+    'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
+}
+
+COOKIES = {
+    'dtCookie': 'v_4_srv_33_sn_EF806CE73FE8BBD5C0D54D237CBD205A_perc_100000_ol_0_mul_1_app-3Afd69ce40c52bd20e_1_rcs-3Acss_0',
+    'TS01f22489': '011d592ce16320141a792061e1a696fbef13c9366c2502598ba5b2f594a78722fd9d91be276b04b12134b0a49acb8bee72e9594a3f',
+    '__cf_bm': 'OB4vV2_4HEqWf1U4mQeMHvq8DgRU78IQMqvcJRMyL2w-1752197046-1.0.1.1-_Bnti5dOBgLhb9wFvxkOoofq7c6HHiK6bJPmn.d9P6Wf_5E17_RzBoii_ln4Ay4toEh_7xZrQZLh18AQoljr6QzKfGxUD3qN5kE3KKJfaNw',
+    'rxVisitor': '175219705569175MI2Q1DBDQD8KEALKEF8CC4ITVPDBCU',
+    'dtSa': '-',
+    '_gid': 'GA1.3.1901695088.1752197056',
+    '_gat_gtag_UA_94042116_5': '1',
+    'cf_clearance': 'YlZoFB6yFHfTG1Iu.J3qI5tFP.5dAfnRWRJ5GR.KAMw-1752197047-1.2.1.1-pcf4maBLPXWuabusJ6tr.JukQZIVXVYORbQQqF48Srd0lL05eNVVDlXwEWT7zJMURnAoKXIGoOfCruWrfoC3yHtJFCSyEjRDzN58v0WQEBvF1p5CC7U_XBHsARSYRTb4Jn_beUsGCwUfl5gx6mic3kwvWS0.xV.BpOoBS2dBM2_ACTvcgrc8HP6_ssrJYlR1T_0MCrC_jNSDIzAUpZKsZNEviX7PgvmBpa9ds9eTS9w',
+    '_ga_CNJN5WQC5G': 'GS2.1.s1752197056$o6$g0$t1752197056$j60$l0$h0',
+    '_ga': 'GA1.1.1938705953.1748994657',
+    'rxvt': '1752198856273|1752197055693',
+    'dtPC': '33$197055688_265h-vKAGMFUKJLALWFRDSADNBQFGVTMOFAHOE-0e0'
+}
+
+# Tabelas Arrow acima deste tamanho são gravadas em streaming via multipart upload em vez de um único put_object.
+# As partes do multipart precisam ter no mínimo 5 MB (exceto a última).
+MULTIPART_THRESHOLD_BYTES = int(os.environ.get('PARQUET_MULTIPART_THRESHOLD_BYTES', str(16 * 1024 * 1024)))
+MULTIPART_CHUNK_BYTES = max(int(os.environ.get('PARQUET_MULTIPART_CHUNK_BYTES', str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+PARQUET_ROW_GROUP_ROWS = int(os.environ.get('PARQUET_ROW_GROUP_ROWS', '131072'))
+
+# Pré-inicialização no carregamento do módulo (init da Lambda): importa as dependências e cria os clientes
+# e a sessão HTTP antes da primeira invocação (ver pre_inicializar)
+PRE_INICIALIZAR = os.environ.get('PRE_INICIALIZAR', 'false').strip().lower() in ('true', '1', 'yes', 'sim')
+
+# Formato dos numéricos retornados pela API: "1.482.105.837" (milhar com ponto) e "3,003" (decimal com vírgula)
+PADRAO_INTEIRO_BR = r'^\d{1,3}(\.\d{3})*$'
+PADRAO_DECIMAL_BR = r'^\d+(,\d+)?$'
+
+# Cliente S3 criado uma única vez por container (ver get_s3_client)
+_s3_client = None
+
+# Metadados da tabela RAW em cache entre invocações "quentes" da Lambda (ver get_catalogo)
+_catalogo = None
+
+# Schema dos arquivos RAW, montado na primeira tipagem (ver raw_schema)
+_raw_schema = None
+
+# Sessão HTTP compartilhada entre as threads e reaproveitada entre invocações "quentes" da Lambda
+_http_session = None
+
+
+def get_http_session():
+    """
+    Retorna a sessão HTTP com pool de conexões keep-alive, criando-a na primeira chamada.
+    O pool é dimensionado para o número de workers para que nenhuma thread espere por conexão.
+    """
+    global _http_session
+    if _http_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS, max_retries=2)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(HEADERS)
+        session.cookies.update(COOKIES)
+        _http_session = session
+    return _http_session
+
+
+def get_s3_client():
+    """
+    Retorna o cliente S3, criando-o apenas na primeira chamada do container.
+    """
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
+
+
+def get_catalogo():
+    """
+    Retorna o CatalogoGlue (cliente Glue e cache do get_table), criando-o apenas na primeira
+    chamada do container. Com partition projection a Lambda nunca o cria.
+    """
+    global _catalogo
+    if _catalogo is None:
+        import boto3
+        _catalogo = CatalogoGlue(boto3.client('glue'))
+    return _catalogo
+
+
+def raw_schema():
+    """
+    Schema explícito dos arquivos RAW; deve acompanhar as colunas da tabela em infra/modules/table/raw.
+    """
+    global _raw_schema
+    if _raw_schema is None:
+        import pyarrow as pa
+        _raw_schema = pa.schema([
+            pa.field('segment', pa.string()),
+            pa.field('cod', pa.string()),
+            pa.field('asset', pa.string()),
+            pa.field('type', pa.string()),
+            pa.field('part', pa.decimal128(18, 3)),
+            pa.field('partAcum', pa.decimal128(18, 3)),
+            pa.field('theoricalQty', pa.int64()),
+            pa.field('indice', pa.string()),
+        ])
+    return _raw_schema
+
+
+def pre_inicializar():
+    """
+    Antecipa o trabalho que a primeira invocação faria: importa requests, pyarrow e boto3 e cria a
+    sessão HTTP, o cliente S3 e o CatalogoGlue (este só sem partition projection). Chamada no
+    carregamento do módulo com PRE_INICIALIZAR=true (o init da Lambda não é cobrado com provisioned
+    concurrency / SnapStart) ou pelo evento {"aquecimento": true}.
+    """
+    import pyarrow.compute  # noqa: F401
+    import pyarrow.parquet  # noqa: F401
+    raw_schema()
+    get_http_session()
+    get_s3_client()
+    if not RAW_PARTITION_PROJECTION:
+        get_catalogo()
+
+
+def _validar_formato(table, coluna, padrao):
+    """
+    Garante que todos os valores da coluna seguem o formato numérico esperado.
+    A checagem é vetorizada (regex do Arrow sobre a coluna inteira), sem laço por linha.
+    """
+    import pyarrow.compute as pc
+    valores = table.column(coluna)
+    validos = pc.fill_null(pc.match_substring_regex(valores, padrao), False)
+    invalidos = len(valores) - pc.sum(validos).as_py() if len(valores) else 0
+    if invalidos:
+        exemplos = pc.filter(valores, pc.invert(validos)).slice(0, 5).to_pylist()
+        raise ValueError(f"Coluna '{coluna}' com {invalidos} valor(es) fora do formato esperado. Exemplos: {exemplos}")
+    return valores
+
+
+def tipar_carteira(results, index):
+    """
+    Converte os registros da API em uma tabela Arrow com o schema raw_schema():
+        - theoricalQty: "1.482.105.837" -> int64
+        - part / partAcum: "3,003" -> decimal(18,3)
+    Valores fora do formato geram ValueError em vez de virarem nulos silenciosamente.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    schema = raw_schema()
+    table = pa.Table.from_pylist(results)
+    for coluna in schema.names:
+        if coluna not in table.column_names and coluna != 'indice':
+            table = table.append_column(coluna, pa.nulls(table.num_rows, pa.string()))
+
+    quantidade = _validar_formato(table, 'theoricalQty', PADRAO_INTEIRO_BR)
+    colunas = {
+        'segment': table.column('segment').cast(pa.string()),
+        'cod': table.column('cod').cast(pa.string()),
+        'asset': table.column('asset').cast(pa.string()),
+        'type': table.column('type').cast(pa.string()),
+        'part': pc.cast(pc.replace_substring(_validar_formato(table, 'part', PADRAO_DECIMAL_BR), ',', '.'), pa.decimal128(18, 3)),
+        'partAcum': pc.cast(pc.replace_substring(_validar_formato(table, 'partAcum', PADRAO_DECIMAL_BR), ',', '.'), pa.decimal128(18, 3)),
+        'theoricalQty': pc.cast(pc.replace_substring(quantidade, '.', ''), pa.int64()),
+        'indice': pa.array([index] * table.num_rows, pa.string()),
+    }
+    return pa.Table.from_pydict(colunas, schema=schema)
+
+
+class S3MultipartStream:
+    """
+    Arquivo somente-escrita que envia ao S3 cada parte assim que ela atinge o tamanho mínimo,
+    de modo que o Parquet completo nunca fica inteiro em memória (usado para payloads grandes).
+    """
+
+    def __init__(self, s3_client, bucket, key, part_size=None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size or MULTIPART_CHUNK_BYTES
+        self.upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key)['UploadId']
+        self.parts = []
+        self.buffer = bytearray()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= self.part_size:
+            self._enviar_parte()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def _enviar_parte(self):
+        part_number = len(self.parts) + 1
+        response = self.s3_client.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                              PartNumber=part_number, Body=bytes(self.buffer))
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self.buffer = bytearray()
+
+    def close(self):
+        if self.closed:
+            return
+        if self.buffer or not self.parts:
+            self._enviar_parte()
+        self.s3_client.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                                                 MultipartUpload={'Parts': self.parts})
+        self.closed = True
+
+    def abort(self):
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+        self.closed = True
+
+
+def escrever_parquet_s3(table, bucket, key, s3_client=None, multipart_threshold=None, instrumentacao_etapas=None):
+    """
+    Serializa uma tabela Arrow em Parquet e envia ao S3 sem passar por arquivo temporário.
+
+    O tamanho da tabela em memória (table.nbytes) decide o caminho:
+        - abaixo do limite: Parquet em um buffer em memória e um único put_object;
+        - acima do limite: Parquet escrito por row groups direto em um multipart upload,
+          enviando cada parte assim que fica pronta (o arquivo completo nunca é materializado).
+
+    No primeiro caminho serialização e upload são medidos como etapas separadas; no multipart
+    elas se intercalam e são medidas juntas na etapa de upload.
+
+    Returns:
+        int: tamanho em bytes do objeto Parquet gravado.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    s3_client = s3_client or get_s3_client()
+    multipart_threshold = MULTIPART_THRESHOLD_BYTES if multipart_threshold is None else multipart_threshold
+    instrumentacao_etapas = instrumentacao_etapas or instrumentacao
+
+    if table.nbytes < multipart_threshold:
+        with instrumentacao_etapas.etapa("serializacao_parquet") as medicao:
+            sink = pa.BufferOutputStream()
+            pq.write_table(table, sink)
+            buffer = sink.getvalue()
+            medicao.registrar(linhas_entrada=table.num_rows, bytes_gravados=buffer.size)
+        print(f"Enviando {buffer.size} bytes via put_object para s3://{bucket}/{key}")
+        with instrumentacao_etapas.etapa("upload", Modo="put_object") as medicao:
+            # BufferReader expõe o buffer Arrow como arquivo (read/seek/tell) sem copiá-lo para bytes Python
+            s3_client.put_object(Bucket=bucket, Key=key, Body=pa.BufferReader(buffer), ContentLength=buffer.size)
+            medicao.registrar(bytes_gravados=buffer.size, arquivos=1)
+        return buffer.size
+
+    print(f"Enviando tabela de {table.nbytes} bytes (em memória) via multipart upload para s3://{bucket}/{key}")
+    with instrumentacao_etapas.etapa("upload", Modo="multipart") as medicao:
+        stream = S3MultipartStream(s3_client, bucket, key)
+        try:
+            with pq.ParquetWriter(stream, table.schema) as writer:
+                writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_ROWS)
+            stream.close()
+        except Exception:
+            stream.abort()
+            raise
+        medicao.registrar(linhas_entrada=table.num_rows, bytes_gravados=stream.position, arquivos=1)
+    print(f"Multipart upload concluído: {stream.position} bytes em {len(stream.parts)} partes.")
+    return stream.position
+
+
+def parse_indices(event):
+    """
+    Lê a lista de índices do evento ('indices' como lista ou string separada por vírgula),
+    ou da variável de ambiente B3_INDICES. Remove duplicados preservando a ordem.
+    """
+    indices = (event or {}).get('indices') or DEFAULT_INDICES
+    if isinstance(indices, str):
+        indices = indices.split(',')
+    return list(dict.fromkeys(i.strip().upper() for i in indices if i and i.strip()))
+
+
+def buscar_pagina(session, api_params, index, page_number):
+    """
+    Faz a requisição de uma página da carteira teórica de um índice e retorna o JSON decodificado.
+    """
+    params = dict(api_params, index=index, pageNumber=page_number)
+    encoded_params = base64.b64encode(json.dumps(params).encode('utf-8')).decode('utf-8')
+    api_url = f"{B3_API_URL}/{encoded_params}"
+
+    print(f"Fazendo requisição para a API: índice={index}, página={page_number}")
+    response = session.get(api_url, timeout=30)
+    response.raise_for_status()
+    return response.json()
+
+
+def buscar_carteiras(indices, api_params, session=None, max_workers=MAX_WORKERS):
+    """
+    Busca todas as páginas de todos os índices de forma concorrente.
+
+    A primeira página de cada índice é buscada em paralelo; com o 'totalPages' retornado,
+    as páginas restantes de todos os índices são buscadas em uma segunda leva paralela.
+    Assim o tempo total fica próximo ao da requisição mais lenta, e não à soma de todas.
+
+    Returns:
+        dict: {indice: lista de registros ('results') de todas as páginas, na ordem das páginas}
+    """
+    session = session or get_http_session()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        primeiras = {index: executor.submit(buscar_pagina, session, api_params, index, 1) for index in indices}
+        primeiras = {index: future.result() for index, future in primeiras.items()}
+
+        restantes = {}
+        for index, data in primeiras.items():
+            total_pages = int((data.get('page') or {}).get('totalPages') or 1)
+            for page_number in range(2, total_pages + 1):
+                restantes[(index, page_number)] = executor.submit(buscar_pagina, session, api_params, index, page_number)
+
+        carteiras = {index: list(data.get('results') or []) for index, data in primeiras.items()}
+        for (index, _), future in sorted(restantes.items()):
+            carteiras[index].extend(future.result().get('results') or [])
+
+    return carteiras
+
+
+def registrar_particao_glue(glue_database_name, glue_table_name, s3_bucket_name, s3_key_prefix, year, month, day):
+    """
+    Registra a partição diária (ano/mes/dia) da tabela RAW no Glue Data Catalog.
+    Retorna None em caso de sucesso ou um dicionário de resposta de erro da Lambda.
+    """
+    print(f"Obtendo informações da tabela Glue '{glue_table_name}' no banco de dados '{glue_database_name}'...")
+    try:
+        table_info = get_catalogo().obter_tabela(glue_database_name, glue_table_name)
+    except Exception as get_table_e:
+        print(f"ERRO ao obter informações da tabela Glue: {get_table_e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({"message": f"Erro ao obter informações da tabela Glue: {str(get_table_e)}"})
+        }
+    if table_info is None:
+        print(f"ERRO: Tabela Glue '{glue_table_name}' não encontrada no banco de dados '{glue_database_name}'.")
+        return {
+            'statusCode': 404,
+            'body': json.dumps({"message": f"Tabela Glue não encontrada: {glue_database_name}.{glue_table_name}"})
+        }
+    print("Informações da tabela obtidas com sucesso.")
+
+    table_partition_keys = table_info.get('PartitionKeys', [])
+
+    # Preparar valores das partições com base nas chaves de partição
+    partition_values = []
+    # Assumimos que as chaves de partição são 'year', 'month', 'day' nesta ordem
+    # Se a ordem ou os nomes forem diferentes, esta lógica precisará ser ajustada
+    # baseada em `table_partition_keys`.
+    # Exemplo mais robusto:
+    for pk in table_partition_keys:
+        if pk['Name'] == 'ano':
+            partition_values.append(str(year))
+        elif pk['Name'] == 'mes':
+            partition_values.append(f"{month:02d}")
+        elif pk['Name'] == 'dia':
+            partition_values.append(f"{day:02d}")
+        else:
+            # Lidar com outras chaves de partição se existirem
+            print(f"AVISO: Chave de partição '{pk['Name']}' não tratada explicitamente na lógica de valores.")
+            # Você pode adicionar um valor padrão ou levantar um erro
+            partition_values.append('unknown') # Ou levantar um erro
+
+    print(f"Atualizando partição no Glue Catalog para {glue_database_name}.{glue_table_name} com valores: {partition_values}...")
+
+    try:
+        # O StorageDescriptor da partição leva apenas as colunas de DADOS (montado pelo CatalogoGlue)
+        resumo = get_catalogo().criar_particoes(glue_database_name, glue_table_name,
+                                                [(partition_values, f"s3://{s3_bucket_name}/{s3_key_prefix}")])
+        if resumo['existentes']:
+            print("Partição já existe no Glue Catalog. Nenhuma ação necessária.")
+        else:
+            print("Partição adicionada/atualizada no Glue Catalog com sucesso.")
+    except Exception as glue_e:
+        print(f"ERRO ao atualizar o Glue Catalog: {glue_e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({"message": f"Dados salvos, mas erro ao atualizar Glue Catalog: {str(glue_e)}"})
+        }
+    return None
+
+
+def gravar_referencia(s3_bucket_name, s3_key_prefix, ultimo_snapshot, conteudo, decisao, indices):
+    """
+    Trata um dia cujas carteiras têm o mesmo conteúdo do último snapshot gravado: nada é gravado se o
+    snapshot é de hoje; senão grava na partição do dia o marcador que aponta para o pregão de referência.
+    """
+    if decisao == "gravado":
+        print(f"Conteúdo igual ao já gravado hoje em s3://{s3_bucket_name}/{ultimo_snapshot['prefixo']}. Nada a gravar.")
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                "message": "Conteúdo igual ao snapshot já gravado hoje. Nenhum arquivo gravado.",
+                "arquivos": [],
+                "sha256": conteudo
+            })
+        }
+
+    marcador_key = f"{s3_key_prefix}{MARCADOR_REFERENCIA}"
+    marcador = {
+        "data_referencia": ultimo_snapshot['data_pregao'],
+        "prefixo_referencia": ultimo_snapshot['prefixo'],
+        "sha256": conteudo,
+        "indices": sorted(indices),
+        "gravado_em": datetime.now().isoformat(),
+    }
+    print(f"Conteúdo igual ao do pregão {marcador['data_referencia']}. Gravando apenas o marcador "
+          f"s3://{s3_bucket_name}/{marcador_key}")
+    gravar_json(f"s3://{s3_bucket_name}/{marcador_key}", marcador, get_s3_client())
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            "message": f"Conteúdo igual ao do pregão {marcador['data_referencia']}: marcador gravado em s3://{s3_bucket_name}/{marcador_key}.",
+            "arquivos": [],
+            "referencia": marcador['data_referencia'],
+            "sha256": conteudo
+        })
+    }
 
-# Inicializa o cliente Glue fora da função para reutilização (melhor prática em Lambda)
-glue_client = boto3.client('glue')
 
 def lambda_handler(event=None, context=None):
     """
-    Função Lambda para fazer o scraping dos dados da carteira teórica do IBovespa da B3
-    usando a API direta e salvar os dados em formato Parquet no S3,
-    além de atualizar o AWS Glue Data Catalog de forma dinâmica.
+    Função Lambda para fazer o scraping dos dados da carteira teórica dos índices da B3
+    (IBOV, IBXX, SMLL, IDIV, ...) usando a API direta e salvar os dados em formato Parquet no S3,
+    um arquivo por índice dentro da partição diária, além de atualizar o AWS Glue Data Catalog.
+
+    O evento aceita:
+        - 'indices': lista (ou string separada por vírgula) de índices a raspar.
+        - 'api_params': parâmetros adicionais enviados à API (ex: 'segment', 'pageSize').
+        - 'forcar_gravacao': grava os Parquet mesmo que o conteúdo seja igual ao do último snapshot.
+        - 'aquecimento': só pré-inicializa o container (ver pre_inicializar), sem raspar.
     """
+    if isinstance(event, dict) and event.get('aquecimento'):
+        pre_inicializar()
+        return {
+            'statusCode': 200,
+            'body': json.dumps({"message": "Container pré-inicializado."})
+        }
+
     api_params = {
         "language": "pt-br",
         "pageNumber": 1,
@@ -26,174 +497,126 @@ def lambda_handler(event=None, context=None):
     if event and isinstance(event, dict):
         api_params.update(event.get('api_params', {}))
 
-    encoded_params = base64.b64encode(json.dumps(api_params).encode('utf-8')).decode('utf-8')
-    api_url = f'https://sistemaswebb3-listados.b3.com.br/indexProxy/indexCall/GetPortfolioDay/{encoded_params}'
-
-    headers = {
-        'accept': 'application/json, text/plain, */*',
-        'accept-language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
-        'priority': 'u=1, i',
-        'referer': 'https://sistemaswebb3-listados.b3.com.br/',
-        'sec-ch-ua': '"Not)A;Brand";v="8", "Chromium";v="138", "Google Chrome";v="138"',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-platform': '"Windows"',
-        'sec-fetch-dest': 'empty',
-        'sec-fetch-mode': 'cors',
-        'sec-fetch-site': 'same-origin',
-        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36',
-    }
+    indices = parse_indices(event if isinstance(event, dict) else None)
 
-    cookies = {
-        'dtCookie': 'v_4_srv_33_sn_EF806CE73FE8BBD5C0D54D237CBD205A_perc_100000_ol_0_mul_1_app-3Afd69ce40c52bd20e_1_rcs-3Acss_0',
-        'TS01f22489': '011d592ce16320141a792061e1a696fbef13c9366c2502598ba5b2f594a78722fd9d91be276b04b12134b0a49acb8bee72e9594a3f',
-        '__cf_bm': 'OB4vV2_4HEqWf1U4mQeMHvq8DgRU78IQMqvcJRMyL2w-1752197046-1.0.1.1-_Bnti5dOBgLhb9wFvxkOoofq7c6HHiK6bJPmn.d9P6Wf_5E17_RzBoii_ln4Ay4toEh_7xZrQZLh18AQoljr6QzKfGxUD3qN5kE3KKJfaNw',
-        'rxVisitor': '175219705569175MI2Q1DBDQD8KEALKEF8CC4ITVPDBCU',
-        'dtSa': '-',
-        '_gid': 'GA1.3.1901695088.1752197056',
-        '_gat_gtag_UA_94042116_5': '1',
-        'cf_clearance': 'YlZoFB6yFHfTG1Iu.J3qI5tFP.5dAfnRWRJ5GR.KAMw-1752197047-1.2.1.1-pcf4maBLPXWuabusJ6tr.JukQZIVXVYORbQQqF48Srd0lL05eNVVDlXwEWT7zJMURnAoKXIGoOfCruWrfoC3yHtJFCSyEjRDzN58v0WQEBvF1p5CC7U_XBHsARSYRTb4Jn_beUsGCwUfl5gx6mic3kwvWS0.xV.BpOoBS2dBM2_ACTvcgrc8HP6_ssrJYlR1T_0MCrC_jNSDIzAUpZKsZNEviX7PgvmBpa9ds9eTS9w',
-        '_ga_CNJN5WQC5G': 'GS2.1.s1752197056$o6$g0$t1752197056$j60$l0$h0',
-        '_ga': 'GA1.1.1938705953.1748994657',
-        'rxvt': '1752198856273|1752197055693',
-        'dtPC': '33$197055688_265h-vKAGMFUKJLALWFRDSADNBQFGVTMOFAHOE-0e0'
-    }
+    s3_bucket_name = os.environ.get('S3_BUCKET_NAME')
+
+    if not s3_bucket_name:
+        print("ERRO: A variável de ambiente 'S3_BUCKET_NAME' não foi configurada.")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({"message": "Nome do bucket S3 não configurado. Por favor, defina a variável de ambiente 'S3_BUCKET_NAME'."})
+        }
+
+    # A exceção de requisição HTTP é tratada abaixo; o requests é carregado de qualquer forma pela sessão
+    from requests.exceptions import RequestException
 
     try:
-        print(f"Fazendo requisição para a API: {api_url}")
-        response = requests.get(api_url, headers=headers, cookies=cookies)
-        response.raise_for_status()
-
-        data = response.json()
-
-        if 'results' in data and data['results']:
-            df = pd.DataFrame(data['results'])
-
-            s3_bucket_name = os.environ.get('S3_BUCKET_NAME')
-            
-            if not s3_bucket_name:
-                print("ERRO: A variável de ambiente 'S3_BUCKET_NAME' não foi configurada.")
-                return {
-                    'statusCode': 500,
-                    'body': json.dumps({"message": "Nome do bucket S3 não configurado. Por favor, defina a variável de ambiente 'S3_BUCKET_NAME'."})
-                }
-
-            now = datetime.now()
-            year = now.year
-            month = now.month
-            day = now.day
-            
-            # --- Adicionar lógica para atualizar o AWS Glue Data Catalog ---
-            glue_database_name = os.environ.get('GLUE_DATABASE_NAME', 'raw_database_name') # Nome do seu banco de dados Glue
-            glue_table_name = os.environ.get('GLUE_TABLE_NAME', 'tb_fiap_tech02_bovespa_raw') # Nome da sua tabela Glue
-
-            # Define o caminho S3 para o arquivo Parquet
-            s3_key_prefix = f"{glue_table_name}/ano={year}/mes={month:02d}/dia={day:02d}/"
-            s3_file_name = "data.parquet"
-            s3_full_key = s3_key_prefix + s3_file_name
-            
-            temp_file_path = f"/tmp/{glue_table_name}_{now.strftime('%Y%m%d%H%M%S')}.parquet"
-
-            print(f"Salvando dados temporariamente em: {temp_file_path}")
-            df.to_parquet(temp_file_path, index=False)
-
-            s3_client = boto3.client('s3')
-            print(f"Fazendo upload de {temp_file_path} para s3://{s3_bucket_name}/{s3_full_key}")
-            s3_client.upload_file(temp_file_path, s3_bucket_name, s3_full_key)
-
-            os.remove(temp_file_path)
-            print(f"Arquivo temporário {temp_file_path} removido.")
-
-            print(f"Obtendo informações da tabela Glue '{glue_table_name}' no banco de dados '{glue_database_name}'...")
-            table_info = None
-            try:
-                response_get_table = glue_client.get_table(
-                    DatabaseName=glue_database_name,
-                    Name=glue_table_name
-                )
-                table_info = response_get_table['Table']
-                print("Informações da tabela obtidas com sucesso.")
-            except glue_client.exceptions.EntityNotFoundException:
-                print(f"ERRO: Tabela Glue '{glue_table_name}' não encontrada no banco de dados '{glue_database_name}'.")
-                return {
-                    'statusCode': 404,
-                    'body': json.dumps({"message": f"Tabela Glue não encontrada: {glue_database_name}.{glue_table_name}"})
-                }
-            except Exception as get_table_e:
-                print(f"ERRO ao obter informações da tabela Glue: {get_table_e}")
-                return {
-                    'statusCode': 500,
-                    'body': json.dumps({"message": f"Erro ao obter informações da tabela Glue: {str(get_table_e)}"})
-                }
-
-            # Extrair colunas e chaves de partição dinamicamente
-            table_columns = table_info['StorageDescriptor']['Columns']
-            table_partition_keys = table_info.get('PartitionKeys', [])
-
-             # **CORREÇÃO CRÍTICA**: O StorageDescriptor da partição deve conter apenas as colunas de DADOS.
-            partition_key_names = {pk['Name'] for pk in table_partition_keys}
-            data_columns = [col for col in table_columns if col['Name'] not in partition_key_names]
-
-
-            # Preparar valores das partições com base nas chaves de partição
-            partition_values = []
-            # Assumimos que as chaves de partição são 'year', 'month', 'day' nesta ordem
-            # Se a ordem ou os nomes forem diferentes, esta lógica precisará ser ajustada
-            # baseada em `table_partition_keys`.
-            # Exemplo mais robusto:
-            for pk in table_partition_keys:
-                if pk['Name'] == 'ano':
-                    partition_values.append(str(year))
-                elif pk['Name'] == 'mes':
-                    partition_values.append(f"{month:02d}")
-                elif pk['Name'] == 'dia':
-                    partition_values.append(f"{day:02d}")
-                else:
-                    # Lidar com outras chaves de partição se existirem
-                    print(f"AVISO: Chave de partição '{pk['Name']}' não tratada explicitamente na lógica de valores.")
-                    # Você pode adicionar um valor padrão ou levantar um erro
-                    partition_values.append('unknown') # Ou levantar um erro
-
-            print(f"Atualizando partição no Glue Catalog para {glue_database_name}.{glue_table_name} com valores: {partition_values}...")
-            
-            try:
-                glue_client.create_partition(
-                    DatabaseName=glue_database_name,
-                    TableName=glue_table_name,
-                    PartitionInput={
-                        'Values': partition_values, # Usando valores de partição dinâmicos
-                        'StorageDescriptor': {
-                            'Location': f"s3://{s3_bucket_name}/{s3_key_prefix}", # Caminho S3 da partição
-                            'InputFormat': table_info['StorageDescriptor']['InputFormat'], # Dinâmico
-                            'OutputFormat': table_info['StorageDescriptor']['OutputFormat'], # Dinâmico
-                            'SerdeInfo': table_info['StorageDescriptor']['SerdeInfo'], # Dinâmico
-                            'Columns': data_columns # Usando colunas dinâmicas
-                        }
-                    }
-                )
-                print("Partição adicionada/atualizada no Glue Catalog com sucesso.")
-            except glue_client.exceptions.AlreadyExistsException:
-                print("Partição já existe no Glue Catalog. Nenhuma ação necessária.")
-            except Exception as glue_e:
-                print(f"ERRO ao atualizar o Glue Catalog: {glue_e}")
-                return {
-                    'statusCode': 500,
-                    'body': json.dumps({"message": f"Dados salvos, mas erro ao atualizar Glue Catalog: {str(glue_e)}"})
-                }
-            # --- Fim da lógica de atualização do AWS Glue Data Catalog ---
+        print(f"Raspando os índices {indices} com até {MAX_WORKERS} requisições simultâneas.")
+        with instrumentacao.etapa("http", Indices=",".join(indices)) as medicao:
+            carteiras = buscar_carteiras(indices, api_params)
+            medicao.registrar(linhas_saida=sum(len(results) for results in carteiras.values()))
 
-            return {
-                'statusCode': 200,
-                'body': json.dumps({"message": f"Dados raspados e salvos com sucesso em s3://{s3_bucket_name}/{s3_full_key} e partição Glue atualizada."})
-            }
-        else:
-            print("Erro: A chave 'results' não foi encontrada na resposta JSON ou está vazia.")
-            print(f"Resposta JSON completa: {json.dumps(data, indent=2)}")
+        vazios = [index for index, results in carteiras.items() if not results]
+        for index in vazios:
+            print(f"AVISO: A chave 'results' não foi encontrada ou está vazia para o índice '{index}'.")
+            del carteiras[index]
+
+        if not carteiras:
+            print("Erro: Nenhum índice retornou dados.")
             return {
                 'statusCode': 404,
                 'body': json.dumps({"message": "Dados não encontrados ou estrutura inesperada."})
             }
 
-    except requests.exceptions.RequestException as e:
+        now = datetime.now()
+        year = now.year
+        month = now.month
+        day = now.day
+
+        # --- Adicionar lógica para atualizar o AWS Glue Data Catalog ---
+        glue_database_name = os.environ.get('GLUE_DATABASE_NAME', 'raw_database_name') # Nome do seu banco de dados Glue
+        glue_table_name = os.environ.get('GLUE_TABLE_NAME', 'tb_fiap_tech02_bovespa_raw') # Nome da sua tabela Glue
+
+        # Define o caminho S3 da partição diária; cada índice vira um arquivo Parquet dentro dela
+        s3_key_prefix = f"{glue_table_name}/ano={year}/mes={month:02d}/dia={day:02d}/"
+        s3_keys = []
+
+        conteudo = hash_carteiras(carteiras)
+        ultimo_snapshot_path = f"s3://{s3_bucket_name}/{glue_table_name}/{CHAVE_ULTIMO_SNAPSHOT}"
+        forcar_gravacao = isinstance(event, dict) and event.get('forcar_gravacao')
+        if SNAPSHOT_DEDUP and not forcar_gravacao:
+            with instrumentacao.etapa("dedup") as medicao:
+                ultimo_snapshot = ler_json(ultimo_snapshot_path, get_s3_client())
+                decisao = decidir_gravacao(ultimo_snapshot, conteudo, now.date())
+                medicao.registrar(linhas_entrada=sum(len(results) for results in carteiras.values()))
+            print(f"Hash do conteúdo raspado: {conteudo} (decisão: {decisao}).")
+            if decisao != "gravar":
+                return gravar_referencia(s3_bucket_name, s3_key_prefix, ultimo_snapshot, conteudo, decisao, carteiras)
+        if SNAPSHOT_DEDUP:
+            # Um marcador gravado mais cedo no mesmo dia sai antes dos Parquet: a partição passa a ter dados próprios
+            get_s3_client().delete_object(Bucket=s3_bucket_name, Key=f"{s3_key_prefix}{MARCADOR_REFERENCIA}")
+
+        for index, results in carteiras.items():
+            with instrumentacao.etapa("tipagem", Indice=index) as medicao:
+                table = tipar_carteira(results, index)
+                medicao.registrar(linhas_entrada=len(results), linhas_saida=table.num_rows)
+
+            s3_full_key = f"{s3_key_prefix}{index}.parquet"
+            print(f"Gravando {table.num_rows} registros do índice '{index}' em s3://{s3_bucket_name}/{s3_full_key}")
+            escrever_parquet_s3(table, s3_bucket_name, s3_full_key)
+            s3_keys.append(s3_full_key)
+
+        erro_catalogo = None
+        if RAW_PARTITION_PROJECTION:
+            print(f"Tabela '{glue_database_name}.{glue_table_name}' com partition projection: partição não registrada no Glue Catalog.")
+        else:
+            with instrumentacao.etapa("catalogo") as medicao:
+                erro_catalogo = registrar_particao_glue(glue_database_name, glue_table_name, s3_bucket_name,
+                                                        s3_key_prefix, year, month, day)
+                medicao.registrar(particoes=1, arquivos=len(s3_keys))
+        if erro_catalogo:
+            return erro_catalogo
+        # --- Fim da lógica de atualização do AWS Glue Data Catalog ---
+
+        resumo_alteracoes = None
+        if SNAPSHOT_ALTERACOES:
+            # Antes do último snapshot: se falhar, a próxima execução grava a partição (e o change-set) de novo
+            with instrumentacao.etapa("alteracoes") as medicao:
+                ultima_carteira_path = f"s3://{s3_bucket_name}/{glue_table_name}/{CHAVE_ULTIMA_CARTEIRA}"
+                alteracoes, estado = calcular_alteracoes(ler_json(ultima_carteira_path, get_s3_client()), carteiras,
+                                                         now.date(), conteudo)
+                gravar_json(f"s3://{s3_bucket_name}/{s3_key_prefix}{ARQUIVO_ALTERACOES}", alteracoes, get_s3_client())
+                gravar_json(ultima_carteira_path, estado, get_s3_client())
+                resumo_alteracoes = alteracoes['resumo']
+                medicao.registrar(linhas_entrada=sum(len(results) for results in carteiras.values()),
+                                  linhas_saida=sum(resumo_alteracoes[chave] for chave in ('entradas', 'saidas', 'alteracoes')),
+                                  arquivos=1)
+            print(f"Alterações em relação ao pregão anterior: {json.dumps(resumo_alteracoes)} "
+                  f"(s3://{s3_bucket_name}/{s3_key_prefix}{ARQUIVO_ALTERACOES})")
+
+        if SNAPSHOT_DEDUP:
+            # Só depois dos Parquet e do catálogo: uma falha no meio faz a próxima execução gravar de novo
+            gravar_json(ultimo_snapshot_path, {
+                "sha256": conteudo,
+                "data_pregao": now.date().isoformat(),
+                "prefixo": s3_key_prefix,
+                "arquivos": s3_keys,
+                "gravado_em": now.isoformat(),
+            }, get_s3_client())
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                "message": f"Dados raspados e salvos com sucesso em s3://{s3_bucket_name}/{s3_key_prefix} e partição Glue atualizada.",
+                "arquivos": s3_keys,
+                "indices_sem_dados": vazios,
+                "alteracoes": resumo_alteracoes,
+                "sha256": conteudo
+            })
+        }
+
+    except RequestException as e:
         print(f"Erro ao fazer a requisição HTTP: {e}")
         return {
             'statusCode': 500,
@@ -203,7 +626,13 @@ def lambda_handler(event=None, context=None):
         print(f"Erro ao decodificar a resposta JSON: {e}")
         return {
             'statusCode': 500,
-            'body': json.dumps({"message": f"Erro de decodificação JSON: {str(e)}", "response_content": response.text})
+            'body': json.dumps({"message": f"Erro de decodificação JSON: {str(e)}"})
+        }
+    except ValueError as e:
+        print(f"Erro de validação dos dados raspados: {e}")
+        return {
+            'statusCode': 422,
+            'body': json.dumps({"message": f"Dados fora do formato esperado: {str(e)}"})
         }
     except Exception as e:
         print(f"Ocorreu um erro inesperado: {e}")
@@ -212,20 +641,24 @@ def lambda_handler(event=None, context=None):
             'body': json.dumps({"message": f"Erro inesperado: {str(e)}"})
         }
 
+if PRE_INICIALIZAR:
+    pre_inicializar()
+
 # Bloco para testar a função localmente, simulando uma invocação Lambda
 if __name__ == "__main__":
     print("Testando a função Lambda localmente...")
     # Para testar localmente o salvamento em S3, você precisaria configurar
     # credenciais AWS no seu ambiente local (ex: variáveis de ambiente AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY)
     # e ter o 'pyarrow' e 'boto3' instalados.
-    
+    # Para raspar contra um servidor HTTP local em vez da B3, defina B3_API_URL (ex: http://127.0.0.1:8000/GetPortfolioDay).
+
     # Defina um nome de bucket S3 para teste local (substitua por um bucket real que você tenha acesso)
-    os.environ['S3_BUCKET_NAME'] = 'dev-533267324332-fiap-tc02-dados-brutos-bovespa' 
+    os.environ['S3_BUCKET_NAME'] = 'dev-533267324332-fiap-tc02-dados-brutos-bovespa'
     os.environ['GLUE_DATABASE_NAME'] = 'raw_database_name' # Nome do seu banco de dados Glue para teste
     os.environ['GLUE_TABLE_NAME'] = 'tb_fiap_tech02_bovespa_raw' # Nome da sua tabela Glue para teste
 
 
-    test_event = {} # Usar parâmetros padrão para a API
+    test_event = {"indices": ["IBOV", "IBXX", "SMLL", "IDIV"]} # Parâmetros padrão da API para cada índice
 
     response_from_lambda = lambda_handler(test_event, None)
 
@@ -1,57 +1,134 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+from collections import deque
+from datetime import datetime, timezone
+import json
+import os
 import re
+import time
+import uuid
 
-def extrair_cotacao_bitcoin():
+URL_BITCOIN = os.environ.get('BITCOIN_URL', "https://br.investing.com/crypto/bitcoin/btc-eur")
+
+# Modo coletor: intervalo entre as consultas e limites de cada lote Parquet (o que vier primeiro)
+INTERVALO_SEGUNDOS = float(os.environ.get('BITCOIN_INTERVALO_SEGUNDOS', '5'))
+LOTE_MAX_TICKS = int(os.environ.get('BITCOIN_LOTE_MAX_TICKS', '500'))
+LOTE_MAX_SEGUNDOS = float(os.environ.get('BITCOIN_LOTE_MAX_SEGUNDOS', '300'))
+# Capacidade do ring buffer: com o S3 indisponível, os ticks mais antigos são descartados além dela
+CAPACIDADE_BUFFER = int(os.environ.get('BITCOIN_CAPACIDADE_BUFFER', '10000'))
+# Prefixo da tabela RAW dos ticks no bucket (S3_BUCKET_NAME), com o mesmo layout ano=/mes=/dia= da B3
+PREFIXO_TICKS = os.environ.get('BITCOIN_PREFIXO', 'tb_fiap_tech02_bitcoin_ticks_raw')
+# Folga antes do timeout da Lambda para descarregar o buffer
+FOLGA_TIMEOUT_SEGUNDOS = 10
+
+# Pré-inicialização no carregamento do módulo (init da Lambda): sessão HTTP, cliente S3 e pyarrow prontos
+# antes da primeira invocação, em vez de na primeira descarga do buffer (ver pre_inicializar)
+PRE_INICIALIZAR = os.environ.get('PRE_INICIALIZAR', 'false').strip().lower() in ('true', '1', 'yes', 'sim')
+
+# É crucial enviar um cabeçalho User-Agent para simular um navegador real.
+# Muitos sites bloqueiam requisições que não parecem vir de um navegador.
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Inspecionando a página, vemos que o preço está em uma <div> com o atributo data-test="instrument-price-last".
+# Este é um seletor estável e ideal para scraping.
+ATRIBUTOS_PRECO = {'data-test': 'instrument-price-last'}
+PADRAO_PRECO = re.compile(r'data-test\s*=\s*["\']?instrument-price-last\b')
+# Trecho analisado a partir da abertura da <div> do preço (o conteúdo é só o texto do preço)
+JANELA_PRECO_CARACTERES = 1024
+
+# Cliente S3 e sessão HTTP reaproveitados entre invocações "quentes" da Lambda
+_s3_client = None
+_http_session = None
+
+
+def get_http_session():
+    """
+    Retorna a sessão HTTP keep-alive, criando-a na primeira chamada: as consultas do coletor
+    reaproveitam a mesma conexão TLS em vez de abrir uma por tick.
+    """
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=2)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update(HEADERS)
+        _http_session = session
+    return _http_session
+
+
+def get_s3_client():
+    global _s3_client
+    if _s3_client is None:
+        import boto3
+        _s3_client = boto3.client('s3')
+    return _s3_client
+
+
+def pre_inicializar():
+    """
+    Cria a sessão HTTP e o cliente S3 e importa o pyarrow usado na descarga. Chamada no carregamento
+    do módulo com PRE_INICIALIZAR=true ou pelo evento {"aquecimento": true}.
+    """
+    import pyarrow.parquet  # noqa: F401
+    get_http_session()
+    get_s3_client()
+
+
+def converter_preco(texto):
+    """
+    Converte o texto do preço no formato brasileiro (ex: "336.195,0") em float.
+    """
+    # 1. Remove os pontos (.) que são separadores de milhar.
+    # 2. Substitui a vírgula (,) por um ponto (.) para ser um decimal válido em Python.
+    return float(texto.strip().replace('.', '').replace(',', '.'))
+
+
+def extrair_preco_html(html):
+    """
+    Extrai o preço da página sem montar a árvore do documento inteiro: localiza o atributo da
+    <div> do preço no texto e analisa só o trecho a partir dela, com um SoupStrainer que descarta
+    qualquer outro elemento. Se o atributo não for localizado no texto, o SoupStrainer percorre o
+    documento inteiro, ainda sem montar a árvore.
+
+    Returns:
+        float: o preço, ou None se o elemento não for encontrado.
+    """
+    match = PADRAO_PRECO.search(html)
+    if match:
+        inicio = html.rfind('<', 0, match.start())
+        html = html[inicio:match.start() + JANELA_PRECO_CARACTERES]
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('div', attrs=ATRIBUTOS_PRECO))
+    price_element = soup.find('div', ATRIBUTOS_PRECO)
+    if not price_element:
+        return None
+    return converter_preco(price_element.get_text())
+
+
+def extrair_cotacao_bitcoin(session=None, url=URL_BITCOIN):
     """
     Extrai a cotação atual do Bitcoin (BTC/BRL) da página do Investing.com.
 
     Returns:
         float: O valor da cotação como um número float, ou None se ocorrer um erro.
     """
-    url = "https://br.investing.com/crypto/bitcoin/btc-eur"
-    
-    # É crucial enviar um cabeçalho User-Agent para simular um navegador real.
-    # Muitos sites bloqueiam requisições que não parecem vir de um navegador.
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
-
+    session = session or get_http_session()
     try:
         print(f"Acessando a página: {url}")
-        # Faz a requisição GET para obter o conteúdo da página
-        response = requests.get(url, headers=headers)
-        
+        response = session.get(url, timeout=10)
+
         # Verifica se a requisição foi bem-sucedida (código de status 200)
         response.raise_for_status()
-        print("Página acessada com sucesso.")
-
-        # Cria um objeto BeautifulSoup para "ler" o HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
 
-        # Encontra o elemento que contém o preço.
-        # Inspecionando a página, vemos que o preço está em uma <div> com o atributo data-test="instrument-price-last".
-        # Este é um seletor estável e ideal para scraping.
-        price_element = soup.find('div', {'data-test': 'instrument-price-last'})
-
-        if not price_element:
+        price_float = extrair_preco_html(response.text)
+        if price_float is None:
             print("Erro: Elemento do preço não encontrado na página. O site pode ter mudado sua estrutura.")
             return None
 
-        # Extrai o texto do elemento (ex: "336.195,0")
-        price_text = price_element.get_text()
-        print(f"Texto do preço extraído: '{price_text}'")
-
-        # Limpa o texto para converter em um número (float)
-        # 1. Remove os pontos (.) que são separadores de milhar.
-        # 2. Substitui a vírgula (,) por um ponto (.) para ser um decimal válido em Python.
-        price_cleaned = price_text.replace('.', '').replace(',', '.')
-        
-        # Converte o texto limpo para float
-        price_float = float(price_cleaned)
-        
         print(f"Cotação do Bitcoin (BTC/BRL): R$ {price_float:,.2f}")
-        
         return price_float
 
     except requests.exceptions.RequestException as e:
@@ -61,6 +138,142 @@ def extrair_cotacao_bitcoin():
         print(f"Erro ao processar o conteúdo da página ou converter o preço: {e}")
         return None
 
+
+def tabela_ticks(ticks):
+    """
+    Tabela Arrow dos ticks [(epoch em ms, preço)].
+    """
+    import pyarrow as pa
+    instantes, precos = zip(*ticks)
+    return pa.table({
+        'data_hora': pa.array(instantes, pa.timestamp('ms', tz='UTC')),
+        'preco': pa.array(precos, pa.float64()),
+    })
+
+
+class ColetorBitcoin:
+    """
+    Consulta a cotação a cada 'intervalo_segundos' pela mesma sessão keep-alive e acumula os ticks
+    em um ring buffer limitado. O buffer é descarregado em Parquet no bucket RAW, um arquivo por
+    dia em ano=/mes=/dia=, ao atingir 'max_ticks' ticks ou 'max_segundos' desde a última descarga
+    (e ao final da execução). Uma descarga que falha mantém os ticks para a próxima tentativa.
+    """
+
+    def __init__(self, bucket, prefixo=PREFIXO_TICKS, intervalo_segundos=INTERVALO_SEGUNDOS,
+                 max_ticks=LOTE_MAX_TICKS, max_segundos=LOTE_MAX_SEGUNDOS, capacidade=CAPACIDADE_BUFFER,
+                 session=None, s3_client=None, url=URL_BITCOIN, relogio=time.time, sleep=time.sleep):
+        if capacidade < max_ticks:
+            raise ValueError(f"A capacidade do buffer ({capacidade}) deve comportar um lote ({max_ticks} ticks).")
+        self.bucket = bucket
+        self.prefixo = prefixo.strip('/')
+        self.intervalo_segundos = intervalo_segundos
+        self.max_ticks = max_ticks
+        self.max_segundos = max_segundos
+        self.buffer = deque(maxlen=capacidade)
+        self.session = session or get_http_session()
+        self.s3_client = s3_client
+        self.url = url
+        self.relogio = relogio
+        self.sleep = sleep
+        self.ultima_descarga = relogio()
+        self.estatisticas = {'ticks': 0, 'falhas': 0, 'descartados': 0, 'arquivos': 0, 'bytes': 0}
+
+    def coletar_tick(self):
+        preco = extrair_cotacao_bitcoin(self.session, self.url)
+        if preco is None:
+            self.estatisticas['falhas'] += 1
+            return None
+        if len(self.buffer) == self.buffer.maxlen:
+            self.estatisticas['descartados'] += 1
+        self.buffer.append((int(self.relogio() * 1000), preco))
+        self.estatisticas['ticks'] += 1
+        return preco
+
+    def deve_descarregar(self):
+        return len(self.buffer) >= self.max_ticks or \
+            (bool(self.buffer) and self.relogio() - self.ultima_descarga >= self.max_segundos)
+
+    def descarregar(self):
+        """
+        Grava os ticks do buffer, um objeto Parquet por dia (UTC) dos ticks.
+
+        Returns:
+            int: ticks gravados.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.ultima_descarga = self.relogio()
+        if not self.buffer:
+            return 0
+        ticks = list(self.buffer)
+        por_dia = {}
+        for tick in ticks:
+            por_dia.setdefault(datetime.fromtimestamp(tick[0] / 1000, tz=timezone.utc).date(), []).append(tick)
+        try:
+            s3_client = self.s3_client or get_s3_client()
+            for dia, ticks_dia in sorted(por_dia.items()):
+                sink = pa.BufferOutputStream()
+                pq.write_table(tabela_ticks(ticks_dia), sink, compression='zstd')
+                buffer = sink.getvalue()
+                inicio = datetime.fromtimestamp(ticks_dia[0][0] / 1000, tz=timezone.utc)
+                key = (f"{self.prefixo}/ano={dia.year}/mes={dia.month:02d}/dia={dia.day:02d}/"
+                       f"{inicio:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+                s3_client.put_object(Bucket=self.bucket, Key=key, Body=pa.BufferReader(buffer),
+                                     ContentLength=buffer.size)
+                self.estatisticas['arquivos'] += 1
+                self.estatisticas['bytes'] += buffer.size
+                print(f"{len(ticks_dia)} tick(s) gravado(s) em s3://{self.bucket}/{key} ({buffer.size} bytes).")
+        except Exception as e:
+            print(f"[ColetorBitcoin] Erro ao descarregar {len(ticks)} tick(s); mantidos no buffer: {e}")
+            return 0
+        # Só sai do buffer o que foi gravado (ticks novos não chegam durante a descarga)
+        for _ in ticks:
+            self.buffer.popleft()
+        return len(ticks)
+
+    def executar(self, duracao_segundos):
+        """
+        Coleta por 'duracao_segundos' e descarrega o que restar no buffer ao final.
+        """
+        fim = self.relogio() + duracao_segundos
+        while self.relogio() < fim:
+            inicio = self.relogio()
+            self.coletar_tick()
+            if self.deve_descarregar():
+                self.descarregar()
+            self.sleep(max(0.0, min(self.intervalo_segundos - (self.relogio() - inicio), fim - self.relogio())))
+        self.descarregar()
+        return dict(self.estatisticas, pendentes=len(self.buffer))
+
+
+def lambda_handler(event=None, context=None):
+    """
+    Coletor de ticks do Bitcoin. O evento aceita 'duracao_segundos' (padrão: um ciclo de
+    LOTE_MAX_SEGUNDOS), limitada ao tempo restante da invocação; {"aquecimento": true} só
+    pré-inicializa o container.
+    """
+    if (event or {}).get('aquecimento'):
+        pre_inicializar()
+        return {'statusCode': 200, 'body': json.dumps({"message": "Container pré-inicializado."})}
+
+    s3_bucket_name = os.environ.get('S3_BUCKET_NAME')
+    if not s3_bucket_name:
+        print("ERRO: A variável de ambiente 'S3_BUCKET_NAME' não foi configurada.")
+        return {'statusCode': 500, 'body': json.dumps({"message": "Nome do bucket S3 não configurado."})}
+
+    duracao = float((event or {}).get('duracao_segundos', LOTE_MAX_SEGUNDOS))
+    if context is not None:
+        duracao = min(duracao, context.get_remaining_time_in_millis() / 1000 - FOLGA_TIMEOUT_SEGUNDOS)
+
+    resumo = ColetorBitcoin(s3_bucket_name).executar(max(duracao, 0))
+    print(f"Coleta concluída: {resumo}")
+    return {'statusCode': 200, 'body': json.dumps(resumo)}
+
+
+if PRE_INICIALIZAR:
+    pre_inicializar()
+
 # Executa a função
 if __name__ == "__main__":
     extrair_cotacao_bitcoin()
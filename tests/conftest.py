@@ -0,0 +1,64 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+from tests.dados_b3 import RAIZ_REPO, gerar_raw, gerar_raw_misto, ler_csv_refinado
+
+# Os módulos do pipeline são importados como no Glue Job e nas Lambdas: utils.zip no --extra-py-files e
+# os arquivos de app/utils empacotados ao lado do handler
+for subdiretorio in (("app", "utils"), ("app", "src"), ("lambda",)):
+    sys.path.insert(0, os.path.join(RAIZ_REPO, *subdiretorio))
+
+
+@pytest.fixture(scope="session")
+def linhas_csv():
+    return ler_csv_refinado()
+
+
+@pytest.fixture(scope="session")
+def spark():
+    """
+    SparkSession local; os testes que a usam são pulados sem pyspark ou sem um JRE.
+    """
+    pytest.importorskip("pyspark")
+    if not (os.environ.get("JAVA_HOME") or shutil.which("java")):
+        pytest.skip("Spark local requer um JRE (java no PATH ou JAVA_HOME).")
+    from pyspark.sql import SparkSession
+    sessao = (SparkSession.builder.master("local[1]").appName("tests")
+              .config("spark.ui.enabled", "false").config("spark.ui.showConsoleProgress", "false")
+              .config("spark.sql.session.timeZone", "UTC").config("spark.sql.shuffle.partitions", "2")
+              .getOrCreate())
+    sessao.sparkContext.setLogLevel("ERROR")
+    yield sessao
+    sessao.stop()
+
+
+@pytest.fixture(scope="session")
+def raw_texto(tmp_path_factory, linhas_csv):
+    raiz = str(tmp_path_factory.mktemp("raw_texto"))
+    return raiz, gerar_raw(linhas_csv, raiz, tipado=False)
+
+
+@pytest.fixture(scope="session")
+def raw_tipado(tmp_path_factory, linhas_csv):
+    raiz = str(tmp_path_factory.mktemp("raw_tipado"))
+    return raiz, gerar_raw(linhas_csv, raiz, tipado=True)
+
+
+@pytest.fixture(scope="session")
+def raw_misto(tmp_path_factory, linhas_csv):
+    """
+    Partições legadas (texto) e tipadas sob a mesma raiz, como na camada RAW antes da migração.
+    """
+    raiz = str(tmp_path_factory.mktemp("raw_misto"))
+    return raiz, gerar_raw_misto(linhas_csv, raiz)
+
+
+@pytest.fixture(params=["arrow", "spark"])
+def motor(request):
+    from motores import MotorArrow, MotorSpark
+    if request.param == "spark":
+        return MotorSpark(request.getfixturevalue("spark"))
+    return MotorArrow()
@@ -0,0 +1,152 @@
+###################################################################################################################
+# Dados de teste compartilhados: a camada RAW reconstruída a partir de docs/dados/dados_refinados.csv nos dois    #
+# formatos gravados pelo scraper (texto no formato brasileiro, sem 'indice', e numéricos tipados), as linhas      #
+# esperadas do transform_dataframe e a comparação de resultados entre motores, sem depender da ordem das linhas.  #
+###################################################################################################################
+
+import csv
+import datetime
+import os
+from decimal import Decimal
+
+RAIZ_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV_REFINADO = os.path.join(RAIZ_REPO, "docs", "dados", "dados_refinados.csv")
+TOLERANCIA_RELATIVA = 1e-9
+
+
+def ler_csv_refinado(caminho=CSV_REFINADO):
+    with open(caminho, encoding="utf-8") as arquivo:
+        return list(csv.DictReader(arquivo))
+
+
+def formatar_inteiro_br(valor):
+    return f"{valor:,}".replace(",", ".")
+
+
+def formatar_decimal_br(valor):
+    return f"{valor:.3f}".replace(".", ",")
+
+
+def dias(linhas_csv):
+    return sorted({(linha["ano"], linha["mes"], linha["dia"]) for linha in linhas_csv})
+
+
+def gerar_raw(linhas_csv, destino, tipado):
+    """
+    Grava os registros do CSV refinado como arquivos RAW em destino/ano=/mes=/dia=/IBOV.parquet.
+
+    Returns:
+        list: diretórios das partições gravadas, em ordem.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    por_dia = {}
+    for linha in linhas_csv:
+        por_dia.setdefault((linha["ano"], linha["mes"], linha["dia"]), []).append(linha)
+
+    for (ano, mes, dia), linhas in por_dia.items():
+        quantidades = [int(Decimal(l["quantidade_teorica"])) for l in linhas]
+        parts = [Decimal(l["percentual_participacao_acao"]) for l in linhas]
+        acumulados = [Decimal(l["percentual_participacao_acumulada"]) for l in linhas]
+        colunas = {
+            "segment": pa.array([l["segmento"] for l in linhas], pa.string()),
+            "cod": pa.array([l["codigo_bovespa"] for l in linhas], pa.string()),
+            "asset": pa.array([l["nome_acao"] for l in linhas], pa.string()),
+            "type": pa.array([l["nome_tipo_acao"] for l in linhas], pa.string()),
+        }
+        if tipado:
+            colunas["part"] = pa.array(parts, pa.decimal128(18, 3))
+            colunas["partAcum"] = pa.array(acumulados, pa.decimal128(18, 3))
+            colunas["theoricalQty"] = pa.array(quantidades, pa.int64())
+            colunas["indice"] = pa.array(["IBOV"] * len(linhas), pa.string())
+        else:
+            # Formato legado: texto como a API devolve e sem a coluna 'indice'
+            colunas["part"] = pa.array([formatar_decimal_br(v) for v in parts], pa.string())
+            colunas["partAcum"] = pa.array([formatar_decimal_br(v) for v in acumulados], pa.string())
+            colunas["theoricalQty"] = pa.array([formatar_inteiro_br(v) for v in quantidades], pa.string())
+
+        diretorio = os.path.join(destino, f"ano={ano}", f"mes={mes}", f"dia={dia}")
+        os.makedirs(diretorio, exist_ok=True)
+        pq.write_table(pa.table(colunas), os.path.join(diretorio, "IBOV.parquet"))
+
+    return [os.path.join(destino, f"ano={a}", f"mes={m}", f"dia={d}") + "/" for a, m, d in sorted(por_dia)]
+
+
+def gerar_raw_misto(linhas_csv, destino):
+    """
+    Primeira metade dos pregões no formato legado (texto) e a segunda tipada, na mesma raiz.
+    """
+    pregoes = dias(linhas_csv)
+    legados = set(pregoes[:len(pregoes) // 2])
+    gerar_raw([l for l in linhas_csv if (l["ano"], l["mes"], l["dia"]) in legados], destino, tipado=False)
+    gerar_raw([l for l in linhas_csv if (l["ano"], l["mes"], l["dia"]) not in legados], destino, tipado=True)
+    return [os.path.join(destino, f"ano={a}", f"mes={m}", f"dia={d}") + "/" for a, m, d in pregoes]
+
+
+def linhas_golden(linhas_csv):
+    """
+    Linhas esperadas do transform_dataframe para os registros do CSV.
+    """
+    return [{
+        "segmento": linha["segmento"],
+        "codigo_bovespa": linha["codigo_bovespa"],
+        "nome_acao": linha["nome_acao"],
+        "nome_tipo_acao": linha["nome_tipo_acao"],
+        "percentual_participacao_acao": Decimal(linha["percentual_participacao_acao"]),
+        "percentual_participacao_acumulada": Decimal(linha["percentual_participacao_acumulada"]),
+        "quantidade_teorica": Decimal(linha["quantidade_teorica"]),
+        "ano": linha["ano"],
+        "mes": linha["mes"],
+        "dia": linha["dia"],
+        "data_pregao": datetime.date.fromisoformat(linha["data_pregao"]),
+        "indice": "IBOV",
+    } for linha in linhas_csv]
+
+
+def linhas(motor, df):
+    if motor.nome == "spark":
+        return [linha.asDict() for linha in df.collect()]
+    return df.to_pylist()
+
+
+def normalizar_valor(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.date()
+    if isinstance(valor, Decimal):
+        return valor.normalize() if valor == valor.to_integral_value() else valor
+    return valor
+
+
+def normalizar_linhas(linhas_df, colunas):
+    normalizadas = [tuple(normalizar_valor(linha.get(c)) for c in colunas) for linha in linhas_df]
+    return sorted(normalizadas, key=lambda t: tuple("" if v is None else str(v) for v in t))
+
+
+def valores_iguais(a, b):
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None:
+            return a is b
+        return abs(float(a) - float(b)) <= TOLERANCIA_RELATIVA * max(1.0, abs(float(a)), abs(float(b)))
+    if isinstance(a, Decimal) and isinstance(b, Decimal):
+        return a.compare(b) == 0
+    return a == b
+
+
+def comparar(nome, linhas_a, linhas_b, colunas):
+    """
+    Compara dois conjuntos de linhas (list[dict]) ignorando a ordem. Retorna a lista de divergências.
+    """
+    a = normalizar_linhas(linhas_a, colunas)
+    b = normalizar_linhas(linhas_b, colunas)
+    divergencias = []
+    if len(a) != len(b):
+        divergencias.append(f"{nome}: {len(a)} linhas x {len(b)} linhas")
+    for linha_a, linha_b in zip(a, b):
+        for coluna, va, vb in zip(colunas, linha_a, linha_b):
+            if not valores_iguais(va, vb):
+                divergencias.append(f"{nome}: coluna '{coluna}' difere: {va!r} x {vb!r} (linha {linha_a})")
+                break
+        if len(divergencias) >= 5:
+            break
+    return divergencias
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+import pytest
+
+from tests.dados_b3 import linhas
+
+
+def consolidar(linhas_df, tamanho_periodo, soma_qtd, contagem_qtd, soma_part, contagem_part):
+    """
+    {(período, índice, tipo): (média da quantidade teórica, média da participação)} a partir de somas e contagens.
+    """
+    acumulado = {}
+    for linha in linhas_df:
+        chave = (str(linha["data_pregao"])[:tamanho_periodo], linha["indice"], linha["nome_tipo_acao"])
+        total = acumulado.setdefault(chave, [Decimal(0), 0, Decimal(0), 0])
+        total[0] += Decimal(linha[soma_qtd])
+        total[1] += linha[contagem_qtd]
+        total[2] += Decimal(linha[soma_part])
+        total[3] += linha[contagem_part]
+    return {chave: (total[0] / total[1], total[2] / total[3]) for chave, total in acumulado.items()}
+
+
+@pytest.mark.parametrize("tamanho_periodo", [7, 4], ids=["mensal", "anual"])
+def test_consolidacao_pelo_agregado_igual_a_da_tabela_refinada(motor, raw_tipado, tamanho_periodo):
+    from transformacoes_b3 import TransformacoesB3
+    raiz, caminhos = raw_tipado
+    transformacoes = TransformacoesB3(motor)
+    refinado = transformacoes.adicionar_data_pregao(
+        transformacoes.transform_dataframe(motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw)))
+
+    esperado = consolidar([dict(linha, contagem=1) for linha in linhas(motor, refinado)], tamanho_periodo,
+                          "quantidade_teorica", "contagem", "percentual_participacao_acao", "contagem")
+    obtido = consolidar(linhas(motor, transformacoes.agregado_diario_tipo(refinado)), tamanho_periodo,
+                        "soma_quantidade_teorica", "contagem_quantidade_teorica",
+                        "soma_percentual_participacao_acao", "contagem_percentual_participacao_acao")
+
+    assert obtido == esperado
+
+
+def test_agregado_tem_os_mesmos_tipos_nos_dois_motores(spark, raw_tipado):
+    from motores import MotorArrow, MotorSpark
+    from transformacoes_b3 import TransformacoesB3
+    raiz, caminhos = raw_tipado
+    tipos = {}
+    for motor in (MotorArrow(), MotorSpark(spark)):
+        transformacoes = TransformacoesB3(motor)
+        df = transformacoes.adicionar_data_pregao(transformacoes.transform_dataframe(
+            motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw)))
+        primeira = linhas(motor, transformacoes.agregado_diario_tipo(df))[0]
+        tipos[type(motor).__name__] = {coluna: type(valor).__name__ for coluna, valor in primeira.items()}
+
+    assert tipos["MotorArrow"] == tipos["MotorSpark"]
@@ -0,0 +1,77 @@
+import datetime
+from decimal import Decimal
+
+from tests.dados_b3 import formatar_decimal_br, formatar_inteiro_br, linhas
+
+
+def carteiras_por_pregao(linhas_csv):
+    """
+    [(data_pregao, results)] com os registros do CSV no formato da API do scraper.
+    """
+    por_pregao = {}
+    for linha in linhas_csv:
+        por_pregao.setdefault(datetime.date.fromisoformat(linha["data_pregao"]), []).append({
+            "segment": linha["segmento"], "cod": linha["codigo_bovespa"], "asset": linha["nome_acao"],
+            "type": linha["nome_tipo_acao"], "part": formatar_decimal_br(Decimal(linha["percentual_participacao_acao"])),
+            "theoricalQty": formatar_inteiro_br(int(Decimal(linha["quantidade_teorica"])))})
+    return sorted(por_pregao.items())
+
+
+def change_sets(pregoes):
+    from alteracoes_carteira import calcular_alteracoes
+    estado, resultado = None, {}
+    for data_pregao, results in pregoes:
+        resultado[data_pregao], estado = calcular_alteracoes(estado, {"IBOV": results}, data_pregao)
+    return resultado, estado
+
+
+def alteracoes_do_change_set(change_set):
+    return {(alteracao["cod"], alteracao.get("delta_theoricalQty", 0), Decimal(alteracao.get("delta_part", "0")))
+            for alteracao in change_set["indices"]["IBOV"]["alteracoes"]}
+
+
+def test_change_set_igual_as_variacoes_da_janela(motor, raw_tipado, linhas_csv):
+    from transformacoes_b3 import TransformacoesB3
+    raiz, caminhos = raw_tipado
+    transformacoes = TransformacoesB3(motor)
+    df = transformacoes.window_variacoes_diarias(transformacoes.adicionar_data_pregao(
+        transformacoes.transform_dataframe(motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw))))
+    pregoes = carteiras_por_pregao(linhas_csv)
+    datas = [data_pregao for data_pregao, _ in pregoes]
+    anteriores = dict(zip(datas[1:], datas))
+
+    por_janela = {data_pregao: set() for data_pregao in datas[1:]}
+    for linha in linhas(motor, df):
+        anterior = anteriores.get(linha["data_pregao"])
+        if anterior is None or linha["intervalo"] != (linha["data_pregao"] - anterior).days:
+            continue
+        delta_quantidade = int(linha["variacao_quantidade_teorica"])
+        delta_participacao = Decimal(linha["variacao_percentual_participacao_acao_anterior"])
+        if delta_quantidade or delta_participacao:
+            por_janela[linha["data_pregao"]].add((linha["codigo_bovespa"], delta_quantidade, delta_participacao))
+
+    resultado, _ = change_sets(pregoes)
+    assert {data_pregao: alteracoes_do_change_set(resultado[data_pregao]) for data_pregao in datas[1:]} == por_janela
+
+
+def test_entradas_e_saidas_fecham_com_a_carteira_de_cada_pregao(linhas_csv):
+    pregoes = carteiras_por_pregao(linhas_csv)
+    resultado, _ = change_sets(pregoes)
+
+    for (_, anterior), (data_pregao, atual) in zip(pregoes, pregoes[1:]):
+        codigos_anteriores, codigos = {r["cod"] for r in anterior}, {r["cod"] for r in atual}
+        indice = resultado[data_pregao]["indices"]["IBOV"]
+        assert {item["cod"] for item in indice["entradas"]} == codigos - codigos_anteriores
+        assert {item["cod"] for item in indice["saidas"]} == codigos_anteriores - codigos
+
+
+def test_regravacao_do_mesmo_pregao_compara_com_o_pregao_anterior(linhas_csv):
+    from alteracoes_carteira import calcular_alteracoes
+    pregoes = carteiras_por_pregao(linhas_csv)[:2]
+    resultado, estado = change_sets(pregoes)
+    data_pregao, results = pregoes[-1]
+
+    regravado, _ = calcular_alteracoes(estado, {"IBOV": results}, data_pregao)
+
+    assert regravado["indices"] == resultado[data_pregao]["indices"]
+    assert regravado["indices"]["IBOV"]["data_anterior"] == pregoes[0][0].isoformat()
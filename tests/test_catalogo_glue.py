@@ -0,0 +1,102 @@
+import pytest
+from botocore.exceptions import ClientError
+
+COLUNAS = [{'Name': 'cod', 'Type': 'string'}, {'Name': 'theoricalQty', 'Type': 'bigint'}]
+CHAVES = [{'Name': 'ano', 'Type': 'string'}, {'Name': 'mes', 'Type': 'string'}, {'Name': 'dia', 'Type': 'string'}]
+
+
+class GlueFalso:
+    """
+    Uma tabela e partições em memória; 'throttling' lista as partições que falham uma vez por erro transitório.
+    """
+
+    def __init__(self, throttling=()):
+        self.tabela = {'Name': 'tb', 'PartitionKeys': list(CHAVES), 'Parameters': {},
+                       'StorageDescriptor': {'Columns': COLUNAS + CHAVES, 'Location': 's3://bucket/tb/'}}
+        self.particoes = {}
+        self.throttling = set(throttling)
+        self.chamadas = []
+
+    def get_table(self, DatabaseName, Name):
+        self.chamadas.append('get_table')
+        if Name != 'tb':
+            raise ClientError({'Error': {'Code': 'EntityNotFoundException'}}, 'GetTable')
+        return {'Table': self.tabela}
+
+    def update_table(self, DatabaseName, TableInput):
+        self.chamadas.append('update_table')
+        self.tabela = dict(self.tabela, **TableInput)
+
+    def batch_create_partition(self, DatabaseName, TableName, PartitionInputList):
+        self.chamadas.append('batch_create_partition')
+        assert len(PartitionInputList) <= 100
+        erros = []
+        for entrada in PartitionInputList:
+            chave = tuple(entrada['Values'])
+            if chave in self.throttling:
+                self.throttling.discard(chave)
+                erros.append({'PartitionValues': list(chave), 'ErrorDetail': {'ErrorCode': 'ThrottlingException'}})
+            elif chave in self.particoes:
+                erros.append({'PartitionValues': list(chave), 'ErrorDetail': {'ErrorCode': 'AlreadyExistsException'}})
+            else:
+                self.particoes[chave] = entrada
+        return {'Errors': erros}
+
+    def batch_get_partition(self, DatabaseName, TableName, PartitionsToGet):
+        self.chamadas.append('batch_get_partition')
+        assert len(PartitionsToGet) <= 100
+        return {'Partitions': [dict(self.particoes[tuple(item['Values'])]) for item in PartitionsToGet
+                               if tuple(item['Values']) in self.particoes]}
+
+
+def particoes(dias):
+    return [(["2025", "01", f"{dia:03d}"], f"s3://bucket/tb/ano=2025/mes=01/dia={dia:03d}/") for dia in range(dias)]
+
+
+@pytest.fixture
+def catalogo():
+    from catalogo_glue import CatalogoGlue
+
+    def criar(glue):
+        return CatalogoGlue(glue, sleep=lambda segundos: None)
+    return criar
+
+
+def test_particoes_sao_criadas_em_lotes_e_so_as_transitorias_sao_reenviadas(catalogo):
+    glue = GlueFalso(throttling={("2025", "01", "007"), ("2025", "01", "150")})
+
+    resumo = catalogo(glue).criar_particoes("db", "tb", particoes(250))
+
+    # 3 lotes de até 100 e um único reenvio com as 2 entradas que falharam
+    assert resumo == {'criadas': 250, 'existentes': 0, 'chamadas': 4}
+    assert len(glue.particoes) == 250
+    assert glue.chamadas.count('get_table') == 1
+    # Partições levam só as colunas de dados, sem as chaves de partição
+    assert glue.particoes[("2025", "01", "000")]['StorageDescriptor']['Columns'] == COLUNAS
+
+
+def test_reexecucao_so_encontra_particoes_existentes(catalogo):
+    glue = GlueFalso()
+    cliente = catalogo(glue)
+    cliente.criar_particoes("db", "tb", particoes(120))
+
+    assert cliente.criar_particoes("db", "tb", particoes(120)) == {'criadas': 0, 'existentes': 120, 'chamadas': 2}
+    assert len(cliente.obter_particoes("db", "tb", [valores for valores, _ in particoes(130)])) == 120
+
+
+def test_update_table_so_quando_o_esquema_muda(catalogo):
+    glue = GlueFalso()
+    cliente = catalogo(glue)
+
+    assert cliente.atualizar_tabela("db", "tb", COLUNAS + CHAVES, CHAVES) is False
+    assert cliente.atualizar_tabela("db", "tb", COLUNAS + CHAVES + [{'Name': 'indice', 'Type': 'string'}]) is True
+    assert glue.chamadas.count('update_table') == 1
+
+
+def test_erro_nao_transitorio_interrompe_o_registro(catalogo):
+    glue = GlueFalso()
+    glue.batch_create_partition = lambda **kwargs: {'Errors': [{
+        'PartitionValues': ["2025", "01", "000"], 'ErrorDetail': {'ErrorCode': 'InvalidInputException'}}]}
+
+    with pytest.raises(RuntimeError):
+        catalogo(glue).criar_particoes("db", "tb", particoes(1))
@@ -0,0 +1,111 @@
+import io
+from datetime import datetime, timezone
+
+import pytest
+
+PRECO = '<div class="text-5xl/9 font-bold" data-test="instrument-price-last">336.195,0</div>'
+
+
+def pagina(posicao, preco=PRECO):
+    """
+    Página com links, scripts e o JSON do __NEXT_DATA__ ao redor da <div> do preço, em 'posicao' (0 a 1).
+    """
+    blocos = [f'<div class="row"><a href="/crypto/moeda-{i}" data-test="link-{i}">Moeda {i}</a></div>'
+              for i in range(200)]
+    blocos.insert(int(len(blocos) * posicao), preco)
+    return (f"<html><head><script>window.cfg={{\"a\": 1}};</script></head><body><main>{''.join(blocos)}</main>"
+            f"<script id=\"__NEXT_DATA__\" type=\"application/json\">{{\"props\": {{}}}}</script></body></html>")
+
+
+@pytest.fixture(scope="module")
+def coletor():
+    pytest.importorskip("bs4")
+    pytest.importorskip("requests")
+    import lambda_functions_scrapper_bitcoin
+    return lambda_functions_scrapper_bitcoin
+
+
+@pytest.mark.parametrize("html", [
+    pagina(0.0), pagina(0.5), pagina(1.0),
+    pagina(0.5, PRECO.replace('"instrument-price-last"', "'instrument-price-last'")),
+    # Atributo que o trecho não localiza no texto: fallback no documento inteiro
+    pagina(0.5, PRECO.replace('data-test="instrument-price-last"', 'data-test="instrument&#45;price-last"')),
+], ids=["inicio", "meio", "fim", "aspas_simples", "fallback"])
+def test_extracao_igual_a_do_documento_inteiro(coletor, html):
+    from bs4 import BeautifulSoup
+    elemento = BeautifulSoup(html, 'html.parser').find('div', {'data-test': 'instrument-price-last'})
+
+    assert coletor.extrair_preco_html(html) == coletor.converter_preco(elemento.get_text()) == 336195.0
+
+
+def test_pagina_sem_o_preco(coletor):
+    assert coletor.extrair_preco_html(pagina(0.5, "")) is None
+
+
+class Resposta:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class Sessao:
+    def __init__(self, html):
+        self.html = html
+
+    def get(self, url, timeout=None):
+        return Resposta(self.html)
+
+
+class S3Falso:
+    def __init__(self, falhas=0):
+        self.objetos = {}
+        self.falhas = falhas
+
+    def put_object(self, Bucket, Key, Body, ContentLength):
+        if self.falhas:
+            self.falhas -= 1
+            raise ConnectionError("S3 indisponível")
+        self.objetos[Key] = Body.read()
+
+
+class Relogio:
+    def __init__(self, inicio):
+        self.agora = inicio
+
+    def __call__(self):
+        return self.agora
+
+    def dormir(self, segundos):
+        self.agora += segundos
+
+
+def ticks_gravados(s3):
+    import pyarrow.parquet as pq
+    return sum(pq.read_table(io.BytesIO(corpo)).num_rows for corpo in s3.objetos.values())
+
+
+def test_coletor_grava_um_arquivo_por_dia_e_por_lote(coletor):
+    # 10 minutos de ticks a cada 5s cruzando a meia-noite (UTC), lotes de até 60 ticks
+    relogio = Relogio(datetime(2025, 7, 25, 23, 55, tzinfo=timezone.utc).timestamp())
+    s3 = S3Falso()
+    resumo = coletor.ColetorBitcoin("bucket", intervalo_segundos=5, max_ticks=60, max_segundos=300, capacidade=120,
+                                    session=Sessao(pagina(0.5)), s3_client=s3, relogio=relogio,
+                                    sleep=relogio.dormir).executar(600)
+
+    assert resumo["ticks"] == 120 and resumo["pendentes"] == 0
+    assert ticks_gravados(s3) == 120
+    assert sorted({"/".join(chave.split("/")[1:4]) for chave in s3.objetos}) == [
+        "ano=2025/mes=07/dia=25", "ano=2025/mes=07/dia=26"]
+
+
+def test_descarga_com_falha_mantem_os_ticks_no_buffer(coletor):
+    relogio = Relogio(datetime(2025, 7, 25, 12, tzinfo=timezone.utc).timestamp())
+    s3 = S3Falso(falhas=1)
+    resumo = coletor.ColetorBitcoin("bucket", intervalo_segundos=5, max_ticks=10, max_segundos=300, capacidade=100,
+                                    session=Sessao(pagina(0.5)), s3_client=s3, relogio=relogio,
+                                    sleep=relogio.dormir).executar(100)
+
+    assert resumo["ticks"] == 20 and resumo["pendentes"] == 0
+    assert ticks_gravados(s3) == 20
@@ -0,0 +1,103 @@
+import copy
+import os
+
+import pytest
+
+COLUNAS_PARTICAO = ["ano", "mes", "dia", "data_pregao"]
+
+
+class GlueCatalogoMemoria:
+    """
+    Uma tabela com partições em memória; 'parametros' da tabela habilitam a partition projection.
+    """
+
+    def __init__(self, location, particoes, parametros=None):
+        self.location = location
+        self.parametros = parametros or {}
+        self.particoes = {tuple(valores): {'Values': list(valores), 'StorageDescriptor': {'Location': caminho}}
+                          for valores, caminho in particoes}
+
+    def get_table(self, DatabaseName, Name):
+        return {'Table': {'StorageDescriptor': {'Location': self.location}, 'Parameters': self.parametros,
+                          'PartitionKeys': [{'Name': nome} for nome in COLUNAS_PARTICAO]}}
+
+    def get_partitions(self, DatabaseName, TableName, NextToken=None):
+        return {'Partitions': [copy.deepcopy(particao) for _, particao in sorted(self.particoes.items())]}
+
+    def batch_update_partition(self, DatabaseName, TableName, Entries):
+        for entrada in Entries:
+            self.particoes[tuple(entrada['PartitionValueList'])] = dict(entrada['PartitionInput'])
+        return {'Errors': []}
+
+
+@pytest.fixture
+def tabela_fragmentada(tmp_path, raw_tipado):
+    """
+    Tabela refinada com vários arquivos pequenos por pregão, como as gravações com muitas shuffle partitions.
+    """
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    from motores import MotorArrow
+    from transformacoes_b3 import TransformacoesB3
+
+    raiz, caminhos = raw_tipado
+    motor = MotorArrow()
+    transformacoes = TransformacoesB3(motor)
+    tabela = transformacoes.adicionar_data_pregao(transformacoes.transform_dataframe(
+        motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw)))
+    location = str(tmp_path / "refinado")
+    particoes = []
+    for data_pregao in sorted(set(tabela.column("data_pregao").to_pylist())):
+        dia = tabela.filter(pc.equal(tabela.column("data_pregao"), data_pregao)).drop_columns(COLUNAS_PARTICAO)
+        valores = [f"{data_pregao.year}", f"{data_pregao.month:02d}", f"{data_pregao.day:02d}", str(data_pregao)]
+        diretorio = os.path.join(location, *(f"{chave}={valor}" for chave, valor in zip(COLUNAS_PARTICAO, valores)))
+        os.makedirs(diretorio)
+        for indice, inicio in enumerate(range(0, dia.num_rows, 10)):
+            pq.write_table(dia.slice(inicio, 10), os.path.join(diretorio, f"part-{indice:05d}.snappy.parquet"))
+        particoes.append((valores, diretorio + "/"))
+    return location, particoes
+
+
+def conteudo(catalogo):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    tabelas = []
+    for valores, particao in sorted(catalogo.particoes.items()):
+        tabela = pq.read_table(particao['StorageDescriptor']['Location'])
+        tabelas.append(tabela.append_column("particao", pa.array(["/".join(valores)] * tabela.num_rows)))
+    return pa.concat_tables(tabelas).sort_by([(nome, "ascending") for nome in ["particao", "codigo_bovespa"]])
+
+
+def compactar(catalogo, particoes):
+    from compactacao import JobCompactacaoB3
+    from instrumentacao import Instrumentacao, SinkNulo
+    datas = [valores[3] for valores, _ in particoes]
+    job = JobCompactacaoB3("db", "tb", start_date=min(datas), end_date=max(datas),
+                           instrumentacao=Instrumentacao("test_compactacao", sink=SinkNulo()))
+    job.glue_client = catalogo
+    return job.run()
+
+
+def test_compactacao_preserva_o_conteudo_e_e_idempotente(tabela_fragmentada):
+    location, particoes = tabela_fragmentada
+    catalogo = GlueCatalogoMemoria(location, particoes)
+    original = conteudo(catalogo)
+
+    estatisticas = compactar(catalogo, particoes)
+
+    assert len(estatisticas) == len(particoes)
+    assert all(len(os.listdir(caminho)) == 1 for _, caminho in particoes)
+    assert all(particao['StorageDescriptor']['Location'] == caminho
+               for (_, caminho), particao in zip(particoes, catalogo.particoes.values()))
+    assert conteudo(catalogo).equals(original)
+    assert compactar(catalogo, particoes) == []
+    assert conteudo(catalogo).equals(original)
+
+
+def test_tabela_com_partition_projection_nao_e_compactada(tabela_fragmentada):
+    location, particoes = tabela_fragmentada
+    catalogo = GlueCatalogoMemoria(location, particoes, parametros={'projection.enabled': 'true'})
+    arquivos = {caminho: sorted(os.listdir(caminho)) for _, caminho in particoes}
+
+    assert compactar(catalogo, particoes) == []
+    assert {caminho: sorted(os.listdir(caminho)) for _, caminho in particoes} == arquivos
@@ -0,0 +1,108 @@
+import pytest
+
+from tests.dados_b3 import linhas
+
+
+@pytest.fixture
+def refinado(motor, raw_tipado):
+    from transformacoes_b3 import TransformacoesB3
+    raiz, caminhos = raw_tipado
+    transformacoes = TransformacoesB3(motor)
+    return transformacoes.adicionar_data_pregao(
+        transformacoes.transform_dataframe(motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw)))
+
+
+def dimensao(motor, tmp_path):
+    from dimensao_acoes import DimensaoAcoes
+    return DimensaoAcoes(motor, str(tmp_path / "historico"), str(tmp_path / "atual"))
+
+
+def aplicado_pregao_a_pregao(linhas_lote):
+    from dimensao_acoes import aplicar_lote
+    versoes, ultimos = [], {}
+    for data_pregao in sorted({linha["data_pregao"] for linha in linhas_lote}):
+        versoes, ultimos, _ = aplicar_lote(versoes, ultimos, [linha for linha in linhas_lote
+                                                              if linha["data_pregao"] == data_pregao])
+    return versoes
+
+
+def test_coleta_em_fatias_igual_ao_historico_aplicado_pregao_a_pregao(motor, refinado, tmp_path):
+    from dimensao_acoes import COLUNAS_LOTE
+    tabela = dimensao(motor, tmp_path)
+
+    # Fatias pequenas: vários pregões por coleta e várias coletas por lote
+    resumo = tabela.atualizar(refinado, linhas_por_coleta=200)
+
+    assert resumo["linhas_lote"] == len(linhas(motor, refinado))
+    assert tabela.ler(tabela.location_historico) == aplicado_pregao_a_pregao(motor.coletar(refinado, COLUNAS_LOTE))
+
+
+def test_reprocessamento_ate_o_ultimo_pregao_nao_altera_o_historico(motor, refinado, tmp_path):
+    tabela = dimensao(motor, tmp_path)
+    tabela.atualizar(refinado)
+    historico, atual = tabela.ler(tabela.location_historico), tabela.ler(tabela.location_atual)
+    ultimo = max(linha["data_pregao"] for linha in atual)
+
+    resumo = tabela.atualizar(motor.filtrar_entre(refinado, "data_pregao", ultimo, ultimo))
+
+    assert resumo["ignorados"] == []
+    assert tabela.ler(tabela.location_historico) == historico
+    assert tabela.ler(tabela.location_atual) == atual
+
+
+def test_lote_anterior_ao_ultimo_pregao_e_ignorado(motor, refinado, tmp_path):
+    tabela = dimensao(motor, tmp_path)
+    tabela.atualizar(refinado)
+    historico = tabela.ler(tabela.location_historico)
+    primeiro = min(versao["valid_from"] for versao in historico)
+
+    resumo = tabela.atualizar(motor.filtrar_entre(refinado, "data_pregao", primeiro, primeiro))
+
+    assert resumo["ignorados"] == ["IBOV"]
+    assert tabela.ler(tabela.location_historico) == historico
+
+
+def test_fatias_agrupam_pregoes_consecutivos_ate_o_limite():
+    from datetime import date
+    from dimensao_acoes import fatias_pregoes
+    contagens = [{"data_pregao": date(2025, 7, dia), "linhas": linhas_pregao}
+                 for dia, linhas_pregao in ((1, 40), (2, 40), (3, 90), (4, 10), (7, 150))]
+
+    assert fatias_pregoes(contagens, 100) == [(date(2025, 7, 1), date(2025, 7, 2)),
+                                              (date(2025, 7, 3), date(2025, 7, 4)),
+                                              (date(2025, 7, 7), date(2025, 7, 7))]
+
+
+def test_composicao_e_periodos_iguais_aos_da_varredura_da_tabela_refinada(motor, refinado, tmp_path):
+    tabela = dimensao(motor, tmp_path)
+    tabela.atualizar(refinado)
+    presencas = {}
+    for linha in linhas(motor, refinado):
+        presencas.setdefault(linha["codigo_bovespa"], set()).add(linha["data_pregao"])
+    pregoes = sorted(set().union(*presencas.values()))
+
+    def periodos_varredura(codigo):
+        periodos, inicio = [], None
+        for pregao in pregoes:
+            if pregao in presencas[codigo] and inicio is None:
+                inicio = pregao
+            elif pregao not in presencas[codigo] and inicio is not None:
+                periodos.append((inicio, pregao))
+                inicio = None
+        return periodos + ([(inicio, None)] if inicio else [])
+
+    def periodos_dimensao(codigo):
+        periodos = []
+        for versao in tabela.ler(tabela.location_historico):
+            if versao["codigo_bovespa"] != codigo:
+                continue
+            if periodos and periodos[-1][1] == versao["valid_from"]:
+                periodos[-1] = (periodos[-1][0], versao["valid_to"])
+            else:
+                periodos.append((versao["valid_from"], versao["valid_to"]))
+        return periodos
+
+    assert sorted(linha["codigo_bovespa"] for linha in tabela.ler(tabela.location_atual)) == \
+        sorted(codigo for codigo, datas in presencas.items() if pregoes[-1] in datas)
+    assert {codigo: periodos_dimensao(codigo) for codigo in presencas} == \
+        {codigo: periodos_varredura(codigo) for codigo in presencas}
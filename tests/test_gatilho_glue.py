@@ -0,0 +1,98 @@
+import pytest
+from botocore.exceptions import ClientError
+
+
+class GlueFalso:
+    def __init__(self, erro=None):
+        self.erro = erro
+        self.execucoes = []
+
+    def get_job(self, JobName):
+        return {'Job': {'ExecutionProperty': {'MaxConcurrentRuns': 1}}}
+
+    def get_job_runs(self, JobName, MaxResults):
+        return {'JobRuns': []}
+
+    def start_job_run(self, JobName, Arguments):
+        if self.erro:
+            raise ClientError({'Error': {'Code': self.erro, 'Message': self.erro}}, 'StartJobRun')
+        self.execucoes.append(Arguments['--INPUT_PATHS'].split(','))
+        # Cada execução ocupa o único slot até o fim do teste
+        self.get_job_runs = lambda JobName, MaxResults: {'JobRuns': [{'JobRunState': 'RUNNING'}]}
+        return {'JobRunId': f"jr_{len(self.execucoes)}"}
+
+
+class Relogio:
+    def __init__(self, agora=1000.0):
+        self.agora = agora
+
+    def __call__(self):
+        return self.agora
+
+
+PARTICOES = ["s3://raw/ano=2025/mes=07/dia=18/", "s3://raw/ano=2025/mes=07/dia=21/"]
+
+
+def test_so_a_invocacao_mais_recente_reivindica_o_lote():
+    from lambda_function import MemoriaEstadoStore, registrar_pendentes, reivindicar_pendentes
+    store = MemoriaEstadoStore()
+    registrar_pendentes(store, PARTICOES[:1], "a", agora=0)
+    registrar_pendentes(store, PARTICOES[1:], "b", agora=1)
+
+    assert reivindicar_pendentes(store, "a", expiracao_seconds=120, agora=5) == []
+    assert reivindicar_pendentes(store, "b", expiracao_seconds=120, agora=5) == PARTICOES
+
+
+def test_lote_abandonado_e_assumido_por_qualquer_invocacao_apos_expirar():
+    from lambda_function import MemoriaEstadoStore, registrar_pendentes, reivindicar_pendentes
+    store = MemoriaEstadoStore()
+    registrar_pendentes(store, PARTICOES, "morta", agora=0)
+
+    assert reivindicar_pendentes(store, None, expiracao_seconds=120, agora=60) == []
+    assert reivindicar_pendentes(store, None, expiracao_seconds=120, agora=121) == PARTICOES
+    assert store.ler()['pendentes'] == []
+
+
+def test_drenagem_agendada_inicia_o_lote_abandonado(monkeypatch):
+    import lambda_function
+    store = lambda_function.MemoriaEstadoStore()
+    glue = GlueFalso()
+    lambda_function.registrar_pendentes(store, PARTICOES, "morta", agora=0)
+    monkeypatch.setattr(lambda_function, "PENDENTES_EXPIRACAO_SECONDS", 0)
+
+    lambda_function.lambda_handler({'drenar': True}, None, glue_client=glue, store=store, debounce_seconds=15,
+                                   sleep=lambda segundos: None)
+
+    assert glue.execucoes == [PARTICOES]
+
+
+def test_lote_volta_para_a_fila_quando_o_start_job_run_falha():
+    from lambda_function import AgendadorGlueJob, MemoriaEstadoStore
+    store = MemoriaEstadoStore()
+    agendador = AgendadorGlueJob(GlueFalso(erro='AccessDeniedException'), "job", store, sleep=lambda s: None)
+    agendador.enfileirar(PARTICOES)
+
+    with pytest.raises(ClientError):
+        agendador.drenar()
+
+    estado = store.ler()
+    assert [item['particao'] for item in estado['fila']] == PARTICOES
+    assert estado['em_andamento'] == {}
+
+
+def test_lease_expirado_volta_para_a_fila_e_e_despachado():
+    from lambda_function import AgendadorGlueJob, MemoriaEstadoStore
+    store, relogio, glue = MemoriaEstadoStore(), Relogio(), GlueFalso()
+    agendador = AgendadorGlueJob(glue, "job", store, relogio=relogio, lease_seconds=120, sleep=lambda s: None)
+    agendador.enfileirar(PARTICOES)
+    # Invocação que morre entre a retirada do lote e o start_job_run
+    agendador._retirar_lote()
+
+    relogio.agora += 60
+    assert agendador.drenar()['execucoes'] == []
+    relogio.agora += 61
+    relatorio = agendador.drenar()
+
+    assert relatorio['leases_recuperados'] == len(PARTICOES)
+    assert glue.execucoes == [PARTICOES]
+    assert store.ler()['em_andamento'] == {} and store.ler()['fila'] == []
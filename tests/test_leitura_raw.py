@@ -0,0 +1,59 @@
+import pytest
+
+from tests.dados_b3 import gerar_raw_misto
+
+
+def test_uniao_sem_normalizar_falha_com_layouts_mistos(raw_misto):
+    import pyarrow as pa
+    from motores import MotorArrow
+    raiz, caminhos = raw_misto
+
+    with pytest.raises((pa.ArrowTypeError, pa.ArrowInvalid)):
+        MotorArrow().ler_parquet(caminhos, raiz)
+
+
+def test_normalizar_raw_converte_os_dois_layouts_para_o_schema_tipado(motor, raw_misto, linhas_csv):
+    from transformacoes_b3 import COLUNAS_PARTICAO_RAW, SCHEMA_RAW, TransformacoesB3
+    raiz, caminhos = raw_misto
+    transformacoes = TransformacoesB3(motor)
+
+    df = motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw)
+
+    assert motor.colunas(df) == [nome for nome, _ in SCHEMA_RAW] + COLUNAS_PARTICAO_RAW
+    assert motor.contar(df) == len(linhas_csv)
+    # Os arquivos legados não têm 'indice': a coluna vem nula e o transform_dataframe preenche IBOV
+    indices = {linha["indice"] for linha in motor.coletar(transformacoes.transform_dataframe(
+        transformacoes.adicionar_data_pregao(df)), ["indice"])}
+    assert indices == {"IBOV"}
+
+
+def test_migracao_raw_tipada_e_idempotente(tmp_path, linhas_csv):
+    import pyarrow.dataset as ds
+    from migracao_raw_tipada import MigracaoRawTipada, raw_schema
+    raiz = str(tmp_path / "raw")
+    caminhos = gerar_raw_misto(linhas_csv, raiz)
+    legados = len(caminhos) // 2
+
+    simulado = MigracaoRawTipada(raiz, dry_run=True).run()
+    migrado = MigracaoRawTipada(raiz).run()
+    reexecucao = MigracaoRawTipada(raiz).run()
+
+    assert simulado["migrados"] == migrado["migrados"] == legados
+    assert reexecucao["migrados"] == 0
+    tabela = ds.dataset(raiz, format="parquet", partitioning="hive").to_table()
+    assert tabela.select(raw_schema().names).schema == raw_schema()
+    assert tabela.num_rows == len(linhas_csv)
+
+
+def test_migracao_raw_tipada_recusa_valor_fora_do_formato(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from migracao_raw_tipada import MigracaoRawTipada
+    diretorio = tmp_path / "ano=2025" / "mes=07" / "dia=18"
+    diretorio.mkdir(parents=True)
+    pq.write_table(pa.table({"segment": ["s"], "cod": ["ABCD3"], "asset": ["A"], "type": ["ON"],
+                             "part": ["1.5"], "partAcum": ["1,500"], "theoricalQty": ["1.000"]}),
+                   str(diretorio / "IBOV.parquet"))
+
+    with pytest.raises(ValueError, match="part"):
+        MigracaoRawTipada(str(tmp_path)).run()
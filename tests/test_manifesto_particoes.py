@@ -0,0 +1,91 @@
+import io
+import threading
+
+import pytest
+from botocore.exceptions import ClientError
+
+
+class S3Falso:
+    """
+    Objetos em memória com ETag e as pré-condições IfMatch / IfNoneMatch do put_object.
+    """
+
+    def __init__(self):
+        self.objetos = {}
+        self.versao = 0
+        self.antes_do_put = None
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objetos:
+            raise ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+        corpo, etag = self.objetos[(Bucket, Key)]
+        return {'Body': io.BytesIO(corpo), 'ETag': etag}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, IfMatch=None, IfNoneMatch=None):
+        if self.antes_do_put:
+            gancho, self.antes_do_put = self.antes_do_put, None
+            gancho()
+        atual = self.objetos.get((Bucket, Key))
+        if (IfNoneMatch and atual) or (IfMatch and (not atual or atual[1] != IfMatch)):
+            raise ClientError({'Error': {'Code': 'PreconditionFailed'}}, 'PutObject')
+        self.versao += 1
+        self.objetos[(Bucket, Key)] = (Body, f'"{self.versao}"')
+        return {'ETag': f'"{self.versao}"'}
+
+
+def snapshot(dia):
+    particao = f"ano=2025/mes=07/dia={dia:02d}"
+    return {particao: {f"{particao}/dados.parquet": {"etag": str(dia), "size": dia}}}
+
+
+def test_registros_concorrentes_no_s3_nao_se_sobrescrevem():
+    from manifesto_particoes import ManifestoParticoes
+    s3 = S3Falso()
+    manifesto = ManifestoParticoes("s3://bucket/manifesto.json", s3_client=s3)
+    manifesto.registrar_processadas(snapshot(1))
+    # Outra execução grava entre a leitura e o put desta
+    s3.antes_do_put = lambda: ManifestoParticoes("s3://bucket/manifesto.json", s3_client=s3) \
+        .registrar_processadas(snapshot(2))
+
+    manifesto.registrar_processadas(snapshot(3))
+
+    assert sorted(manifesto.carregar()["particoes"]) == [f"ano=2025/mes=07/dia={dia:02d}" for dia in (1, 2, 3)]
+
+
+def test_registros_concorrentes_no_disco_nao_se_sobrescrevem(tmp_path):
+    from manifesto_particoes import ManifestoParticoes
+    caminho = str(tmp_path / "manifesto.json")
+    threads = [threading.Thread(target=ManifestoParticoes(caminho).registrar_processadas, args=(snapshot(dia),))
+               for dia in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(ManifestoParticoes(caminho).carregar()["particoes"]) == 8
+
+
+def test_particoes_registradas_deixam_de_ser_pendentes(tmp_path, raw_tipado):
+    from manifesto_particoes import ManifestoParticoes
+    raiz, caminhos = raw_tipado
+    manifesto = ManifestoParticoes(str(tmp_path / "manifesto.json"))
+
+    pendentes, snapshot_atual = manifesto.particoes_pendentes(raiz)
+    assert len(pendentes) == len(caminhos)
+
+    manifesto.registrar_processadas(snapshot_atual)
+    assert manifesto.particoes_pendentes(raiz)[0] == []
+
+
+def test_conflito_persistente_interrompe_o_registro():
+    from manifesto_particoes import ManifestoParticoes
+    from objetos_s3 import atualizar_json
+    s3 = S3Falso()
+    ManifestoParticoes("s3://bucket/manifesto.json", s3_client=s3).registrar_processadas(snapshot(1))
+
+    def sempre_alterado(conteudo):
+        s3.antes_do_put = lambda: s3.put_object("bucket", "manifesto.json", b"{}", IfMatch=None)
+        return conteudo, None
+
+    with pytest.raises(RuntimeError):
+        atualizar_json("s3://bucket/manifesto.json", sempre_alterado, s3, max_tentativas=3, sleep=lambda s: None)
@@ -0,0 +1,49 @@
+import pytest
+
+from tests.dados_b3 import comparar, linhas, linhas_golden
+
+
+def executar_etapas(transformacoes, df):
+    from qualidade_dados import CHAVE_PREGAO, REGRAS, agregacoes
+    etapas = {}
+    df = transformacoes.adicionar_data_pregao(df)
+    etapas["transform_dataframe"] = transformacoes.transform_dataframe(df)
+    etapas["sumarizacao_tipo"] = transformacoes.sumarizacao_tipo(etapas["transform_dataframe"])
+    etapas["window_variacoes_diarias"] = transformacoes.window_variacoes_diarias(etapas["transform_dataframe"])
+    etapas["window_media_movel"] = transformacoes.window_media_movel(etapas["transform_dataframe"])
+    # Agregação única das regras de qualidade (contagens condicionais e de distintos)
+    etapas["qualidade_dados"] = transformacoes.motor.agregar(etapas["transform_dataframe"], CHAVE_PREGAO,
+                                                             agregacoes(REGRAS))
+    return etapas
+
+
+def resultados(motor, raiz, caminhos):
+    from transformacoes_b3 import TransformacoesB3
+    transformacoes = TransformacoesB3(motor)
+    df = motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw)
+    etapas = executar_etapas(transformacoes, df)
+    return {nome: (sorted(motor.colunas(resultado)), linhas(motor, resultado)) for nome, resultado in etapas.items()}
+
+
+@pytest.mark.parametrize("variante", ["raw_texto", "raw_tipado", "raw_misto"])
+def test_spark_e_arrow_produzem_os_mesmos_resultados(request, spark, variante):
+    from motores import MotorArrow, MotorSpark
+    raiz, caminhos = request.getfixturevalue(variante)
+
+    spark_resultados = resultados(MotorSpark(spark), raiz, caminhos)
+    arrow_resultados = resultados(MotorArrow(), raiz, caminhos)
+
+    for etapa, (colunas_spark, linhas_spark) in spark_resultados.items():
+        colunas_arrow, linhas_arrow = arrow_resultados[etapa]
+        assert colunas_spark == colunas_arrow, etapa
+        assert comparar(etapa, linhas_spark, linhas_arrow, colunas_spark) == []
+
+
+@pytest.mark.parametrize("variante", ["raw_texto", "raw_tipado", "raw_misto"])
+def test_transform_dataframe_reproduz_o_csv_refinado(request, motor, linhas_csv, variante):
+    raiz, caminhos = request.getfixturevalue(variante)
+    golden = linhas_golden(linhas_csv)
+
+    _, obtidas = resultados(motor, raiz, caminhos)["transform_dataframe"]
+
+    assert comparar("golden", obtidas, golden, sorted(golden[0])) == []
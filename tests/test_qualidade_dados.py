@@ -0,0 +1,91 @@
+import os
+import shutil
+
+import pytest
+
+# Defeito injetado -> regras que devem apontá-lo no relatório
+DEFEITOS = {
+    "arquivo_repetido": ["duplicadas"],
+    "quantidade_nula": ["nulos_quantidade_teorica"],
+    "participacao_negativa": ["negativos_percentual_participacao_acao", "soma_participacao"],
+    "carteira_incompleta": ["soma_participacao"],
+}
+
+
+def injetar_defeitos(caminhos):
+    """
+    Um defeito por pregão nos primeiros pregões, regravando o arquivo RAW tipado.
+
+    Returns:
+        dict: defeito -> data do pregão (AAAA-MM-DD)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    injetados = {}
+    for defeito, caminho in zip(DEFEITOS, caminhos):
+        arquivo = os.path.join(caminho, "IBOV.parquet")
+        tabela = pq.read_table(arquivo)
+        if defeito == "arquivo_repetido":
+            shutil.copy(arquivo, os.path.join(caminho, "IBOV_copia.parquet"))
+        elif defeito in ("quantidade_nula", "participacao_negativa"):
+            coluna = "theoricalQty" if defeito == "quantidade_nula" else "part"
+            indice = tabela.column_names.index(coluna)
+            valores = tabela.column(indice).to_pylist()
+            if defeito == "quantidade_nula":
+                valores[0] = None
+            else:
+                # A maior participação: o desvio da soma (o dobro dela) fica acima do alerta
+                maior = valores.index(max(valores))
+                valores[maior] = -valores[maior]
+            tabela = tabela.set_column(indice, coluna, pa.array(valores, tabela.schema.field(indice).type))
+        else:
+            # Última página da API perdida: a soma das participações fica abaixo de 100
+            tabela = tabela.slice(0, tabela.num_rows - 10)
+        pq.write_table(tabela, arquivo)
+        ano, mes, dia = (parte.split("=")[1] for parte in caminho.rstrip("/").split("/")[-3:])
+        injetados[defeito] = f"{ano}-{mes}-{dia}"
+    return injetados
+
+
+@pytest.fixture(scope="module")
+def raw_com_defeitos(tmp_path_factory, raw_tipado):
+    raiz_original, caminhos = raw_tipado
+    raiz = str(tmp_path_factory.mktemp("raw_defeitos") / "raw")
+    shutil.copytree(raiz_original, raiz)
+    caminhos = [caminho.replace(raiz_original, raiz) for caminho in caminhos]
+    return raiz, caminhos, injetar_defeitos(caminhos)
+
+
+def validar(motor, raiz, caminhos):
+    from qualidade_dados import ValidacaoQualidade
+    from transformacoes_b3 import TransformacoesB3
+    transformacoes = TransformacoesB3(motor)
+    df = transformacoes.transform_dataframe(transformacoes.adicionar_data_pregao(
+        motor.ler_parquet(caminhos, raiz, normalizar=transformacoes.normalizar_raw)))
+    df, _ = motor.materializar(df, contar=False)
+    return ValidacaoQualidade(motor).validar(df, tabela="tests"), motor.contar(df)
+
+
+def test_relatorio_aponta_os_pregoes_com_defeito(motor, raw_com_defeitos):
+    raiz, caminhos, injetados = raw_com_defeitos
+
+    relatorio, linhas = validar(motor, raiz, caminhos)
+
+    regras = {regra["regra"]: sorted(str(exemplo["data_pregao"]) for exemplo in regra["exemplos"])
+              for regra in relatorio["regras"]}
+    assert relatorio["linhas"] == linhas
+    assert relatorio["status"] != "ok"
+    for defeito, nomes in DEFEITOS.items():
+        for nome in nomes:
+            assert injetados[defeito] in regras[nome], (defeito, nome)
+
+
+def test_historico_sem_defeitos_nao_aponta_pregoes(motor, raw_tipado):
+    raiz, caminhos = raw_tipado
+
+    relatorio, linhas = validar(motor, raiz, caminhos)
+
+    assert relatorio["linhas"] == linhas
+    assert relatorio["status"] == "ok"
+    assert all(regra["exemplos"] == [] for regra in relatorio["regras"])
@@ -0,0 +1,104 @@
+import os
+import random
+from datetime import date
+
+import pytest
+
+REGISTROS = [{"segment": "Bancos", "cod": "ITUB4", "asset": "ITAUUNIBANCO", "type": "PN N1", "part": "7,953",
+              "theoricalQty": "4.801.593.832"},
+             {"segment": "Petróleo", "cod": "PETR4", "asset": "PETROBRAS", "type": "PN N2", "part": "6,912",
+              "theoricalQty": "4.520.574.580"}]
+
+
+def test_hash_nao_depende_da_ordem_de_registros_e_campos():
+    from referencias_snapshot import hash_carteiras
+    embaralhados = [dict(reversed(list(registro.items()))) for registro in reversed(REGISTROS)]
+
+    assert hash_carteiras({"IBOV": REGISTROS}) == hash_carteiras({"IBOV": embaralhados})
+    assert hash_carteiras({"IBOV": REGISTROS}) != hash_carteiras({"IBXX": REGISTROS})
+    assert hash_carteiras({"IBOV": REGISTROS}) != hash_carteiras({"IBOV": REGISTROS[:1]})
+
+
+def test_decisao_de_gravacao():
+    from referencias_snapshot import decidir_gravacao
+    ultimo = {"sha256": "abc", "data_pregao": "2025-07-18"}
+
+    assert decidir_gravacao(None, "abc", date(2025, 7, 21)) == "gravar"
+    assert decidir_gravacao(ultimo, "def", date(2025, 7, 21)) == "gravar"
+    assert decidir_gravacao(ultimo, "abc", date(2025, 7, 21)) == "referencia"
+    assert decidir_gravacao(ultimo, "abc", date(2025, 7, 18)) == "gravado"
+
+
+class CatalogoFalso:
+    def __init__(self, location, chaves, parametros=None):
+        self.tabela = {'StorageDescriptor': {'Location': location}, 'Parameters': parametros or {},
+                       'PartitionKeys': [{'Name': chave} for chave in chaves]}
+        self.registradas = []
+
+    def obter_tabela(self, database_name, table_name):
+        return self.tabela
+
+    def criar_particoes(self, database_name, table_name, particoes):
+        self.registradas.extend(particoes)
+
+
+@pytest.fixture
+def tabela_refinada(tmp_path):
+    """
+    Partição refinada do pregão de referência (2025-07-18) no layout legado, com dois arquivos.
+    """
+    location = str(tmp_path / "refinado")
+    diretorio = os.path.join(location, "ano=2025", "mes=07", "dia=18", "data_pregao=2025-07-18")
+    os.makedirs(diretorio)
+    aleatorio = random.Random(42)
+    for nome in ("part-00000.parquet", "part-00001.parquet"):
+        with open(os.path.join(diretorio, nome), "wb") as arquivo:
+            arquivo.write(aleatorio.randbytes(256))
+    return location, diretorio
+
+
+MARCADOR = {"data_referencia": "2025-07-18"}
+PARTICAO_RAW = "s3://raw/tb_raw/ano=2025/mes=07/dia=21/"
+
+
+def arquivos(diretorio):
+    return {nome: open(os.path.join(diretorio, nome), "rb").read() for nome in sorted(os.listdir(diretorio))}
+
+
+def test_replicacao_copia_os_arquivos_da_referencia_e_registra_a_particao(tabela_refinada):
+    from referencias_snapshot import ReplicadorReferencias
+    location, referencia = tabela_refinada
+    catalogo = CatalogoFalso(location, ["ano", "mes", "dia", "data_pregao"])
+    destino = os.path.join(location, "ano=2025", "mes=07", "dia=21", "data_pregao=2025-07-21")
+    os.makedirs(destino)
+    # Arquivo de uma execução anterior que a referência não tem mais
+    open(os.path.join(destino, "part-00009.parquet"), "wb").close()
+
+    copiados, faltantes = ReplicadorReferencias(catalogo, "db", ["tb"]).replicar(PARTICAO_RAW, MARCADOR)
+
+    assert (copiados, faltantes) == ({"tb": 2}, [])
+    assert arquivos(destino) == arquivos(referencia)
+    assert catalogo.registradas == [(["2025", "07", "21", "2025-07-21"], f"{destino}/")]
+
+
+def test_tabela_com_projecao_nao_registra_particao(tabela_refinada):
+    from referencias_snapshot import ReplicadorReferencias
+    location, _ = tabela_refinada
+    catalogo = CatalogoFalso(location, ["ano", "mes", "dia", "data_pregao"], {'projection.enabled': 'true'})
+
+    copiados, _ = ReplicadorReferencias(catalogo, "db", ["tb"]).replicar(PARTICAO_RAW, MARCADOR)
+
+    assert copiados == {"tb": 2}
+    assert catalogo.registradas == []
+
+
+def test_referencia_ainda_nao_processada_fica_pendente(tabela_refinada):
+    from referencias_snapshot import ReplicadorReferencias
+    location, _ = tabela_refinada
+    catalogo = CatalogoFalso(location, ["ano", "mes", "dia", "data_pregao"])
+
+    copiados, faltantes = ReplicadorReferencias(catalogo, "db", ["tb"]).replicar(
+        PARTICAO_RAW, {"data_referencia": "2025-07-17"})
+
+    assert (copiados, faltantes) == ({}, ["tb"])
+    assert catalogo.registradas == []